@@ -42,6 +42,15 @@ class Settings(BaseSettings):
     # Feature flags
     enable_caching: bool = True
     cache_ttl: int = 300
+    enable_pipeline_instrumentation: bool = False
+    
+    # Central bank rate ingestion
+    fred_api_key: Optional[str] = None
+    central_bank_rates_max_workers: int = 6
+    central_bank_rates_cache_dir: Optional[str] = ".cache/central_bank_rates"
+    central_bank_rates_cache_fresh_seconds: int = 300
+    central_bank_rates_base_url: Optional[str] = None
+    central_bank_rates_fixture_dir: Optional[str] = None
     
     @validator('database_url', pre=True, always=True)
     def build_database_url(cls, v, values):
@@ -0,0 +1,68 @@
+-- ================================================
+-- GL PERIOD SUMMARY
+-- Posted period totals by reporting dimension
+-- Maintained incrementally by the posting engine;
+-- rebuild with scripts/rebuild_period_summary.py
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS gl_period_summary (
+    summary_id             BIGSERIAL PRIMARY KEY,
+    company_code           VARCHAR(10) NOT NULL,
+    ledger_id              VARCHAR(10) NOT NULL,
+    fiscal_year            INTEGER NOT NULL,
+    posting_period         INTEGER NOT NULL,
+    gl_account             VARCHAR(10) NOT NULL,
+    
+    -- Reporting dimensions ('' = not assigned)
+    business_unit_code     VARCHAR(20) NOT NULL DEFAULT '',
+    business_area_id       VARCHAR(4) NOT NULL DEFAULT '',
+    document_type          VARCHAR(2) NOT NULL DEFAULT '',
+    
+    -- Period Totals
+    period_debits          NUMERIC(15,2) NOT NULL DEFAULT 0,
+    period_credits         NUMERIC(15,2) NOT NULL DEFAULT 0,
+    net_amount             NUMERIC(15,2) NOT NULL DEFAULT 0,
+    transaction_count      INTEGER NOT NULL DEFAULT 0,
+    
+    -- Metadata
+    last_updated           TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    CONSTRAINT chk_summary_period CHECK (posting_period BETWEEN 1 AND 16),
+    CONSTRAINT uk_gl_period_summary UNIQUE (
+        company_code, ledger_id, fiscal_year, posting_period, gl_account,
+        business_unit_code, business_area_id, document_type
+    )
+);
+
+CREATE INDEX IF NOT EXISTS idx_gl_period_summary_period
+ON gl_period_summary (fiscal_year, posting_period, company_code);
+
+CREATE INDEX IF NOT EXISTS idx_gl_period_summary_business_unit
+ON gl_period_summary (business_unit_code, fiscal_year, posting_period);
+
+COMMENT ON TABLE gl_period_summary IS 'Posted period totals by company, ledger, period, account, business unit, business area and document type';
+
+-- Initial load from the documents posted so far
+INSERT INTO gl_period_summary (
+    company_code, ledger_id, fiscal_year, posting_period, gl_account,
+    business_unit_code, business_area_id, document_type,
+    period_debits, period_credits, net_amount, transaction_count
+)
+SELECT jeh.companycodeid,
+       COALESCE(jel.ledgerid, '0L'),
+       jeh.fiscalyear,
+       jeh.period,
+       jel.glaccountid,
+       COALESCE(jel.business_unit_code, ''),
+       COALESCE(jel.business_area_id, ''),
+       COALESCE(jeh.document_type, ''),
+       SUM(COALESCE(jel.debitamount, 0)),
+       SUM(COALESCE(jel.creditamount, 0)),
+       SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0)),
+       COUNT(*)
+FROM journalentryline jel
+JOIN journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
+    AND jeh.companycodeid = jel.companycodeid
+WHERE jeh.posted_at IS NOT NULL
+GROUP BY 1, 2, 3, 4, 5, 6, 7, 8
+ON CONFLICT ON CONSTRAINT uk_gl_period_summary DO NOTHING;
@@ -0,0 +1,18 @@
+-- ================================================
+-- REPORT DATA VERSIONS
+-- One counter per (company, fiscal year, period), bumped by the
+-- posting, reversal and revaluation paths in their own transaction.
+-- The shared report cache compares counters to detect stale results.
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS report_data_versions (
+    company_code           VARCHAR(10) NOT NULL,
+    fiscal_year            INTEGER NOT NULL,
+    posting_period         INTEGER NOT NULL,
+    version                BIGINT NOT NULL DEFAULT 0,
+    updated_at             TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (company_code, fiscal_year, posting_period)
+);
+
+COMMENT ON TABLE report_data_versions IS 'Data version per company, fiscal year and period used to invalidate cached reports';
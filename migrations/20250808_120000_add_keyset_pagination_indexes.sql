@@ -0,0 +1,18 @@
+-- ================================================
+-- KEYSET PAGINATION INDEXES
+-- Let the journal listings seek straight to a page cursor
+-- instead of reading and discarding the rows of earlier pages.
+-- ================================================
+
+-- GL line listing: lines come out of the index in account order, so each page
+-- only sorts the current account's lines by date before the LIMIT stops it
+CREATE INDEX IF NOT EXISTS idx_jel_keyset_account
+ON journalentryline (glaccountid, companycodeid, documentnumber, linenumber);
+
+-- Header lookups for the lines of a page
+CREATE INDEX IF NOT EXISTS idx_jeh_document_company
+ON journalentryheader (documentnumber, companycodeid);
+
+-- Journal listing: newest documents first
+CREATE INDEX IF NOT EXISTS idx_jeh_keyset_listing
+ON journalentryheader (documentdate DESC, documentnumber, companycodeid);
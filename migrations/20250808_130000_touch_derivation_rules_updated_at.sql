@@ -0,0 +1,20 @@
+-- ================================================
+-- DERIVATION RULE CHANGE TRACKING
+-- Every UPDATE of ledger_derivation_rules moves updated_at forward,
+-- including updates that do not set it (e.g. toggling is_active),
+-- so the compiled rule matcher's fingerprint sees the change.
+-- ================================================
+
+CREATE OR REPLACE FUNCTION touch_ledger_derivation_rule()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_touch_ledger_derivation_rule ON ledger_derivation_rules;
+CREATE TRIGGER trg_touch_ledger_derivation_rule
+    BEFORE UPDATE ON ledger_derivation_rules
+    FOR EACH ROW
+    EXECUTE FUNCTION touch_ledger_derivation_rule();
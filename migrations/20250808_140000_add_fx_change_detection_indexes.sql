@@ -0,0 +1,15 @@
+-- ================================================
+-- FX REVALUATION CHANGE DETECTION INDEXES
+-- Incremental revaluation looks for documents posted or dated since the
+-- oldest balance snapshot; these indexes bound that scan to recent activity.
+-- ================================================
+
+CREATE INDEX IF NOT EXISTS idx_jeh_company_posted_at
+ON journalentryheader (companycodeid, posted_at);
+
+CREATE INDEX IF NOT EXISTS idx_jeh_company_postingdate
+ON journalentryheader (companycodeid, postingdate);
+
+-- Lines of the candidate documents
+CREATE INDEX IF NOT EXISTS idx_jel_company_document
+ON journalentryline (companycodeid, documentnumber);
@@ -0,0 +1,57 @@
+-- ================================================
+-- LINE DOCUMENT DATE
+-- Copies the header's documentdate onto journalentryline so the GL line
+-- listing's (account, date, company, document, line) order can be read
+-- straight from one index instead of sorting each account's lines.
+-- ================================================
+
+ALTER TABLE journalentryline ADD COLUMN IF NOT EXISTS documentdate DATE;
+
+UPDATE journalentryline jel
+SET documentdate = jeh.documentdate
+FROM journalentryheader jeh
+WHERE jeh.documentnumber = jel.documentnumber
+AND jeh.companycodeid = jel.companycodeid
+AND jel.documentdate IS DISTINCT FROM jeh.documentdate;
+
+-- New and re-keyed lines take the date of their header
+CREATE OR REPLACE FUNCTION set_journal_line_document_date()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT jeh.documentdate INTO NEW.documentdate
+    FROM journalentryheader jeh
+    WHERE jeh.documentnumber = NEW.documentnumber
+    AND jeh.companycodeid = NEW.companycodeid;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_set_journal_line_document_date ON journalentryline;
+CREATE TRIGGER trg_set_journal_line_document_date
+    BEFORE INSERT OR UPDATE OF documentnumber, companycodeid, documentdate ON journalentryline
+    FOR EACH ROW
+    EXECUTE FUNCTION set_journal_line_document_date();
+
+-- Header date changes are carried to the lines
+CREATE OR REPLACE FUNCTION sync_journal_line_document_date()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE journalentryline
+    SET documentdate = NEW.documentdate
+    WHERE documentnumber = NEW.documentnumber
+    AND companycodeid = NEW.companycodeid;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_sync_journal_line_document_date ON journalentryheader;
+CREATE TRIGGER trg_sync_journal_line_document_date
+    AFTER UPDATE OF documentdate ON journalentryheader
+    FOR EACH ROW
+    WHEN (OLD.documentdate IS DISTINCT FROM NEW.documentdate)
+    EXECUTE FUNCTION sync_journal_line_document_date();
+
+-- GL line listing: the index holds the full sort key, so a page is an index range scan
+DROP INDEX IF EXISTS idx_jel_keyset_account;
+CREATE INDEX idx_jel_keyset_account
+ON journalentryline (glaccountid, documentdate, companycodeid, documentnumber, linenumber);
@@ -0,0 +1,42 @@
+-- ================================================
+-- SINGLE EXCHANGE RATE TABLE
+-- exchange_rates is the only rate table read and written by the
+-- application. Copies the rates written to the legacy exchangerate
+-- table since the 20250807 consolidation (latest active row per pair,
+-- rate type and date). Legacy DAILY rows become SPOT rates.
+-- ================================================
+
+INSERT INTO exchange_rates (
+    from_currency, to_currency, rate_date, rate_type, exchange_rate,
+    source, created_at, created_by, rate_source_type, is_official
+)
+SELECT DISTINCT ON (er.fromcurrency, er.tocurrency, t.rate_type, er.ratedate)
+    er.fromcurrency,
+    er.tocurrency,
+    er.ratedate,
+    t.rate_type,
+    ROUND(er.rate, 6),
+    COALESCE(er.rate_source, 'MIGRATED_FROM_OLD_TABLE'),
+    COALESCE(er.created_at, CURRENT_TIMESTAMP),
+    COALESCE(er.created_by, 'MIGRATION'),
+    'MANUAL',
+    false
+FROM exchangerate er
+CROSS JOIN LATERAL (
+    SELECT CASE
+        WHEN er.rate_type IN ('SPOT', 'CLOSING', 'AVERAGE', 'HISTORICAL', 'BUDGET', 'OFFICIAL')
+        THEN er.rate_type
+        ELSE 'SPOT'
+    END AS rate_type
+) t
+WHERE COALESCE(er.is_active, true)
+AND er.rate > 0
+AND er.fromcurrency <> er.tocurrency
+AND er.fromcurrency ~ '^[A-Z]{3}$'
+AND er.tocurrency ~ '^[A-Z]{3}$'
+ORDER BY er.fromcurrency, er.tocurrency, t.rate_type, er.ratedate, er.created_at DESC
+ON CONFLICT (from_currency, to_currency, rate_type, rate_date) DO NOTHING;
+
+COMMENT ON TABLE exchangerate IS 'Legacy exchange rate table, superseded by exchange_rates; no longer read or written';
+
+ANALYZE exchange_rates;
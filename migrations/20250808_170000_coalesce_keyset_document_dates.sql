@@ -0,0 +1,16 @@
+-- ================================================
+-- KEYSET INDEXES ON COALESCED DOCUMENT DATES
+-- The journal listings sort on COALESCE(documentdate, DATE '0001-01-01')
+-- so documents without a document date stay on their pages instead of
+-- falling out of the seek comparison. The indexes hold the same expression
+-- so a page is still one index range scan.
+-- ================================================
+
+DROP INDEX IF EXISTS idx_jel_keyset_account;
+CREATE INDEX idx_jel_keyset_account
+ON journalentryline (glaccountid, (COALESCE(documentdate, DATE '0001-01-01')),
+                     companycodeid, documentnumber, linenumber);
+
+DROP INDEX IF EXISTS idx_jeh_keyset_listing;
+CREATE INDEX idx_jeh_keyset_listing
+ON journalentryheader ((COALESCE(documentdate, DATE '0001-01-01')) DESC, documentnumber, companycodeid);
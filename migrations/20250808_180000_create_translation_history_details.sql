@@ -0,0 +1,47 @@
+-- ================================================
+-- TRANSLATION HISTORY DETAILS
+-- Per-account lines of a saved translation run, written in one bulk
+-- insert by TranslationMethodsService._save_translation_results.
+-- translation_history is created here as well for databases where
+-- create_translation_history_table() has never run.
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS translation_history (
+    history_id               SERIAL PRIMARY KEY,
+    entity_id                VARCHAR(10) NOT NULL,
+    translation_method       VARCHAR(50) NOT NULL,
+    functional_currency      VARCHAR(3) NOT NULL,
+    presentation_currency    VARCHAR(3) NOT NULL,
+    translation_date         DATE NOT NULL,
+    fiscal_year              INTEGER NOT NULL,
+    fiscal_period            INTEGER NOT NULL,
+    total_translated_balance DECIMAL(15,2),
+    translation_adjustment   DECIMAL(15,2),
+    oci_impact               DECIMAL(15,2),
+    pnl_impact               DECIMAL(15,2),
+    created_at               TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_by               VARCHAR(50),
+    
+    CONSTRAINT uk_translation_history UNIQUE (
+        entity_id, translation_method, translation_date,
+        fiscal_year, fiscal_period
+    )
+);
+
+CREATE TABLE IF NOT EXISTS translation_history_details (
+    detail_id                SERIAL PRIMARY KEY,
+    history_id               INTEGER NOT NULL REFERENCES translation_history(history_id) ON DELETE CASCADE,
+    gl_account               VARCHAR(20),
+    account_name             VARCHAR(100),
+    account_type             VARCHAR(20),
+    monetary_classification  VARCHAR(20),
+    rate_type                VARCHAR(20),
+    balance_fc               DECIMAL(18,2),
+    rate_applied             DECIMAL(15,6),
+    balance_translated       DECIMAL(18,2)
+);
+
+CREATE INDEX IF NOT EXISTS idx_translation_history_details_history
+ON translation_history_details (history_id);
+
+COMMENT ON TABLE translation_history_details IS 'Translated account balances of each saved translation run';
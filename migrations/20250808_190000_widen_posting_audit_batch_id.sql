@@ -0,0 +1,8 @@
+-- ================================================
+-- POSTING AUDIT BATCH ID
+-- Bulk and worker-pool batch ids carry a random suffix after their
+-- timestamp (GLPostingEngine._new_batch_id) so batches started within
+-- the same second stay distinguishable; VARCHAR(20) no longer fits them.
+-- ================================================
+
+ALTER TABLE posting_audit_trail ALTER COLUMN batch_id TYPE VARCHAR(40);
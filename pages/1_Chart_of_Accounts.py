@@ -5,6 +5,7 @@ from sqlalchemy import text
 from auth.optimized_middleware import optimized_authenticator as authenticator
 from utils.logger import StreamlitLogHandler
 from utils.navigation import show_sap_sidebar, show_breadcrumb
+from utils.gl_account_index import invalidate_gl_account_index
 
 # Require authentication and permission
 authenticator.require_auth()
@@ -121,6 +122,7 @@ if st.button("Save Changes"):
         
         st.success("All changes saved successfully!")
         load_glaccounts.clear()
+        invalidate_gl_account_index()
         
     except Exception as e:
         st.error(f"Error saving changes: {e}")
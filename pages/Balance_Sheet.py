@@ -6,6 +6,7 @@ from datetime import date
 from db_config import engine
 from utils.navigation import show_sap_sidebar, show_breadcrumb
 from utils.pdf_generator import generate_balance_sheet_pdf
+from utils.reporting_engine import ReportFilter, reporting_engine
 
 # Configure page
 st.set_page_config(page_title="📊 Balance Sheet", layout="wide", initial_sidebar_state="expanded")
@@ -58,12 +59,14 @@ with st.expander("🔍 Filter Options", expanded=True):
 
 # Run Report Button
 if st.button("📊 Generate Balance Sheet", type="primary"):
-    # Process filter selections
+    # Process filter selections ("All" leaves the dimension unrestricted)
+    all_years = "All" in selected_years
+    all_periods = "All" in selected_periods
     if "All" in selected_companies:
         selected_companies = companies
-    if "All" in selected_years:
+    if all_years:
         selected_years = years
-    if "All" in selected_periods:
+    if all_periods:
         selected_periods = periods
     if "All" in selected_account_types:
         selected_account_types = account_types
@@ -73,62 +76,22 @@ if st.button("📊 Generate Balance Sheet", type="primary"):
         st.error("⚠️ Please ensure Company Code(s) and date range are provided.")
         st.stop()
     
-    # Build query
-    where_conditions = ["jeh.documentdate BETWEEN :date_from AND :date_to"]
-    params = {"date_from": date_from, "date_to": date_to}
-    
-    if selected_companies:
-        comp_ph = ", ".join([f":comp{i}" for i in range(len(selected_companies))])
-        where_conditions.append(f"jeh.companycodeid IN ({comp_ph})")
-        params.update({f"comp{i}": v for i, v in enumerate(selected_companies)})
-    
-    if selected_years:
-        year_ph = ", ".join([f":year{i}" for i in range(len(selected_years))])
-        where_conditions.append(f"jeh.fiscalyear IN ({year_ph})")
-        params.update({f"year{i}": v for i, v in enumerate(selected_years)})
-    
-    if selected_periods:
-        period_ph = ", ".join([f":period{i}" for i in range(len(selected_periods))])
-        where_conditions.append(f"jeh.period IN ({period_ph})")
-        params.update({f"period{i}": v for i, v in enumerate(selected_periods)})
-    
-    if selected_account_types:
-        type_ph = ", ".join([f":type{i}" for i in range(len(selected_account_types))])
-        where_conditions.append(f"coa.accounttype IN ({type_ph})")
-        params.update({f"type{i}": v for i, v in enumerate(selected_account_types)})
-    else:
-        where_conditions.append("coa.accounttype IN ('Asset', 'Liability', 'Equity')")
-    
-    query = f"""
-    SELECT 
-        coa.glaccountid,
-        coa.accountname,
-        coa.accounttype,
-        SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0)) AS balance
-    FROM 
-        journalentryline jel
-    JOIN 
-        glaccount coa ON coa.glaccountid = jel.glaccountid
-    JOIN 
-        journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
-    WHERE 
-        {' AND '.join(where_conditions)}
-    GROUP BY 
-        coa.glaccountid, coa.accountname, coa.accounttype
-    HAVING 
-        {'ABS(SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0))) >= :threshold' if not show_zero_balances else 'TRUE'}
-    ORDER BY 
-        coa.accounttype, coa.glaccountid
-    """
-    
-    if not show_zero_balances:
-        params["threshold"] = balance_threshold
+    # Build report filter
+    report_filter = ReportFilter(
+        company_codes=selected_companies,
+        date_from=date_from,
+        date_to=date_to,
+        fiscal_years=None if all_years else selected_years,
+        periods=None if all_periods else selected_periods,
+        account_types=selected_account_types
+    )
     
     # Execute query
     with st.spinner("Generating Balance Sheet..."):
         try:
-            with engine.connect() as conn:
-                df = pd.read_sql(text(query), conn, params=params)
+            df = reporting_engine.balance_sheet(
+                report_filter, threshold=None if show_zero_balances else balance_threshold
+            )
             
             if df.empty:
                 st.warning("No records found with the selected filters.")
@@ -704,8 +704,7 @@ def show_performance_analytics():
     st.header("📈 Performance Analytics")
     st.markdown("*Business unit performance analysis and trends*")
     
-    # This would integrate with GL transactions and other financial data
-    st.info("📊 Performance analytics will be enhanced once GL transaction integration is complete.")
+    show_financial_performance()
     
     # Show unit distribution analysis
     try:
@@ -759,6 +758,77 @@ def show_performance_analytics():
     except Exception as e:
         st.error(f"Error loading analytics data: {e}")
 
+def show_financial_performance():
+    """Posted revenue and expenses by business unit from the period summary."""
+    try:
+        with engine.connect() as conn:
+            years = [row[0] for row in conn.execute(text(
+                "SELECT DISTINCT fiscal_year FROM gl_period_summary ORDER BY fiscal_year DESC"
+            )).fetchall()]
+        
+        if not years:
+            st.info("📊 No posted GL activity in the period summary yet.")
+            return
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            fiscal_year = st.selectbox("Fiscal Year", years, key="bu_perf_year")
+        with col2:
+            periods = st.slider("Periods", 1, 16, (1, 12), key="bu_perf_periods")
+        
+        with engine.connect() as conn:
+            performance = pd.read_sql(text("""
+                SELECT 
+                    s.business_unit_code,
+                    COALESCE(bu.unit_name, 'Unassigned') as unit_name,
+                    bu.unit_type,
+                    SUM(CASE WHEN coa.accounttype = 'Revenue' 
+                        THEN s.period_credits - s.period_debits ELSE 0 END) as revenue,
+                    SUM(CASE WHEN coa.accounttype IN ('Expense', 'Expenses') 
+                        THEN s.period_debits - s.period_credits ELSE 0 END) as expenses,
+                    SUM(s.transaction_count) as transaction_count
+                FROM gl_period_summary s
+                JOIN glaccount coa ON coa.glaccountid = s.gl_account
+                LEFT JOIN business_units bu ON bu.business_unit_code = NULLIF(s.business_unit_code, '')
+                WHERE s.fiscal_year = :fy
+                AND s.posting_period BETWEEN :period_from AND :period_to
+                AND coa.accounttype IN ('Revenue', 'Expense', 'Expenses')
+                GROUP BY s.business_unit_code, bu.unit_name, bu.unit_type
+                ORDER BY revenue DESC
+            """), conn, params={"fy": fiscal_year, "period_from": periods[0], "period_to": periods[1]})
+        
+        if performance.empty:
+            st.info("📊 No posted revenue or expenses for the selected periods.")
+            return
+        
+        performance['revenue'] = performance['revenue'].astype(float)
+        performance['expenses'] = performance['expenses'].astype(float)
+        performance['net_income'] = performance['revenue'] - performance['expenses']
+        
+        st.subheader("💰 Financial Performance by Business Unit")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Revenue", f"{performance['revenue'].sum():,.2f}")
+        with col2:
+            st.metric("Expenses", f"{performance['expenses'].sum():,.2f}")
+        with col3:
+            st.metric("Net Income", f"{performance['net_income'].sum():,.2f}")
+        
+        fig = px.bar(
+            performance.head(20),
+            x='unit_name',
+            y=['revenue', 'expenses', 'net_income'],
+            title='Revenue, Expenses and Net Income (Top 20 Units by Revenue)',
+            barmode='group'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        st.dataframe(performance, use_container_width=True, hide_index=True)
+    
+    except Exception as e:
+        st.error(f"Error loading financial performance: {e}")
+
 def show_business_unit_reports():
     """Business unit reporting interface."""
     st.header("📋 Business Unit Reports")
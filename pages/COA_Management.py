@@ -10,6 +10,7 @@ from sqlalchemy import text
 from db_config import engine
 from utils.navigation import show_sap_sidebar, show_breadcrumb
 from utils.logger import get_logger
+from utils.gl_account_index import invalidate_gl_account_index
 import traceback
 
 # Configure page
@@ -247,6 +248,7 @@ def manage_account_groups():
                                 "req_bu": req_business_unit, "req_ba": req_business_area,
                                 "fsg": default_fsg, "active": is_active, "user": current_user
                             })
+                            invalidate_gl_account_index()
                             st.success(f"Account Group {group_code} created successfully!")
                         
                         else:  # Edit mode
@@ -264,6 +266,7 @@ def manage_account_groups():
                                 "req_bu": req_business_unit, "req_ba": req_business_area,
                                 "fsg": default_fsg, "active": is_active, "user": current_user
                             })
+                            invalidate_gl_account_index()
                             st.success(f"Account Group {group_code} updated successfully!")
                         
                         st.rerun()
@@ -598,6 +601,7 @@ def manage_gl_accounts():
                                         'VENDOR' if new_account_type == 'PAYABLE' else 'NONE'
                         })
                         
+                        invalidate_gl_account_index()
                         st.success(f"GL Account {new_account_id} created successfully!")
                         st.rerun()
                         
@@ -28,6 +28,8 @@ import csv
 from sqlalchemy import text
 from db_config import engine
 from auth.optimized_middleware import optimized_authenticator as authenticator
+from utils.exchange_rate_bulk_loader import ExchangeRateBulkLoader
+from utils.exchange_rate_store import invalidate_exchange_rates
 
 # Page configuration
 st.set_page_config(
@@ -40,6 +42,8 @@ st.set_page_config(
 authenticator.require_auth()
 user = authenticator.get_current_user()
 
+exchange_rate_bulk_loader = ExchangeRateBulkLoader()
+
 def main():
     """Main Currency Administration application."""
     st.title("💱 Currency & Exchange Rate Administration")
@@ -389,24 +393,17 @@ def show_bulk_import():
         
         if uploaded_file is not None:
             try:
-                # Read uploaded file
-                if uploaded_file.name.endswith('.csv'):
-                    upload_df = pd.read_csv(uploaded_file)
-                else:
-                    upload_df = pd.read_excel(uploaded_file)
-                
-                st.success(f"✅ File loaded: {len(upload_df)} rows")
+                # Only a preview is read here; the import streams the file in chunks
+                preview_df = exchange_rate_bulk_loader.read_preview(uploaded_file, uploaded_file.name)
+                missing_columns = exchange_rate_bulk_loader.missing_columns(list(preview_df.columns))
                 
-                # Validate data
-                validation_results = validate_upload_data(upload_df)
-                
-                if validation_results['valid']:
-                    st.success("✅ Data validation passed")
+                if not missing_columns:
+                    st.success(f"✅ File loaded: {uploaded_file.name} ({uploaded_file.size / 1024:,.0f} KB)")
                     
                     # Preview data
                     st.subheader("📋 Data Preview")
                     st.dataframe(
-                        upload_df.head(10),
+                        preview_df,
                         use_container_width=True,
                         hide_index=True
                     )
@@ -419,6 +416,11 @@ def show_bulk_import():
                         help="Update rates if they already exist for the same date/currency pair"
                     )
                     
+                    skip_invalid = st.checkbox(
+                        "Skip Invalid Rows",
+                        help="Import the valid rows even if some rows fail validation"
+                    )
+                    
                     dry_run = st.checkbox(
                         "Dry Run (Preview Only)",
                         value=True,
@@ -426,32 +428,62 @@ def show_bulk_import():
                     )
                     
                     if st.button("🚀 Import Exchange Rates"):
-                        import_results = import_exchange_rates(
-                            upload_df, update_existing, dry_run
-                        )
+                        with st.spinner("Staging and validating rates..."):
+                            import_results = import_exchange_rates(
+                                uploaded_file, update_existing, dry_run, skip_invalid
+                            )
                         
-                        if import_results['success']:
-                            if dry_run:
-                                st.info(f"✅ Dry run completed: {import_results['processed']} rates would be imported")
-                            else:
-                                st.success(f"✅ Import completed: {import_results['processed']} rates imported")
-                            
-                            if import_results.get('errors'):
-                                st.warning(f"⚠️ {len(import_results['errors'])} errors encountered")
-                                with st.expander("View Errors"):
-                                    for error in import_results['errors']:
-                                        st.error(error)
-                        else:
-                            st.error(f"❌ Import failed: {import_results.get('error', 'Unknown error')}")
+                        show_import_results(import_results, dry_run)
                 
                 else:
                     st.error("❌ Data validation failed")
-                    for error in validation_results['errors']:
-                        st.error(f"• {error}")
+                    for column in missing_columns:
+                        st.error(f"• Missing required column: {column}")
                     
             except Exception as e:
                 st.error(f"❌ Error reading file: {str(e)}")
 
+def show_import_results(import_results, dry_run):
+    """Display the outcome of a bulk rate import or dry run."""
+    if 'rows_read' not in import_results:
+        st.error(f"❌ Import failed: {import_results.get('error', 'Unknown error')}")
+        return
+    
+    if import_results['success']:
+        if dry_run:
+            st.info(f"✅ Dry run completed: {import_results['processed']} rates would be imported")
+        else:
+            st.success(f"✅ Import completed: {import_results['processed']} rates imported")
+    else:
+        st.error(f"❌ Import failed: {import_results.get('error', 'Unknown error')}")
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Rows Read", f"{import_results['rows_read']:,}")
+    col2.metric("Rejected", f"{import_results['rows_rejected']:,}")
+    col3.metric("New", f"{import_results['inserted']:,}")
+    col4.metric("Updated", f"{import_results['updated']:,}")
+    col5.metric("Unchanged", f"{import_results['unchanged']:,}")
+    
+    if import_results['skipped_existing']:
+        st.info(f"ℹ️ {import_results['skipped_existing']} existing rates differ and were left unchanged "
+                f"(enable 'Update Existing Rates' to overwrite them)")
+    
+    if import_results['changes']:
+        label = "Changes that would be applied" if dry_run else "Changes applied"
+        with st.expander(f"{label} (first {len(import_results['changes'])})"):
+            st.dataframe(
+                pd.DataFrame(import_results['changes']),
+                use_container_width=True,
+                hide_index=True
+            )
+    
+    if import_results['errors']:
+        suffix = "+" if import_results['errors_truncated'] else ""
+        st.warning(f"⚠️ {len(import_results['errors'])}{suffix} validation errors")
+        with st.expander("View Errors"):
+            for error in import_results['errors']:
+                st.error(error)
+
 def show_rate_analytics():
     """Exchange rate analytics and reporting."""
     st.header("📊 Exchange Rate Analytics")
@@ -766,6 +798,7 @@ def save_exchange_rate(from_currency, to_currency, rate_date, rate_type, exchang
                 "source": source,
                 "created_by": user.username if user else 'system'
             })
+        invalidate_exchange_rates(from_currency, to_currency)
         
         st.success(f"✅ Exchange rate saved: 1 {from_currency} = {exchange_rate:.6f} {to_currency}")
         st.rerun()
@@ -827,117 +860,16 @@ def get_current_exchange_rates():
     except:
         return pd.DataFrame()
 
-def validate_upload_data(df):
-    """Validate uploaded exchange rate data."""
-    errors = []
-    required_columns = ['from_currency', 'to_currency', 'rate_date', 'rate_type', 'exchange_rate']
-    
-    # Check required columns
-    for col in required_columns:
-        if col not in df.columns:
-            errors.append(f"Missing required column: {col}")
-    
-    if not errors:
-        # Validate data types and values
-        for idx, row in df.iterrows():
-            row_num = idx + 1
-            
-            # Currency codes validation
-            if len(str(row['from_currency'])) != 3:
-                errors.append(f"Row {row_num}: Invalid from_currency (must be 3 characters)")
-            
-            if len(str(row['to_currency'])) != 3:
-                errors.append(f"Row {row_num}: Invalid to_currency (must be 3 characters)")
-            
-            # Rate type validation
-            valid_rate_types = ['SPOT', 'CLOSING', 'AVERAGE', 'HISTORICAL', 'BUDGET']
-            if str(row['rate_type']).upper() not in valid_rate_types:
-                errors.append(f"Row {row_num}: Invalid rate_type (must be one of {valid_rate_types})")
-            
-            # Exchange rate validation
-            try:
-                rate = float(row['exchange_rate'])
-                if rate <= 0:
-                    errors.append(f"Row {row_num}: Exchange rate must be positive")
-            except (ValueError, TypeError):
-                errors.append(f"Row {row_num}: Invalid exchange rate format")
-    
-    return {
-        'valid': len(errors) == 0,
-        'errors': errors
-    }
-
-def import_exchange_rates(df, update_existing, dry_run):
-    """Import exchange rates from DataFrame."""
-    try:
-        processed = 0
-        errors = []
-        
-        if not dry_run:
-            with engine.begin() as conn:
-                for idx, row in df.iterrows():
-                    try:
-                        if update_existing:
-                            conn.execute(text("""
-                                INSERT INTO exchange_rates (
-                                    from_currency, to_currency, rate_date, rate_type,
-                                    exchange_rate, source, created_by
-                                ) VALUES (
-                                    :from_curr, :to_curr, :rate_date, :rate_type,
-                                    :exchange_rate, :source, :created_by
-                                )
-                                ON CONFLICT (from_currency, to_currency, rate_type, rate_date) 
-                                DO UPDATE SET
-                                    exchange_rate = :exchange_rate,
-                                    source = :source,
-                                    updated_at = CURRENT_TIMESTAMP
-                            """), {
-                                "from_curr": row['from_currency'],
-                                "to_curr": row['to_currency'],
-                                "rate_date": row['rate_date'],
-                                "rate_type": row['rate_type'].upper(),
-                                "exchange_rate": float(row['exchange_rate']),
-                                "source": row.get('source', 'Bulk Import'),
-                                "created_by": user.username if user else 'system'
-                            })
-                        else:
-                            conn.execute(text("""
-                                INSERT INTO exchange_rates (
-                                    from_currency, to_currency, rate_date, rate_type,
-                                    exchange_rate, source, created_by
-                                ) VALUES (
-                                    :from_curr, :to_curr, :rate_date, :rate_type,
-                                    :exchange_rate, :source, :created_by
-                                )
-                            """), {
-                                "from_curr": row['from_currency'],
-                                "to_curr": row['to_currency'],
-                                "rate_date": row['rate_date'],
-                                "rate_type": row['rate_type'].upper(),
-                                "exchange_rate": float(row['exchange_rate']),
-                                "source": row.get('source', 'Bulk Import'),
-                                "created_by": user.username if user else 'system'
-                            })
-                        
-                        processed += 1
-                        
-                    except Exception as e:
-                        errors.append(f"Row {idx + 1}: {str(e)}")
-        else:
-            # Dry run - just count valid rows
-            processed = len(df)
-        
-        return {
-            'success': True,
-            'processed': processed,
-            'errors': errors
-        }
-        
-    except Exception as e:
-        return {
-            'success': False,
-            'error': str(e)
-        }
+def import_exchange_rates(uploaded_file, update_existing, dry_run, skip_invalid=False):
+    """Stage, validate and upsert an uploaded exchange rate file."""
+    return exchange_rate_bulk_loader.load(
+        uploaded_file,
+        uploaded_file.name,
+        update_existing=update_existing,
+        dry_run=dry_run,
+        skip_invalid=skip_invalid,
+        created_by=user.username if user else 'system'
+    )
 
 def get_currency_pairs():
     """Get available currency pairs."""
@@ -1190,16 +1122,16 @@ def show_official_rates_import():
                     
                     # Save all button
                     if st.button("💾 Save All Official Rates", key="save_all"):
-                        saved_sources = 0
-                        for source_key, rates_data in all_results.items():
-                            if st.session_state.cb_service.save_official_rates(rates_data, user.get('username', 'Unknown')):
-                                saved_sources += 1
+                        saved_rates = st.session_state.cb_service.save_all_official_rates(
+                            list(all_results.values()), user.get('username', 'Unknown')
+                        )
+                        expected_rates = sum(len(rates_data['rates']) for rates_data in all_results.values())
                         
-                        if saved_sources == len(all_results):
-                            st.success(f"✅ Successfully saved rates from all {saved_sources} sources!")
+                        if saved_rates and saved_rates == expected_rates:
+                            st.success(f"✅ Successfully saved {saved_rates} rates from all {len(all_results)} sources!")
                             st.balloons()
                         else:
-                            st.warning(f"⚠️ Saved rates from {saved_sources}/{len(all_results)} sources")
+                            st.warning(f"⚠️ Saved {saved_rates}/{expected_rates} rates from {len(all_results)} sources")
                 else:
                     st.error("❌ Failed to fetch rates from any official source")
     
@@ -29,6 +29,8 @@ import os
 sys.path.append('/home/anton/erp/gl')
 
 from utils.fx_revaluation_service import FXRevaluationService
+from utils.fx_revaluation_orchestrator import FXRevaluationOrchestrator
+from utils.fx_scenario_engine import FXScenarioEngine, RateScenario, currency_shock_grid
 from utils.currency_service import CurrencyTranslationService
 from db_config import engine
 from sqlalchemy import text
@@ -65,6 +67,7 @@ def main():
             [
                 "🔄 Run Revaluation", 
                 "📊 Dashboard",
+                "🧪 Rate Scenarios",
                 "📈 Reports"
             ]
         )
@@ -74,6 +77,8 @@ def main():
         show_revaluation_runner()
     elif page == "📊 Dashboard":
         show_dashboard()
+    elif page == "🧪 Rate Scenarios":
+        show_rate_scenarios()
     elif page == "📈 Reports":
         show_reports()
 
@@ -230,11 +235,17 @@ def show_revaluation_runner():
             help="Generate journal entries for revaluations"
         )
         
+        incremental = st.checkbox(
+            "Incremental",
+            value=False,
+            help="Re-read balances only for accounts with postings since their last revaluation snapshot"
+        )
+        
         # Run button
         if st.button("▶️ Run FX Revaluation", type="primary"):
             run_fx_revaluation(
                 company_code, revaluation_date, fiscal_year, fiscal_period,
-                run_type, selected_ledgers, create_journals
+                run_type, selected_ledgers, create_journals, incremental
             )
     
     with col2:
@@ -274,9 +285,110 @@ def show_revaluation_runner():
                     "balance_usd_current": st.column_config.NumberColumn("Balance (USD)", format="$%.2f")
                 }
             )
+    
+    st.divider()
+    show_multi_company_runner(revaluation_date, fiscal_year, fiscal_period, run_type,
+                              create_journals, incremental)
+
+def show_multi_company_runner(revaluation_date: date, fiscal_year: int, fiscal_period: int,
+                              run_type: str, create_journals: bool, incremental: bool = False):
+    """Display the concurrent multi-company revaluation interface."""
+    st.subheader("🌐 Multi-Company Revaluation")
+    st.caption("Revalues every company code / ledger combination concurrently, using the settings above")
+    
+    col1, col2, col3 = st.columns([2, 2, 1])
+    
+    with col1:
+        available_companies = get_available_company_codes()
+        company_codes = st.multiselect(
+            "Company Codes",
+            options=available_companies,
+            default=available_companies,
+            key="multi_company_codes"
+        )
+    
+    with col2:
+        ledger_ids = st.multiselect(
+            "Ledgers",
+            options=get_available_ledgers(),
+            help="Leave empty for all configured ledgers",
+            key="multi_company_ledgers"
+        )
+    
+    with col3:
+        max_workers = st.number_input("Workers", value=4, min_value=1, max_value=8)
+    
+    if st.button("▶️ Run for All Selected Companies", disabled=not company_codes):
+        run_multi_company_revaluation(
+            company_codes, revaluation_date, fiscal_year, fiscal_period,
+            run_type, ledger_ids, create_journals, int(max_workers), incremental
+        )
+
+def run_multi_company_revaluation(company_codes: list, revaluation_date: date, fiscal_year: int,
+                                  fiscal_period: int, run_type: str, ledger_ids: list,
+                                  create_journals: bool, max_workers: int, incremental: bool = False):
+    """Execute FX revaluation for several company codes concurrently."""
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    
+    def on_progress(done, total, outcome):
+        progress_bar.progress(done / total)
+        status_text.text(f"{done}/{total} units done - {outcome.unit.company_code}/{outcome.unit.ledger_id}: {outcome.status}")
+    
+    try:
+        orchestrator = FXRevaluationOrchestrator(max_workers=max_workers)
+        result = orchestrator.run(
+            company_codes, revaluation_date, fiscal_year, fiscal_period,
+            run_type=run_type, ledger_ids=ledger_ids or None,
+            create_journals=create_journals, incremental=incremental,
+            progress_callback=on_progress
+        )
+        
+        if result["status"] == "COMPLETED":
+            st.success(f"✅ Revalued {result['units_completed']} units in {result.get('elapsed_seconds', 0):.1f}s")
+        elif result["status"] == "PARTIAL":
+            st.warning(f"⚠️ {result['units_failed']} of {result['units_total']} units failed")
+        else:
+            st.error(f"❌ FX Revaluation failed: {result['errors']}")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Accounts Processed", result["accounts_processed"])
+        with col2:
+            st.metric("Revaluations Created", result["revaluations_created"])
+        with col3:
+            st.metric("Net Unrealized G/L", f"${(result['total_unrealized_gain'] - result['total_unrealized_loss']):,.2f}")
+        
+        if result["unit_outcomes"]:
+            st.subheader("📊 Results by Company and Ledger")
+            unit_rows = []
+            for outcome in result["unit_outcomes"]:
+                ledger_result = result["company_results"][outcome["company_code"]]["ledger_results"].get(outcome["ledger_id"], {})
+                unit_rows.append({
+                    "Company": outcome["company_code"],
+                    "Ledger": outcome["ledger_id"],
+                    "Status": outcome["status"],
+                    "Attempts": outcome["attempts"],
+                    "Seconds": outcome["elapsed_seconds"],
+                    "Accounts": ledger_result.get("accounts_processed", 0),
+                    "Re-read": ledger_result.get("accounts_reextracted", 0),
+                    "Revaluations": ledger_result.get("revaluations_created", 0),
+                    "Journals": len(ledger_result.get("journal_documents", []))
+                })
+            st.dataframe(pd.DataFrame(unit_rows), use_container_width=True, hide_index=True)
+        
+        if result["errors"]:
+            with st.expander(f"⚠️ {len(result['errors'])} messages"):
+                for error in result["errors"]:
+                    st.write(f"• {error}")
+    
+    except Exception as e:
+        st.error(f"❌ Error running FX revaluation: {str(e)}")
+        status_text.text("FX revaluation failed")
 
 def run_fx_revaluation(company_code: str, revaluation_date: date, fiscal_year: int,
-                      fiscal_period: int, run_type: str, selected_ledgers: list, create_journals: bool):
+                      fiscal_period: int, run_type: str, selected_ledgers: list, create_journals: bool,
+                      incremental: bool = False):
     """Execute FX revaluation process."""
     
     progress_bar = st.progress(0)
@@ -294,7 +406,8 @@ def run_fx_revaluation(company_code: str, revaluation_date: date, fiscal_year: i
             fiscal_period=fiscal_period,
             run_type=run_type,
             ledger_ids=selected_ledgers if selected_ledgers else None,
-            create_journals=create_journals
+            create_journals=create_journals,
+            incremental=incremental
         )
         
         progress_bar.progress(100)
@@ -320,6 +433,9 @@ def run_fx_revaluation(company_code: str, revaluation_date: date, fiscal_year: i
                     ledger_results.append({
                         "Ledger": ledger_id,
                         "Accounts": ledger_result["accounts_processed"],
+                        "Re-read": ledger_result["accounts_reextracted"],
+                        "Balance Changed": ledger_result["accounts_balance_changed"],
+                        "Rate Changed": ledger_result["accounts_rate_changed"],
                         "Revaluations": ledger_result["revaluations_created"],
                         "Gain": f"${ledger_result['total_unrealized_gain']:,.2f}",
                         "Loss": f"${ledger_result['total_unrealized_loss']:,.2f}",
@@ -448,6 +564,92 @@ def show_revaluation_settings():
         email_notifications = st.checkbox("Email notifications")
         notification_threshold = st.number_input("Notification threshold ($)", value=1000.00)
 
+def show_rate_scenarios():
+    """Display the read-only FX rate-shock scenario analysis."""
+    st.header("🧪 FX Rate Scenarios")
+    st.caption("Unrealized gain/loss the next revaluation would produce under rate shocks - nothing is posted")
+    
+    if 'fx_scenario_engine' not in st.session_state:
+        st.session_state.fx_scenario_engine = FXScenarioEngine(service=st.session_state.fx_service)
+    scenario_engine = st.session_state.fx_scenario_engine
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        company_code = st.selectbox("Company Code", get_available_company_codes(), key="scenario_company")
+    with col2:
+        revaluation_date = st.date_input("Revaluation Date", value=date.today(), key="scenario_date")
+    with col3:
+        ledger_ids = st.multiselect("Ledgers", options=get_available_ledgers(),
+                                    help="Leave empty for all configured ledgers", key="scenario_ledgers")
+    
+    # The exposure is loaded once per selection; scenarios are re-evaluated in memory
+    exposure_key = (company_code, revaluation_date, tuple(ledger_ids))
+    reload = st.button("🔄 Reload Balances")
+    if reload or st.session_state.get("scenario_exposure_key") != exposure_key:
+        try:
+            with st.spinner("Loading FX exposure..."):
+                st.session_state.scenario_exposure = scenario_engine.load_exposure(
+                    company_code, revaluation_date, ledger_ids or None
+                )
+            st.session_state.scenario_exposure_key = exposure_key
+        except Exception as e:
+            st.error(f"❌ Error loading FX exposure: {str(e)}")
+            return
+    
+    exposure = st.session_state.scenario_exposure
+    if len(exposure) == 0:
+        st.warning("No accounts configured for FX revaluation")
+        return
+    
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        mode = st.radio("Scenarios", ["Shock Grid", "Custom"], horizontal=True)
+        if mode == "Shock Grid":
+            currencies = st.multiselect("Currencies", exposure.currencies, default=exposure.currencies)
+            shock_text = st.text_input("Shocks (%)", value="-10, -5, -2, -1, 1, 2, 5, 10",
+                                       help="Relative change of each currency against USD")
+            try:
+                shocks = [float(value) / 100 for value in shock_text.split(",") if value.strip()]
+            except ValueError:
+                st.error("Shocks must be comma-separated numbers")
+                return
+            scenarios = currency_shock_grid(currencies, shocks)
+        else:
+            scenarios = [RateScenario("Base", {})]
+            custom = {}
+            for currency in exposure.currencies:
+                shock = st.number_input(f"{currency} shock (%)", value=0.0, step=0.5,
+                                        key=f"scenario_shock_{currency}")
+                if shock:
+                    custom[currency] = shock / 100
+            scenarios.append(RateScenario("Custom", custom))
+    
+    result = scenario_engine.evaluate(exposure, scenarios)
+    summary_df = pd.DataFrame(result.scenario_summary())
+    
+    with col2:
+        metric1, metric2, metric3 = st.columns(3)
+        with metric1:
+            st.metric("Accounts", int(exposure.revalued.sum()))
+        with metric2:
+            st.metric("Base Unrealized G/L", f"${result.base_unrealized.sum():,.2f}")
+        with metric3:
+            st.metric("Worst Scenario Impact", f"${result.total_impact.min():,.2f}")
+        
+        fig = px.bar(summary_df, x="scenario", y="impact", title="P&L Impact by Scenario",
+                     labels={"scenario": "Scenario", "impact": "Impact (USD)"})
+        st.plotly_chart(fig, use_container_width=True)
+    
+    st.subheader("📊 Impact by Scenario and Ledger")
+    st.dataframe(summary_df, use_container_width=True, hide_index=True)
+    
+    scenario_name = st.selectbox("Account detail for scenario", summary_df["scenario"].tolist())
+    account_df = pd.DataFrame(result.account_impacts(summary_df["scenario"].tolist().index(scenario_name)))
+    if not account_df.empty:
+        st.dataframe(account_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("No account is affected by this scenario")
+
 def show_reports():
     """Display FX revaluation reports."""
     st.header("📈 FX Revaluation Reports")
@@ -705,6 +907,19 @@ def get_available_ledgers():
     except:
         return ["L1", "2L", "3L", "4L", "CL"]
 
+def get_available_company_codes():
+    """Get company codes with active FX revaluation configuration."""
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(text("""
+                SELECT DISTINCT company_code FROM fx_revaluation_config
+                WHERE is_active = true
+                ORDER BY company_code
+            """)).fetchall()
+            return [row[0] for row in result]
+    except:
+        return ["1000"]
+
 def get_revaluation_configuration(company_code: str, ledger_ids: list):
     """Get revaluation configuration."""
     try:
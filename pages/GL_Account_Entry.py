@@ -1,6 +1,7 @@
 import streamlit as st
 import psycopg2
 import pandas as pd
+from utils.gl_account_index import invalidate_gl_account_index
 
 # Database connection - configure with Streamlit secrets or replace with your credentials
 conn = psycopg2.connect(
@@ -88,6 +89,7 @@ elif ok:
             conn.commit()
             st.success("Record deleted successfully!")
         # Refresh data after operation
+        invalidate_gl_account_index()
         df = load_glaccounts()
     except Exception as e:
         conn.rollback()
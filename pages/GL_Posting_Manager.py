@@ -219,12 +219,21 @@ class GLPostingManager:
                                  if doc['document_number'] in selected_docs)
                 st.metric("Total Amount", f"${total_amount:,.2f}")
             
+            with col3:
+                bulk_mode = st.checkbox(
+                    "⚡ Bulk mode",
+                    value=len(selected_docs) > 50,
+                    help="Validate and write the batch with set-based statements (recommended for large batches)"
+                )
+                st.info("💡 Batch posting will process all selected documents in a single transaction")
+            
             with col2:
                 if st.button("🚀 Execute Batch Posting", type="primary"):
-                    self.execute_batch_posting(selected_docs, company_code, posting_date)
+                    self.execute_batch_posting(selected_docs, company_code, posting_date, bulk_mode)
+                preview_clicked = st.button("🔮 Preview Impact")
             
-            with col3:
-                st.info("💡 Batch posting will process all selected documents in a single transaction")
+            if preview_clicked:
+                self.show_posting_simulation(selected_docs, company_code, posting_date)
     
     def render_account_balances(self, company_code: str):
         """Render account balance overview"""
@@ -443,13 +452,14 @@ class GLPostingManager:
             else:
                 st.error(f"❌ {message}")
     
-    def execute_batch_posting(self, doc_numbers: List[str], company_code: str, posting_date: date):
+    def execute_batch_posting(self, doc_numbers: List[str], company_code: str, posting_date: date,
+                              bulk_mode: bool = False):
         """Execute batch posting"""
         current_user = st.session_state.get('user_id', 'unknown')
         
         with st.spinner(f"Batch posting {len(doc_numbers)} documents..."):
             results = self.posting_engine.post_multiple_journal_entries(
-                doc_numbers, company_code, current_user, posting_date
+                doc_numbers, company_code, current_user, posting_date, bulk_mode=bulk_mode
             )
             
             # Display results
@@ -477,6 +487,49 @@ class GLPostingManager:
             time.sleep(2)
             st.rerun()
     
+    def show_posting_simulation(self, doc_numbers: List[str], company_code: str, posting_date: date):
+        """Show projected balance and trial balance impact of a batch without posting it"""
+        current_user = st.session_state.get('user_id', 'unknown')
+        
+        with st.spinner(f"Simulating {len(doc_numbers)} documents..."):
+            simulation = self.posting_engine.simulate_posting(
+                doc_numbers, company_code, current_user, posting_date
+            )
+        
+        if simulation.get("error"):
+            st.error(f"❌ Simulation failed: {simulation['error']}")
+            return
+        
+        with st.expander("🔮 Posting Simulation (nothing has been posted)", expanded=True):
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.metric("Documents", simulation['total_documents'])
+            
+            with col2:
+                st.metric("Would Post", len(simulation['valid_documents']))
+            
+            with col3:
+                st.metric("Would Fail", len(simulation['failed_documents']))
+            
+            if simulation['trial_balance_impact']:
+                st.subheader("⚖️ Trial Balance Impact")
+                st.dataframe(pd.DataFrame(simulation['trial_balance_impact']), use_container_width=True)
+            
+            if simulation['projected_balances']:
+                st.subheader("📈 Projected Account Balances")
+                df = pd.DataFrame(simulation['projected_balances'])[[
+                    'gl_account', 'ledger_id', 'fiscal_year', 'posting_period',
+                    'current_ending_balance', 'delta_debits', 'delta_credits',
+                    'projected_ending_balance', 'projected_transaction_count'
+                ]]
+                st.dataframe(df, use_container_width=True, height=300)
+            
+            if simulation['failed_documents']:
+                st.subheader("❌ Documents That Would Fail")
+                for failed in simulation['failed_documents']:
+                    st.write(f"**{failed['document']}:** {failed['error']}")
+    
     def show_document_preview(self, doc_number: str, company_code: str):
         """Show document preview in an expandable section"""
         try:
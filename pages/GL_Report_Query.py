@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
 import io
-from sqlalchemy import text
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, DataReturnMode
 from datetime import date
-from db_config import engine
 from utils.navigation import show_sap_sidebar, show_breadcrumb
+from utils.keyset_pagination import MAX_PAGE_SIZE, gl_line_listing
+from utils.reporting_engine import ReportFilter
+from utils.streaming_export import available_formats, streaming_exporter
+
+# Files larger than this are kept on the server instead of offered as a download
+DOWNLOAD_MAX_BYTES = 200 * 1024 * 1024
 
 # Configure page
 st.set_page_config(page_title="🔍 GL Report Query", layout="wide", initial_sidebar_state="expanded")
@@ -30,63 +34,45 @@ with st.expander("⚙️ Report Settings", expanded=True):
     with col2:
         # Data options
         st.subheader("📄 Data Options")
-        limit_records = st.number_input("📊 Limit Records", min_value=0, max_value=50000, value=10000, step=1000)
+        page_size = st.number_input("📊 Rows per Page", min_value=100, max_value=MAX_PAGE_SIZE, value=1000, step=100)
     
     # Export options
     st.subheader("📤 Export Options")
-    export_format = st.selectbox("Export Format", ["Excel", "CSV"])
+    export_format = st.selectbox("Export Format", available_formats(),
+                                 help="Format of the full export; Parquet requires pyarrow")
     include_formatting = st.checkbox("Include Number Formatting", value=True)
 
-# Fetch GL data from database
-def get_gl_data(limit=None):
-    """Fetch GL data with optional limit"""
-    query = """
-    SELECT
-        jel.documentnumber,
-        jel.linenumber,
-        coa.glaccountid,
-        coa.accountname AS gl_description,
-        coa.accounttype,
-        jeh.companycodeid,
-        jeh.documentdate,
-        jeh.fiscalyear,
-        jeh.period,
-        jel.debitamount,
-        jel.creditamount,
-        jel.description AS memo,
-        jel.business_unit_id,
-        jeh.reference,
-        jeh.createdby,
-        jeh.createdat
-    FROM
-        journalentryline jel
-    JOIN glaccount coa ON coa.glaccountid = jel.glaccountid
-    JOIN journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
-    ORDER BY
-        coa.glaccountid, jeh.documentdate, jel.linenumber
-    """
-    
-    if limit and limit > 0:
-        query += f" LIMIT {limit}"
-    
-    with engine.connect() as conn:
-        df = pd.read_sql(text(query), conn)
-    
-    return df
+report_filter = ReportFilter()
+
+# Streamed export of every line the grid pages through, in the same order and with the same filter
+GL_QUERY, GL_QUERY_PARAMS = gl_line_listing.export_query(report_filter)
+
+# Page navigation state: the grid shows one keyset page at a time
+def reset_navigation(account=None):
+    st.session_state.gl_query_nav = {"after": None, "before": None, "account": account,
+                                     "origin": account, "number": 1}
 
-# Load data
+if st.session_state.get('gl_query_page_size') != page_size:
+    st.session_state.gl_query_page_size = page_size
+    reset_navigation()
+nav = st.session_state.gl_query_nav
+
+# Totals of the whole ledger come from the balance tables, not from the loaded page
 with st.spinner("Loading GL data..."):
-    df = get_gl_data(limit_records if limit_records > 0 else None)
+    account_totals = gl_line_listing.totals(report_filter)
+    page = gl_line_listing.fetch_page(report_filter, after=nav["after"], before=nav["before"],
+                                      account=nav["account"], page_size=page_size)
+df = page.rows
 
 # Display data info
 col1, col2, col3 = st.columns(3)
 with col1:
-    st.metric("📊 Total Records", f"{len(df):,}")
+    st.metric("📊 Total Records", f"{int(account_totals['transaction_count'].sum()):,}")
 with col2:
-    total_debits = df['debitamount'].sum()
+    total_debits = account_totals['total_debit'].sum()
     st.metric("💰 Total Debits", f"{total_debits:,.2f}")
 with col3:
-    total_credits = df['creditamount'].sum()
+    total_credits = account_totals['total_credit'].sum()
     st.metric("💰 Total Credits", f"{total_credits:,.2f}")
 
 # Balance check
@@ -96,6 +82,39 @@ if abs(balance_diff) < 0.01:
 else:
     st.error(f"⚠️ Unbalanced: Difference of {balance_diff:,.2f}")
 
+# Page navigation
+def go_to(after=None, before=None, number=1):
+    st.session_state.gl_query_nav = {**nav, "after": after, "before": before, "account": None, "number": number}
+
+def jump_to_account():
+    reset_navigation(st.session_state.gl_query_jump or None)
+
+account_names = dict(zip(account_totals['glaccountid'], account_totals['accountname']))
+
+col1, col2, col3, col4 = st.columns([1, 1, 1, 3])
+with col1:
+    st.button("⏮️ First", disabled=not page.has_previous, on_click=reset_navigation)
+with col2:
+    st.button("◀️ Previous", disabled=not page.has_previous or page.first_cursor is None,
+              on_click=go_to, kwargs={"before": page.first_cursor, "number": max(nav["number"] - 1, 1)})
+with col3:
+    st.button("Next ▶️", disabled=not page.has_next or page.last_cursor is None,
+              on_click=go_to, kwargs={"after": page.last_cursor, "number": nav["number"] + 1})
+with col4:
+    st.selectbox(
+        "Jump to GL Account",
+        [""] + list(account_names),
+        format_func=lambda acct: f"{acct} - {account_names[acct]}" if acct else "",
+        key="gl_query_jump",
+        on_change=jump_to_account
+    )
+
+page_label = f"Page {nav['number']}" + (f" from account {nav['origin']}" if nav["origin"] else "")
+if df.empty:
+    st.warning("No journal lines on this page.")
+    st.stop()
+st.caption(f"{page_label} · {len(df):,} rows · {df['glaccountid'].iloc[0]} to {df['glaccountid'].iloc[-1]}")
+
 # AG Grid setup
 gb = GridOptionsBuilder.from_dataframe(df)
 
@@ -214,101 +233,143 @@ else:
 st.markdown("---")
 st.subheader("📤 Export Data")
 
-# Get selected data or all data
-if grid_response['selected_rows'] is not None and len(grid_response['selected_rows']) > 0:
+# Selected rows are already in memory; without a selection the full query is streamed to a file
+has_selection = grid_response['selected_rows'] is not None and len(grid_response['selected_rows']) > 0
+if has_selection:
     export_df = pd.DataFrame(grid_response['selected_rows'])
     st.info(f"Exporting {len(export_df)} selected rows")
 else:
     export_df = df.copy()
-    st.info(f"Exporting all {len(export_df)} rows")
 
-# Export options
-col1, col2, col3 = st.columns(3)
+if has_selection:
+    col1, col2, col3 = st.columns(3)
 
-with col1:
-    # Excel export
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        # Prepare export data
-        if include_formatting:
-            export_data = export_df.copy()
-            # Format amounts for display
-            export_data['debitamount'] = export_data['debitamount'].apply(lambda x: x if pd.notna(x) else 0)
-            export_data['creditamount'] = export_data['creditamount'].apply(lambda x: x if pd.notna(x) else 0)
-        else:
-            export_data = export_df.copy()
-        
-        export_data.to_excel(writer, index=False, sheet_name='GL_Report')
-        
-        workbook = writer.book
-        worksheet = writer.sheets['GL_Report']
-        
-        # Format columns
-        currency_fmt = workbook.add_format({'num_format': '#,##0.00', 'align': 'right'})
-        date_fmt = workbook.add_format({'num_format': 'yyyy-mm-dd'})
-        bold_fmt = workbook.add_format({'bold': True})
-        
-        # Apply formatting
-        for idx, col in enumerate(export_data.columns):
-            if 'amount' in col.lower():
-                worksheet.set_column(idx, idx, 15, currency_fmt)
-            elif 'date' in col.lower():
-                worksheet.set_column(idx, idx, 12, date_fmt)
-            elif col in ['documentnumber', 'glaccountid']:
-                worksheet.set_column(idx, idx, 15, bold_fmt)
-            elif col == 'gl_description':
-                worksheet.set_column(idx, idx, 30)
+    with col1:
+        # Excel export
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+            # Prepare export data
+            if include_formatting:
+                export_data = export_df.copy()
+                # Format amounts for display
+                export_data['debitamount'] = export_data['debitamount'].apply(lambda x: x if pd.notna(x) else 0)
+                export_data['creditamount'] = export_data['creditamount'].apply(lambda x: x if pd.notna(x) else 0)
             else:
-                worksheet.set_column(idx, idx, 12)
-        
-        # Add summary at the bottom
-        summary_row = len(export_data) + 2
-        worksheet.write(summary_row, 0, 'TOTALS:', bold_fmt)
+                export_data = export_df.copy()
+            
+            export_data.to_excel(writer, index=False, sheet_name='GL_Report')
+            
+            workbook = writer.book
+            worksheet = writer.sheets['GL_Report']
+            
+            # Format columns
+            currency_fmt = workbook.add_format({'num_format': '#,##0.00', 'align': 'right'})
+            date_fmt = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+            bold_fmt = workbook.add_format({'bold': True})
+            
+            # Apply formatting
+            for idx, col in enumerate(export_data.columns):
+                if 'amount' in col.lower():
+                    worksheet.set_column(idx, idx, 15, currency_fmt)
+                elif 'date' in col.lower():
+                    worksheet.set_column(idx, idx, 12, date_fmt)
+                elif col in ['documentnumber', 'glaccountid']:
+                    worksheet.set_column(idx, idx, 15, bold_fmt)
+                elif col == 'gl_description':
+                    worksheet.set_column(idx, idx, 30)
+                else:
+                    worksheet.set_column(idx, idx, 12)
+            
+            # Add summary at the bottom
+            summary_row = len(export_data) + 2
+            worksheet.write(summary_row, 0, 'TOTALS:', bold_fmt)
+            
+            # Find amount columns
+            debit_col = export_data.columns.get_loc('debitamount')
+            credit_col = export_data.columns.get_loc('creditamount')
+            
+            # Add sum formulas
+            debit_col_letter = chr(65 + debit_col)
+            credit_col_letter = chr(65 + credit_col)
+            
+            worksheet.write_formula(summary_row, debit_col, f'=SUM({debit_col_letter}2:{debit_col_letter}{len(export_data)+1})', currency_fmt)
+            worksheet.write_formula(summary_row, credit_col, f'=SUM({credit_col_letter}2:{credit_col_letter}{len(export_data)+1})', currency_fmt)
         
-        # Find amount columns
-        debit_col = export_data.columns.get_loc('debitamount')
-        credit_col = export_data.columns.get_loc('creditamount')
-        
-        # Add sum formulas
-        debit_col_letter = chr(65 + debit_col)
-        credit_col_letter = chr(65 + credit_col)
+        st.download_button(
+            label="📊 Download Excel",
+            data=output.getvalue(),
+            file_name=f"GL_Report_{date.today().strftime('%Y%m%d')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+    with col2:
+        # CSV export
+        if include_formatting:
+            csv_df = export_df.copy()
+            csv_df['debitamount'] = csv_df['debitamount'].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "0.00")
+            csv_df['creditamount'] = csv_df['creditamount'].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "0.00")
+        else:
+            csv_df = export_df.copy()
         
-        worksheet.write_formula(summary_row, debit_col, f'=SUM({debit_col_letter}2:{debit_col_letter}{len(export_data)+1})', currency_fmt)
-        worksheet.write_formula(summary_row, credit_col, f'=SUM({credit_col_letter}2:{credit_col_letter}{len(export_data)+1})', currency_fmt)
-    
-    st.download_button(
-        label="📊 Download Excel",
-        data=output.getvalue(),
-        file_name=f"GL_Report_{date.today().strftime('%Y%m%d')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+        csv = csv_df.to_csv(index=False)
+        st.download_button(
+            label="📄 Download CSV",
+            data=csv,
+            file_name=f"GL_Report_{date.today().strftime('%Y%m%d')}.csv",
+            mime="text/csv"
+        )
 
-with col2:
-    # CSV export
-    if include_formatting:
-        csv_df = export_df.copy()
-        csv_df['debitamount'] = csv_df['debitamount'].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "0.00")
-        csv_df['creditamount'] = csv_df['creditamount'].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "0.00")
-    else:
-        csv_df = export_df.copy()
-    
-    csv = csv_df.to_csv(index=False)
-    st.download_button(
-        label="📄 Download CSV",
-        data=csv,
-        file_name=f"GL_Report_{date.today().strftime('%Y%m%d')}.csv",
-        mime="text/csv"
-    )
+    with col3:
+        # JSON export for advanced users
+        json_data = export_df.to_json(orient='records', indent=2)
+        st.download_button(
+            label="🔗 Download JSON",
+            data=json_data,
+            file_name=f"GL_Report_{date.today().strftime('%Y%m%d')}.json",
+            mime="application/json"
+        )
+else:
+    # Full export: rows are streamed from the database in chunks, independent of the grid limit
+    st.info("Exporting all matching rows (not limited to the records loaded into the grid)")
 
-with col3:
-    # JSON export for advanced users
-    json_data = export_df.to_json(orient='records', indent=2)
-    st.download_button(
-        label="🔗 Download JSON",
-        data=json_data,
-        file_name=f"GL_Report_{date.today().strftime('%Y%m%d')}.json",
-        mime="application/json"
-    )
+    if st.button(f"📤 Export All Rows as {export_format}", type="primary"):
+        progress_bar = st.progress(0.0, text="Counting rows...")
+        total_rows = streaming_exporter.count_rows(GL_QUERY, GL_QUERY_PARAMS)
+
+        def show_progress(rows_written, expected_rows):
+            fraction = min(rows_written / expected_rows, 1.0) if expected_rows else 1.0
+            progress_bar.progress(fraction, text=f"Exported {rows_written:,} of {expected_rows:,} rows")
+
+        try:
+            st.session_state.gl_query_export = streaming_exporter.export(
+                GL_QUERY, GL_QUERY_PARAMS, export_format,
+                file_stem=f"GL_Report_{date.today().strftime('%Y%m%d')}",
+                column_formats={'debitamount': 'currency', 'creditamount': 'currency',
+                                'documentdate': 'date', 'createdat': 'datetime'},
+                total_columns=['debitamount', 'creditamount'],
+                progress=show_progress,
+                total_rows=total_rows,
+                sheet_name='GL_Report'
+            )
+            progress_bar.progress(1.0, text="Export complete")
+        except Exception as e:
+            progress_bar.empty()
+            st.error(f"Export failed: {e}")
+
+    export_result = st.session_state.get('gl_query_export')
+    if export_result is not None:
+        st.caption(f"{export_result.rows:,} rows · {export_result.size_bytes / 1024 / 1024:,.1f} MB · "
+                   f"{export_result.duration:.1f}s")
+        if export_result.size_bytes <= DOWNLOAD_MAX_BYTES:
+            with open(export_result.path, 'rb') as export_file:
+                st.download_button(
+                    label=f"⬇️ Download {export_result.file_name}",
+                    data=export_file,
+                    file_name=export_result.file_name,
+                    mime=export_result.mime
+                )
+        else:
+            st.warning(f"Export is too large for a browser download; it was written to {export_result.path}")
 
 # Summary statistics
 st.markdown("---")
@@ -342,7 +403,14 @@ with st.expander("💡 Usage Tips"):
     **Export Options:**
     - **Excel**: Best for detailed analysis with formatting
     - **CSV**: Best for importing into other systems
-    - **JSON**: Best for developers and API integration
+    - **JSON**: Best for developers and API integration (selected rows)
+    - **Parquet**: Best for data tools such as pandas or Spark (full export)
+    - Without a selection, every matching row is exported in chunks, regardless of the record limit
+    
+    **Paging:**
+    - The grid shows one page of lines at a time, ordered by account, date, document and line
+    - Use **Jump to GL Account** to open the first page of an account
+    - The totals above cover the whole ledger and come from the account balance tables
     
     **Pro Tips:**
     - Use the expanded view for better visibility of all columns
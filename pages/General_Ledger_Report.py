@@ -1,10 +1,16 @@
 import streamlit as st
 import pandas as pd
-import io
 from sqlalchemy import text
 from datetime import date, datetime
 from db_config import engine
 from utils.navigation import show_sap_sidebar, show_breadcrumb
+from utils.streaming_export import RunningBalance, available_formats, streaming_exporter
+
+# Files larger than this are kept on the server instead of offered as a download
+DOWNLOAD_MAX_BYTES = 200 * 1024 * 1024
+
+EXPORT_COLUMNS = ['glaccountid', 'gl_description', 'accounttype', 'documentnumber', 'documentdate',
+                  'fiscalyear', 'period', 'currencycode', 'reference', 'memo', 'debitamount', 'creditamount']
 
 # Configure page
 st.set_page_config(page_title="📘 General Ledger Report", layout="wide", initial_sidebar_state="expanded")
@@ -175,12 +181,22 @@ if st.button("📘 Generate General Ledger Report", type="primary"):
         glaccount coa ON coa.glaccountid = jel.glaccountid
     JOIN 
         journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
+        AND jeh.companycodeid = jel.companycodeid
     WHERE 
         {' AND '.join(where_conditions)}
     ORDER BY 
         {order_by_clause}
     """
     
+    # The export streams every matching row, independent of the display limit
+    st.session_state.gl_export_request = {
+        "query": query,
+        "params": params,
+        "running_balance": show_running_balance,
+        "file_stem": f"General_Ledger_{date_to.strftime('%Y%m%d')}"
+    }
+    st.session_state.pop('gl_export_result', None)
+    
     if limit_records > 0:
         query += f" LIMIT {limit_records}"
     
@@ -202,19 +218,8 @@ if st.button("📘 Generate General Ledger Report", type="primary"):
                 
                 # Calculate running balance if requested
                 if show_running_balance:
-                    df['running_balance'] = 0.0
-                    for account in df['glaccountid'].unique():
-                        account_mask = df['glaccountid'] == account
-                        account_data = df[account_mask].copy()
-                        account_data = account_data.sort_values(['documentdate', 'documentnumber', 'linenumber'])
-                        
-                        running_bal = 0.0
-                        for idx in account_data.index:
-                            debit = df.loc[idx, 'debitamount'] if pd.notna(df.loc[idx, 'debitamount']) else 0
-                            credit = df.loc[idx, 'creditamount'] if pd.notna(df.loc[idx, 'creditamount']) else 0
-                            running_bal += (debit - credit)
-                            df.loc[idx, 'running_balance'] = running_bal
-                    
+                    # Rows are ordered by date, document and line within each account
+                    df = RunningBalance()(df)
                     df['balance_formatted'] = df['running_balance'].apply(lambda x: f"{x:,.2f}")
                 
                 if group_by_account:
@@ -313,79 +318,67 @@ if st.button("📘 Generate General Ledger Report", type="primary"):
                         difference = total_debits - total_credits
                         st.metric("Difference", f"{difference:,.2f}")
                 
-                # Export options
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Excel export
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                        # Export detailed data
-                        export_columns = ['glaccountid', 'gl_description', 'accounttype', 'documentnumber', 'documentdate', 
-                                        'fiscalyear', 'period', 'currencycode', 'reference', 'memo', 'debitamount', 'creditamount']
-                        if show_running_balance:
-                            export_columns.append('running_balance')
-                        
-                        export_df = df[export_columns].copy()
-                        export_df.to_excel(writer, index=False, sheet_name='General_Ledger')
-                        
-                        workbook = writer.book
-                        worksheet = writer.sheets['General_Ledger']
-                        
-                        # Format columns
-                        currency_fmt = workbook.add_format({'num_format': '#,##0.00', 'align': 'right'})
-                        date_fmt = workbook.add_format({'num_format': 'yyyy-mm-dd'})
-                        bold_fmt = workbook.add_format({'bold': True})
-                        
-                        worksheet.set_column('A:A', 12, bold_fmt)  # Account ID
-                        worksheet.set_column('B:B', 30)           # Account Name
-                        worksheet.set_column('C:C', 12)           # Account Type
-                        worksheet.set_column('D:D', 15, bold_fmt) # Document Number
-                        worksheet.set_column('E:E', 12, date_fmt) # Date
-                        worksheet.set_column('F:F', 12)           # Fiscal Year
-                        worksheet.set_column('G:G', 8)            # Period
-                        worksheet.set_column('H:H', 10)           # Currency
-                        worksheet.set_column('I:I', 15)           # Reference
-                        worksheet.set_column('J:J', 30)           # Memo
-                        worksheet.set_column('K:K', 15, currency_fmt)  # Debit
-                        worksheet.set_column('L:L', 15, currency_fmt)  # Credit
-                        if show_running_balance:
-                            worksheet.set_column('M:M', 15, currency_fmt)  # Running Balance
-                        
-                        # Add summary
-                        summary_start = len(export_df) + 2
-                        worksheet.write(summary_start, 0, 'SUMMARY:', bold_fmt)
-                        worksheet.write(summary_start + 1, 0, 'Total Debits:', bold_fmt)
-                        worksheet.write(summary_start + 1, 10, total_debits if group_by_account else df['debitamount'].fillna(0).sum(), currency_fmt)
-                        worksheet.write(summary_start + 2, 0, 'Total Credits:', bold_fmt)
-                        worksheet.write(summary_start + 2, 11, total_credits if group_by_account else df['creditamount'].fillna(0).sum(), currency_fmt)
-                    
-                    st.download_button(
-                        label="📤 Download Excel",
-                        data=output.getvalue(),
-                        file_name=f"General_Ledger_{date_to.strftime('%Y%m%d')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-                
-                with col2:
-                    # CSV export
-                    export_columns = ['glaccountid', 'gl_description', 'accounttype', 'documentnumber', 'documentdate', 
-                                    'fiscalyear', 'period', 'currencycode', 'reference', 'memo', 'debitamount', 'creditamount']
-                    if show_running_balance:
-                        export_columns.append('running_balance')
-                    
-                    csv_df = df[export_columns].copy()
-                    csv = csv_df.to_csv(index=False)
-                    st.download_button(
-                        label="📄 Download CSV",
-                        data=csv,
-                        file_name=f"General_Ledger_{date_to.strftime('%Y%m%d')}.csv",
-                        mime="text/csv"
-                    )
-                
         except Exception as e:
             st.error(f"Error generating General Ledger Report: {str(e)}")
 
+# Export of the last generated report, streamed from the database in chunks
+export_request = st.session_state.get('gl_export_request')
+if export_request:
+    st.subheader("📤 Export General Ledger")
+    st.caption("Exports every transaction matching the filters, not only the rows shown above")
+    
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        export_format = st.selectbox("Export Format", available_formats(),
+                                     help="Parquet requires pyarrow")
+    with col2:
+        st.write("")
+        start_export = st.button(f"📤 Export as {export_format}")
+    
+    if start_export:
+        progress_bar = st.progress(0.0, text="Counting rows...")
+        
+        def show_progress(rows_written, expected_rows):
+            fraction = min(rows_written / expected_rows, 1.0) if expected_rows else 1.0
+            progress_bar.progress(fraction, text=f"Exported {rows_written:,} of {expected_rows:,} rows")
+        
+        columns = EXPORT_COLUMNS + (['running_balance'] if export_request['running_balance'] else [])
+        column_formats = {'debitamount': 'currency', 'creditamount': 'currency',
+                          'running_balance': 'currency', 'documentdate': 'date'}
+        try:
+            total_rows = streaming_exporter.count_rows(export_request['query'], export_request['params'])
+            st.session_state.gl_export_result = streaming_exporter.export(
+                export_request['query'], export_request['params'], export_format,
+                file_stem=export_request['file_stem'],
+                columns=columns,
+                transform=RunningBalance() if export_request['running_balance'] else None,
+                column_formats=column_formats,
+                total_columns=['debitamount', 'creditamount'],
+                progress=show_progress,
+                total_rows=total_rows,
+                sheet_name='General_Ledger'
+            )
+            progress_bar.progress(1.0, text="Export complete")
+        except Exception as e:
+            progress_bar.empty()
+            st.error(f"Export failed: {str(e)}")
+    
+    export_result = st.session_state.get('gl_export_result')
+    if export_result is not None:
+        st.caption(f"{export_result.rows:,} rows · {export_result.size_bytes / 1024 / 1024:,.1f} MB · "
+                   f"{export_result.duration:.1f}s · Debits {export_result.totals['debitamount']:,.2f} · "
+                   f"Credits {export_result.totals['creditamount']:,.2f}")
+        if export_result.size_bytes <= DOWNLOAD_MAX_BYTES:
+            with open(export_result.path, 'rb') as export_file:
+                st.download_button(
+                    label=f"⬇️ Download {export_result.file_name}",
+                    data=export_file,
+                    file_name=export_result.file_name,
+                    mime=export_result.mime
+                )
+        else:
+            st.warning(f"Export is too large for a browser download; it was written to {export_result.path}")
+
 # Information panel
 with st.expander("ℹ️ About General Ledger"):
     st.markdown("""
@@ -410,8 +403,10 @@ with st.expander("ℹ️ About General Ledger"):
     - **Search Functions**: Find specific documents, memos, or references
     
     **Export Options:**
-    - **Excel**: Formatted spreadsheet with proper column formatting
+    - **XLSX**: Formatted spreadsheet with proper column formatting
     - **CSV**: Raw data for import into other systems or analysis tools
+    - **Parquet**: Columnar file for data tools such as pandas or Spark
+    - Exports include every matching transaction, independent of the record limit
     """)
 
 # Navigation is now handled by the SAP-style sidebar
\ No newline at end of file
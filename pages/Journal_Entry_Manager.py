@@ -41,6 +41,7 @@ from utils.logger import StreamlitLogHandler, log_database_operation, get_logger
 from auth.optimized_middleware import optimized_authenticator as authenticator
 from utils.navigation import show_sap_sidebar, show_breadcrumb
 from utils.workflow_engine import WorkflowEngine
+from utils.report_cache import bump_data_versions
 
 logger = get_logger("journal_entry_manager")
 
@@ -1964,6 +1965,12 @@ def handle_reverse_entry():
                     'debit': float(line_summary['total_debit']),
                     'credit': float(line_summary['total_credit'])
                 })
+                
+                # Invalidate cached reports of both the original and the reversal period
+                bump_data_versions(conn, [
+                    (cc, hdr['fiscalyear'], hdr['period']),
+                    (cc, reversal_date.year, reversal_date.month)
+                ])
             
             st.success(f"✅ **Reversal Entry Created Successfully!**")
             st.info(f"📄 **Reversal Document:** {new_doc_number}")
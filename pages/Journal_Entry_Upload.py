@@ -41,6 +41,7 @@ sys.path.append('/home/anton/erp/gl')
 
 from db_config import engine
 from utils.workflow_engine import WorkflowEngine
+from utils.gl_account_index import gl_account_index
 from utils.navigation import show_breadcrumb
 from auth.optimized_middleware import optimized_authenticator as authenticator
 
@@ -1590,23 +1591,22 @@ def validate_gl_accounts(gl_accounts: list) -> list:
     """Validate GL accounts against database."""
     valid_accounts = []
     
+    account_list = []
+    
     try:
-        with engine.connect() as conn:
-            # Convert accounts to strings
-            account_list = [str(acc) for acc in gl_accounts if acc]
+        # Convert accounts to strings
+        account_list = [str(acc) for acc in gl_accounts if acc]
+        
+        if account_list:
+            # Answered from the in-memory GL account index - no query per file
+            missing = set(gl_account_index.find_missing(account_list))
+            valid_accounts = [acc for acc in account_list if acc not in missing]
             
-            if account_list:
-                # Use IN clause with individual parameters (more compatible)
-                placeholders = ','.join([f"'{acc}'" for acc in account_list])
-                query = f"SELECT glaccountid FROM glaccount WHERE glaccountid IN ({placeholders})"
-                result = conn.execute(text(query))
-                valid_accounts = [row[0] for row in result]
-                
-                # Debug output for verification
-                st.write(f"🔍 **GL Validation:** Checked {len(account_list)} accounts, found {len(valid_accounts)} valid")
-                if len(account_list) != len(valid_accounts):
-                    invalid_count = len(account_list) - len(valid_accounts)
-                    st.warning(f"⚠️ {invalid_count} invalid GL accounts detected")
+            # Debug output for verification
+            st.write(f"🔍 **GL Validation:** Checked {len(account_list)} accounts, found {len(valid_accounts)} valid")
+            if len(account_list) != len(valid_accounts):
+                invalid_count = len(account_list) - len(valid_accounts)
+                st.warning(f"⚠️ {invalid_count} invalid GL accounts detected")
     
     except Exception as e:
         st.error(f"❌ Error validating GL accounts: {e}")
@@ -5,6 +5,7 @@ from sqlalchemy import text
 from datetime import date
 from db_config import engine
 from utils.navigation import show_sap_sidebar, show_breadcrumb
+from utils.keyset_pagination import JOURNAL_HEADER_SORT_KEYS, KeysetPaginator, MAX_PAGE_SIZE
 
 # Configure page
 st.set_page_config(page_title="📑 Journal Listing Report", layout="wide", initial_sidebar_state="expanded")
@@ -115,7 +116,7 @@ with st.expander("🔍 Filter Options", expanded=True):
         show_memo = st.checkbox("Show Memo Column", value=True)
         show_reference = st.checkbox("Show Reference Column", value=True)
         show_currency = st.checkbox("Show Currency Column", value=True)
-        limit_records = st.number_input("Limit Records", min_value=0, max_value=10000, value=1000, step=100)
+        page_size = st.number_input("Rows per Page", min_value=50, max_value=MAX_PAGE_SIZE, value=1000, step=50)
 
 # Run Report Button
 if st.button("🔍 Run Report", type="primary"):
@@ -182,35 +183,57 @@ if st.button("🔍 Run Report", type="primary"):
     if show_memo:
         columns.append("memo")
     
-    query = f"""
-    SELECT {', '.join(columns)}
-    FROM journalentryheader
-    WHERE {' AND '.join(where_conditions)}
-    ORDER BY documentdate DESC, documentnumber
-    """
+    with engine.connect() as conn:
+        document_count = conn.execute(text(f"""
+            SELECT COUNT(*) FROM journalentryheader
+            WHERE {' AND '.join(where_conditions)}
+        """), params).scalar()
     
-    if limit_records > 0:
-        query += f" LIMIT {limit_records}"
+    # Results are paged by (date, document, company) cursors instead of a LIMIT
+    st.session_state.journal_listing = {
+        "columns": columns,
+        "conditions": where_conditions,
+        "params": params,
+        "document_count": document_count,
+        "page_size": page_size
+    }
+    st.session_state.journal_listing_nav = {"after": None, "before": None, "number": 1}
+
+def go_to_page(after=None, before=None, number=1):
+    st.session_state.journal_listing_nav = {"after": after, "before": before, "number": number}
+
+listing = st.session_state.get('journal_listing')
+if listing:
+    nav = st.session_state.journal_listing_nav
+    paginator = KeysetPaginator(", ".join(listing["columns"]), "journalentryheader",
+                                JOURNAL_HEADER_SORT_KEYS, listing["page_size"])
     
     # Execute query
     with st.spinner("Generating report..."):
         try:
-            with engine.connect() as conn:
-                df = pd.read_sql(text(query), conn, params=params)
+            page = paginator.fetch_page(listing["conditions"], listing["params"],
+                                        after=nav["after"], before=nav["before"])
+            df = page.rows[listing["columns"]]
             
             if df.empty:
                 st.warning("No records found with the selected filters.")
             else:
-                st.subheader(f"📊 Results ({len(df)} records)")
+                st.subheader(f"📊 Results ({listing['document_count']:,} records)")
+                st.caption(f"Page {nav['number']} · {len(df):,} documents")
                 
-                # Add clickable document numbers
-                def make_clickable(doc_num):
-                    return f'<a href="javascript:void(0)" onclick="streamlit.setComponentValue(\'{doc_num}\')">{doc_num}</a>'
+                # Page navigation
+                col1, col2, col3 = st.columns([1, 1, 4])
+                with col1:
+                    st.button("◀️ Previous", disabled=not page.has_previous, on_click=go_to_page,
+                              kwargs={"before": page.first_cursor, "number": max(nav["number"] - 1, 1)})
+                with col2:
+                    st.button("Next ▶️", disabled=not page.has_next, on_click=go_to_page,
+                              kwargs={"after": page.last_cursor, "number": nav["number"] + 1})
                 
                 # Display dataframe with formatting
                 st.dataframe(df, use_container_width=True)
                 
-                # Export options
+                # Export options (current page)
                 col1, col2 = st.columns(2)
                 
                 with col1:
@@ -22,6 +22,7 @@ sys.path.append('/home/anton/erp/gl')
 
 from db_config import engine
 from utils.navigation import show_breadcrumb
+from utils.derivation_rule_matcher import invalidate_derivation_rules
 from auth.optimized_middleware import optimized_authenticator as authenticator
 
 # Page configuration
@@ -504,6 +505,7 @@ def show_derivation_rules():
                             'created_by': user.username
                         })
                         conn.commit()
+                    invalidate_derivation_rules()
                     
                     st.success("✅ Derivation rule created successfully!")
                     st.rerun()
@@ -18,6 +18,8 @@ from auth.optimized_middleware import optimized_authenticator as authenticator
 from utils.navigation import show_breadcrumb
 from utils.streamlit_optimization import StreamlitOptimizer, monitor_session_health
 from utils.db_connection_manager import get_db_manager
+from utils.pipeline_instrumentation import pipeline_instrumentation
+from utils.report_cache import report_cache
 
 st.set_page_config(
     page_title="Performance Monitor",
@@ -223,6 +225,99 @@ def main():
     except Exception as e:
         st.error(f"Database performance monitoring unavailable: {e}")
     
+    # Posting Pipeline Instrumentation
+    st.header("🧮 Posting Pipeline Instrumentation")
+    
+    instrumentation_enabled = st.toggle(
+        "Record per-phase timings",
+        value=pipeline_instrumentation.enabled,
+        help="Times each phase of GL posting, parallel posting and FX revaluation runs in this process"
+    )
+    if instrumentation_enabled != pipeline_instrumentation.enabled:
+        if instrumentation_enabled:
+            pipeline_instrumentation.enable()
+        else:
+            pipeline_instrumentation.disable()
+    
+    phase_stats = pipeline_instrumentation.get_histograms()
+    if phase_stats:
+        phase_df = pd.DataFrame(phase_stats)
+        
+        pipelines = sorted(phase_df['pipeline'].unique())
+        selected_pipeline = st.selectbox("Pipeline", pipelines)
+        pipeline_df = phase_df[phase_df['pipeline'] == selected_pipeline]
+        
+        fig = px.bar(
+            pipeline_df,
+            x='phase',
+            y='total_ms',
+            hover_data=['count', 'avg_ms', 'p95_ms', 'avg_statements'],
+            title=f'Total Time by Phase - {selected_pipeline}',
+            labels={'total_ms': 'Total (ms)', 'phase': 'Phase'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        st.dataframe(
+            pipeline_df[['phase', 'count', 'avg_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms',
+                         'statements', 'avg_statements', 'rows_written']],
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        if st.checkbox("Show Latency Histogram"):
+            bucket_df = pd.DataFrame(
+                [{'phase': row['phase'], **row['buckets']} for _, row in pipeline_df.iterrows()]
+            ).set_index('phase')
+            st.dataframe(bucket_df, use_container_width=True)
+        
+        if st.checkbox("Show Recent Documents"):
+            traces = pipeline_instrumentation.get_recent_documents(selected_pipeline, limit=20)
+            trace_rows = [
+                {'document': trace['document'], 'total_ms': trace['total_ms'],
+                 **{phase['phase']: phase['elapsed_ms'] for phase in trace['phases']}}
+                for trace in traces
+            ]
+            st.dataframe(pd.DataFrame(trace_rows), use_container_width=True, hide_index=True)
+        
+        if st.button("🧹 Reset Phase Timings"):
+            pipeline_instrumentation.reset()
+            st.rerun()
+    elif pipeline_instrumentation.enabled:
+        st.info("No instrumented postings recorded yet")
+    
+    # Shared Report Cache
+    st.header("📦 Shared Report Cache")
+    
+    cache_stats = report_cache.get_stats()
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Hit Rate", f"{cache_stats['hit_rate'] * 100:.1f}%")
+    with col2:
+        st.metric("Hits / Misses", f"{cache_stats['hits']} / {cache_stats['misses']}")
+    with col3:
+        st.metric("Entries", cache_stats['entries'])
+    with col4:
+        st.metric("Memory", f"{cache_stats['bytes'] / 1024 / 1024:.1f} / {cache_stats['max_bytes'] / 1024 / 1024:.0f} MB")
+    with col5:
+        st.metric("Evictions", cache_stats['evictions'])
+    
+    st.caption(
+        f"Invalidated by postings: {cache_stats['stale']} | Expired: {cache_stats['expired']} | "
+        f"Waited on a running computation: {cache_stats['coalesced']} | "
+        f"Too large to cache: {cache_stats['oversized']} | Version lookup errors: {cache_stats['errors']}"
+    )
+    
+    if cache_stats['by_report_type']:
+        st.dataframe(pd.DataFrame(cache_stats['by_report_type']), use_container_width=True, hide_index=True)
+    
+    if st.checkbox("Show Report Cache Entries"):
+        st.dataframe(pd.DataFrame(report_cache.get_entries()), use_container_width=True, hide_index=True)
+    
+    if st.button("🧹 Clear Report Cache"):
+        report_cache.clear()
+        st.rerun()
+    
     # Cache Analysis
     if 'query_cache' in st.session_state and st.session_state.query_cache:
         st.header("💾 Cache Analysis")
@@ -304,6 +399,7 @@ def main():
     with col2:
         if st.button("💾 Clear All Cache"):
             st.cache_data.clear()
+            report_cache.clear()
             if 'query_cache' in st.session_state:
                 st.session_state.query_cache = {}
             st.success("All cache cleared!")
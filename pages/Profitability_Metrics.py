@@ -6,6 +6,7 @@ from plotly.subplots import make_subplots
 from sqlalchemy import text
 from datetime import date, datetime
 from db_config import engine
+from utils.report_cache import CacheScope, cached_report
 from utils.navigation import show_sap_sidebar, show_breadcrumb
 
 st.set_page_config(page_title="📈 Profitability Metrics", layout="wide", initial_sidebar_state="expanded")
@@ -25,44 +26,44 @@ def get_filter_options():
     return companies, years, periods
 
 def get_profitability_data(companies, years, periods):
-    """Get profitability data for calculations"""
+    """Get profitability data for calculations from the posted period summary"""
     
     where_conditions = ["1=1"]
     params = {}
     
     if companies and "All" not in companies:
         comp_ph = ", ".join([f":comp{i}" for i in range(len(companies))])
-        where_conditions.append(f"jeh.companycodeid IN ({comp_ph})")
+        where_conditions.append(f"s.company_code IN ({comp_ph})")
         params.update({f"comp{i}": v for i, v in enumerate(companies)})
     
     if years and "All" not in years:
         year_ph = ", ".join([f":year{i}" for i in range(len(years))])
-        where_conditions.append(f"jeh.fiscalyear IN ({year_ph})")
+        where_conditions.append(f"s.fiscal_year IN ({year_ph})")
         params.update({f"year{i}": v for i, v in enumerate(years)})
     
     if periods and "All" not in periods:
         period_ph = ", ".join([f":period{i}" for i in range(len(periods))])
-        where_conditions.append(f"jeh.period IN ({period_ph})")
+        where_conditions.append(f"s.posting_period IN ({period_ph})")
         params.update({f"period{i}": v for i, v in enumerate(periods)})
     
     query = f"""
     WITH monthly_data AS (
         SELECT 
-            jeh.fiscalyear,
-            jeh.period,
-            CONCAT(jeh.fiscalyear, '-', LPAD(jeh.period::text, 2, '0')) as year_month,
+            s.fiscal_year as fiscalyear,
+            s.posting_period as period,
+            CONCAT(s.fiscal_year, '-', LPAD(s.posting_period::text, 2, '0')) as year_month,
             coa.accounttype,
             CASE 
                 WHEN coa.accounttype = 'Revenue' THEN 
-                    SUM(COALESCE(jel.creditamount, 0) - COALESCE(jel.debitamount, 0))
+                    SUM(s.period_credits - s.period_debits)
                 WHEN coa.accounttype IN ('Expense', 'Expenses') THEN 
-                    SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0))
+                    SUM(s.period_debits - s.period_credits)
                 WHEN coa.accounttype = 'Asset' THEN
-                    SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0))
+                    SUM(s.period_debits - s.period_credits)
                 WHEN coa.accounttype = 'Liability' THEN
-                    SUM(COALESCE(jel.creditamount, 0) - COALESCE(jel.debitamount, 0))
+                    SUM(s.period_credits - s.period_debits)
                 WHEN coa.accounttype = 'Equity' THEN
-                    SUM(COALESCE(jel.creditamount, 0) - COALESCE(jel.debitamount, 0))
+                    SUM(s.period_credits - s.period_debits)
                 ELSE 0
             END as amount,
             CASE 
@@ -119,12 +120,10 @@ def get_profitability_data(companies, years, periods):
                 WHEN coa.accounttype = 'Equity' THEN 'Total Equity'
                 ELSE coa.accounttype
             END as category
-        FROM journalentryline jel
-        JOIN glaccount coa ON coa.glaccountid = jel.glaccountid
-        JOIN journalentryheader jeh ON jeh.documentnumber = jel.documentnumber 
-            AND jeh.companycodeid = jel.companycodeid
+        FROM gl_period_summary s
+        JOIN glaccount coa ON coa.glaccountid = s.gl_account
         WHERE {' AND '.join(where_conditions)}
-        GROUP BY jeh.fiscalyear, jeh.period, year_month, coa.accounttype, category
+        GROUP BY s.fiscal_year, s.posting_period, year_month, coa.accounttype, category
     )
     SELECT 
         year_month,
@@ -137,10 +136,17 @@ def get_profitability_data(companies, years, periods):
     ORDER BY fiscalyear, period
     """
     
-    with engine.connect() as conn:
-        df = pd.read_sql(text(query), conn, params=params)
+    def load():
+        with engine.connect() as conn:
+            return pd.read_sql(text(query), conn, params=params)
     
-    return df
+    # Shared across users; recomputed when a posting touches the selected periods
+    return cached_report(
+        "profitability_monthly",
+        {"companies": companies, "years": years, "periods": periods},
+        load,
+        scope=CacheScope.of(companies, years, periods)
+    )
 
 def calculate_profitability_metrics(pivot_df):
     """Calculate all profitability metrics"""
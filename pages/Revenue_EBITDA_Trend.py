@@ -6,6 +6,7 @@ from plotly.subplots import make_subplots
 from sqlalchemy import text
 from datetime import date, datetime
 from db_config import engine
+from utils.report_cache import CacheScope, cached_report
 from utils.navigation import show_sap_sidebar, show_breadcrumb
 
 # Configure page
@@ -21,7 +22,7 @@ def get_filter_options():
     """Get filter options from database"""
     with engine.connect() as conn:
         companies = [row[0] for row in conn.execute(text("SELECT DISTINCT companycodeid FROM journalentryheader ORDER BY companycodeid")).fetchall() if row[0]]
-        business_units = [row[0] for row in conn.execute(text("SELECT DISTINCT business_unit_id FROM journalentryline WHERE business_unit_id IS NOT NULL ORDER BY business_unit_id")).fetchall() if row[0]]
+        business_units = [row[0] for row in conn.execute(text("SELECT DISTINCT business_unit_code FROM gl_period_summary WHERE business_unit_code <> '' ORDER BY business_unit_code")).fetchall() if row[0]]
         years = [row[0] for row in conn.execute(text("SELECT DISTINCT fiscalyear FROM journalentryheader ORDER BY fiscalyear")).fetchall() if row[0]]
     
     return companies, business_units, years
@@ -31,7 +32,7 @@ def calculate_ebitda(net_income, interest_expense, income_taxes, depreciation, a
     return net_income + interest_expense + income_taxes + depreciation + amortization
 
 def get_monthly_data(companies, business_units, years):
-    """Get monthly revenue and expense data"""
+    """Get monthly revenue and expense data from the posted period summary"""
     
     # Build query conditions
     where_conditions = ["1=1"]
@@ -39,31 +40,31 @@ def get_monthly_data(companies, business_units, years):
     
     if companies and "All" not in companies:
         comp_ph = ", ".join([f":comp{i}" for i in range(len(companies))])
-        where_conditions.append(f"jeh.companycodeid IN ({comp_ph})")
+        where_conditions.append(f"s.company_code IN ({comp_ph})")
         params.update({f"comp{i}": v for i, v in enumerate(companies)})
     
     if business_units and "All" not in business_units:
         bu_ph = ", ".join([f":bu{i}" for i in range(len(business_units))])
-        where_conditions.append(f"jel.business_unit_id IN ({bu_ph})")
+        where_conditions.append(f"s.business_unit_code IN ({bu_ph})")
         params.update({f"bu{i}": v for i, v in enumerate(business_units)})
     
     if years and "All" not in years:
         year_ph = ", ".join([f":year{i}" for i in range(len(years))])
-        where_conditions.append(f"jeh.fiscalyear IN ({year_ph})")
+        where_conditions.append(f"s.fiscal_year IN ({year_ph})")
         params.update({f"year{i}": v for i, v in enumerate(years)})
     
     query = f"""
     WITH monthly_data AS (
         SELECT 
-            jeh.fiscalyear,
-            jeh.period,
-            CONCAT(jeh.fiscalyear, '-', LPAD(jeh.period::text, 2, '0')) as year_month,
+            s.fiscal_year as fiscalyear,
+            s.posting_period as period,
+            CONCAT(s.fiscal_year, '-', LPAD(s.posting_period::text, 2, '0')) as year_month,
             coa.accounttype,
             CASE 
                 WHEN coa.accounttype = 'Revenue' THEN 
-                    SUM(COALESCE(jel.creditamount, 0) - COALESCE(jel.debitamount, 0))
+                    SUM(s.period_credits - s.period_debits)
                 WHEN coa.accounttype IN ('Expense', 'Expenses') THEN 
-                    SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0))
+                    SUM(s.period_debits - s.period_credits)
                 ELSE 0
             END as amount,
             CASE 
@@ -74,13 +75,11 @@ def get_monthly_data(companies, business_units, years):
                 WHEN coa.accounttype IN ('Expense', 'Expenses') THEN 'Operating Expense'
                 ELSE coa.accounttype
             END as category
-        FROM journalentryline jel
-        JOIN glaccount coa ON coa.glaccountid = jel.glaccountid
-        JOIN journalentryheader jeh ON jeh.documentnumber = jel.documentnumber 
-            AND jeh.companycodeid = jel.companycodeid
+        FROM gl_period_summary s
+        JOIN glaccount coa ON coa.glaccountid = s.gl_account
         WHERE {' AND '.join(where_conditions)}
             AND coa.accounttype IN ('Revenue', 'Expense')
-        GROUP BY jeh.fiscalyear, jeh.period, year_month, coa.accounttype, category
+        GROUP BY s.fiscal_year, s.posting_period, year_month, coa.accounttype, category
     )
     SELECT 
         year_month,
@@ -93,10 +92,17 @@ def get_monthly_data(companies, business_units, years):
     ORDER BY fiscalyear, period
     """
     
-    with engine.connect() as conn:
-        df = pd.read_sql(text(query), conn, params=params)
+    def load():
+        with engine.connect() as conn:
+            return pd.read_sql(text(query), conn, params=params)
     
-    return df
+    # Shared across users; recomputed when a posting touches the selected periods
+    return cached_report(
+        "revenue_ebitda_monthly",
+        {"companies": companies, "business_units": business_units, "years": years},
+        load,
+        scope=CacheScope.of(companies, years)
+    )
 
 # Get filter options
 companies, business_units, years = get_filter_options()
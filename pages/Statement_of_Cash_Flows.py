@@ -6,6 +6,7 @@ from datetime import date, datetime
 from db_config import engine
 from utils.navigation import show_sap_sidebar, show_breadcrumb
 from utils.pdf_generator import generate_cash_flow_statement_pdf
+from utils.reporting_engine import ReportFilter, reporting_engine
 
 # Configure page
 st.set_page_config(page_title="💧 Statement of Cash Flows", layout="wide", initial_sidebar_state="expanded")
@@ -61,12 +62,14 @@ with st.expander("🔍 Filter Options", expanded=True):
 
 # Run Report Button
 if st.button("💧 Generate Cash Flow Statement", type="primary"):
-    # Process filter selections
+    # Process filter selections ("All" leaves the dimension unrestricted)
+    all_years = "All" in selected_years
+    all_periods = "All" in selected_periods
     if "All" in selected_companies:
         selected_companies = companies
-    if "All" in selected_years:
+    if all_years:
         selected_years = years
-    if "All" in selected_periods:
+    if all_periods:
         selected_periods = periods
     if "All" in selected_cash_accounts:
         selected_cash_accounts = cash_accounts
@@ -76,114 +79,21 @@ if st.button("💧 Generate Cash Flow Statement", type="primary"):
         st.error("⚠️ Please ensure Company Code(s) and date range are provided.")
         st.stop()
     
-    # Build query for cash flow analysis
-    where_conditions = ["jeh.documentdate BETWEEN :date_from AND :date_to"]
-    params = {"date_from": date_from, "date_to": date_to}
-    
-    if selected_companies:
-        comp_ph = ", ".join([f":comp{i}" for i in range(len(selected_companies))])
-        where_conditions.append(f"jeh.companycodeid IN ({comp_ph})")
-        params.update({f"comp{i}": v for i, v in enumerate(selected_companies)})
-    
-    if selected_years:
-        year_ph = ", ".join([f":year{i}" for i in range(len(selected_years))])
-        where_conditions.append(f"jeh.fiscalyear IN ({year_ph})")
-        params.update({f"year{i}": v for i, v in enumerate(selected_years)})
-    
-    if selected_periods:
-        period_ph = ", ".join([f":period{i}" for i in range(len(selected_periods))])
-        where_conditions.append(f"jeh.period IN ({period_ph})")
-        params.update({f"period{i}": v for i, v in enumerate(selected_periods)})
-    
-    # Enhanced cash flow query with proper categorization
-    if cash_flow_method == "Direct Method":
-        # Direct method - analyze actual cash receipts and payments
-        query = f"""
-        SELECT 
-            coa.glaccountid,
-            coa.accountname,
-            coa.accounttype,
-            SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0)) AS net_change,
-            CASE 
-                WHEN coa.accounttype = 'Asset' AND (coa.accountname ILIKE '%cash%' OR coa.accountname ILIKE '%bank%') THEN 'Cash and Cash Equivalents'
-                WHEN coa.accounttype = 'Revenue' THEN 'Operating Activities'
-                WHEN coa.accounttype = 'Expense' AND coa.accountname NOT ILIKE '%depreciation%' THEN 'Operating Activities'
-                WHEN coa.accounttype = 'Asset' AND coa.accountname ILIKE '%equipment%' THEN 'Investing Activities'
-                WHEN coa.accounttype = 'Asset' AND coa.accountname ILIKE '%property%' THEN 'Investing Activities'
-                WHEN coa.accounttype = 'Asset' AND coa.accountname ILIKE '%investment%' THEN 'Investing Activities'
-                WHEN coa.accounttype = 'Liability' AND coa.accountname ILIKE '%loan%' THEN 'Financing Activities'
-                WHEN coa.accounttype = 'Liability' AND coa.accountname ILIKE '%debt%' THEN 'Financing Activities'
-                WHEN coa.accounttype = 'Equity' THEN 'Financing Activities'
-                ELSE 'Operating Activities'
-            END AS cash_flow_category,
-            COUNT(*) as transaction_count
-        FROM 
-            journalentryline jel
-        JOIN 
-            glaccount coa ON coa.glaccountid = jel.glaccountid
-        JOIN 
-            journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
-        WHERE 
-            {' AND '.join(where_conditions)}
-        GROUP BY 
-            coa.glaccountid, coa.accountname, coa.accounttype
-        HAVING 
-            {'ABS(SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0))) >= :threshold' if not show_zero_amounts else 'TRUE'}
-        ORDER BY 
-            cash_flow_category, coa.accounttype, coa.glaccountid
-        """
-    else:
-        # Indirect method - start with net income and adjust
-        query = f"""
-        WITH net_income AS (
-            SELECT 
-                SUM(COALESCE(jel.creditamount, 0) - COALESCE(jel.debitamount, 0)) AS net_income_amount
-            FROM journalentryline jel
-            JOIN glaccount coa ON coa.glaccountid = jel.glaccountid
-            JOIN journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
-            WHERE {' AND '.join(where_conditions)}
-            AND coa.accounttype IN ('Revenue', 'Expense')
-        )
-        SELECT 
-            coa.glaccountid,
-            coa.accountname,
-            coa.accounttype,
-            SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0)) AS net_change,
-            CASE 
-                WHEN coa.accounttype = 'Asset' AND (coa.accountname ILIKE '%cash%' OR coa.accountname ILIKE '%bank%') THEN 'Cash and Cash Equivalents'
-                WHEN coa.accounttype IN ('Revenue', 'Expense') THEN 'Net Income Adjustment'
-                WHEN coa.accounttype = 'Asset' AND coa.accountname NOT ILIKE '%cash%' AND coa.accountname NOT ILIKE '%bank%' THEN 'Operating Activities'
-                WHEN coa.accounttype = 'Liability' AND coa.accountname NOT ILIKE '%loan%' AND coa.accountname NOT ILIKE '%debt%' THEN 'Operating Activities'
-                WHEN coa.accounttype = 'Asset' AND (coa.accountname ILIKE '%equipment%' OR coa.accountname ILIKE '%property%') THEN 'Investing Activities'
-                WHEN coa.accounttype = 'Liability' AND (coa.accountname ILIKE '%loan%' OR coa.accountname ILIKE '%debt%') THEN 'Financing Activities'
-                WHEN coa.accounttype = 'Equity' THEN 'Financing Activities'
-                ELSE 'Operating Activities'
-            END AS cash_flow_category,
-            COUNT(*) as transaction_count
-        FROM 
-            journalentryline jel
-        JOIN 
-            glaccount coa ON coa.glaccountid = jel.glaccountid
-        JOIN 
-            journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
-        WHERE 
-            {' AND '.join(where_conditions)}
-        GROUP BY 
-            coa.glaccountid, coa.accountname, coa.accounttype
-        HAVING 
-            {'ABS(SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0))) >= :threshold' if not show_zero_amounts else 'TRUE'}
-        ORDER BY 
-            cash_flow_category, coa.accounttype, coa.glaccountid
-        """
-    
-    if not show_zero_amounts:
-        params["threshold"] = amount_threshold
+    # Build report filter for cash flow analysis
+    report_filter = ReportFilter(
+        company_codes=selected_companies,
+        date_from=date_from,
+        date_to=date_to,
+        fiscal_years=None if all_years else selected_years,
+        periods=None if all_periods else selected_periods
+    )
     
     # Execute query
     with st.spinner("Generating Cash Flow Statement..."):
         try:
-            with engine.connect() as conn:
-                df = pd.read_sql(text(query), conn, params=params)
+            df = reporting_engine.cash_flow(
+                report_filter, cash_flow_method, threshold=None if show_zero_amounts else amount_threshold
+            )
             
             if df.empty:
                 st.warning("No records found with the selected filters.")
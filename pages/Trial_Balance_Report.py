@@ -6,6 +6,7 @@ from datetime import date, datetime
 from db_config import engine
 from utils.navigation import show_sap_sidebar, show_breadcrumb
 from utils.pdf_generator import generate_trial_balance_pdf
+from utils.reporting_engine import ReportFilter, reporting_engine
 
 # Configure page
 st.set_page_config(page_title="📑 Trial Balance Report", layout="wide", initial_sidebar_state="expanded")
@@ -64,16 +65,19 @@ with st.expander("🔍 Filter Options", expanded=True):
 
 # Run Report Button
 if st.button("📑 Generate Trial Balance", type="primary"):
-    # Process filter selections
+    # Process filter selections ("All" leaves the dimension unrestricted)
+    all_creators = "All" in selected_creators
+    all_years = "All" in selected_years
+    all_periods = "All" in selected_periods
     if "All" in selected_companies:
         selected_companies = companies
-    if "All" in selected_years:
+    if all_years:
         selected_years = years
-    if "All" in selected_periods:
+    if all_periods:
         selected_periods = periods
     if "All" in selected_account_types:
         selected_account_types = account_types
-    if "All" in selected_creators:
+    if all_creators:
         selected_creators = creators
     
     # Validate filters
@@ -81,76 +85,25 @@ if st.button("📑 Generate Trial Balance", type="primary"):
         st.error("⚠️ Please ensure Company Code(s) and date range are provided.")
         st.stop()
     
-    # Build query
-    where_conditions = ["jeh.documentdate BETWEEN :date_from AND :date_to"]
-    params = {"date_from": date_from, "date_to": date_to}
-    
-    if selected_companies:
-        comp_ph = ", ".join([f":comp{i}" for i in range(len(selected_companies))])
-        where_conditions.append(f"jeh.companycodeid IN ({comp_ph})")
-        params.update({f"comp{i}": v for i, v in enumerate(selected_companies)})
-    
-    if selected_years:
-        year_ph = ", ".join([f":year{i}" for i in range(len(selected_years))])
-        where_conditions.append(f"jeh.fiscalyear IN ({year_ph})")
-        params.update({f"year{i}": v for i, v in enumerate(selected_years)})
-    
-    if selected_periods:
-        period_ph = ", ".join([f":period{i}" for i in range(len(selected_periods))])
-        where_conditions.append(f"jeh.period IN ({period_ph})")
-        params.update({f"period{i}": v for i, v in enumerate(selected_periods)})
-    
-    if selected_account_types:
-        type_ph = ", ".join([f":type{i}" for i in range(len(selected_account_types))])
-        where_conditions.append(f"coa.accounttype IN ({type_ph})")
-        params.update({f"type{i}": v for i, v in enumerate(selected_account_types)})
-    
-    if selected_creators:
-        creator_ph = ", ".join([f":creator{i}" for i in range(len(selected_creators))])
-        where_conditions.append(f"jeh.createdby IN ({creator_ph})")
-        params.update({f"creator{i}": v for i, v in enumerate(selected_creators)})
-    
-    if account_id_search:
-        where_conditions.append("UPPER(coa.glaccountid) LIKE UPPER(:account_id_search)")
-        params["account_id_search"] = f"%{account_id_search}%"
-    
-    if account_name_search:
-        where_conditions.append("UPPER(coa.accountname) LIKE UPPER(:account_name_search)")
-        params["account_name_search"] = f"%{account_name_search}%"
-    
-    query = f"""
-    SELECT 
-        coa.glaccountid,
-        coa.accountname,
-        coa.accounttype,
-        SUM(COALESCE(jel.debitamount, 0)) AS total_debit,
-        SUM(COALESCE(jel.creditamount, 0)) AS total_credit,
-        SUM(COALESCE(jel.debitamount, 0)) - SUM(COALESCE(jel.creditamount, 0)) AS net_balance,
-        COUNT(*) as transaction_count
-    FROM 
-        journalentryline jel
-    JOIN 
-        glaccount coa ON coa.glaccountid = jel.glaccountid
-    JOIN 
-        journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
-    WHERE 
-        {' AND '.join(where_conditions)}
-    GROUP BY 
-        coa.glaccountid, coa.accountname, coa.accounttype
-    HAVING 
-        {'(ABS(SUM(COALESCE(jel.debitamount, 0))) >= :threshold OR ABS(SUM(COALESCE(jel.creditamount, 0))) >= :threshold)' if not show_zero_balances else 'TRUE'}
-    ORDER BY 
-        coa.accounttype, coa.glaccountid
-    """
-    
-    if not show_zero_balances:
-        params["threshold"] = balance_threshold
+    # Build report filter
+    report_filter = ReportFilter(
+        company_codes=selected_companies,
+        date_from=date_from,
+        date_to=date_to,
+        fiscal_years=None if all_years else selected_years,
+        periods=None if all_periods else selected_periods,
+        account_types=selected_account_types,
+        account_id_search=account_id_search,
+        account_name_search=account_name_search,
+        created_by=None if all_creators else selected_creators
+    )
     
     # Execute query
     with st.spinner("Generating Trial Balance..."):
         try:
-            with engine.connect() as conn:
-                df = pd.read_sql(text(query), conn, params=params)
+            df = reporting_engine.trial_balance(
+                report_filter, threshold=None if show_zero_balances else balance_threshold
+            )
             
             if df.empty:
                 st.warning("No records found with the selected filters.")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Rebuild the dimensional period summary
+Recomputes gl_period_summary from the posted journal lines
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.period_summary import PeriodSummaryService
+from utils.logger import get_logger
+
+logger = get_logger("rebuild_period_summary")
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description="Rebuild gl_period_summary from posted journal lines")
+    parser.add_argument('--company', help='Only rebuild this company code')
+    parser.add_argument('--fiscal-year', type=int, help='Only rebuild this fiscal year')
+    
+    args = parser.parse_args()
+    
+    try:
+        result = PeriodSummaryService.rebuild(args.company, args.fiscal_year)
+    except Exception as e:
+        logger.error(f"Period summary rebuild failed: {e}")
+        print(f"Rebuild failed: {e}")
+        sys.exit(1)
+    
+    print(f"Company           : {result['company_code'] or 'ALL'}")
+    print(f"Fiscal year       : {result['fiscal_year'] or 'ALL'}")
+    print(f"Rows removed      : {result['rows_deleted']}")
+    print(f"Rows written      : {result['rows_inserted']}")
+    print(f"Duration          : {result['duration']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
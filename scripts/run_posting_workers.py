@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Headless GL posting worker pool
+Posts all approved, unposted journal entries with N concurrent workers
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.posting_worker_pool import PostingWorkerPool
+from utils.logger import get_logger
+
+logger = get_logger("run_posting_workers")
+
+
+def print_summary(results):
+    """Print pool results and throughput"""
+    print(f"Documents claimed : {results['total_documents']}")
+    print(f"Posted            : {results['posted_successfully']}")
+    print(f"Failed            : {len(results['failed_documents'])}")
+    print(f"Shards            : {results['shards']}")
+    print(f"Workers           : {results['workers']}")
+    print(f"Duration          : {results['batch_duration']:.2f}s")
+    print(f"Throughput        : {results['documents_per_second']:.1f} docs/s")
+    
+    for worker in results["worker_stats"]:
+        print(f"  worker {worker['worker_id']}: {worker['posted']} posted, {worker['failed']} failed, "
+              f"{worker['batches']} batches, {worker['documents_per_second']:.1f} docs/s")
+    
+    for failed in results["failed_documents"]:
+        print(f"  FAILED {failed['document']}: {failed['error']}")
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description="Concurrent GL posting worker pool")
+    parser.add_argument('--workers', type=int, default=4, help='Number of concurrent workers')
+    parser.add_argument('--batch-size', type=int, default=100, help='Documents per claim/post transaction')
+    parser.add_argument('--company', help='Only post documents of this company code')
+    parser.add_argument('--posting-date', help='Posting date (YYYY-MM-DD, defaults to today)')
+    parser.add_argument('--posted-by', default='POSTING_WORKER', help='User recorded as poster')
+    parser.add_argument('--loop', type=int, default=0,
+                        help='Keep polling every N seconds instead of running once')
+    
+    args = parser.parse_args()
+    
+    posting_date = datetime.strptime(args.posting_date, "%Y-%m-%d").date() if args.posting_date else None
+    pool = PostingWorkerPool(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        posted_by=args.posted_by,
+        posting_date=posting_date
+    )
+    
+    while True:
+        results = pool.run(args.company)
+        print_summary(results)
+        
+        if not args.loop:
+            break
+        
+        time.sleep(args.loop)
+    
+    if results["failed_documents"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
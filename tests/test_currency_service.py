@@ -0,0 +1,125 @@
+"""Unit tests for CurrencyTranslationService rate resolution, served from in-memory rates"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import utils.currency_service as currency_service_module
+from utils.currency_service import CurrencyTranslationService
+from utils.exchange_rate_store import ExchangeRateStore, _PairHistory
+from utils.rate_cube import RateCube, RateCubeCache
+
+
+JAN_2 = date(2025, 1, 2)
+
+# (from_currency, to_currency) -> [(rate_date, rate)]
+STORED_RATES = {
+    ("EUR", "USD"): [(date(2024, 12, 31), Decimal("1.035000")), (date(2025, 1, 2), Decimal("1.040000"))],
+    ("GBP", "USD"): [(date(2025, 1, 1), Decimal("1.250000"))],
+    ("USD", "JPY"): [(date(2025, 1, 1), Decimal("157.200000"))],
+}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Service whose rate store and cube cache read STORED_RATES instead of the database"""
+    def load_pairs(store, pairs):
+        histories = {}
+        for pair in pairs:
+            rows = STORED_RATES.get(pair, [])
+            histories[pair] = _PairHistory([d.toordinal() for d, _ in rows], [r for _, r in rows], store.version)
+        return histories
+
+    def load_cube(start_date, end_date, currencies=None, pivot_currency="USD"):
+        currencies = sorted({c for pair in STORED_RATES for c in pair} | {pivot_currency})
+        seed_rows = []
+        window_rows = []
+        for (from_currency, to_currency), rows in STORED_RATES.items():
+            before = [(d, r) for d, r in rows if d < start_date]
+            if before:
+                seed_rows.append((from_currency, to_currency) + before[-1])
+            window_rows.extend((from_currency, to_currency, d, r) for d, r in rows if start_date <= d <= end_date)
+        window_rows.sort(key=lambda row: row[2])
+        return RateCube.from_rows(currencies, start_date, end_date, seed_rows, window_rows, pivot_currency)
+
+    monkeypatch.setattr(ExchangeRateStore, "_load_pairs", load_pairs)
+    monkeypatch.setattr(RateCube, "load", staticmethod(load_cube))
+    monkeypatch.setattr(currency_service_module, "exchange_rate_store", ExchangeRateStore())
+    monkeypatch.setattr(currency_service_module, "rate_cube_cache", RateCubeCache())
+    return CurrencyTranslationService()
+
+
+class TestGetExchangeRates:
+
+    def test_as_of_rule_matches_single_lookup(self, service):
+        keys = [("EUR", "USD", date(2025, 1, 1)), ("EUR", "USD", JAN_2), ("EUR", "USD", date(2024, 12, 1))]
+
+        rates = service.get_exchange_rates(keys)
+
+        assert rates == {key: service.get_exchange_rate(*key) for key in keys}
+        assert rates[("EUR", "USD", date(2025, 1, 1))] == Decimal("1.035000")
+        assert rates[("EUR", "USD", date(2024, 12, 1))] is None
+
+    def test_cross_pairs_are_not_derived_by_default(self, service):
+        rates = service.get_exchange_rates([("GBP", "JPY", JAN_2)])
+
+        assert rates[("GBP", "JPY", JAN_2)] is None
+
+    def test_cross_pairs_fall_back_like_translate_amount(self, service):
+        keys = [("GBP", "JPY", JAN_2), ("USD", "EUR", JAN_2), ("EUR", "USD", JAN_2)]
+
+        rates = service.get_exchange_rates(keys, allow_cross_rates=True)
+
+        assert rates[("GBP", "JPY", JAN_2)] == service.get_cross_rate("GBP", "JPY", JAN_2)
+        assert rates[("GBP", "JPY", JAN_2)] == Decimal("196.5000000000")
+        assert rates[("USD", "EUR", JAN_2)] == service.get_cross_rate("USD", "EUR", JAN_2)
+        # Stored pairs keep their stored rate
+        assert rates[("EUR", "USD", JAN_2)] == Decimal("1.040000")
+
+    def test_batch_and_single_translation_agree_on_cross_pairs(self, service):
+        rate = service.get_exchange_rates([("GBP", "JPY", JAN_2)], allow_cross_rates=True)[("GBP", "JPY", JAN_2)]
+
+        assert (Decimal("100.00") * rate).quantize(Decimal("0.01")) == \
+            service.translate_amount(Decimal("100.00"), "GBP", "JPY", JAN_2)
+
+
+class TestTranslateAmounts:
+
+    @pytest.mark.parametrize("from_currency, to_currency", [
+        ("EUR", "USD"), ("GBP", "USD"), ("GBP", "JPY"), ("USD", "EUR")
+    ])
+    def test_matches_translate_amount_on_half_cent_boundaries(self, service, from_currency, to_currency):
+        # Cent and tenth-of-cent amounts put many products exactly on a half cent
+        amounts = [round(cents / 1000, 3) for cents in range(-2000, 2001, 5)] + [10.0625, 0.06, 1.005, 2.675]
+
+        result = service.translate_amounts(amounts, from_currency, to_currency, JAN_2)
+
+        expected = [
+            float(service.translate_amount(Decimal(repr(amount)), from_currency, to_currency, JAN_2))
+            for amount in amounts
+        ]
+        assert list(result["translated_amount"]) == expected
+        assert not result["rate_missing"].any()
+
+    def test_same_currency_returns_amounts_unchanged(self, service):
+        result = service.translate_amounts([1.005, -3.3333], "EUR", "EUR", JAN_2)
+
+        assert list(result["translated_amount"]) == [1.005, -3.3333]
+        assert list(result["exchange_rate"]) == [1.0, 1.0]
+
+    def test_missing_rates_are_nan_and_flagged(self, service):
+        result = service.translate_amounts([100.0, 100.0], ["EUR", "CHF"], "USD", [JAN_2, None])
+
+        assert result["translated_amount"][0] == 104.0
+        assert result["rate_missing"].tolist() == [False, True]
+
+    def test_cross_rates_can_be_disabled(self, service):
+        result = service.translate_amounts([100.0], "GBP", "JPY", JAN_2, allow_cross_rates=False)
+
+        assert result["rate_missing"].tolist() == [True]
+
+    def test_scalars_broadcast_against_arrays(self, service):
+        result = service.translate_amounts(10.0, ["EUR", "GBP"], "USD", JAN_2)
+
+        assert result["translated_amount"].tolist() == [10.4, 12.5]
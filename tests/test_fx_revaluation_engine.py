@@ -0,0 +1,102 @@
+"""Unit tests for the vectorized FX revaluation math"""
+
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from utils.fx_revaluation_engine import FXRevaluationEngine, RevaluationExposure
+from utils.rate_cube import RateCube
+
+
+REVALUATION_DATE = date(2025, 1, 31)
+
+
+def decimal_value(balance_fc: float, rate: float) -> float:
+    exact = Decimal(repr(balance_fc)) * Decimal(repr(rate))
+    return float(exact.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+
+class TestUnrealizedAtRates:
+
+    def test_matches_decimal_half_up_on_half_cent_products(self):
+        balance_fc = np.array([round(cents / 1000, 3) for cents in range(-5000, 5001, 5)])
+        balance_func = np.zeros_like(balance_fc)
+        rates = np.full_like(balance_fc, 1.25)
+
+        value, unrealized = FXRevaluationEngine.unrealized_at_rates(balance_fc, balance_func, rates)
+
+        assert value.tolist() == [decimal_value(float(b), 1.25) for b in balance_fc]
+        assert unrealized.tolist() == value.tolist()
+
+    def test_unrealized_is_value_less_functional_balance(self):
+        value, unrealized = FXRevaluationEngine.unrealized_at_rates(
+            np.array([1000.0, -250.0]), np.array([1080.0, -270.0]), np.array([1.1, 1.1]))
+
+        assert value.tolist() == [1100.0, -275.0]
+        assert unrealized.tolist() == [20.0, -5.0]
+
+    def test_rates_with_leading_scenario_axis_broadcast(self):
+        balance_fc = np.array([100.0, 200.0])
+        balance_func = np.array([110.0, 220.0])
+        rates = np.array([[1.1, 1.1], [1.2, 1.0]])
+
+        value, unrealized = FXRevaluationEngine.unrealized_at_rates(balance_fc, balance_func, rates)
+
+        assert value.shape == (2, 2)
+        assert unrealized.tolist() == [[0.0, 0.0], [10.0, -20.0]]
+
+    def test_missing_rates_stay_nan(self):
+        value, unrealized = FXRevaluationEngine.unrealized_at_rates(
+            np.array([100.0]), np.array([110.0]), np.array([np.nan]))
+
+        assert np.isnan(value[0]) and np.isnan(unrealized[0])
+
+
+class TestCompute:
+
+    def make_exposure(self, currencies, balance_fc, balance_func):
+        return RevaluationExposure(
+            company_code="1000",
+            ledger_id="L1",
+            balance_date=REVALUATION_DATE,
+            gl_accounts=np.array([f"11{i:04d}" for i in range(len(currencies))], dtype=object),
+            account_currencies=np.array(currencies, dtype=object),
+            balance_fc=np.array(balance_fc, dtype=np.float64),
+            balance_func=np.array(balance_func, dtype=np.float64)
+        )
+
+    def test_flags_zero_balances_missing_rates_and_thresholds(self):
+        cube = RateCube.from_rows(
+            ["EUR", "GBP", "USD"], REVALUATION_DATE, REVALUATION_DATE, [],
+            [("EUR", "USD", REVALUATION_DATE, 1.0412345), ("GBP", "USD", REVALUATION_DATE, 1.25)]
+        )
+        exposure = self.make_exposure(
+            ["EUR", "EUR", "GBP", "CHF", "GBP"],
+            [10000.0, 0.0, 100.0, 500.0, 1000000.0],
+            [10300.0, 0.0, 124.5, 550.0, 1249950.0]
+        )
+
+        result = FXRevaluationEngine().compute(exposure, cube, REVALUATION_DATE,
+                                               historical_rates={"EUR": Decimal("1.03")})
+
+        # Closing rates are rounded to the six decimals of a stored rate
+        assert result.current_rates[0] == 1.041235
+        assert result.value_at_current_rate[0] == 10412.35
+        assert result.unrealized_gain_loss[0] == 112.35
+        assert result.historical_rates.tolist() == [1.03, 1.03, 1.0, 1.0, 1.0]
+        assert result.zero_balance.tolist() == [False, True, False, False, False]
+        assert result.rate_missing.tolist() == [False, False, False, True, False]
+        assert result.stored.tolist() == [True, False, True, False, True]
+        # 0.50 is under 1.00 but 0.40% of 124.50; 50.00 clears 1.00 although it is 0.004% of the balance
+        assert result.revaluation_required.tolist() == [True, False, True, False, True]
+
+    def test_small_gain_on_large_balance_is_not_required(self):
+        cube = RateCube.from_rows(["GBP", "USD"], REVALUATION_DATE, REVALUATION_DATE, [],
+                                  [("GBP", "USD", REVALUATION_DATE, 1.25)])
+        exposure = self.make_exposure(["GBP"], [1000000.0], [1249999.5])
+
+        result = FXRevaluationEngine().compute(exposure, cube, REVALUATION_DATE)
+
+        assert result.unrealized_gain_loss.tolist() == [0.5]
+        assert result.revaluation_required.tolist() == [False]
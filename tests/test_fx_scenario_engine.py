@@ -0,0 +1,106 @@
+"""Unit tests for FX rate-shock scenarios evaluated against an in-memory exposure"""
+
+from datetime import date
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from utils.fx_revaluation_engine import FXRevaluationEngine, RevaluationExposure
+from utils.fx_scenario_engine import (
+    ALL_CURRENCIES, ExposureMatrix, FXScenarioEngine, RateScenario, currency_shock_grid
+)
+from utils.rate_cube import RateCube
+
+
+REVALUATION_DATE = date(2025, 1, 31)
+
+
+@pytest.fixture
+def exposure():
+    """Two ledgers holding EUR, GBP, USD (functional) and JPY (no closing rate) accounts"""
+    currencies = ["EUR", "GBP", "JPY", "USD"]
+    account_currencies = np.array(["EUR", "GBP", "USD", "EUR", "JPY", "GBP"], dtype=object)
+    return ExposureMatrix(
+        company_code="1000",
+        revaluation_date=REVALUATION_DATE,
+        functional_currency="USD",
+        ledger_ids=["L1", "L2"],
+        currencies=currencies,
+        account_ledgers=np.array(["L1", "L1", "L1", "L2", "L2", "L2"], dtype=object),
+        gl_accounts=np.array(["110000", "110100", "100000", "110000", "110200", "110100"], dtype=object),
+        account_currencies=account_currencies,
+        ledger_index=np.array([0, 0, 0, 1, 1, 1]),
+        currency_index=np.array([currencies.index(c) for c in account_currencies]),
+        balance_fc=np.array([10000.0, 2500.0, 5000.0, -4000.0, 100000.0, 0.0]),
+        balance_func=np.array([10300.0, 3100.0, 5000.0, -4200.0, 640.0, 15.0]),
+        base_rates=np.array([1.041235, 1.25, np.nan, 1.0])
+    )
+
+
+@pytest.fixture
+def engine():
+    return FXScenarioEngine(revaluation_engine=FXRevaluationEngine(), service=Mock())
+
+
+class TestShockMatrix:
+
+    def test_all_currencies_leaves_functional_currency_unshocked(self, exposure):
+        shocks = FXScenarioEngine.shock_matrix(exposure, [RateScenario("All +5%", {ALL_CURRENCIES: 0.05})])
+
+        assert shocks.tolist() == [[0.05, 0.05, 0.05, 0.0]]
+
+    def test_currency_shock_overrides_all_currencies(self, exposure):
+        shocks = FXScenarioEngine.shock_matrix(
+            exposure, [RateScenario("Mixed", {ALL_CURRENCIES: -0.02, "GBP": 0.10})])
+
+        assert shocks.tolist() == [[-0.02, 0.10, -0.02, 0.0]]
+
+    def test_single_currency_and_unknown_currency(self, exposure):
+        shocks = FXScenarioEngine.shock_matrix(
+            exposure, [RateScenario("Base", {}), RateScenario("EUR", {"EUR": 0.01, "CHF": 0.5})])
+
+        assert shocks.tolist() == [[0.0, 0.0, 0.0, 0.0], [0.01, 0.0, 0.0, 0.0]]
+
+
+class TestEvaluate:
+
+    def test_zero_shock_reproduces_base(self, exposure, engine):
+        result = engine.evaluate(exposure, [RateScenario("Base", {}), RateScenario("All 0%", {ALL_CURRENCIES: 0.0})])
+
+        assert result.shocked_rates[0].tolist() == pytest.approx(exposure.base_rates.tolist(), nan_ok=True)
+        assert (result.impact == 0).all()
+        assert result.unrealized[0].tolist() == result.base_unrealized.tolist()
+
+    def test_base_unrealized_matches_revaluation_compute(self, exposure, engine):
+        cube = RateCube.from_rows(["EUR", "GBP", "USD"], REVALUATION_DATE, REVALUATION_DATE, [],
+                                  [("EUR", "USD", REVALUATION_DATE, 1.0412345),
+                                   ("GBP", "USD", REVALUATION_DATE, 1.25)])
+        ledger = RevaluationExposure("1000", "L1", REVALUATION_DATE, exposure.gl_accounts,
+                                     exposure.account_currencies, exposure.balance_fc, exposure.balance_func)
+        revaluation = FXRevaluationEngine().compute(ledger, cube, REVALUATION_DATE)
+
+        result = engine.evaluate(exposure, [RateScenario("Base", {})])
+
+        stored = revaluation.stored
+        assert result.base_unrealized[stored].tolist() == revaluation.unrealized_gain_loss[stored].tolist()
+        # Accounts a revaluation would not store contribute nothing
+        assert result.base_unrealized[~stored].tolist() == [0.0, 0.0]
+
+    def test_impacts_roll_up_to_ledgers(self, exposure, engine):
+        result = engine.evaluate(exposure, [RateScenario("All +10%", {ALL_CURRENCIES: 0.10})])
+
+        # The USD account is never shocked and the JPY account has no closing rate
+        assert result.impact[0, 2] == 0.0 and result.impact[0, 4] == 0.0
+        assert result.impact[0, 0] == pytest.approx(1041.24)
+        assert result.impact[0, 1] == pytest.approx(312.5)
+        assert result.impact[0, 3] == pytest.approx(-416.50)
+        assert result.ledger_impact[0].tolist() == pytest.approx([1353.74, -416.50])
+        assert result.total_impact[0] == pytest.approx(937.24)
+
+
+def test_currency_shock_grid():
+    scenarios = currency_shock_grid(["EUR"], shocks=(-0.05, 0.05))
+
+    assert [s.name for s in scenarios] == ["Base", "EUR -5%", "EUR +5%", "All -5%", "All +5%"]
+    assert scenarios[-1].shocks == {ALL_CURRENCIES: 0.05}
@@ -0,0 +1,15 @@
+"""Unit tests for GL posting helpers that do not touch the database"""
+
+from utils.gl_posting_engine import GLPostingEngine
+
+
+def test_batch_ids_started_in_the_same_second_differ():
+    batch_ids = [GLPostingEngine._new_batch_id("BULK") for _ in range(500)]
+
+    assert len(set(batch_ids)) == len(batch_ids)
+
+
+def test_batch_ids_fit_the_audit_trail_column():
+    # posting_audit_trail.batch_id is VARCHAR(40)
+    assert GLPostingEngine._new_batch_id("BULK").startswith("BULK")
+    assert len(GLPostingEngine._new_batch_id("W999")) <= 40
@@ -0,0 +1,144 @@
+"""Unit tests for keyset cursors, seek conditions and paging over an in-memory table"""
+
+import base64
+from datetime import date, datetime
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+import utils.keyset_pagination as keyset_module
+from utils.keyset_pagination import KeysetPaginator, SortKey, decode_cursor, encode_cursor
+
+
+class TestCursors:
+
+    @pytest.mark.parametrize("values", [
+        ["110000", date(2025, 1, 31), "JE0001", 3],
+        [datetime(2025, 1, 31, 23, 59, 59, 123456), Decimal("-1234.50"), None, 2.5],
+        [],
+    ])
+    def test_round_trip(self, values):
+        assert decode_cursor(encode_cursor(values)) == values
+
+    def test_numpy_and_pandas_values_round_trip_as_python_values(self):
+        cursor = encode_cursor([np.int64(7), pd.Timestamp("2025-02-01 08:30:00")])
+
+        assert decode_cursor(cursor) == [7, datetime(2025, 2, 1, 8, 30)]
+
+    def test_cursor_is_url_safe(self):
+        cursor = encode_cursor(["?" * 30, ">" * 30])
+
+        assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+
+    @pytest.mark.parametrize("cursor", ["not a cursor", base64.urlsafe_b64encode(b"{").decode()])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(ValueError, match="Invalid page cursor"):
+            decode_cursor(cursor)
+
+
+class TestSeekCondition:
+
+    def test_mixed_directions_forward(self):
+        paginator = KeysetPaginator("*", "t", [SortKey("a", "a"), SortKey("b", "b", descending=True), SortKey("c", "c")])
+        params = {}
+
+        condition = paginator._seek_condition([1, 2, 3], backward=False, params=params)
+
+        assert condition == ("a >= :seek_0 AND ((a > :seek_0) OR (a = :seek_0 AND b < :seek_1) "
+                             "OR (a = :seek_0 AND b = :seek_1 AND c > :seek_2))")
+        assert params == {"seek_0": 1, "seek_1": 2, "seek_2": 3}
+
+    def test_mixed_directions_backward(self):
+        paginator = KeysetPaginator("*", "t", [SortKey("a", "a", descending=True), SortKey("b", "b")])
+
+        condition = paginator._seek_condition([1, 2], backward=True, params={})
+
+        assert condition == "a >= :seek_0 AND ((a > :seek_0) OR (a = :seek_0 AND b < :seek_1))"
+
+    def test_order_by_flips_every_key_backward(self):
+        paginator = KeysetPaginator("*", "t", [SortKey("a", "a"), SortKey("b", "b", descending=True)])
+
+        assert paginator._order_by(False) == "a ASC, b DESC"
+        assert paginator._order_by(True) == "a DESC, b ASC"
+
+    def test_cursor_length_must_match_sort_keys(self):
+        paginator = KeysetPaginator("*", "t", [SortKey("a", "a"), SortKey("b", "b")])
+
+        with pytest.raises(ValueError, match="sort order"):
+            paginator._seek_condition([1], backward=False, params={})
+
+
+# (account, posted, line) sorted account ASC, posted DESC, line ASC
+ROWS = [
+    ("100000", "2025-01-03", 1), ("100000", "2025-01-03", 2), ("100000", "2025-01-01", 1),
+    ("200000", "2025-01-05", 1), ("200000", "2025-01-02", 1), ("200000", "2025-01-02", 2),
+    ("300000", "2025-01-04", 1),
+]
+
+
+@pytest.fixture
+def paginator(monkeypatch):
+    sqlite = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with sqlite.begin() as conn:
+        conn.execute(text("CREATE TABLE lines (account TEXT, posted TEXT, line INTEGER)"))
+        conn.execute(text("INSERT INTO lines VALUES (:account, :posted, :line)"),
+                      [{"account": a, "posted": p, "line": n} for a, p, n in reversed(ROWS)])
+    monkeypatch.setattr(keyset_module, "engine", sqlite)
+    return KeysetPaginator("account, posted, line", "lines", [
+        SortKey("account", "account"), SortKey("posted", "posted", descending=True), SortKey("line", "line")
+    ], page_size=3)
+
+
+def keys(page):
+    return list(page.rows.itertuples(index=False, name=None))
+
+
+class TestFetchPage:
+
+    def test_pages_forward_and_back_in_mixed_order(self, paginator):
+        first = paginator.fetch_page()
+        second = paginator.fetch_page(after=first.last_cursor)
+        third = paginator.fetch_page(after=second.last_cursor)
+        back = paginator.fetch_page(before=second.first_cursor)
+
+        assert keys(first) + keys(second) + keys(third) == ROWS
+        assert (first.has_previous, first.has_next) == (False, True)
+        assert (second.has_previous, second.has_next) == (True, True)
+        assert (third.has_previous, third.has_next) == (True, False)
+        assert keys(back) == keys(first)
+        assert back.has_previous is False
+        assert list(first.rows.columns) == ["account", "posted", "line"]
+
+    def test_conditions_restrict_every_page(self, paginator):
+        page = paginator.fetch_page(conditions=["line = :line"], params={"line": 1})
+
+        assert keys(page) == [row for row in ROWS if row[2] == 1][:3]
+
+    def test_start_at_first_key_has_no_previous_page(self, paginator):
+        page = paginator.fetch_page(start="000000")
+
+        assert keys(page) == ROWS[:3]
+        assert page.has_previous is False
+
+    def test_start_past_rows_has_previous_page(self, paginator):
+        page = paginator.fetch_page(start="200000")
+
+        assert keys(page) == ROWS[3:6]
+        assert page.has_previous is True
+        assert keys(paginator.fetch_page(before=page.first_cursor)) == ROWS[:3]
+
+    def test_start_respects_conditions(self, paginator):
+        page = paginator.fetch_page(conditions=["account >= :from_account"], params={"from_account": "200000"},
+                                    start="200000")
+
+        assert page.has_previous is False
+
+    def test_after_and_before_are_exclusive(self, paginator):
+        cursor = encode_cursor(["100000", "2025-01-03", 1])
+
+        with pytest.raises(ValueError):
+            paginator.fetch_page(after=cursor, before=cursor)
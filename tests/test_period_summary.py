@@ -0,0 +1,119 @@
+"""Unit tests for gl_period_summary delta aggregation"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import utils.period_summary as period_summary_module
+from utils.gl_posting_engine import GLPostingEngine
+from utils.parallel_posting_service import ParallelPostingService
+from utils.period_summary import PeriodSummaryService, SUMMARY_KEY_COLUMNS, UNASSIGNED
+
+
+def line(gl_account, debit=0, credit=0, ledger_id="L1", business_unit=None, business_area=None):
+    return {
+        "gl_account": gl_account,
+        "ledger_id": ledger_id,
+        "debit_amount": Decimal(str(debit)),
+        "credit_amount": Decimal(str(credit)),
+        "business_unit": business_unit,
+        "business_area": business_area
+    }
+
+
+def document(lines, document_type="SA", period=1):
+    return {
+        "header": {"company_code": "1000", "fiscal_year": 2025, "period": period, "document_type": document_type},
+        "lines": lines
+    }
+
+
+class TestAggregateDeltas:
+
+    def test_lines_with_the_same_key_are_summed(self):
+        deltas = PeriodSummaryService.aggregate_deltas([
+            document([line("400000", credit="100.00"), line("110000", debit="100.00")]),
+            document([line("400000", credit="50.25"), line("110000", debit="50.25")]),
+        ])
+
+        assert [(d["gl_account"], d["period_debits"], d["period_credits"], d["transaction_count"])
+                for d in deltas] == [
+            ("110000", Decimal("150.25"), Decimal("0"), 2),
+            ("400000", Decimal("0"), Decimal("150.25"), 2),
+        ]
+
+    def test_dimensions_split_keys_and_missing_ones_are_unassigned(self):
+        deltas = PeriodSummaryService.aggregate_deltas([
+            document([line("400000", credit=10, business_unit="BU1"), line("400000", credit=20)],
+                     document_type=None),
+            document([line("400000", credit=5, business_area="BA1")], document_type="DR", period=2),
+        ])
+
+        keys = [tuple(d[column] for column in SUMMARY_KEY_COLUMNS) for d in deltas]
+        assert keys == [
+            ("1000", "L1", 2025, 1, "400000", UNASSIGNED, UNASSIGNED, UNASSIGNED),
+            ("1000", "L1", 2025, 1, "400000", "BU1", UNASSIGNED, UNASSIGNED),
+            ("1000", "L1", 2025, 2, "400000", UNASSIGNED, "BA1", "DR"),
+        ]
+
+    def test_deltas_are_in_key_order(self):
+        deltas = PeriodSummaryService.aggregate_deltas([
+            document([line("500000", debit=1, ledger_id="L2"), line("100000", credit=1, ledger_id="L2"),
+                      line("300000", debit=1, ledger_id="L1"), line("200000", credit=1, ledger_id="L1")])
+        ])
+
+        assert [(d["ledger_id"], d["gl_account"]) for d in deltas] == [
+            ("L1", "200000"), ("L1", "300000"), ("L2", "100000"), ("L2", "500000")
+        ]
+
+
+class TestApplyDeltas:
+
+    @pytest.fixture
+    def inserts(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(period_summary_module, "execute_multi_row_insert",
+                            lambda conn, table, columns, rows, on_conflict=None: calls.append((table, rows)))
+        return calls
+
+    def test_no_deltas_writes_nothing(self, inserts):
+        PeriodSummaryService.apply_deltas(object(), [])
+
+        assert inserts == []
+
+    def test_rows_carry_net_amount(self, inserts):
+        deltas = PeriodSummaryService.aggregate_deltas([
+            document([line("110000", debit="80.00"), line("110000", credit="30.00")])
+        ])
+
+        PeriodSummaryService.apply_deltas(object(), deltas)
+
+        [(table, rows)] = inserts
+        assert table == "gl_period_summary"
+        assert rows[0]["net_amount"] == Decimal("50.00")
+        assert rows[0]["transaction_count"] == 2
+
+
+def test_parallel_entry_applies_matching_balance_and_summary_deltas(monkeypatch):
+    applied = {}
+    monkeypatch.setattr(GLPostingEngine, "_apply_balance_deltas",
+                        staticmethod(lambda conn, deltas, posting_date: applied.update(balances=deltas,
+                                                                                       posting_date=posting_date)))
+    monkeypatch.setattr(PeriodSummaryService, "apply_deltas",
+                        staticmethod(lambda conn, deltas: applied.update(summary=deltas)))
+    lines = [
+        {"gl_account": "110000", "debit_amount": Decimal("10.00"), "credit_amount": Decimal("0"), "business_unit": "BU1"},
+        {"gl_account": "400000", "debit_amount": Decimal("0"), "credit_amount": Decimal("10.00")},
+    ]
+
+    ParallelPostingService._update_parallel_ledger_balances(object(), "1000", "L2", lines, (date(2025, 3, 15), 2025, 3))
+
+    assert [(d["ledger_id"], d["fiscal_year"], d["posting_period"], d["business_unit_code"], d["document_type"])
+            for d in applied["summary"]] == [("L2", 2025, 3, "BU1", "SA"), ("L2", 2025, 3, UNASSIGNED, "SA")]
+    assert sum(d["period_debits"] for d in applied["summary"]) == Decimal("10.00")
+    assert [(d["gl_account"], d["ledger_id"], d["posting_period"], d["debit_amount"], d["credit_amount"])
+            for d in applied["balances"]] == [
+        ("110000", "L2", 3, Decimal("10.00"), Decimal("0")), ("400000", "L2", 3, Decimal("0"), Decimal("10.00"))
+    ]
+    assert applied["posting_date"] == date(2025, 3, 15)
@@ -0,0 +1,137 @@
+"""Unit tests for the exchange rate cube (forward-fill and cross-rate resolution)"""
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from utils.rate_cube import (
+    RateCube, round_half_up,
+    RESOLUTION_MISSING, RESOLUTION_DIRECT, RESOLUTION_INVERSE, RESOLUTION_TRIANGULATED
+)
+
+
+JAN_1 = date(2025, 1, 1)
+JAN_5 = date(2025, 1, 5)
+
+
+def make_cube(window_rows, seed_rows=(), currencies=("EUR", "GBP", "JPY", "USD"),
+              pivot_currency="USD", start_date=JAN_1, end_date=JAN_5):
+    return RateCube.from_rows(list(currencies), start_date, end_date, seed_rows, window_rows, pivot_currency)
+
+
+class TestForwardFill:
+
+    def test_seed_rate_fills_days_before_first_window_rate(self):
+        cube = make_cube(
+            window_rows=[("EUR", "USD", date(2025, 1, 3), 1.20)],
+            seed_rows=[("EUR", "USD", date(2024, 12, 30), 1.10)]
+        )
+
+        assert cube.rate("EUR", "USD", date(2025, 1, 1)) == 1.10
+        assert cube.rate("EUR", "USD", date(2025, 1, 2)) == 1.10
+        assert cube.rate("EUR", "USD", date(2025, 1, 3)) == 1.20
+        assert cube.rate("EUR", "USD", date(2025, 1, 5)) == 1.20
+
+    def test_without_seed_days_before_first_rate_are_missing(self):
+        cube = make_cube(window_rows=[("EUR", "USD", date(2025, 1, 3), 1.20)])
+
+        rates, resolution = cube.lookup("EUR", "USD", np.array([date(2025, 1, 2), date(2025, 1, 3)], dtype=object))
+
+        assert np.isnan(rates[0])
+        assert resolution[0] == RESOLUTION_MISSING
+        assert rates[1] == 1.20
+
+    def test_dates_after_window_use_last_day(self):
+        cube = make_cube(window_rows=[("EUR", "USD", date(2025, 1, 4), 1.15)])
+
+        assert cube.rate("EUR", "USD", date(2025, 3, 1)) == 1.15
+
+    def test_dates_before_window_are_missing(self):
+        cube = make_cube(window_rows=[], seed_rows=[("EUR", "USD", date(2024, 12, 30), 1.10)])
+
+        assert cube.rate("EUR", "USD", date(2024, 12, 31)) is None
+
+    def test_last_row_of_a_day_wins(self):
+        cube = make_cube(window_rows=[
+            ("EUR", "USD", date(2025, 1, 2), 1.10),
+            ("EUR", "USD", date(2025, 1, 2), 1.12),
+        ])
+
+        assert cube.rate("EUR", "USD", date(2025, 1, 2)) == 1.12
+
+    def test_same_currency_is_one(self):
+        cube = make_cube(window_rows=[])
+
+        assert cube.rate("JPY", "JPY", JAN_1) == 1.0
+
+
+class TestCrossRates:
+
+    def test_inverse_of_opposite_pair(self):
+        cube = make_cube(window_rows=[("USD", "JPY", JAN_1, 150.0)])
+
+        rates, resolution = cube.lookup("JPY", "USD", np.array([JAN_1], dtype=object))
+
+        assert rates[0] == pytest.approx(1 / 150.0)
+        assert resolution[0] == RESOLUTION_INVERSE
+
+    def test_direct_rate_preferred_over_inverse(self):
+        cube = make_cube(window_rows=[("USD", "JPY", JAN_1, 150.0), ("JPY", "USD", JAN_1, 0.0070)])
+
+        rates, resolution = cube.lookup("JPY", "USD", np.array([JAN_1], dtype=object))
+
+        assert rates[0] == 0.0070
+        assert resolution[0] == RESOLUTION_DIRECT
+
+    def test_triangulates_through_pivot(self):
+        cube = make_cube(window_rows=[("GBP", "USD", JAN_1, 1.25), ("USD", "JPY", JAN_1, 150.0)])
+
+        rates, resolution = cube.lookup(np.array(["GBP", "JPY"], dtype=object),
+                                        np.array(["JPY", "GBP"], dtype=object),
+                                        np.array([JAN_1, JAN_1], dtype=object))
+
+        assert rates[0] == pytest.approx(187.5)
+        assert rates[1] == pytest.approx(1 / 187.5)
+        assert list(resolution) == [RESOLUTION_TRIANGULATED, RESOLUTION_TRIANGULATED]
+
+    def test_without_pivot_cross_pairs_stay_missing(self):
+        cube = make_cube(window_rows=[("GBP", "USD", JAN_1, 1.25), ("USD", "JPY", JAN_1, 150.0)],
+                         pivot_currency=None)
+
+        assert cube.rate("GBP", "JPY", JAN_1) is None
+
+    def test_unknown_currency_is_missing(self):
+        cube = make_cube(window_rows=[("GBP", "USD", JAN_1, 1.25)])
+
+        rates, resolution = cube.lookup("CHF", "USD", np.array([JAN_1], dtype=object))
+
+        assert np.isnan(rates[0])
+        assert resolution[0] == RESOLUTION_MISSING
+
+    def test_statistics_count_resolutions(self):
+        cube = make_cube(window_rows=[("GBP", "USD", JAN_1, 1.25), ("USD", "JPY", JAN_1, 150.0)],
+                         currencies=("GBP", "JPY", "USD"), end_date=JAN_1)
+
+        stats = cube.get_statistics()
+
+        # 3 diagonal + 2 stored; 2 inverses; GBP<->JPY triangulated
+        assert stats["direct_rates"] == 5
+        assert stats["inverse_rates"] == 2
+        assert stats["triangulated_rates"] == 2
+        assert stats["missing_rates"] == 0
+
+
+class TestRoundHalfUp:
+
+    def test_halves_round_away_from_zero(self):
+        assert list(round_half_up(np.array([0.125, -0.125, 2.675, 1.005]), 2)) == [0.13, -0.13, 2.68, 1.01]
+
+    def test_translate_rounds_and_reports_missing(self):
+        cube = make_cube(window_rows=[("EUR", "USD", JAN_1, 1.1)])
+
+        translated, rates, _ = cube.translate(np.array([10.0, 10.0]), np.array(["EUR", "CHF"], dtype=object),
+                                              "USD", np.array([JAN_1, JAN_1], dtype=object))
+
+        assert translated[0] == 11.0
+        assert np.isnan(translated[1]) and np.isnan(rates[1])
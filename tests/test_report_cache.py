@@ -0,0 +1,98 @@
+"""Unit tests for report cache keys, scopes and version-based invalidation"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.report_cache import CacheScope, ReportCache, bump_data_versions, make_cache_key
+
+
+class TestCacheKeys:
+
+    def test_parameter_order_does_not_change_the_key(self):
+        assert make_cache_key("tb", {"company": "1000", "year": 2025}) == \
+            make_cache_key("tb", {"year": 2025, "company": "1000"})
+
+    def test_selection_order_does_not_change_the_key(self):
+        assert make_cache_key("tb", {"periods": [3, 1, 2], "accounts": ("400000", "100000")}) == \
+            make_cache_key("tb", {"periods": [1, 2, 3], "accounts": {"100000", "400000"}})
+
+    def test_dates_decimals_and_numpy_scalars_normalize(self):
+        assert make_cache_key("tb", {"as_of": date(2025, 1, 31), "min": Decimal("10.50"), "year": np.int64(2025)}) == \
+            make_cache_key("tb", {"as_of": "2025-01-31", "min": "10.50", "year": 2025})
+        assert make_cache_key("tb", {"at": datetime(2025, 1, 31, 12, 0)}) == \
+            make_cache_key("tb", {"at": "2025-01-31T12:00:00"})
+
+    def test_different_values_and_report_types_differ(self):
+        assert make_cache_key("tb", {"year": 2025}) != make_cache_key("tb", {"year": 2024})
+        assert make_cache_key("tb", {"year": 2025}) != make_cache_key("bs", {"year": 2025})
+
+
+class TestCacheScope:
+
+    def test_filter_lists_are_deduplicated_sorted_and_cast(self):
+        assert CacheScope.of(["2000", "1000", "1000"], ["2025"], [12, 1]) == \
+            CacheScope(("1000", "2000"), (2025,), (1, 12))
+
+    def test_empty_and_all_mean_unrestricted(self):
+        assert CacheScope.of([], ["All", "2025"], None) == CacheScope()
+
+
+class TestBumpDataVersions:
+
+    def test_keys_are_deduplicated_and_sorted(self):
+        conn = Mock()
+
+        bump_data_versions(conn, [("2000", 2025, 1), ("1000", "2025", "3"), ("1000", 2025, 3), (None, 2025, 1)])
+
+        params = conn.execute.call_args[0][1]
+        assert params == {"companies": ["1000", "2000"], "years": [2025, 2025], "periods": [3, 1]}
+
+    def test_no_keys_executes_nothing(self):
+        conn = Mock()
+
+        bump_data_versions(conn, [("1000", None, 1)])
+
+        conn.execute.assert_not_called()
+
+
+class TestReportCache:
+
+    @pytest.fixture
+    def cache(self):
+        cache = ReportCache()
+        cache.version = 1
+        cache.data_version = lambda scope: cache.version
+        return cache
+
+    def test_hit_until_the_data_version_changes(self, cache):
+        compute = Mock(side_effect=[pd.DataFrame({"amount": [1]}), pd.DataFrame({"amount": [2]})])
+
+        first = cache.get_or_compute("tb", {"year": 2025}, compute)
+        second = cache.get_or_compute("tb", {"year": 2025}, compute)
+        cache.version = 2
+        third = cache.get_or_compute("tb", {"year": 2025}, compute)
+
+        assert compute.call_count == 2
+        assert first.equals(second)
+        assert third["amount"].tolist() == [2]
+        assert cache.get_stats()["stale"] == 1
+
+    def test_callers_get_copies(self, cache):
+        cache.get_or_compute("tb", {}, lambda: {"rows": [1]})["rows"].append(2)
+
+        assert cache.get_or_compute("tb", {}, lambda: {"rows": []}) == {"rows": [1]}
+
+    def test_serves_uncached_when_versions_are_unavailable(self):
+        cache = ReportCache()
+        cache.data_version = Mock(side_effect=RuntimeError("no database"))
+        compute = Mock(return_value=1)
+
+        cache.get_or_compute("tb", {}, compute)
+        cache.get_or_compute("tb", {}, compute)
+
+        assert compute.call_count == 2
@@ -0,0 +1,60 @@
+"""Unit tests for chunked exports writing from in-memory chunks"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from utils.streaming_export import StreamingExporter
+
+
+def chunks(*frames, error=None):
+    def iter_chunks(query, params=None, column_types=None):
+        yield from frames
+        if error is not None:
+            raise error
+    return iter_chunks
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    return StreamingExporter(chunk_size=2, export_dir=str(tmp_path))
+
+
+CHUNK = pd.DataFrame({"glaccountid": ["100000", "200000"], "debitamount": [10.5, 0.0]})
+
+
+@pytest.mark.parametrize("export_format", ["CSV", "XLSX", "Parquet"])
+def test_failure_closes_writer_and_removes_partial_file(exporter, monkeypatch, export_format):
+    opened = []
+    open_writer = StreamingExporter._open_writer
+
+    def tracking_open_writer(*args, **kwargs):
+        writer = open_writer(*args, **kwargs)
+        opened.append(writer)
+        return writer
+
+    monkeypatch.setattr(StreamingExporter, "_open_writer", staticmethod(tracking_open_writer))
+    monkeypatch.setattr(exporter, "iter_chunks", chunks(CHUNK, error=RuntimeError("connection lost")))
+
+    with pytest.raises(RuntimeError, match="connection lost"):
+        exporter.export("SELECT 1", {}, export_format, "gl_detail")
+
+    [writer] = opened
+    if export_format == "CSV":
+        assert writer._file.closed
+    elif export_format == "Parquet":
+        assert not writer._writer.is_open
+    else:
+        assert writer._workbook.fileclosed
+    assert os.listdir(exporter.export_dir) == []
+
+
+def test_csv_export_writes_every_chunk_and_totals(exporter, monkeypatch):
+    monkeypatch.setattr(exporter, "iter_chunks", chunks(CHUNK, CHUNK))
+
+    result = exporter.export("SELECT 1", {}, "CSV", "gl_detail", total_columns=["debitamount"])
+
+    assert (result.rows, result.chunks) == (4, 2)
+    assert result.totals == {"debitamount": 21.0}
+    assert pd.read_csv(result.path, dtype={"glaccountid": str})["glaccountid"].tolist() == ["100000", "200000"] * 2
@@ -8,6 +8,8 @@ Features:
 - Federal Reserve H.10 daily rates via FRED API
 - ECB daily reference rates via XML feed
 - Bank of England official rates
+- Concurrent fetching of all sources and series with bounded parallelism
+- Pluggable transport (HTTP with on-disk cache, HTTP stand-in or local files)
 - Regulatory compliance tracking
 - Audit trail for official rate sources
 
@@ -15,14 +17,20 @@ Author: Claude Code Assistant
 Date: August 6, 2025
 """
 
-import requests
+import json
+import time
 import pandas as pd
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
-from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, List, Optional
-from sqlalchemy import text
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional
 from db_config import engine
+from utils.rate_source_providers import (
+    RateResource, RateResponse, RateSourceProvider, get_default_rate_provider
+)
+from utils.exchange_rate_store import invalidate_exchange_rates
+from utils.sql_helpers import execute_multi_row_insert
 import logging
 
 # Set up logging
@@ -32,10 +40,46 @@ logger = logging.getLogger(__name__)
 class CentralBankRatesService:
     """Service to fetch official central bank exchange rates."""
     
-    def __init__(self):
-        """Initialize the service."""
+    # FRED series codes for major currencies
+    FRED_SERIES = {
+        'EUR': 'DEXUSEU',  # US / Euro Foreign Exchange Rate
+        'GBP': 'DEXUSUK',  # US / UK Foreign Exchange Rate  
+        'JPY': 'DEXJPUS',  # Japan / US Foreign Exchange Rate
+        'CAD': 'DEXCAUS',  # Canada / US Foreign Exchange Rate
+        'CHF': 'DEXSZUS',  # Switzerland / US Foreign Exchange Rate
+        'AUD': 'DEXUSAL',  # US / Australia Foreign Exchange Rate
+        'NZD': 'DEXUSNZ',  # US / New Zealand Foreign Exchange Rate
+        'SEK': 'DEXSDUS',  # Sweden / US Foreign Exchange Rate
+        'NOK': 'DEXNOUS',  # Norway / US Foreign Exchange Rate
+        'DKK': 'DEXDNUS',  # Denmark / US Foreign Exchange Rate
+    }
+    
+    # BOE Statistical Database - major currency spot rates
+    BOE_SERIES = {
+        'XUDLERD': 'EUR',  # EUR/GBP
+        'XUDLGBD': 'GBP',  # GBP/USD (inverted)
+        'XUDLJYD': 'JPY',  # JPY/GBP
+        'XUDLCDD': 'CAD',  # CAD/GBP
+        'XUDLSFD': 'CHF'   # CHF/GBP
+    }
+    
+    RATE_QUANTIZER = Decimal('0.000001')
+    
+    def __init__(self, provider: Optional[RateSourceProvider] = None, max_workers: Optional[int] = None):
+        """
+        Initialize the service.
+        
+        Args:
+            provider: Transport for source documents (default from settings:
+                HTTP with disk cache, an HTTP stand-in or local fixture files)
+            max_workers: Maximum concurrent fetches across all sources
+        """
+        from config import settings
+        
         # FRED API key - get free from https://fred.stlouisfed.org/docs/api/api_key.html
-        self.fred_api_key = None  # Set this to your FRED API key for production use
+        self.fred_api_key = settings.fred_api_key  # Set FRED_API_KEY for production use
+        self.provider = provider or get_default_rate_provider()
+        self.max_workers = max_workers or settings.central_bank_rates_max_workers
         self.base_urls = {
             'fed_h10': 'https://www.federalreserve.gov/releases/h10/',
             'ecb': 'https://www.ecb.europa.eu/stats/eurofxref/',
@@ -43,6 +87,76 @@ class CentralBankRatesService:
             'fred': 'https://api.stlouisfed.org/fred/series/observations'
         }
         
+    # ------------------------------------------------------------------
+    # Resources and concurrent fetching
+    # ------------------------------------------------------------------
+    
+    def _fred_available(self) -> bool:
+        """FRED needs an API key unless served by a stand-in provider"""
+        return bool(self.fred_api_key) or not self.provider.requires_credentials
+    
+    def _fred_resources(self, target_date: Optional[date] = None) -> Dict[str, RateResource]:
+        resources = {}
+        for currency, series_id in self.FRED_SERIES.items():
+            params = [
+                ('series_id', series_id),
+                ('api_key', self.fred_api_key or ''),
+                ('file_type', 'json'),
+                ('sort_order', 'desc'),
+                ('limit', '1')  # Get most recent observation
+            ]
+            if target_date:
+                params.append(('observation_end', target_date.isoformat()))
+            resources[currency] = RateResource(
+                source='fred',
+                key=f"fred/{series_id}.json",
+                url=self.base_urls['fred'],
+                params=tuple(params)
+            )
+        return resources
+    
+    def _ecb_resource(self) -> RateResource:
+        return RateResource(
+            source='ecb',
+            key='ecb/eurofxref-daily.xml',
+            url=f"{self.base_urls['ecb']}eurofxref-daily.xml"
+        )
+    
+    def _boe_resources(self) -> Dict[str, RateResource]:
+        return {
+            currency: RateResource(
+                source='boe',
+                key=f"boe/{code}.csv",
+                url=f"{self.base_urls['boe']}_iadb-fromshowcolumns.asp",
+                params=(('csv.x', 'yes'), ('SeriesCodes', code), ('UsingCodes', 'Y'), ('CSVF', 'TN'))
+            )
+            for code, currency in self.BOE_SERIES.items()
+        }
+    
+    def _fetch_resources(self, resources: Iterable[RateResource]) -> Dict[RateResource, RateResponse]:
+        """Fetch many resources concurrently, at most ``max_workers`` at a time"""
+        resources = list(dict.fromkeys(resources))
+        if not resources:
+            return {}
+        
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(resources)),
+                                thread_name_prefix="cb-rates") as executor:
+            responses = dict(zip(resources, executor.map(self._fetch_one, resources)))
+        
+        cached = sum(1 for response in responses.values() if response.from_cache)
+        failed = sum(1 for response in responses.values() if not response.ok)
+        logger.info(f"Fetched {len(resources)} rate documents via {self.provider.name} in "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms "
+                    f"({cached} from cache, {failed} failed)")
+        return responses
+    
+    def _fetch_one(self, resource: RateResource) -> RateResponse:
+        try:
+            return self.provider.fetch(resource)
+        except Exception as e:
+            return RateResponse(resource, 0, error=str(e))
+    
     def fetch_fed_h10_rates(self, target_date: Optional[date] = None) -> Dict:
         """
         Fetch Federal Reserve H.10 daily rates using alternative method.
@@ -137,7 +251,7 @@ class CentralBankRatesService:
         Returns:
             Dictionary with rates data
         """
-        if not self.fred_api_key:
+        if not self._fred_available():
             return {
                 'source': 'Federal Reserve (FRED)',
                 'source_type': 'OFFICIAL',
@@ -145,49 +259,33 @@ class CentralBankRatesService:
                 'error': 'FRED API key required. Get free key from https://fred.stlouisfed.org/docs/api/api_key.html'
             }
         
+        resources = self._fred_resources(target_date)
+        responses = self._fetch_resources(resources.values())
+        return self._build_fred_result(resources, responses, target_date)
+    
+    def _build_fred_result(self, resources: Dict[str, RateResource],
+                           responses: Dict[RateResource, RateResponse],
+                           target_date: Optional[date] = None) -> Dict:
         try:
-            # FRED series codes for major currencies
-            fred_series = {
-                'EUR': 'DEXUSEU',  # US / Euro Foreign Exchange Rate
-                'GBP': 'DEXUSUK',  # US / UK Foreign Exchange Rate  
-                'JPY': 'DEXJPUS',  # Japan / US Foreign Exchange Rate
-                'CAD': 'DEXCAUS',  # Canada / US Foreign Exchange Rate
-                'CHF': 'DEXSZUS',  # Switzerland / US Foreign Exchange Rate
-                'AUD': 'DEXUSAL',  # US / Australia Foreign Exchange Rate
-                'NZD': 'DEXUSNZ',  # US / New Zealand Foreign Exchange Rate
-                'SEK': 'DEXSDUS',  # Sweden / US Foreign Exchange Rate
-                'NOK': 'DEXNOUS',  # Norway / US Foreign Exchange Rate
-                'DKK': 'DEXDNUS',  # Denmark / US Foreign Exchange Rate
-            }
-            
             rates = {}
             rate_date = target_date or date.today()
             
-            for currency, series_id in fred_series.items():
+            for currency, resource in resources.items():
+                response = responses[resource]
+                if not response.ok:
+                    logger.warning(f"Error fetching FRED data for {currency}: {response.error}")
+                    continue
                 try:
-                    # FRED API call
-                    fred_url = f"https://api.stlouisfed.org/fred/series/observations"
-                    params = {
-                        'series_id': series_id,
-                        'api_key': self.fred_api_key,
-                        'file_type': 'json',
-                        'sort_order': 'desc',
-                        'limit': 1  # Get most recent observation
-                    }
-                    
-                    response = requests.get(fred_url, params=params, timeout=30)
-                    response.raise_for_status()
-                    
-                    data = response.json()
+                    data = json.loads(response.content)
                     if 'observations' in data and len(data['observations']) > 0:
                         obs = data['observations'][0]
                         if obs['value'] != '.':  # FRED uses '.' for missing values
                             rates[currency] = Decimal(obs['value']).quantize(
-                                Decimal('0.000001'), rounding=ROUND_HALF_UP
+                                self.RATE_QUANTIZER, rounding=ROUND_HALF_UP
                             )
                             
                 except Exception as e:
-                    logger.warning(f"Error fetching FRED data for {currency}: {e}")
+                    logger.warning(f"Error parsing FRED data for {currency}: {e}")
                     continue
             
             return {
@@ -217,14 +315,14 @@ class CentralBankRatesService:
         Returns:
             Dictionary with rates data
         """
+        logger.info("Fetching ECB reference rates...")
+        resource = self._ecb_resource()
+        return self._build_ecb_result(self._fetch_resources([resource])[resource])
+    
+    def _build_ecb_result(self, response: RateResponse) -> Dict:
         try:
-            logger.info("Fetching ECB reference rates...")
-            
-            # ECB daily rates XML feed
-            xml_url = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml"
-            
-            response = requests.get(xml_url, timeout=30)
-            response.raise_for_status()
+            if not response.ok:
+                raise RuntimeError(response.error)
             
             # Parse XML
             root = ET.fromstring(response.content)
@@ -248,9 +346,9 @@ class CentralBankRatesService:
                 if currency and rate:
                     try:
                         rates[currency] = Decimal(rate).quantize(
-                            Decimal('0.000001'), rounding=ROUND_HALF_UP
+                            self.RATE_QUANTIZER, rounding=ROUND_HALF_UP
                         )
-                    except ValueError as e:
+                    except (ValueError, InvalidOperation) as e:
                         logger.warning(f"Error processing ECB rate for {currency}: {e}")
                         continue
             
@@ -281,39 +379,32 @@ class CentralBankRatesService:
         Returns:
             Dictionary with rates data
         """
+        logger.info("Fetching Bank of England rates...")
+        resources = self._boe_resources()
+        return self._build_boe_result(resources, self._fetch_resources(resources.values()))
+    
+    def _build_boe_result(self, resources: Dict[str, RateResource],
+                          responses: Dict[RateResource, RateResponse]) -> Dict:
         try:
-            logger.info("Fetching Bank of England rates...")
-            
-            # BOE Statistical Database - major currency spot rates
-            boe_codes = {
-                'XUDLERD': 'EUR',  # EUR/GBP
-                'XUDLGBD': 'GBP',  # GBP/USD (inverted)
-                'XUDLJYD': 'JPY',  # JPY/GBP
-                'XUDLCDD': 'CAD',  # CAD/GBP
-                'XUDLSFD': 'CHF'   # CHF/GBP
-            }
-            
             rates = {}
             rate_date = date.today()
             
-            for code, currency in boe_codes.items():
+            for currency, resource in resources.items():
+                response = responses[resource]
+                if not response.ok:
+                    logger.warning(f"Error fetching BOE rate for {currency}: {response.error}")
+                    continue
                 try:
-                    # BOE CSV download URL
-                    csv_url = f"https://www.bankofengland.co.uk/boeapps/database/_iadb-fromshowcolumns.asp?csv.x=yes&SeriesCodes={code}&UsingCodes=Y&CSVF=TN"
-                    
-                    response = requests.get(csv_url, timeout=30)
-                    if response.status_code == 200:
-                        # Parse CSV (last row has most recent rate)
-                        lines = response.text.strip().split('\n')
-                        if len(lines) > 1:
-                            last_line = lines[-1].split(',')
-                            if len(last_line) >= 2 and last_line[1] != '':
-                                rate_value = float(last_line[1])
-                                rates[currency] = Decimal(str(rate_value)).quantize(
-                                    Decimal('0.000001'), rounding=ROUND_HALF_UP
-                                )
+                    # Parse CSV (last row has most recent rate)
+                    lines = response.text.strip().split('\n')
+                    if len(lines) > 1:
+                        last_line = lines[-1].split(',')
+                        if len(last_line) >= 2 and last_line[1].strip() != '':
+                            rates[currency] = Decimal(last_line[1].strip()).quantize(
+                                self.RATE_QUANTIZER, rounding=ROUND_HALF_UP
+                            )
                 except Exception as e:
-                    logger.warning(f"Error fetching BOE rate for {currency}: {e}")
+                    logger.warning(f"Error parsing BOE rate for {currency}: {e}")
                     continue
             
             return {
@@ -336,6 +427,35 @@ class CentralBankRatesService:
                 'error': str(e)
             }
     
+    def fetch_all_rates(self, target_date: Optional[date] = None) -> Dict[str, Dict]:
+        """
+        Fetch every source and series concurrently in one bounded pool.
+        
+        FRED series are used for the Federal Reserve when an API key (or a
+        stand-in provider) is available, otherwise the H.10 demo rates.
+        
+        Args:
+            target_date: Rate date for FRED observations (None = most recent)
+            
+        Returns:
+            Dictionary of rates data per source key, including failed sources
+        """
+        use_fred = self._fred_available()
+        fred_resources = self._fred_resources(target_date) if use_fred else {}
+        ecb_resource = self._ecb_resource()
+        boe_resources = self._boe_resources()
+        
+        responses = self._fetch_resources(
+            list(fred_resources.values()) + [ecb_resource] + list(boe_resources.values())
+        )
+        
+        return {
+            'federal_reserve': (self._build_fred_result(fred_resources, responses, target_date)
+                                if use_fred else self.fetch_fed_h10_rates(target_date)),
+            'ecb': self._build_ecb_result(responses[ecb_resource]),
+            'boe': self._build_boe_result(boe_resources, responses)
+        }
+    
     def save_official_rates(self, rates_data: Dict, created_by: str = 'CENTRAL_BANK_SERVICE') -> bool:
         """
         Save official rates to database with regulatory compliance flags.
@@ -350,57 +470,79 @@ class CentralBankRatesService:
         if rates_data.get('status') != 'SUCCESS':
             logger.error("Cannot save rates - fetch was not successful")
             return False
+        
+        return self.save_all_official_rates([rates_data], created_by) > 0
+    
+    def save_all_official_rates(self, rates_list: List[Dict],
+                                created_by: str = 'CENTRAL_BANK_SERVICE') -> int:
+        """
+        Save the rates of several sources in one transaction with batched upserts.
+        
+        Sources whose fetch was not successful are skipped. When two sources
+        supply the same pair for the same date the later one in ``rates_list`` wins.
+        
+        Args:
+            rates_list: Rates data from fetch methods
+            created_by: User or service creating the rates
             
+        Returns:
+            Number of rates saved
+        """
+        rows = {}
+        for rates_data in rates_list:
+            if rates_data.get('status') != 'SUCCESS':
+                logger.warning(f"Skipping {rates_data.get('source')} - fetch was not successful")
+                continue
+            
+            for currency, rate in rates_data['rates'].items():
+                if rate and rate > 0:  # Skip invalid rates
+                    key = (currency, rates_data['base_currency'], rates_data['rate_date'])
+                    rows[key] = {
+                        'from_currency': currency,
+                        'to_currency': rates_data['base_currency'],
+                        'exchange_rate': rate,
+                        'rate_date': rates_data['rate_date'],
+                        'rate_type': 'OFFICIAL',
+                        'source': rates_data['source'],
+                        'rate_source_type': rates_data['source_type'],
+                        'is_official': True,
+                        'publication_date': rates_data['publication_date'],
+                        'created_by': created_by
+                    }
+        
+        if not rows:
+            return 0
+        
         try:
-            with engine.connect() as conn:
-                saved_count = 0
-                
-                for currency, rate in rates_data['rates'].items():
-                    if rate and rate > 0:  # Skip invalid rates
-                        try:
-                            # Insert or update exchange rate
-                            query = text("""
-                                INSERT INTO exchange_rates 
-                                (from_currency, to_currency, exchange_rate, rate_date, rate_type, 
-                                 source, rate_source_type, is_official, publication_date,
-                                 created_by, created_at)
-                                VALUES (:from_curr, :to_curr, :rate, :rate_date, 'OFFICIAL',
-                                        :source, :source_type, true, :pub_date, :user, CURRENT_TIMESTAMP)
-                                ON CONFLICT (from_currency, to_currency, rate_date, rate_type)
-                                DO UPDATE SET 
-                                    exchange_rate = EXCLUDED.exchange_rate,
-                                    source = EXCLUDED.source,
-                                    rate_source_type = EXCLUDED.rate_source_type,
-                                    publication_date = EXCLUDED.publication_date,
-                                    is_official = true,
-                                    updated_by = EXCLUDED.created_by,
-                                    updated_at = CURRENT_TIMESTAMP
-                            """)
-                            
-                            conn.execute(query, {
-                                'from_curr': currency,
-                                'to_curr': rates_data['base_currency'],
-                                'rate': float(rate),
-                                'rate_date': rates_data['rate_date'],
-                                'source': rates_data['source'],
-                                'source_type': rates_data['source_type'],
-                                'pub_date': rates_data['publication_date'],
-                                'user': created_by
-                            })
-                            
-                            saved_count += 1
-                            
-                        except Exception as e:
-                            logger.warning(f"Error saving rate for {currency}: {e}")
-                            continue
-                
-                conn.commit()
-                logger.info(f"Successfully saved {saved_count}/{len(rates_data['rates'])} official rates from {rates_data['source']}")
-                return saved_count > 0
-                
+            with engine.begin() as conn:
+                execute_multi_row_insert(
+                    conn, "exchange_rates",
+                    ['from_currency', 'to_currency', 'exchange_rate', 'rate_date', 'rate_type',
+                     'source', 'rate_source_type', 'is_official', 'publication_date', 'created_by'],
+                    list(rows.values()),
+                    on_conflict="""
+                        ON CONFLICT (from_currency, to_currency, rate_date, rate_type)
+                        DO UPDATE SET 
+                            exchange_rate = EXCLUDED.exchange_rate,
+                            source = EXCLUDED.source,
+                            rate_source_type = EXCLUDED.rate_source_type,
+                            publication_date = EXCLUDED.publication_date,
+                            is_official = true,
+                            updated_by = EXCLUDED.created_by,
+                            updated_at = CURRENT_TIMESTAMP
+                    """
+                )
+            
+            # Official rates answer spot lookups; drop the cached histories and cubes
+            invalidate_exchange_rates()
+            
+            logger.info(f"Successfully saved {len(rows)} official rates from "
+                        f"{len([r for r in rates_list if r.get('status') == 'SUCCESS'])} sources")
+            return len(rows)
+            
         except Exception as e:
             logger.error(f"Error saving official rates: {e}")
-            return False
+            return 0
     
     def get_available_official_sources(self) -> List[Dict]:
         """Get list of available official rate sources."""
@@ -479,26 +621,29 @@ class CentralBankRatesService:
         return validation_results
 
 # Utility functions
-def fetch_all_official_rates() -> Dict[str, Dict]:
-    """Fetch rates from all available official sources."""
-    service = CentralBankRatesService()
+def fetch_all_official_rates(persist: bool = False, created_by: str = 'CENTRAL_BANK_SERVICE',
+                             provider: Optional[RateSourceProvider] = None) -> Dict[str, Dict]:
+    """
+    Fetch rates from all available official sources concurrently.
     
-    results = {}
+    Args:
+        persist: Save the fetched rates with one batched upsert
+        created_by: User or service recorded on saved rates
+        provider: Transport override (e.g. LocalFileRateProvider for tests)
     
-    # Fetch Fed H.10 rates
-    fed_rates = service.fetch_fed_h10_rates()
-    if fed_rates.get('status') == 'SUCCESS':
-        results['federal_reserve'] = fed_rates
+    Returns:
+        Rates data of the sources that were fetched successfully
+    """
+    service = CentralBankRatesService(provider=provider)
     
-    # Fetch ECB rates  
-    ecb_rates = service.fetch_ecb_reference_rates()
-    if ecb_rates.get('status') == 'SUCCESS':
-        results['ecb'] = ecb_rates
+    results = {
+        source_key: rates_data
+        for source_key, rates_data in service.fetch_all_rates().items()
+        if rates_data.get('status') == 'SUCCESS'
+    }
     
-    # Fetch BOE rates
-    boe_rates = service.fetch_boe_rates()
-    if boe_rates.get('status') == 'SUCCESS':
-        results['boe'] = boe_rates
+    if persist and results:
+        service.save_all_official_rates(list(results.values()), created_by)
     
     return results
 
@@ -5,8 +5,10 @@ Provides functions for managing Chart of Accounts, Account Groups, and Field Sta
 
 from typing import Dict, List, Optional, Tuple, Any
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from db_config import engine
 from utils.logger import get_logger
+from utils.gl_account_index import gl_account_index, invalidate_gl_account_index
 from datetime import datetime
 
 logger = get_logger("coa_manager")
@@ -18,26 +20,21 @@ class COAManager:
     def validate_account_number(account_id: str, account_group_code: str) -> Tuple[bool, str]:
         """Validate if account number is within the allowed range for the account group"""
         try:
-            with engine.connect() as conn:
-                result = conn.execute(text("""
-                    SELECT number_range_from, number_range_to, group_name
-                    FROM account_groups 
-                    WHERE group_code = :group_code AND is_active = TRUE
-                """), {"group_code": account_group_code}).fetchone()
-                
-                if not result:
-                    return False, f"Account group {account_group_code} not found or inactive"
-                
-                range_from, range_to, group_name = result
-                account_num = int(account_id)
-                range_from_num = int(range_from)
-                range_to_num = int(range_to)
+            group = gl_account_index.get_group(account_group_code)
+            if not group or not group.is_active:
+                return False, f"Account group {account_group_code} not found or inactive"
+            
+            range_from, range_to, group_name = group.number_range_from, group.number_range_to, group.group_name
+            account_num = int(account_id)
+            range_from_num = int(range_from)
+            range_to_num = int(range_to)
+            
+            if range_from_num <= account_num <= range_to_num:
+                return True, "Account number is within valid range"
+            else:
+                return False, f"Account {account_id} is outside range {range_from}-{range_to} for group {group_name}"
                 
-                if range_from_num <= account_num <= range_to_num:
-                    return True, "Account number is within valid range"
-                else:
-                    return False, f"Account {account_id} is outside range {range_from}-{range_to} for group {group_name}"
-                    
+
         except ValueError:
             return False, "Account ID must be numeric"
         except Exception as e:
@@ -48,42 +45,25 @@ class COAManager:
     def get_next_available_account(account_group_code: str) -> Optional[str]:
         """Get the next available account number in the specified group"""
         try:
-            with engine.connect() as conn:
-                # Get group range
-                group_info = conn.execute(text("""
-                    SELECT number_range_from, number_range_to
-                    FROM account_groups 
-                    WHERE group_code = :group_code AND is_active = TRUE
-                """), {"group_code": account_group_code}).fetchone()
-                
-                if not group_info:
-                    return None
-                
-                range_from, range_to = group_info
-                
-                # Find existing accounts in this range
-                existing_accounts = conn.execute(text("""
-                    SELECT glaccountid::bigint as account_num
-                    FROM glaccount 
-                    WHERE account_group_code = :group_code
-                    AND glaccountid::bigint BETWEEN :range_from AND :range_to
-                    AND (marked_for_deletion = FALSE OR marked_for_deletion IS NULL)
-                    ORDER BY glaccountid::bigint
-                """), {
-                    "group_code": account_group_code,
-                    "range_from": int(range_from),
-                    "range_to": int(range_to)
-                }).fetchall()
-                
-                used_numbers = {row[0] for row in existing_accounts}
-                
-                # Find first available number
-                for num in range(int(range_from), int(range_to) + 1):
-                    if num not in used_numbers:
-                        return str(num).zfill(6)  # Return as 6-digit string
-                
-                return None  # No available numbers
-                
+            group = gl_account_index.get_group(account_group_code)
+            if not group or not group.is_active:
+                return None
+            
+            range_from, range_to = int(group.number_range_from), int(group.number_range_to)
+            
+            # Existing accounts in this range, from the account index
+            used_numbers = {
+                int(info.gl_account) for info in gl_account_index.accounts_in_group(account_group_code)
+                if info.gl_account.isdigit() and range_from <= int(info.gl_account) <= range_to
+            }
+            
+            # Find first available number
+            for num in range(range_from, range_to + 1):
+                if num not in used_numbers:
+                    return str(num).zfill(6)  # Return as 6-digit string
+            
+            return None  # No available numbers
+            
         except Exception as e:
             logger.error(f"Error finding next available account: {e}")
             return None
@@ -218,12 +198,12 @@ class COAManager:
             
             with engine.connect() as conn:
                 with conn.begin():
-                    # Check if account already exists
-                    existing = conn.execute(text("""
-                        SELECT COUNT(*) FROM glaccount WHERE glaccountid = :id
-                    """), {"id": account_data['glaccountid']}).fetchone()[0]
                     
-                    if existing > 0:
+                    # Check if account already exists (against the table, not the cached index);
+                    # a concurrent insert is caught by the primary key below
+                    if conn.execute(text(
+                        "SELECT 1 FROM glaccount WHERE glaccountid = :glaccountid"
+                    ), {"glaccountid": account_data['glaccountid']}).fetchone():
                         return False, f"Account {account_data['glaccountid']} already exists"
                     
                     # Get account group information
@@ -272,9 +252,15 @@ class COAManager:
                         "planning_level": account_data.get('planning_level', 'ACCOUNT'),
                         "created_by": created_by
                     })
+                
+                invalidate_gl_account_index()
+                return True, f"Account {account_data['glaccountid']} created successfully"
                     
-                    return True, f"Account {account_data['glaccountid']} created successfully"
-                    
+        except IntegrityError as e:
+            if "glaccount_pkey" in str(e) or "glaccountid" in str(e):
+                return False, f"Account {account_data['glaccountid']} already exists"
+            logger.error(f"Error creating GL account: {e}")
+            return False, f"Creation failed: {str(e)}"
         except Exception as e:
             logger.error(f"Error creating GL account: {e}")
             return False, f"Creation failed: {str(e)}"
@@ -11,12 +11,19 @@ Date: August 6, 2025
 import logging
 from datetime import datetime, date
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, Iterable, List, Tuple
+import numpy as np
+import pandas as pd
 from sqlalchemy import create_engine, text
 from db_config import engine
+from utils.exchange_rate_store import exchange_rate_store, invalidate_exchange_rates
+from utils.rate_cube import rate_cube_cache, round_half_up, DEFAULT_PIVOT_CURRENCY, SPOT_RATE_TYPES
 
 logger = logging.getLogger(__name__)
 
+# Precision of derived (inverse or triangulated) rates
+CROSS_RATE_QUANTIZER = Decimal('0.0000000001')
+
 class CurrencyTranslationService:
     """Service for currency translation operations in parallel ledger system."""
     
@@ -44,54 +51,88 @@ class CurrencyTranslationService:
             rate_date = date.today()
             
         try:
-            with self.engine.connect() as conn:
-                # Try exact date first
-                query = text("""
-                    SELECT rate FROM exchangerate 
-                    WHERE fromcurrency = :from_curr 
-                    AND tocurrency = :to_curr 
-                    AND ratedate = :rate_date
-                    AND is_active = true
-                    ORDER BY created_at DESC 
-                    LIMIT 1
-                """)
-                
-                result = conn.execute(query, {
-                    'from_curr': from_currency,
-                    'to_curr': to_currency,
-                    'rate_date': rate_date
-                }).fetchone()
-                
-                if result:
-                    return Decimal(str(result[0]))
-                
-                # If exact date not found, get most recent rate before that date
-                query_recent = text("""
-                    SELECT rate FROM exchangerate 
-                    WHERE fromcurrency = :from_curr 
-                    AND tocurrency = :to_curr 
-                    AND ratedate <= :rate_date
-                    AND is_active = true
-                    ORDER BY ratedate DESC, created_at DESC 
-                    LIMIT 1
-                """)
-                
-                result_recent = conn.execute(query_recent, {
-                    'from_curr': from_currency,
-                    'to_curr': to_currency,
-                    'rate_date': rate_date
-                }).fetchone()
-                
-                if result_recent:
-                    return Decimal(str(result_recent[0]))
-                    
+            # As-of lookup against the cached rate history (exact date, else most recent before)
+            rate = exchange_rate_store.get_rate(from_currency, to_currency, rate_date)
+            if rate is None:
                 logger.warning(f"No exchange rate found for {from_currency} to {to_currency} on or before {rate_date}")
-                return None
+            return rate
                 
         except Exception as e:
             logger.error(f"Error getting exchange rate: {e}")
             return None
     
+    def get_exchange_rates(self, rate_keys: Iterable[Tuple[str, str, date]],
+                           allow_cross_rates: bool = False) -> Dict[Tuple[str, str, date], Optional[Decimal]]:
+        """
+        Resolve many (from_currency, to_currency, rate_date) lookups at once.
+        
+        Uses the same rule as get_exchange_rate: the rate on the date if present,
+        otherwise the most recent active rate before it. Pairs not yet cached are
+        loaded together with one query.
+        
+        Args:
+            rate_keys: (from_currency, to_currency, rate_date) triples; duplicates are fine
+            allow_cross_rates: Derive pairs that are not stored from the inverse or the
+                pivot currency, as translate_amount does
+        
+        Returns:
+            Dictionary mapping each distinct triple to its rate, or None if not found
+        """
+        rate_keys = set(rate_keys)
+        today = date.today()
+        
+        try:
+            resolved = exchange_rate_store.get_rates(
+                (from_currency, to_currency, rate_date or today)
+                for from_currency, to_currency, rate_date in rate_keys
+            )
+        except Exception as e:
+            logger.error(f"Error getting exchange rates: {e}")
+            return {key: None for key in rate_keys}
+        
+        rates = {}
+        for from_currency, to_currency, rate_date in rate_keys:
+            rate = resolved[(from_currency, to_currency, rate_date or today)]
+            if rate is None and allow_cross_rates:
+                rate = self.get_cross_rate(from_currency, to_currency, rate_date)
+            if rate is None:
+                logger.warning(f"No exchange rate found for {from_currency} to {to_currency} on or before {rate_date}")
+            rates[(from_currency, to_currency, rate_date)] = rate
+        return rates
+    
+    def get_cross_rate(self, from_currency: str, to_currency: str, rate_date: Optional[date] = None,
+                       pivot_currency: str = DEFAULT_PIVOT_CURRENCY) -> Optional[Decimal]:
+        """
+        Get a rate for a pair that may not be stored directly.
+        
+        Resolved from the cached cube of the date's month: direct rate, else inverse
+        of the opposite pair, else triangulated through the pivot currency.
+        
+        Args:
+            from_currency: Source currency code
+            to_currency: Target currency code
+            rate_date: Date for rate lookup (defaults to current date)
+            pivot_currency: Triangulation currency
+            
+        Returns:
+            Exchange rate as Decimal (10 decimal places), or None if it cannot be derived
+        """
+        if from_currency == to_currency:
+            return Decimal('1.000000')
+        
+        rate_date = rate_date or date.today()
+        try:
+            cube = rate_cube_cache.get(rate_date, pivot_currency)
+            rate = cube.rate(from_currency, to_currency, rate_date)
+            if rate is None:
+                logger.warning(f"No direct or cross rate for {from_currency} to {to_currency} via {pivot_currency}")
+                return None
+            return Decimal(repr(rate)).quantize(CROSS_RATE_QUANTIZER, rounding=ROUND_HALF_UP)
+            
+        except Exception as e:
+            logger.error(f"Error getting cross rate: {e}")
+            return None
+    
     def translate_amount(self, amount: Decimal, from_currency: str, to_currency: str,
                         rate_date: Optional[date] = None, rounding_places: int = 2) -> Optional[Decimal]:
         """
@@ -111,6 +152,9 @@ class CurrencyTranslationService:
             return amount
             
         exchange_rate = self.get_exchange_rate(from_currency, to_currency, rate_date)
+        if exchange_rate is None:
+            # Pair not stored: derive it from the inverse or through the pivot currency
+            exchange_rate = self.get_cross_rate(from_currency, to_currency, rate_date)
         if exchange_rate is None:
             return None
             
@@ -120,7 +164,124 @@ class CurrencyTranslationService:
         quantizer = Decimal('0.' + '0' * rounding_places)
         return converted_amount.quantize(quantizer, rounding=ROUND_HALF_UP)
     
-    def get_currency_rates_summary(self, base_currency: str = 'USD', 
+    def translate_amounts(self, amounts, from_currencies, to_currencies, rate_dates=None,
+                          rounding_places: int = 2, allow_cross_rates: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Vectorized translate_amount for arrays of amounts.
+
+        Scalars broadcast against arrays, so a whole column can be translated to one
+        currency. Rates are resolved once per distinct (from, to, date) triple; pairs
+        that are not stored fall back to cross rates like translate_amount. Results are
+        rounded ROUND_HALF_UP; elements whose float product lies on a rounding boundary
+        are recomputed with Decimal so every result matches translate_amount exactly.
+
+        Args:
+            amounts: Amounts (array-like or pandas Series)
+            from_currencies: Source currency codes (array-like or scalar)
+            to_currencies: Target currency codes (array-like or scalar)
+            rate_dates: Rate dates (array-like, scalar or None for today)
+            rounding_places: Decimal places for rounding (default 2)
+            allow_cross_rates: Derive rates for pairs that are not stored
+
+        Returns:
+            Dictionary of arrays aligned with the input: translated_amount (float, NaN
+            where no rate), exchange_rate (float, NaN where no rate) and rate_missing (bool)
+        """
+        today = np.datetime64(date.today(), 'D')
+        amounts = np.asarray(amounts, dtype=np.float64)
+        from_currencies = np.asarray(from_currencies, dtype=object)
+        to_currencies = np.asarray(to_currencies, dtype=object)
+        if rate_dates is None:
+            rate_dates = today
+        rate_dates = pd.to_datetime(pd.Series(np.ravel(rate_dates))).values.astype('datetime64[D]').reshape(np.shape(rate_dates))
+        rate_dates = np.where(np.isnat(rate_dates), today, rate_dates)
+
+        amounts, from_currencies, to_currencies, rate_dates = np.broadcast_arrays(
+            amounts, from_currencies, to_currencies, rate_dates
+        )
+        shape = amounts.shape
+        amounts = amounts.ravel()
+        # Missing currency codes become '' so they resolve to "no rate" instead of NA keys
+        from_currencies = np.where(pd.isna(from_currencies), '', from_currencies)
+        to_currencies = np.where(pd.isna(to_currencies), '', to_currencies)
+
+        # One rate lookup per distinct (from, to, date)
+        codes, uniques = pd.MultiIndex.from_arrays([
+            from_currencies.ravel(), to_currencies.ravel(), rate_dates.ravel()
+        ]).factorize()
+        unique_keys = [(f, t, pd.Timestamp(d).date()) for f, t, d in uniques]
+
+        unique_rates = self.get_exchange_rates(
+            (key for key in unique_keys if key[0] and key[1]), allow_cross_rates=allow_cross_rates
+        )
+
+        decimal_rates = [unique_rates.get(key) for key in unique_keys]
+        rate_by_code = np.array([float(r) if r is not None else np.nan for r in decimal_rates])
+        same_currency = np.array([key[0] == key[1] and key[0] != '' for key in unique_keys], dtype=bool)
+
+        rates = rate_by_code[codes]
+        rate_missing = np.isnan(rates)
+        translated = round_half_up(amounts * rates, rounding_places)
+
+        # Same currency returns the amount unchanged, as translate_amount does
+        unchanged = same_currency[codes]
+        translated[unchanged] = amounts[unchanged]
+
+        # Recompute products that sit within float error of a rounding boundary
+        scaled = np.abs(amounts * rates) * 10.0 ** rounding_places
+        tolerance = np.maximum(1e-6, scaled * 1e-12)
+        boundary = ~rate_missing & ~unchanged & (np.abs(scaled - np.floor(scaled) - 0.5) < tolerance)
+        if boundary.any():
+            quantizer = Decimal('0.' + '0' * rounding_places) if rounding_places else Decimal('1')
+            for i in np.flatnonzero(boundary):
+                exact = Decimal(repr(float(amounts[i]))) * decimal_rates[codes[i]]
+                translated[i] = float(exact.quantize(quantizer, rounding=ROUND_HALF_UP))
+
+        return {
+            "translated_amount": translated.reshape(shape),
+            "exchange_rate": rates.reshape(shape),
+            "rate_missing": rate_missing.reshape(shape)
+        }
+
+    def translate_dataframe(self, df: pd.DataFrame, amount_column: str, from_column: str,
+                            to_column: str = None, date_column: str = None, to_currency: str = None,
+                            rounding_places: int = 2, allow_cross_rates: bool = True,
+                            prefix: str = "translated_") -> pd.DataFrame:
+        """
+        Translate a DataFrame column with translate_amounts.
+
+        Args:
+            df: Source frame
+            amount_column: Column with amounts
+            from_column: Column with source currency codes
+            to_column: Column with target currency codes (or use to_currency)
+            date_column: Column with rate dates (None for today)
+            to_currency: Single target currency for every row
+            rounding_places: Decimal places for rounding (default 2)
+            allow_cross_rates: Derive rates for pairs that are not stored
+            prefix: Prefix of the added columns
+
+        Returns:
+            Copy of df with {prefix}amount, {prefix}rate and {prefix}rate_missing columns
+        """
+        if to_column is None and to_currency is None:
+            raise ValueError("Either to_column or to_currency is required")
+
+        result = self.translate_amounts(
+            df[amount_column].to_numpy(dtype=np.float64),
+            df[from_column].to_numpy(dtype=object),
+            df[to_column].to_numpy(dtype=object) if to_column else to_currency,
+            df[date_column].to_numpy() if date_column else None,
+            rounding_places, allow_cross_rates
+        )
+
+        translated = df.copy()
+        translated[f"{prefix}amount"] = result["translated_amount"]
+        translated[f"{prefix}rate"] = result["exchange_rate"]
+        translated[f"{prefix}rate_missing"] = result["rate_missing"]
+        return translated
+
+    def get_currency_rates_summary(self, base_currency: str = 'USD',
                                  rate_date: Optional[date] = None) -> List[Dict]:
         """
         Get summary of all exchange rates for a base currency.
@@ -138,30 +299,24 @@ class CurrencyTranslationService:
         try:
             with self.engine.connect() as conn:
                 query = text("""
-                    SELECT 
-                        er.tocurrency,
-                        er.rate,
-                        er.ratedate,
-                        er.rate_source,
-                        er.created_at
-                    FROM exchangerate er
-                    INNER JOIN (
-                        SELECT tocurrency, MAX(ratedate) as max_date
-                        FROM exchangerate 
-                        WHERE fromcurrency = :base_curr 
-                        AND ratedate <= :rate_date
-                        AND is_active = true
-                        GROUP BY tocurrency
-                    ) latest ON er.tocurrency = latest.tocurrency 
-                    AND er.ratedate = latest.max_date
-                    WHERE er.fromcurrency = :base_curr
-                    AND er.is_active = true
-                    ORDER BY er.tocurrency
+                    SELECT DISTINCT ON (er.to_currency)
+                        er.to_currency,
+                        er.exchange_rate,
+                        er.rate_date,
+                        er.source,
+                        COALESCE(er.updated_at, er.created_at)
+                    FROM exchange_rates er
+                    WHERE er.from_currency = :base_curr
+                    AND er.rate_date <= :rate_date
+                    AND er.rate_type = ANY(:rate_types)
+                    ORDER BY er.to_currency, er.rate_date DESC,
+                             COALESCE(er.updated_at, er.created_at) DESC
                 """)
                 
                 results = conn.execute(query, {
                     'base_curr': base_currency,
-                    'rate_date': rate_date
+                    'rate_date': rate_date,
+                    'rate_types': SPOT_RATE_TYPES
                 }).fetchall()
                 
                 return [
@@ -181,7 +336,8 @@ class CurrencyTranslationService:
     
     def update_exchange_rate(self, from_currency: str, to_currency: str, 
                            rate: Decimal, rate_date: Optional[date] = None,
-                           rate_source: str = 'API', created_by: str = 'SYSTEM') -> bool:
+                           rate_source: str = 'API', created_by: str = 'SYSTEM',
+                           rate_type: str = 'SPOT') -> bool:
         """
         Update or insert exchange rate for currency pair.
         
@@ -192,6 +348,7 @@ class CurrencyTranslationService:
             rate_date: Rate date (defaults to current date)
             rate_source: Source of the rate (API, MANUAL, etc.)
             created_by: User or system updating the rate
+            rate_type: exchange_rates rate type (SPOT, CLOSING, AVERAGE, ...)
             
         Returns:
             True if successful, False otherwise
@@ -200,63 +357,31 @@ class CurrencyTranslationService:
             rate_date = date.today()
             
         try:
-            with self.engine.connect() as conn:
-                # Check if rate exists for this date
-                check_query = text("""
-                    SELECT COUNT(*) FROM exchangerate 
-                    WHERE fromcurrency = :from_curr 
-                    AND tocurrency = :to_curr 
-                    AND ratedate = :rate_date
-                """)
-                
-                exists = conn.execute(check_query, {
+            with self.engine.begin() as conn:
+                conn.execute(text("""
+                    INSERT INTO exchange_rates
+                    (from_currency, to_currency, rate_date, rate_type,
+                     exchange_rate, source, created_by)
+                    VALUES (:from_curr, :to_curr, :rate_date, :rate_type,
+                            :rate, :rate_source, :created_by)
+                    ON CONFLICT (from_currency, to_currency, rate_type, rate_date)
+                    DO UPDATE SET
+                        exchange_rate = EXCLUDED.exchange_rate,
+                        source = EXCLUDED.source,
+                        updated_by = EXCLUDED.created_by,
+                        updated_at = CURRENT_TIMESTAMP
+                """), {
                     'from_curr': from_currency,
                     'to_curr': to_currency,
-                    'rate_date': rate_date
-                }).scalar()
-                
-                if exists > 0:
-                    # Update existing rate
-                    update_query = text("""
-                        UPDATE exchangerate 
-                        SET rate = :rate,
-                            rate_source = :rate_source,
-                            created_by = :created_by,
-                            created_at = CURRENT_TIMESTAMP
-                        WHERE fromcurrency = :from_curr 
-                        AND tocurrency = :to_curr 
-                        AND ratedate = :rate_date
-                    """)
-                    
-                    conn.execute(update_query, {
-                        'rate': rate,
-                        'rate_source': rate_source,
-                        'created_by': created_by,
-                        'from_curr': from_currency,
-                        'to_curr': to_currency,
-                        'rate_date': rate_date
-                    })
-                else:
-                    # Insert new rate
-                    insert_query = text("""
-                        INSERT INTO exchangerate 
-                        (fromcurrency, tocurrency, ratedate, rate, rate_type, 
-                         rate_source, created_by, is_active)
-                        VALUES (:from_curr, :to_curr, :rate_date, :rate, 'DAILY',
-                                :rate_source, :created_by, true)
-                    """)
-                    
-                    conn.execute(insert_query, {
-                        'from_curr': from_currency,
-                        'to_curr': to_currency,
-                        'rate_date': rate_date,
-                        'rate': rate,
-                        'rate_source': rate_source,
-                        'created_by': created_by
-                    })
-                
-                conn.commit()
-                return True
+                    'rate_date': rate_date,
+                    'rate_type': rate_type,
+                    'rate': rate,
+                    'rate_source': rate_source,
+                    'created_by': created_by
+                })
+            
+            invalidate_exchange_rates(from_currency, to_currency)
+            return True
                 
         except Exception as e:
             logger.error(f"Error updating exchange rate: {e}")
@@ -286,15 +411,15 @@ class CurrencyTranslationService:
         try:
             with self.engine.connect() as conn:
                 query = text("""
-                    SELECT DISTINCT fromcurrency as currency FROM exchangerate 
-                    WHERE is_active = true
+                    SELECT DISTINCT from_currency as currency FROM exchange_rates 
+                    WHERE rate_type = ANY(:rate_types)
                     UNION 
-                    SELECT DISTINCT tocurrency as currency FROM exchangerate 
-                    WHERE is_active = true
+                    SELECT DISTINCT to_currency as currency FROM exchange_rates 
+                    WHERE rate_type = ANY(:rate_types)
                     ORDER BY currency
                 """)
                 
-                results = conn.execute(query).fetchall()
+                results = conn.execute(query, {'rate_types': SPOT_RATE_TYPES}).fetchall()
                 return [row[0] for row in results]
                 
         except Exception as e:
@@ -318,21 +443,22 @@ class CurrencyTranslationService:
             with self.engine.connect() as conn:
                 query = text("""
                     SELECT 
-                        ratedate,
-                        rate,
-                        rate_source,
-                        created_at
-                    FROM exchangerate 
-                    WHERE fromcurrency = :from_curr 
-                    AND tocurrency = :to_curr
-                    AND ratedate >= CURRENT_DATE - INTERVAL '%s days'
-                    AND is_active = true
-                    ORDER BY ratedate DESC
+                        rate_date,
+                        exchange_rate,
+                        source,
+                        COALESCE(updated_at, created_at)
+                    FROM exchange_rates 
+                    WHERE from_currency = :from_curr 
+                    AND to_currency = :to_curr
+                    AND rate_date >= CURRENT_DATE - INTERVAL '%s days'
+                    AND rate_type = ANY(:rate_types)
+                    ORDER BY rate_date DESC
                 """ % days)
                 
                 results = conn.execute(query, {
                     'from_curr': from_currency,
-                    'to_curr': to_currency
+                    'to_curr': to_currency,
+                    'rate_types': SPOT_RATE_TYPES
                 }).fetchall()
                 
                 return [
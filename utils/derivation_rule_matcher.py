@@ -0,0 +1,298 @@
+"""
+Compiled Ledger Derivation Rule Matcher
+In-memory matcher for ledger_derivation_rules used by parallel ledger posting
+
+Active rules are loaded once and compiled per (source_ledger, target_ledger) pair
+into dictionaries keyed by GL account and by account group plus a fallback rule,
+so deriving a line is a few dictionary lookups instead of a query.
+
+Rule selection matches the previous per-line query: a rule with a GL account wins
+over an account group rule, which wins over a catch-all rule. Within a tier the
+lowest rule_id wins.
+
+Writers to ledger_derivation_rules call ``invalidate_derivation_rules()``. Changes
+made by other processes are detected by a cheap fingerprint query (row count,
+active row count and latest rule_id/updated_at) run at most every
+``check_interval_seconds``. A trigger moves updated_at forward on every UPDATE,
+so changes that do not set it themselves are seen as well.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import text
+from db_config import engine
+from utils.logger import get_logger
+
+logger = get_logger("derivation_rule_matcher")
+
+# Priority tiers, same order as the original ORDER BY
+TIER_ACCOUNT = 1
+TIER_ACCOUNT_GROUP = 2
+TIER_DEFAULT = 3
+
+
+@dataclass(frozen=True)
+class DerivationRule:
+    """One active ledger derivation rule"""
+    rule_id: int
+    gl_account: Optional[str]
+    account_group_filter: Optional[str]
+    derivation_rule: str
+    target_account: Optional[str]
+    conversion_factor: Decimal
+    adjustment_reason: Optional[str]
+
+    @property
+    def tier(self) -> int:
+        if self.gl_account is not None:
+            return TIER_ACCOUNT
+        if self.account_group_filter is not None:
+            return TIER_ACCOUNT_GROUP
+        return TIER_DEFAULT
+
+    @property
+    def sort_key(self) -> Tuple[int, int]:
+        return self.tier, self.rule_id
+
+
+# Applied when no rule matches
+DEFAULT_COPY_RULE = DerivationRule(
+    rule_id=0, gl_account=None, account_group_filter=None, derivation_rule="COPY",
+    target_account=None, conversion_factor=Decimal('1.0'), adjustment_reason="Default copy rule"
+)
+
+
+def apply_rule(rule: DerivationRule, source_line: Dict) -> Optional[Dict]:
+    """
+    Derive a target ledger line from a source line
+
+    Returns:
+        Derived line, or None if the rule excludes the line
+    """
+    if rule.derivation_rule == "EXCLUDE":
+        return None
+
+    derived_line = source_line.copy()
+    derived_line["gl_account"] = rule.target_account or source_line["gl_account"]
+    derived_line["derivation_rule"] = rule.derivation_rule
+    derived_line["adjustment_reason"] = rule.adjustment_reason
+
+    # Apply conversion factor for adjustments
+    if rule.derivation_rule == "ADJUST" and rule.conversion_factor != Decimal('1.0'):
+        derived_line["debit_amount"] = derived_line["debit_amount"] * rule.conversion_factor
+        derived_line["credit_amount"] = derived_line["credit_amount"] * rule.conversion_factor
+
+    return derived_line
+
+
+class CompiledRuleSet:
+    """Rules of one (source_ledger, target_ledger) pair compiled into lookup tables"""
+
+    def __init__(self, rules: Iterable[DerivationRule]):
+        self.by_account: Dict[str, DerivationRule] = {}
+        self.by_group: Dict[str, DerivationRule] = {}
+        self.fallback: Optional[DerivationRule] = None
+        self._memo: Dict[Tuple[Optional[str], Optional[str]], DerivationRule] = {}
+
+        for rule in rules:
+            if rule.gl_account is not None:
+                self._keep_best(self.by_account, rule.gl_account, rule)
+            if rule.account_group_filter is not None:
+                # A rule with both filters also matches on the group alone but
+                # keeps its account-tier priority, as in the original query
+                self._keep_best(self.by_group, rule.account_group_filter, rule)
+            if rule.tier == TIER_DEFAULT and (self.fallback is None or rule.sort_key < self.fallback.sort_key):
+                self.fallback = rule
+
+    @staticmethod
+    def _keep_best(table: Dict[str, DerivationRule], key: str, rule: DerivationRule):
+        current = table.get(key)
+        if current is None or rule.sort_key < current.sort_key:
+            table[key] = rule
+
+    def match(self, gl_account: Optional[str], account_group: Optional[str]) -> DerivationRule:
+        """Highest priority rule for an account, or the default copy rule"""
+        key = (gl_account, account_group)
+        rule = self._memo.get(key)
+        if rule is None:
+            candidates = [
+                candidate for candidate in (
+                    self.by_account.get(gl_account) if gl_account is not None else None,
+                    self.by_group.get(account_group) if account_group is not None else None,
+                    self.fallback
+                )
+                if candidate is not None
+            ]
+            rule = min(candidates, key=lambda r: r.sort_key) if candidates else DEFAULT_COPY_RULE
+            self._memo[key] = rule
+        return rule
+
+    def __len__(self) -> int:
+        return len({rule.rule_id for rule in self.by_account.values()} |
+                   {rule.rule_id for rule in self.by_group.values()} |
+                   ({self.fallback.rule_id} if self.fallback else set()))
+
+
+class DerivationRuleMatcher:
+    """Versioned, process-wide cache of compiled derivation rule sets"""
+
+    def __init__(self, check_interval_seconds: int = 30):
+        self.check_interval_seconds = check_interval_seconds
+        self._lock = threading.RLock()
+        self._rule_sets: Dict[Tuple[str, str], CompiledRuleSet] = {}
+        self._version = 0
+        self._loaded_version = -1
+        self._fingerprint = None
+        self._last_check = 0.0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump_version(self) -> int:
+        """Mark the compiled rules stale; the next lookup reloads them"""
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    @staticmethod
+    def _read_fingerprint(conn) -> tuple:
+        row = conn.execute(text("""
+            SELECT COUNT(*), COUNT(*) FILTER (WHERE is_active), MAX(rule_id), MAX(updated_at)
+            FROM ledger_derivation_rules
+        """)).fetchone()
+        return tuple(row)
+
+    def refresh(self):
+        """Load and compile all active rules"""
+        with self._lock:
+            version = self._version
+            with engine.connect() as conn:
+                fingerprint = self._read_fingerprint(conn)
+                result = conn.execute(text("""
+                    SELECT rule_id, source_ledger, target_ledger, gl_account, account_group_filter,
+                           derivation_rule, target_account, conversion_factor, adjustment_reason
+                    FROM ledger_derivation_rules
+                    WHERE is_active = true
+                    ORDER BY rule_id
+                """))
+
+                grouped: Dict[Tuple[str, str], List[DerivationRule]] = {}
+                for row in result:
+                    grouped.setdefault((row[1], row[2]), []).append(DerivationRule(
+                        rule_id=row[0],
+                        gl_account=row[3],
+                        account_group_filter=row[4],
+                        derivation_rule=row[5],
+                        target_account=row[6],
+                        conversion_factor=Decimal(str(row[7])) if row[7] else Decimal('1.0'),
+                        adjustment_reason=row[8]
+                    ))
+
+            self._rule_sets = {pair: CompiledRuleSet(rules) for pair, rules in grouped.items()}
+            self._fingerprint = fingerprint
+            self._loaded_version = version
+            self._last_check = time.monotonic()
+
+            logger.info(f"Derivation rules compiled: {sum(len(r) for r in grouped.values())} rules "
+                        f"across {len(grouped)} ledger pairs (version {version})")
+
+    def _ensure_loaded(self):
+        if self._loaded_version != self._version:
+            with self._lock:
+                if self._loaded_version != self._version:
+                    self.refresh()
+            return
+
+        if time.monotonic() - self._last_check > self.check_interval_seconds:
+            with self._lock:
+                if time.monotonic() - self._last_check <= self.check_interval_seconds:
+                    return
+                self._last_check = time.monotonic()
+                with engine.connect() as conn:
+                    fingerprint = self._read_fingerprint(conn)
+                if fingerprint != self._fingerprint:
+                    logger.info("ledger_derivation_rules changed, recompiling")
+                    self.refresh()
+
+    def get_rule_set(self, source_ledger: str, target_ledger: str) -> CompiledRuleSet:
+        """Compiled rules for a ledger pair (empty when none are configured)"""
+        self._ensure_loaded()
+        rule_set = self._rule_sets.get((source_ledger, target_ledger))
+        if rule_set is None:
+            rule_set = CompiledRuleSet([])
+        return rule_set
+
+    def match(self, source_line: Dict, source_ledger: str, target_ledger: str) -> DerivationRule:
+        """Rule that applies to one source line"""
+        return self.get_rule_set(source_ledger, target_ledger).match(
+            source_line["gl_account"], source_line.get("account_group_id")
+        )
+
+    def derive_line(self, source_line: Dict, source_ledger: str, target_ledger: str) -> Optional[Dict]:
+        """Derive one line; None if excluded"""
+        return apply_rule(self.match(source_line, source_ledger, target_ledger), source_line)
+
+    def derive_lines(self, source_lines: List[Dict], source_ledger: str,
+                     target_ledger: str) -> List[Optional[Dict]]:
+        """
+        Derive every line of a document for one target ledger
+
+        Returns:
+            List aligned with ``source_lines``; excluded lines are None
+        """
+        rule_set = self.get_rule_set(source_ledger, target_ledger)
+        return [
+            apply_rule(rule_set.match(line["gl_account"], line.get("account_group_id")), line)
+            for line in source_lines
+        ]
+
+    def derive_documents(self, documents: Dict[str, List[Dict]], source_ledger: str,
+                         target_ledgers: Iterable[str]) -> Dict[str, Dict[str, List[Optional[Dict]]]]:
+        """
+        Derive the lines of many documents for many target ledgers in one call
+
+        Args:
+            documents: {document_number: source lines}
+            source_ledger: Source ledger ID
+            target_ledgers: Target ledger IDs
+
+        Returns:
+            {target_ledger: {document_number: derived lines aligned with the source lines}}
+        """
+        derived = {}
+        for target_ledger in target_ledgers:
+            rule_set = self.get_rule_set(source_ledger, target_ledger)
+            derived[target_ledger] = {
+                doc_number: [
+                    apply_rule(rule_set.match(line["gl_account"], line.get("account_group_id")), line)
+                    for line in lines
+                ]
+                for doc_number, lines in documents.items()
+            }
+        return derived
+
+    def get_statistics(self) -> Dict[str, int]:
+        return {
+            "version": self._version,
+            "loaded_version": self._loaded_version,
+            "ledger_pairs": len(self._rule_sets),
+            "rules": sum(len(rule_set) for rule_set in self._rule_sets.values())
+        }
+
+
+# Process-wide instance
+derivation_rule_matcher = DerivationRuleMatcher()
+
+
+def get_derivation_rule_matcher() -> DerivationRuleMatcher:
+    """Get the process-wide derivation rule matcher"""
+    return derivation_rule_matcher
+
+
+def invalidate_derivation_rules() -> int:
+    """Bump the matcher version after any change to ledger_derivation_rules"""
+    return derivation_rule_matcher.bump_version()
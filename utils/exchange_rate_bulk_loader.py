@@ -0,0 +1,476 @@
+"""
+Bulk Exchange Rate Loader
+Streams CSV/Excel rate files into a staging table with COPY and merges them into exchange_rates
+
+The file is read in chunks of ``chunk_rows`` rows. Each chunk is normalised with
+pandas and copied into a temporary staging table, so memory stays bounded by the
+chunk size regardless of the file length. Validation then runs as a handful of
+set-based statements over the staging table:
+
+- malformed or unknown currency codes (checked against the currencies master)
+- unsupported rate types, unparseable dates, missing or non-positive rates
+- duplicate keys within the file
+- inverse pairs (EUR/USD vs USD/EUR on the same date and rate type) whose
+  product deviates from 1 by more than ``inverse_tolerance``, both within the
+  file and against rates already stored
+
+Valid rows are merged into exchange_rates, the table every rate reader (the
+exchange rate store, rate cubes, revaluation and translation) uses, with a
+single INSERT ... SELECT ... ON CONFLICT keyed by pair, rate type and date.
+Only SPOT_RATE_TYPES answer spot lookups, so AVERAGE, HISTORICAL and BUDGET
+imports never replace the rates used for posting and revaluation. After a
+committed merge the in-process rate caches are invalidated. A dry run
+performs the same staging and validation and reports the inserts, updates and
+unchanged rows the merge would produce, then discards the staging table.
+"""
+
+import io
+from decimal import Decimal
+from typing import Any, BinaryIO, Dict, Iterator, List
+import pandas as pd
+from sqlalchemy import text
+from db_config import engine
+from utils.exchange_rate_store import invalidate_exchange_rates
+from utils.logger import get_logger
+
+logger = get_logger("exchange_rate_bulk_loader")
+
+REQUIRED_COLUMNS = ['from_currency', 'to_currency', 'rate_date', 'rate_type', 'exchange_rate']
+OPTIONAL_COLUMNS = ['source']
+VALID_RATE_TYPES = ['SPOT', 'CLOSING', 'AVERAGE', 'HISTORICAL', 'BUDGET']
+DEFAULT_SOURCE = 'Bulk Import'
+
+# Upper bound for DECIMAL(15,6) rates
+MAX_EXCHANGE_RATE = Decimal('999999999')
+
+# exchange_rates.source is VARCHAR(100)
+MAX_SOURCE_LENGTH = 100
+
+STAGING_TABLE = "exchange_rate_import_staging"
+ERROR_TABLE = "exchange_rate_import_errors"
+STAGING_COLUMNS = ['row_number', 'from_currency', 'to_currency', 'rate_date',
+                   'rate_type', 'exchange_rate', 'source']
+
+
+class ExchangeRateBulkLoader:
+    """COPY-based staging, set-based validation and single-statement upsert of rate files"""
+
+    def __init__(self, chunk_rows: int = 50000, inverse_tolerance: Decimal = Decimal('0.005'),
+                 max_reported_errors: int = 1000, max_reported_changes: int = 500):
+        self.chunk_rows = chunk_rows
+        self.inverse_tolerance = inverse_tolerance
+        self.max_reported_errors = max_reported_errors
+        self.max_reported_changes = max_reported_changes
+
+    # ------------------------------------------------------------------
+    # File reading
+    # ------------------------------------------------------------------
+
+    def read_preview(self, file_obj: BinaryIO, file_name: str, rows: int = 10) -> pd.DataFrame:
+        """First rows of the file with normalised column names, for display"""
+        file_obj.seek(0)
+        if file_name.lower().endswith('.csv'):
+            preview = pd.read_csv(file_obj, nrows=rows)
+        else:
+            preview = pd.read_excel(file_obj, nrows=rows)
+        file_obj.seek(0)
+        preview.columns = [str(col).strip().lower() for col in preview.columns]
+        return preview
+
+    @staticmethod
+    def missing_columns(columns: List[str]) -> List[str]:
+        """Required columns absent from a header"""
+        present = {str(col).strip().lower() for col in columns}
+        return [col for col in REQUIRED_COLUMNS if col not in present]
+
+    def iter_chunks(self, file_obj: BinaryIO, file_name: str) -> Iterator[pd.DataFrame]:
+        """Yield the file as DataFrames of at most ``chunk_rows`` rows, all values as strings"""
+        file_obj.seek(0)
+        name = file_name.lower()
+
+        if name.endswith('.csv'):
+            yield from pd.read_csv(file_obj, chunksize=self.chunk_rows, dtype=str, keep_default_na=False)
+        elif name.endswith('.xlsx'):
+            yield from self._iter_xlsx_chunks(file_obj)
+        else:
+            # Legacy .xls has no streaming reader; read once and copy in chunks
+            frame = pd.read_excel(file_obj, dtype=str, keep_default_na=False)
+            for start in range(0, len(frame), self.chunk_rows):
+                yield frame.iloc[start:start + self.chunk_rows]
+
+    def _iter_xlsx_chunks(self, file_obj: BinaryIO) -> Iterator[pd.DataFrame]:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_obj, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = ['' if col is None else str(col) for col in header]
+
+            batch = []
+            for row in rows:
+                if not any(value is not None for value in row):
+                    continue
+                batch.append(['' if value is None else str(value) for value in row])
+                if len(batch) >= self.chunk_rows:
+                    yield pd.DataFrame(batch, columns=columns)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=columns)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _normalise_chunk(chunk: pd.DataFrame, first_row_number: int) -> pd.DataFrame:
+        """Map one raw chunk to the staging columns; unparseable values become NULL"""
+        chunk = chunk.copy()
+        chunk.columns = [str(col).strip().lower() for col in chunk.columns]
+
+        def column(name: str) -> pd.Series:
+            if name in chunk.columns:
+                return chunk[name].astype(str).str.strip()
+            return pd.Series('', index=chunk.index)
+
+        rate_text = column('exchange_rate')
+        rate_valid = pd.to_numeric(rate_text, errors='coerce').notna()
+        rate_dates = pd.to_datetime(column('rate_date'), errors='coerce')
+        source = column('source')
+
+        return pd.DataFrame({
+            'row_number': range(first_row_number, first_row_number + len(chunk)),
+            'from_currency': column('from_currency').str.upper().values,
+            'to_currency': column('to_currency').str.upper().values,
+            'rate_date': rate_dates.dt.strftime('%Y-%m-%d').where(rate_dates.notna(), None).values,
+            'rate_type': column('rate_type').str.upper().values,
+            'exchange_rate': rate_text.where(rate_valid, None).values,
+            'source': source.where(source != '', DEFAULT_SOURCE).str.slice(0, MAX_SOURCE_LENGTH).values
+        })
+
+    # ------------------------------------------------------------------
+    # Staging
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _create_staging_tables(conn):
+        conn.execute(text(f"""
+            CREATE TEMP TABLE {STAGING_TABLE} (
+                row_number BIGINT PRIMARY KEY,
+                from_currency TEXT,
+                to_currency TEXT,
+                rate_date DATE,
+                rate_type TEXT,
+                exchange_rate NUMERIC,
+                source TEXT,
+                is_valid BOOLEAN NOT NULL DEFAULT TRUE
+            ) ON COMMIT DROP
+        """))
+        conn.execute(text(f"""
+            CREATE TEMP TABLE {ERROR_TABLE} (
+                row_number BIGINT NOT NULL,
+                message TEXT NOT NULL
+            ) ON COMMIT DROP
+        """))
+
+    def _copy_to_staging(self, conn, file_obj: BinaryIO, file_name: str) -> int:
+        """COPY the file chunk by chunk into the staging table; returns rows staged"""
+        cursor = conn.connection.dbapi_connection.cursor()
+        copy_sql = (f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) "
+                    f"FROM STDIN WITH (FORMAT csv)")
+        rows_staged = 0
+
+        try:
+            for chunk in self.iter_chunks(file_obj, file_name):
+                if rows_staged == 0:
+                    missing = self.missing_columns(list(chunk.columns))
+                    if missing:
+                        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+                if chunk.empty:
+                    continue
+
+                staged = self._normalise_chunk(chunk, rows_staged + 1)
+                buffer = io.StringIO()
+                staged.to_csv(buffer, header=False, index=False)
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+                rows_staged += len(staged)
+        finally:
+            cursor.close()
+
+        conn.execute(text(f"ANALYZE {STAGING_TABLE}"))
+        return rows_staged
+
+    # ------------------------------------------------------------------
+    # Validation
+    # ------------------------------------------------------------------
+
+    def _validate_staging(self, conn) -> int:
+        """Record every validation failure and flag the affected rows; returns rows rejected"""
+        conn.execute(text(f"""
+            INSERT INTO {ERROR_TABLE} (row_number, message)
+            SELECT row_number, 'Invalid from_currency (must be 3 letters)'
+            FROM {STAGING_TABLE} WHERE COALESCE(from_currency, '') !~ '^[A-Z]{{3}}$'
+            UNION ALL
+            SELECT row_number, 'Invalid to_currency (must be 3 letters)'
+            FROM {STAGING_TABLE} WHERE COALESCE(to_currency, '') !~ '^[A-Z]{{3}}$'
+            UNION ALL
+            SELECT s.row_number, 'Unknown or inactive currency: ' || s.from_currency
+            FROM {STAGING_TABLE} s
+            WHERE s.from_currency ~ '^[A-Z]{{3}}$'
+              AND NOT EXISTS (SELECT 1 FROM currencies c
+                              WHERE c.currency_code = s.from_currency AND c.is_active = TRUE)
+            UNION ALL
+            SELECT s.row_number, 'Unknown or inactive currency: ' || s.to_currency
+            FROM {STAGING_TABLE} s
+            WHERE s.to_currency ~ '^[A-Z]{{3}}$'
+              AND NOT EXISTS (SELECT 1 FROM currencies c
+                              WHERE c.currency_code = s.to_currency AND c.is_active = TRUE)
+            UNION ALL
+            SELECT row_number, 'from_currency and to_currency must differ'
+            FROM {STAGING_TABLE} WHERE from_currency = to_currency
+            UNION ALL
+            SELECT row_number, 'Invalid rate_type (must be one of ' || :rate_types_text || ')'
+            FROM {STAGING_TABLE} WHERE COALESCE(rate_type, '') <> ALL(:rate_types)
+            UNION ALL
+            SELECT row_number, 'Invalid rate_date (expected YYYY-MM-DD)'
+            FROM {STAGING_TABLE} WHERE rate_date IS NULL
+            UNION ALL
+            SELECT row_number, 'Invalid exchange rate format'
+            FROM {STAGING_TABLE} WHERE exchange_rate IS NULL
+            UNION ALL
+            SELECT row_number, 'Exchange rate must be positive'
+            FROM {STAGING_TABLE} WHERE exchange_rate <= 0
+            UNION ALL
+            SELECT row_number, 'Exchange rate exceeds the supported range'
+            FROM {STAGING_TABLE} WHERE exchange_rate > :max_rate
+        """), {
+            "rate_types": VALID_RATE_TYPES,
+            "rate_types_text": ", ".join(VALID_RATE_TYPES),
+            "max_rate": MAX_EXCHANGE_RATE
+        })
+
+        # Duplicate keys: identical repeats are rejected after the first row, conflicting
+        # repeats are all rejected since no single rate can be chosen
+        conn.execute(text(f"""
+            INSERT INTO {ERROR_TABLE} (row_number, message)
+            SELECT row_number,
+                   CASE WHEN conflicting
+                        THEN 'Conflicting duplicate of row ' || first_row || ' (different rate)'
+                        ELSE 'Duplicate of row ' || first_row
+                   END
+            FROM (
+                SELECT row_number,
+                       MIN(row_number) OVER w AS first_row,
+                       COUNT(*) OVER w AS occurrences,
+                       MIN(exchange_rate) OVER w IS DISTINCT FROM MAX(exchange_rate) OVER w AS conflicting
+                FROM {STAGING_TABLE}
+                WHERE rate_date IS NOT NULL
+                WINDOW w AS (PARTITION BY from_currency, to_currency, rate_type, rate_date)
+            ) d
+            WHERE d.occurrences > 1 AND (d.conflicting OR d.row_number <> d.first_row)
+        """))
+
+        # Inverse pairs in the file, then against stored rates the file does not replace
+        conn.execute(text(f"""
+            INSERT INTO {ERROR_TABLE} (row_number, message)
+            SELECT a.row_number,
+                   'Inconsistent with inverse rate in row ' || b.row_number ||
+                   ' (' || a.exchange_rate || ' x ' || b.exchange_rate || ')'
+            FROM {STAGING_TABLE} a
+            JOIN {STAGING_TABLE} b
+              ON b.from_currency = a.to_currency AND b.to_currency = a.from_currency
+             AND b.rate_date = a.rate_date AND b.rate_type = a.rate_type
+            WHERE a.exchange_rate > 0 AND b.exchange_rate > 0
+              AND ABS(a.exchange_rate * b.exchange_rate - 1) > :tolerance
+            UNION ALL
+            SELECT a.row_number,
+                   'Inconsistent with stored inverse rate ' || e.to_currency || '/' || e.from_currency ||
+                   ' = ' || e.exchange_rate
+            FROM {STAGING_TABLE} a
+            JOIN exchange_rates e
+              ON e.from_currency = a.to_currency AND e.to_currency = a.from_currency
+             AND e.rate_date = a.rate_date AND e.rate_type = a.rate_type
+            WHERE a.exchange_rate > 0
+              AND ABS(a.exchange_rate * e.exchange_rate - 1) > :tolerance
+              AND NOT EXISTS (
+                  SELECT 1 FROM {STAGING_TABLE} b
+                  WHERE b.from_currency = e.from_currency AND b.to_currency = e.to_currency
+                    AND b.rate_date = e.rate_date AND b.rate_type = e.rate_type
+              )
+        """), {"tolerance": self.inverse_tolerance})
+
+        result = conn.execute(text(f"""
+            UPDATE {STAGING_TABLE} s
+            SET is_valid = FALSE
+            WHERE EXISTS (SELECT 1 FROM {ERROR_TABLE} e WHERE e.row_number = s.row_number)
+        """))
+        return result.rowcount
+
+    def _fetch_errors(self, conn) -> List[str]:
+        result = conn.execute(text(f"""
+            SELECT row_number, message
+            FROM {ERROR_TABLE}
+            ORDER BY row_number, message
+            LIMIT :limit
+        """), {"limit": self.max_reported_errors})
+        return [f"Row {row[0]}: {row[1]}" for row in result]
+
+    # ------------------------------------------------------------------
+    # Diff and merge
+    # ------------------------------------------------------------------
+
+    def _summarise_changes(self, conn, update_existing: bool) -> Dict[str, Any]:
+        """Counts and a sample of what merging the valid staged rows changes"""
+        counts = conn.execute(text(f"""
+            SELECT
+                COUNT(*) FILTER (WHERE e.from_currency IS NULL) AS inserts,
+                COUNT(*) FILTER (WHERE e.from_currency IS NOT NULL
+                                   AND (e.exchange_rate <> ROUND(s.exchange_rate, 6)
+                                        OR e.source IS DISTINCT FROM s.source)) AS changed,
+                COUNT(*) FILTER (WHERE e.from_currency IS NOT NULL
+                                   AND e.exchange_rate = ROUND(s.exchange_rate, 6)
+                                   AND e.source IS NOT DISTINCT FROM s.source) AS unchanged
+            FROM {STAGING_TABLE} s
+            LEFT JOIN exchange_rates e
+              ON e.from_currency = s.from_currency AND e.to_currency = s.to_currency
+             AND e.rate_type = s.rate_type AND e.rate_date = s.rate_date
+            WHERE s.is_valid
+        """)).fetchone()
+
+        inserts, changed, unchanged = counts[0], counts[1], counts[2]
+        actions = ['INSERT', 'UPDATE'] if update_existing else ['INSERT']
+
+        changes = conn.execute(text(f"""
+            SELECT * FROM (
+                SELECT s.row_number, s.from_currency, s.to_currency, s.rate_date, s.rate_type,
+                       e.exchange_rate AS current_rate, ROUND(s.exchange_rate, 6) AS new_rate,
+                       e.source AS current_source, s.source AS new_source,
+                       CASE WHEN e.from_currency IS NULL THEN 'INSERT' ELSE 'UPDATE' END AS action
+                FROM {STAGING_TABLE} s
+                LEFT JOIN exchange_rates e
+                  ON e.from_currency = s.from_currency AND e.to_currency = s.to_currency
+                 AND e.rate_type = s.rate_type AND e.rate_date = s.rate_date
+                WHERE s.is_valid
+                  AND (e.from_currency IS NULL
+                       OR e.exchange_rate <> ROUND(s.exchange_rate, 6)
+                       OR e.source IS DISTINCT FROM s.source)
+            ) c
+            WHERE c.action = ANY(:actions)
+            ORDER BY c.row_number
+            LIMIT :limit
+        """), {"actions": actions, "limit": self.max_reported_changes})
+
+        return {
+            "inserted": inserts,
+            "updated": changed if update_existing else 0,
+            "unchanged": unchanged,
+            "skipped_existing": 0 if update_existing else changed,
+            "changes": [dict(row._mapping) for row in changes]
+        }
+
+    @staticmethod
+    def _merge_staging(conn, update_existing: bool, created_by: str) -> int:
+        """Upsert all valid staged rows into exchange_rates with one statement; returns rows written"""
+        if update_existing:
+            conflict_action = """
+                DO UPDATE SET
+                    exchange_rate = EXCLUDED.exchange_rate,
+                    source = EXCLUDED.source,
+                    updated_by = EXCLUDED.created_by,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE (exchange_rates.exchange_rate, exchange_rates.source)
+                      IS DISTINCT FROM (EXCLUDED.exchange_rate, EXCLUDED.source)
+            """
+        else:
+            conflict_action = "DO NOTHING"
+
+        result = conn.execute(text(f"""
+            INSERT INTO exchange_rates (
+                from_currency, to_currency, rate_date, rate_type,
+                exchange_rate, source, created_by
+            )
+            SELECT from_currency, to_currency, rate_date, rate_type,
+                   ROUND(exchange_rate, 6), source, :created_by
+            FROM {STAGING_TABLE}
+            WHERE is_valid
+            ON CONFLICT (from_currency, to_currency, rate_type, rate_date)
+            {conflict_action}
+        """), {"created_by": created_by})
+        return result.rowcount
+
+    # ------------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------------
+
+    def load(self, file_obj: BinaryIO, file_name: str, update_existing: bool = False,
+             dry_run: bool = True, skip_invalid: bool = False,
+             created_by: str = 'system') -> Dict[str, Any]:
+        """
+        Stage, validate and merge an exchange rate file
+
+        Args:
+            file_obj: Binary file object of a CSV, XLSX or XLS file
+            file_name: Original file name, used to pick the reader
+            update_existing: Overwrite stored rates for the same pair, type and date
+            dry_run: Report the changes without writing to exchange_rates
+            skip_invalid: Merge the valid rows when some rows fail validation
+                (by default any failure rejects the whole file)
+            created_by: User recorded on inserted rows
+
+        Returns:
+            Dict with success flag, row counts, validation errors and a sample of changes
+        """
+        try:
+            with engine.begin() as conn:
+                self._create_staging_tables(conn)
+                rows_read = self._copy_to_staging(conn, file_obj, file_name)
+                rows_rejected = self._validate_staging(conn)
+                errors = self._fetch_errors(conn)
+                summary = self._summarise_changes(conn, update_existing)
+
+                blocked = rows_rejected > 0 and not skip_invalid
+                would_write = summary["inserted"] + summary["updated"]
+                written = 0
+                if not dry_run and not blocked:
+                    written = self._merge_staging(conn, update_existing, created_by)
+
+            if written:
+                # Only after the commit, so no reader reloads the old rates in between
+                invalidate_exchange_rates()
+
+            result = {
+                "success": not blocked,
+                "dry_run": dry_run,
+                "rows_read": rows_read,
+                "rows_rejected": rows_rejected,
+                "processed": would_write if dry_run else written,
+                "errors": errors,
+                "errors_truncated": len(errors) >= self.max_reported_errors,
+                **summary
+            }
+            if blocked:
+                result["error"] = f"{rows_rejected} of {rows_read} rows failed validation"
+
+            logger.info(f"Exchange rate bulk load {'(dry run) ' if dry_run else ''}of {file_name}: "
+                        f"{rows_read} rows read, {rows_rejected} rejected, "
+                        f"{summary['inserted']} new, {summary['updated']} updated, "
+                        f"{summary['unchanged']} unchanged, {written} written")
+            return result
+
+        except Exception as e:
+            logger.error(f"Exchange rate bulk load of {file_name} failed: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+
+def bulk_load_exchange_rates(file_obj: BinaryIO, file_name: str, update_existing: bool = False,
+                             dry_run: bool = True, skip_invalid: bool = False,
+                             created_by: str = 'system') -> Dict[str, Any]:
+    """Utility function to stage, validate and merge an exchange rate file"""
+    return ExchangeRateBulkLoader().load(
+        file_obj, file_name, update_existing=update_existing, dry_run=dry_run,
+        skip_invalid=skip_invalid, created_by=created_by
+    )
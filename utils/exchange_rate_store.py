@@ -0,0 +1,193 @@
+"""
+As-Of Exchange Rate Store
+In-process cache of exchange_rates history answering as-of lookups by binary search
+
+For each currency pair the spot rates (SPOT_RATE_TYPES) are kept as a sorted list of date ordinals
+and a parallel list of Decimal rates. ``get_rate(from, to, as_of)`` returns the rate
+on ``as_of`` or the most recent one before it, which is the same rule as
+CurrencyTranslationService.get_exchange_rate (for several rows on one date the most
+recently written wins).
+
+Pairs are loaded on first use, many at a time when requested together, and kept in
+an LRU bounded by ``max_pairs``. Writers call ``invalidate_exchange_rates()`` (for one
+pair or everything); entries older than ``max_age_seconds`` are reloaded so rates
+written by other processes are picked up.
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import text
+from db_config import engine
+from utils.logger import get_logger
+from utils.rate_cube import SPOT_RATE_TYPES, rate_cube_cache
+
+logger = get_logger("exchange_rate_store")
+
+
+class _PairHistory:
+    """Sorted rate history of one currency pair"""
+
+    __slots__ = ("ordinals", "rates", "loaded_at", "version")
+
+    def __init__(self, ordinals: List[int], rates: List[Decimal], version: int):
+        self.ordinals = ordinals
+        self.rates = rates
+        self.loaded_at = time.monotonic()
+        self.version = version
+
+    def as_of(self, ordinal: int) -> Optional[Decimal]:
+        i = bisect_right(self.ordinals, ordinal)
+        return self.rates[i - 1] if i else None
+
+
+class ExchangeRateStore:
+    """Bounded, versioned cache of per-pair exchange rate histories"""
+
+    def __init__(self, max_pairs: int = 512, max_age_seconds: int = 300):
+        self.max_pairs = max_pairs
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.RLock()
+        self._pairs: "OrderedDict[Tuple[str, str], _PairHistory]" = OrderedDict()
+        self._version = 0
+        self._hits = 0
+        self._loads = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self, from_currency: str = None, to_currency: str = None) -> int:
+        """
+        Drop cached history after rates were written
+
+        With a currency pair only that pair is dropped; without arguments every
+        pair is marked stale.
+        """
+        with self._lock:
+            if from_currency and to_currency:
+                self._pairs.pop((from_currency, to_currency), None)
+            else:
+                self._version += 1
+            return self._version
+
+    def _is_fresh(self, history: Optional[_PairHistory]) -> bool:
+        return (history is not None and history.version == self._version and
+                time.monotonic() - history.loaded_at <= self.max_age_seconds)
+
+    def _load_pairs(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], _PairHistory]:
+        """Load the full spot rate history of several pairs with one query"""
+        version = self._version
+        histories = {pair: ([], []) for pair in pairs}
+
+        with engine.connect() as conn:
+            result = conn.execute(text("""
+                SELECT er.from_currency, er.to_currency, er.rate_date, er.exchange_rate
+                FROM exchange_rates er
+                JOIN unnest(CAST(:from_currs AS VARCHAR[]), CAST(:to_currs AS VARCHAR[]))
+                     AS p(from_curr, to_curr)
+                  ON er.from_currency = p.from_curr AND er.to_currency = p.to_curr
+                WHERE er.rate_type = ANY(:rate_types)
+                ORDER BY er.from_currency, er.to_currency, er.rate_date,
+                         COALESCE(er.updated_at, er.created_at)
+            """), {
+                "from_currs": [pair[0] for pair in pairs],
+                "to_currs": [pair[1] for pair in pairs],
+                "rate_types": SPOT_RATE_TYPES
+            })
+
+            for row in result:
+                ordinals, rates = histories[(row[0], row[1])]
+                ordinal = row[2].toordinal()
+                rate = Decimal(str(row[3]))
+                if ordinals and ordinals[-1] == ordinal:
+                    # Same date: the most recently written row wins
+                    rates[-1] = rate
+                else:
+                    ordinals.append(ordinal)
+                    rates.append(rate)
+
+        loaded = {pair: _PairHistory(ordinals, rates, version) for pair, (ordinals, rates) in histories.items()}
+        with self._lock:
+            for pair, history in loaded.items():
+                self._pairs[pair] = history
+                self._pairs.move_to_end(pair)
+            while len(self._pairs) > self.max_pairs:
+                self._pairs.popitem(last=False)
+            self._loads += 1
+        return loaded
+
+    def _histories(self, pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], _PairHistory]:
+        """Histories for the given pairs, loading all stale or missing ones in one query"""
+        found = {}
+        stale = []
+        with self._lock:
+            for pair in set(pairs):
+                history = self._pairs.get(pair)
+                if self._is_fresh(history):
+                    self._pairs.move_to_end(pair)
+                    self._hits += 1
+                    found[pair] = history
+                else:
+                    stale.append(pair)
+
+        if stale:
+            found.update(self._load_pairs(sorted(stale)))
+        return found
+
+    def get_rate(self, from_currency: str, to_currency: str,
+                 as_of: Optional[date] = None) -> Optional[Decimal]:
+        """Rate on ``as_of`` (default today) or the most recent one before it"""
+        if from_currency == to_currency:
+            return Decimal('1.000000')
+
+        history = self._histories([(from_currency, to_currency)])[(from_currency, to_currency)]
+        return history.as_of((as_of or date.today()).toordinal())
+
+    def get_rates(self, rate_keys: Iterable[Tuple[str, str, Optional[date]]]) -> Dict[Tuple, Optional[Decimal]]:
+        """Resolve many (from, to, as_of) lookups, loading any uncached pairs in one query"""
+        rate_keys = set(rate_keys)
+        histories = self._histories(
+            (from_currency, to_currency) for from_currency, to_currency, _ in rate_keys
+            if from_currency != to_currency
+        )
+
+        rates = {}
+        for key in rate_keys:
+            from_currency, to_currency, as_of = key
+            if from_currency == to_currency:
+                rates[key] = Decimal('1.000000')
+                continue
+            history = histories.get((from_currency, to_currency))
+            rates[key] = history.as_of((as_of or date.today()).toordinal()) if history else None
+        return rates
+
+    def get_statistics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "version": self._version,
+                "pairs_cached": len(self._pairs),
+                "max_pairs": self.max_pairs,
+                "rate_points": sum(len(h.ordinals) for h in self._pairs.values()),
+                "hits": self._hits,
+                "loads": self._loads
+            }
+
+
+# Process-wide instance
+exchange_rate_store = ExchangeRateStore()
+
+
+def get_exchange_rate_store() -> ExchangeRateStore:
+    """Get the process-wide exchange rate store"""
+    return exchange_rate_store
+
+
+def invalidate_exchange_rates(from_currency: str = None, to_currency: str = None) -> int:
+    """Drop cached rates and rate cubes after any write to exchange_rates"""
+    rate_cube_cache.invalidate()
+    return exchange_rate_store.invalidate(from_currency, to_currency)
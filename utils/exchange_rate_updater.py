@@ -12,9 +12,10 @@ import logging
 import requests
 import json
 from datetime import datetime, date
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 from typing import Dict, List, Optional, Tuple
-from .currency_service import CurrencyTranslationService
+from .currency_service import CurrencyTranslationService, CROSS_RATE_QUANTIZER
+from .rate_cube import load_rate_cube
 
 logger = logging.getLogger(__name__)
 
@@ -142,37 +143,23 @@ class ExchangeRateUpdater:
         major_currencies = ['USD', 'EUR', 'GBP', 'JPY']
         results = {}
         
-        for base_curr in major_currencies:
-            for target_curr in major_currencies:
-                if base_curr == target_curr:
-                    continue
-                    
-                # Check if direct rate exists
-                direct_rate = self.currency_service.get_exchange_rate(
-                    base_curr, target_curr, rate_date
-                )
-                
-                if direct_rate is None:
-                    # Try to calculate via USD
-                    if base_curr != 'USD' and target_curr != 'USD':
-                        base_to_usd = self.currency_service.get_exchange_rate(
-                            base_curr, 'USD', rate_date
-                        )
-                        usd_to_target = self.currency_service.get_exchange_rate(
-                            'USD', target_curr, rate_date
-                        )
-                        
-                        if base_to_usd and usd_to_target:
-                            calculated_rate = base_to_usd * usd_to_target
-                            success = self.currency_service.update_exchange_rate(
-                                from_currency=base_curr,
-                                to_currency=target_curr,
-                                rate=calculated_rate,
-                                rate_date=rate_date,
-                                rate_source='CALCULATED',
-                                created_by='CROSS_RATE_CALCULATOR'
-                            )
-                            results[f"{base_curr}_{target_curr}"] = success
+        # Derive every missing pair in one pass over the rate cube
+        cube = load_rate_cube(rate_date, currencies=major_currencies, pivot_currency='USD')
+        
+        for base_curr, target_curr, rate, resolution in cube.missing_direct_pairs(rate_date):
+            if 'USD' in (base_curr, target_curr):
+                continue
+            
+            calculated_rate = Decimal(repr(rate)).quantize(CROSS_RATE_QUANTIZER, rounding=ROUND_HALF_UP)
+            success = self.currency_service.update_exchange_rate(
+                from_currency=base_curr,
+                to_currency=target_curr,
+                rate=calculated_rate,
+                rate_date=rate_date,
+                rate_source='CALCULATED',
+                created_by='CROSS_RATE_CALCULATOR'
+            )
+            results[f"{base_curr}_{target_curr}"] = success
                             
         return results
     
@@ -186,33 +173,11 @@ class ExchangeRateUpdater:
         Returns:
             List of inconsistencies found
         """
-        inconsistencies = []
         currencies = ['USD', 'EUR', 'GBP']
         
-        # Check triangular consistency for major currencies
-        for base in currencies:
-            for via in currencies:
-                for target in currencies:
-                    if base == via or via == target or base == target:
-                        continue
-                        
-                    direct_rate = self.currency_service.get_exchange_rate(base, target)
-                    base_to_via = self.currency_service.get_exchange_rate(base, via)
-                    via_to_target = self.currency_service.get_exchange_rate(via, target)
-                    
-                    if direct_rate and base_to_via and via_to_target:
-                        calculated_rate = base_to_via * via_to_target
-                        deviation = abs(float(direct_rate) - float(calculated_rate)) / float(direct_rate)
-                        
-                        if deviation > tolerance:
-                            inconsistencies.append({
-                                'path': f"{base} → {target} (direct) vs {base} → {via} → {target}",
-                                'direct_rate': float(direct_rate),
-                                'calculated_rate': float(calculated_rate),
-                                'deviation_percent': deviation * 100
-                            })
-        
-        return inconsistencies
+        # Check triangular consistency for major currencies as one matrix operation
+        cube = load_rate_cube(date.today(), currencies=currencies, pivot_currency=None)
+        return cube.triangular_deviations(date.today(), tolerance)
     
     def get_rate_update_summary(self, days: int = 7) -> Dict:
         """
@@ -231,15 +196,14 @@ class ExchangeRateUpdater:
             with engine.connect() as conn:
                 query = text("""
                     SELECT 
-                        rate_source,
+                        source,
                         COUNT(*) as update_count,
-                        COUNT(DISTINCT fromcurrency || tocurrency) as currency_pairs,
-                        MIN(created_at) as first_update,
-                        MAX(created_at) as latest_update
-                    FROM exchangerate 
-                    WHERE created_at >= CURRENT_TIMESTAMP - INTERVAL '%s days'
-                    AND is_active = true
-                    GROUP BY rate_source
+                        COUNT(DISTINCT from_currency || to_currency) as currency_pairs,
+                        MIN(COALESCE(updated_at, created_at)) as first_update,
+                        MAX(COALESCE(updated_at, created_at)) as latest_update
+                    FROM exchange_rates 
+                    WHERE COALESCE(updated_at, created_at) >= CURRENT_TIMESTAMP - INTERVAL '%s days'
+                    GROUP BY source
                     ORDER BY update_count DESC
                 """ % days)
                 
@@ -0,0 +1,558 @@
+"""
+Set-Based FX Revaluation Engine
+Extracts, revalues and stores all configured accounts of a ledger in a few statements
+
+For one ledger the engine:
+1. extracts the document-currency and functional-currency balance of every
+   configured account with one grouped query (``extract_exposure``)
+2. revalues all accounts at once with NumPy against a RateCube for the
+   revaluation date (``compute``)
+3. writes every fx_revaluation_details row with multi-row inserts (``save_details``)
+
+Incremental mode (``extract_exposure_incremental``) re-extracts only the accounts
+whose balance may have moved since their last snapshot in
+fx_account_balances_history: accounts without a snapshot, accounts whose
+currency changed, and accounts with postings after the snapshot date or posted
+after the snapshot was taken (backdated postings). Those postings are found
+from the headers posted or dated since the oldest snapshot, using the
+(company, posted_at) and (company, postingdate) indexes. All other balances are taken
+from the snapshot. Because every account is still revalued by ``compute`` at the
+current rates, an incremental run produces exactly the details of a full run.
+Each run writes its balances back as the new snapshot (``save_snapshots``).
+
+Results follow the rules of the former per-account path: accounts with a zero
+foreign-currency balance are counted but not stored, accounts without a closing
+rate carry an error message and are not stored, and revaluation is required when
+the unrealized gain/loss is at least 1.00 or 0.01% of the functional balance.
+Amounts are rounded half-up to cents (the precision of fx_revaluation_details);
+products that sit within float error of a rounding boundary are recomputed with
+Decimal.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import text
+from utils.rate_cube import RateCube, load_rate_cube, round_half_up
+from utils.sql_helpers import execute_multi_row_insert
+from utils.logger import get_logger
+
+logger = get_logger("fx_revaluation_engine")
+
+FUNCTIONAL_CURRENCY = "USD"
+
+# Revaluation is required above either threshold
+THRESHOLD_AMOUNT = 1.00
+THRESHOLD_PERCENT = 0.0001  # 0.01%
+
+AMOUNT_QUANTIZER = Decimal('0.01')
+RATE_QUANTIZER = Decimal('0.000001')
+
+# Postings whose transaction started shortly before a snapshot may commit after it
+SNAPSHOT_SAFETY_MARGIN = "10 minutes"
+
+SNAPSHOT_COLUMNS = [
+    "company_code", "ledger_id", "gl_account", "balance_date", "balance_fc", "balance_func",
+    "exchange_rate", "currency_code", "last_revaluation_date", "cumulative_unrealized_gl",
+    "period_revaluation_amount"
+]
+
+DETAIL_COLUMNS = [
+    "run_id", "company_code", "ledger_id", "gl_account", "account_currency",
+    "functional_currency", "opening_balance_fc", "current_balance_fc",
+    "opening_balance_func", "historical_exchange_rate", "current_exchange_rate",
+    "rate_difference", "current_balance_func_at_current_rate",
+    "unrealized_gain_loss", "revaluation_required", "error_message"
+]
+
+
+@dataclass
+class RevaluationExposure:
+    """Balances of the configured accounts of one ledger as parallel arrays"""
+    company_code: str
+    ledger_id: str
+    balance_date: date
+    gl_accounts: np.ndarray
+    account_currencies: np.ndarray
+    balance_fc: np.ndarray
+    balance_func: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.gl_accounts)
+
+
+@dataclass
+class AccountSnapshot:
+    """Last recorded balance of an account and the rates of its last revaluation detail"""
+    gl_account: str
+    balance_date: Optional[date]
+    balance_fc: Optional[Decimal]
+    balance_func: Optional[Decimal]
+    currency_code: Optional[str]
+    cumulative_unrealized_gl: Decimal
+    period_revaluation_amount: Decimal
+    taken_at: Optional[Any]
+    last_closing_rate: Optional[Decimal]
+    last_historical_rate: Optional[Decimal]
+
+    @property
+    def has_balance(self) -> bool:
+        return self.balance_date is not None
+
+
+@dataclass
+class RevaluationResult:
+    """Vectorized revaluation of one exposure"""
+    exposure: RevaluationExposure
+    current_rates: np.ndarray
+    historical_rates: np.ndarray
+    value_at_current_rate: np.ndarray
+    unrealized_gain_loss: np.ndarray
+    zero_balance: np.ndarray
+    rate_missing: np.ndarray
+    revaluation_required: np.ndarray
+
+    @property
+    def stored(self) -> np.ndarray:
+        """Accounts that get an fx_revaluation_details row"""
+        return ~self.zero_balance & ~self.rate_missing
+
+
+def _to_decimal(value: float, quantizer: Decimal) -> Decimal:
+    return Decimal(repr(float(value))).quantize(quantizer, rounding=ROUND_HALF_UP)
+
+
+class FXRevaluationEngine:
+    """Set-based balance extraction and vectorized revaluation for whole ledgers"""
+
+    def __init__(self, functional_currency: str = FUNCTIONAL_CURRENCY):
+        self.functional_currency = functional_currency
+
+    def extract_exposure(self, conn, company_code: str, ledger_id: str,
+                         accounts: List[Dict], balance_date: date) -> RevaluationExposure:
+        """
+        Document-currency and functional balances of all configured accounts in one query
+
+        Args:
+            conn: Database connection
+            company_code: Company code
+            ledger_id: Ledger ID
+            accounts: fx_revaluation_config rows of the ledger
+            balance_date: Include postings up to and including this date
+
+        Returns:
+            RevaluationExposure aligned with ``accounts``
+        """
+        gl_accounts = [account["gl_account"] for account in accounts]
+        currencies = [account["account_currency"] for account in accounts]
+
+        rows = conn.execute(text("""
+            WITH cfg AS (
+                SELECT c.gl_account, c.account_currency, c.position
+                FROM unnest(CAST(:gl_accounts AS VARCHAR[]), CAST(:currencies AS VARCHAR[]))
+                     WITH ORDINALITY AS c(gl_account, account_currency, position)
+            ),
+            sums AS (
+                SELECT jel.glaccountid, jel.currencycode,
+                       SUM(CASE
+                               WHEN ga.accounttype IN ('ASSETS', 'EXPENSES')
+                               THEN jel.debitamount - jel.creditamount
+                               ELSE jel.creditamount - jel.debitamount
+                           END) AS balance
+                FROM journalentryline jel
+                JOIN journalentryheader jeh ON jel.documentnumber = jeh.documentnumber
+                    AND jel.companycodeid = jeh.companycodeid
+                JOIN glaccount ga ON jel.glaccountid = ga.glaccountid
+                WHERE jel.companycodeid = :company_code
+                AND jel.ledgerid = :ledger_id
+                AND jel.glaccountid = ANY(:gl_accounts)
+                AND (jel.currencycode = ANY(:currencies) OR jel.currencycode = :functional_currency)
+                AND jeh.postingdate <= :balance_date
+                AND jeh.workflow_status = 'POSTED'
+                GROUP BY jel.glaccountid, jel.currencycode
+            )
+            SELECT cfg.gl_account, cfg.account_currency,
+                   COALESCE(fc.balance, 0) AS balance_fc,
+                   COALESCE(func.balance, 0) AS balance_func
+            FROM cfg
+            LEFT JOIN sums fc ON fc.glaccountid = cfg.gl_account
+                AND fc.currencycode = cfg.account_currency
+            LEFT JOIN sums func ON func.glaccountid = cfg.gl_account
+                AND func.currencycode = :functional_currency
+            ORDER BY cfg.position
+        """), {
+            "gl_accounts": gl_accounts,
+            "currencies": currencies,
+            "company_code": company_code,
+            "ledger_id": ledger_id,
+            "functional_currency": self.functional_currency,
+            "balance_date": balance_date
+        }).fetchall()
+
+        return RevaluationExposure(
+            company_code=company_code,
+            ledger_id=ledger_id,
+            balance_date=balance_date,
+            gl_accounts=np.array([row[0] for row in rows], dtype=object),
+            account_currencies=np.array([row[1] for row in rows], dtype=object),
+            balance_fc=np.array([float(row[2]) for row in rows], dtype=np.float64),
+            balance_func=np.array([float(row[3]) for row in rows], dtype=np.float64)
+        )
+
+    def load_snapshots(self, conn, company_code: str, ledger_id: str, gl_accounts: List[str],
+                       balance_date: date) -> Dict[str, AccountSnapshot]:
+        """
+        Latest balance snapshot on or before ``balance_date`` and latest detail rates per account
+
+        Returns:
+            {gl_account: AccountSnapshot}; accounts never snapshotted have ``has_balance`` False
+        """
+        rows = conn.execute(text("""
+            SELECT a.gl_account,
+                   h.balance_date, h.balance_fc, h.balance_func, h.currency_code,
+                   h.cumulative_unrealized_gl, h.period_revaluation_amount, h.created_at,
+                   d.current_exchange_rate, d.historical_exchange_rate
+            FROM unnest(CAST(:gl_accounts AS VARCHAR[])) AS a(gl_account)
+            LEFT JOIN LATERAL (
+                SELECT balance_date, balance_fc, balance_func, currency_code,
+                       cumulative_unrealized_gl, period_revaluation_amount, created_at
+                FROM fx_account_balances_history
+                WHERE company_code = :company_code
+                AND ledger_id = :ledger_id
+                AND gl_account = a.gl_account
+                AND balance_date <= :balance_date
+                ORDER BY balance_date DESC
+                LIMIT 1
+            ) h ON true
+            LEFT JOIN LATERAL (
+                SELECT fd.current_exchange_rate, fd.historical_exchange_rate
+                FROM fx_revaluation_details fd
+                JOIN fx_revaluation_runs fr ON fr.run_id = fd.run_id
+                WHERE fd.company_code = :company_code
+                AND fd.ledger_id = :ledger_id
+                AND fd.gl_account = a.gl_account
+                AND fr.revaluation_date <= :balance_date
+                ORDER BY fr.revaluation_date DESC, fd.detail_id DESC
+                LIMIT 1
+            ) d ON true
+        """), {
+            "gl_accounts": gl_accounts,
+            "company_code": company_code,
+            "ledger_id": ledger_id,
+            "balance_date": balance_date
+        }).fetchall()
+
+        return {
+            row[0]: AccountSnapshot(
+                gl_account=row[0],
+                balance_date=row[1],
+                balance_fc=row[2],
+                balance_func=row[3],
+                currency_code=row[4],
+                cumulative_unrealized_gl=row[5] or Decimal('0.00'),
+                period_revaluation_amount=row[6] or Decimal('0.00'),
+                taken_at=row[7],
+                last_closing_rate=row[8],
+                last_historical_rate=row[9]
+            )
+            for row in rows
+        }
+
+    def find_changed_accounts(self, conn, company_code: str, ledger_id: str,
+                              snapshots: Dict[str, AccountSnapshot], balance_date: date) -> set:
+        """
+        Snapshotted accounts with postings the snapshot may not include
+
+        The scan starts from the documents that can matter to any snapshot: posting
+        date after the oldest snapshot's balance date, or posted after the oldest
+        snapshot was taken (less the safety margin). Both bounds are served by
+        header indexes, so the cost follows the activity since the last run rather
+        than the accounts' history. Each candidate line is then tested against its
+        own account's snapshot.
+        """
+        snapshotted = [snapshot for snapshot in snapshots.values() if snapshot.has_balance]
+        if not snapshotted:
+            return set()
+
+        taken_at = [snapshot.taken_at for snapshot in snapshotted if snapshot.taken_at is not None]
+        rows = conn.execute(text(f"""
+            WITH candidates AS (
+                SELECT jeh.documentnumber, jeh.postingdate, jeh.posted_at
+                FROM journalentryheader jeh
+                WHERE jeh.companycodeid = :company_code
+                AND jeh.workflow_status = 'POSTED'
+                AND jeh.postingdate <= :balance_date
+                AND (jeh.postingdate > :min_balance_date
+                     OR jeh.posted_at > CAST(:min_taken_at AS TIMESTAMP) - INTERVAL '{SNAPSHOT_SAFETY_MARGIN}')
+            )
+            SELECT DISTINCT s.gl_account
+            FROM candidates c
+            JOIN journalentryline jel ON jel.companycodeid = :company_code
+                AND jel.documentnumber = c.documentnumber
+            JOIN unnest(CAST(:gl_accounts AS VARCHAR[]), CAST(:balance_dates AS DATE[]),
+                        CAST(:taken_at AS TIMESTAMP[])) AS s(gl_account, balance_date, taken_at)
+                ON s.gl_account = jel.glaccountid
+            WHERE jel.ledgerid = :ledger_id
+            AND (c.postingdate > s.balance_date
+                 OR c.posted_at > s.taken_at - INTERVAL '{SNAPSHOT_SAFETY_MARGIN}')
+        """), {
+            "gl_accounts": [snapshot.gl_account for snapshot in snapshotted],
+            "balance_dates": [snapshot.balance_date for snapshot in snapshotted],
+            "taken_at": [snapshot.taken_at for snapshot in snapshotted],
+            "min_balance_date": min(snapshot.balance_date for snapshot in snapshotted),
+            "min_taken_at": min(taken_at) if taken_at else None,
+            "company_code": company_code,
+            "ledger_id": ledger_id,
+            "balance_date": balance_date
+        }).fetchall()
+        return {row[0] for row in rows}
+
+    def extract_exposure_incremental(self, conn, company_code: str, ledger_id: str,
+                                     accounts: List[Dict], balance_date: date
+                                     ) -> Tuple[RevaluationExposure, np.ndarray, Dict[str, AccountSnapshot]]:
+        """
+        Exposure built from snapshots, re-extracting only accounts whose balance may have changed
+
+        Returns:
+            Tuple of (exposure aligned with ``accounts``, boolean mask of re-extracted
+            accounts, snapshots by account)
+        """
+        gl_accounts = [account["gl_account"] for account in accounts]
+        snapshots = self.load_snapshots(conn, company_code, ledger_id, gl_accounts, balance_date)
+        posted_since = self.find_changed_accounts(conn, company_code, ledger_id, snapshots, balance_date)
+
+        reextract = np.array([
+            not snapshots[account["gl_account"]].has_balance
+            or snapshots[account["gl_account"]].currency_code != account["account_currency"]
+            or account["gl_account"] in posted_since
+            for account in accounts
+        ], dtype=bool)
+
+        balance_fc = np.array([float(snapshots[a].balance_fc or 0) for a in gl_accounts], dtype=np.float64)
+        balance_func = np.array([float(snapshots[a].balance_func or 0) for a in gl_accounts], dtype=np.float64)
+
+        if reextract.any():
+            positions = np.flatnonzero(reextract)
+            fresh = self.extract_exposure(
+                conn, company_code, ledger_id, [accounts[i] for i in positions], balance_date
+            )
+            balance_fc[positions] = fresh.balance_fc
+            balance_func[positions] = fresh.balance_func
+
+        exposure = RevaluationExposure(
+            company_code=company_code,
+            ledger_id=ledger_id,
+            balance_date=balance_date,
+            gl_accounts=np.array(gl_accounts, dtype=object),
+            account_currencies=np.array([account["account_currency"] for account in accounts], dtype=object),
+            balance_fc=balance_fc,
+            balance_func=balance_func
+        )
+        return exposure, reextract, snapshots
+
+    @staticmethod
+    def balance_changed(exposure: RevaluationExposure, snapshots: Dict[str, AccountSnapshot]) -> np.ndarray:
+        """Accounts whose balances differ from their previous snapshot (or have none)"""
+        previous = [snapshots[gl_account] for gl_account in exposure.gl_accounts]
+        has_balance = np.array([snapshot.has_balance for snapshot in previous], dtype=bool)
+        previous_fc = np.array([float(snapshot.balance_fc or 0) for snapshot in previous], dtype=np.float64)
+        previous_func = np.array([float(snapshot.balance_func or 0) for snapshot in previous], dtype=np.float64)
+        return ~has_balance | (exposure.balance_fc != previous_fc) | (exposure.balance_func != previous_func)
+
+    @staticmethod
+    def rate_changed(result: RevaluationResult, account_results: List[Dict],
+                     snapshots: Dict[str, AccountSnapshot]) -> np.ndarray:
+        """Stored accounts whose closing or historical rate differs from their latest detail"""
+        return result.stored & np.array([
+            account_result["current_exchange_rate"] != snapshots[account_result["gl_account"]].last_closing_rate
+            or account_result["historical_exchange_rate"] != snapshots[account_result["gl_account"]].last_historical_rate
+            for account_result in account_results
+        ], dtype=bool)
+
+    def save_snapshots(self, conn, result: RevaluationResult, account_results: List[Dict],
+                       snapshots: Optional[Dict[str, AccountSnapshot]] = None) -> int:
+        """Upsert the run's balances into fx_account_balances_history; returns rows written"""
+        exposure = result.exposure
+        if snapshots is None:
+            snapshots = self.load_snapshots(conn, exposure.company_code, exposure.ledger_id,
+                                            list(exposure.gl_accounts), exposure.balance_date)
+
+        rows = []
+        for i, account_result in enumerate(account_results):
+            snapshot = snapshots.get(account_result["gl_account"])
+            previous_cumulative = Decimal('0.00')
+            if snapshot is not None and snapshot.has_balance:
+                previous_cumulative = snapshot.cumulative_unrealized_gl
+                if snapshot.balance_date == exposure.balance_date:
+                    previous_cumulative -= snapshot.period_revaluation_amount
+
+            unrealized = account_result["unrealized_gain_loss"]
+            rows.append({
+                "company_code": exposure.company_code,
+                "ledger_id": exposure.ledger_id,
+                "gl_account": account_result["gl_account"],
+                "balance_date": exposure.balance_date,
+                "balance_fc": account_result["current_balance_fc"],
+                "balance_func": _to_decimal(exposure.balance_func[i], AMOUNT_QUANTIZER),
+                "exchange_rate": (Decimal('0') if np.isnan(result.current_rates[i])
+                                  else _to_decimal(result.current_rates[i], RATE_QUANTIZER)),
+                "currency_code": account_result["account_currency"],
+                "last_revaluation_date": exposure.balance_date,
+                "cumulative_unrealized_gl": unrealized,
+                "period_revaluation_amount": unrealized - previous_cumulative
+            })
+
+        if rows:
+            execute_multi_row_insert(
+                conn, "fx_account_balances_history", SNAPSHOT_COLUMNS, rows,
+                on_conflict="""
+                    ON CONFLICT (company_code, ledger_id, gl_account, balance_date)
+                    DO UPDATE SET
+                        balance_fc = EXCLUDED.balance_fc,
+                        balance_func = EXCLUDED.balance_func,
+                        exchange_rate = EXCLUDED.exchange_rate,
+                        currency_code = EXCLUDED.currency_code,
+                        last_revaluation_date = EXCLUDED.last_revaluation_date,
+                        cumulative_unrealized_gl = EXCLUDED.cumulative_unrealized_gl,
+                        period_revaluation_amount = EXCLUDED.period_revaluation_amount,
+                        created_at = CURRENT_TIMESTAMP
+                """
+            )
+        return len(rows)
+
+    def load_cube(self, revaluation_date: date, currencies: Iterable[str]) -> RateCube:
+        """Rate cube for the revaluation date covering the given account currencies"""
+        return load_rate_cube(revaluation_date, currencies=set(currencies) | {self.functional_currency})
+
+    @staticmethod
+    def unrealized_at_rates(balance_fc: np.ndarray, balance_func: np.ndarray,
+                            rates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Functional value at the given rates and the unrealized gain/loss, both in cents
+
+        ``rates`` may carry leading dimensions (e.g. scenarios x accounts); the
+        balances broadcast against its last axis.
+        """
+        product = balance_fc * rates
+        value = round_half_up(product, 2)
+
+        # Recompute products within float error of a half-cent
+        scaled = np.abs(product) * 100.0
+        with np.errstate(invalid="ignore"):
+            boundary = ~np.isnan(product) & (np.abs(scaled - np.floor(scaled) - 0.5) < np.maximum(1e-6, scaled * 1e-12))
+        balances = np.broadcast_to(balance_fc, product.shape)
+        for index in zip(*np.nonzero(boundary)):
+            exact = Decimal(repr(float(balances[index]))) * Decimal(repr(float(rates[index])))
+            value[index] = float(exact.quantize(AMOUNT_QUANTIZER, rounding=ROUND_HALF_UP))
+
+        return value, round_half_up(value - balance_func, 2)
+
+    def compute(self, exposure: RevaluationExposure, cube: RateCube, revaluation_date: date,
+                historical_rates: Optional[Dict[str, Decimal]] = None) -> RevaluationResult:
+        """
+        Revalue every account of an exposure at the closing rate
+
+        Args:
+            exposure: Extracted balances
+            cube: Rate cube containing ``revaluation_date``
+            revaluation_date: Closing rate date
+            historical_rates: {account_currency: rate} reported as the historical rate
+                (missing currencies default to 1.0)
+
+        Returns:
+            RevaluationResult with one element per account
+        """
+        historical_rates = historical_rates or {}
+        n = len(exposure)
+
+        rates, _ = cube.lookup(exposure.account_currencies, self.functional_currency,
+                               np.array([revaluation_date] * n, dtype=object))
+        # Closing rates carry the six decimals of the stored rate
+        current_rates = round_half_up(rates, 6)
+        historical = np.array([
+            float(historical_rates.get(currency) or 1) for currency in exposure.account_currencies
+        ], dtype=np.float64)
+
+        zero_balance = exposure.balance_fc == 0
+        rate_missing = ~zero_balance & np.isnan(current_rates)
+
+        value_at_current, unrealized = self.unrealized_at_rates(
+            exposure.balance_fc, exposure.balance_func, current_rates)
+
+        with np.errstate(invalid="ignore"):
+            required = (~zero_balance & ~rate_missing &
+                        ((np.abs(unrealized) >= THRESHOLD_AMOUNT) |
+                         (np.abs(unrealized) / np.maximum(np.abs(exposure.balance_func), 1.0) >= THRESHOLD_PERCENT)))
+
+        return RevaluationResult(
+            exposure=exposure,
+            current_rates=current_rates,
+            historical_rates=historical,
+            value_at_current_rate=value_at_current,
+            unrealized_gain_loss=unrealized,
+            zero_balance=zero_balance,
+            rate_missing=rate_missing,
+            revaluation_required=required
+        )
+
+    def account_results(self, result: RevaluationResult) -> List[Dict]:
+        """Per-account result dictionaries (the shape used for details and journals)"""
+        exposure = result.exposure
+        account_results = []
+
+        for i in range(len(exposure)):
+            account_result = {
+                "gl_account": exposure.gl_accounts[i],
+                "account_currency": exposure.account_currencies[i],
+                "functional_currency": self.functional_currency,
+                "opening_balance_fc": Decimal('0.00'),
+                "current_balance_fc": _to_decimal(exposure.balance_fc[i], AMOUNT_QUANTIZER),
+                "opening_balance_func": Decimal('0.00'),
+                "historical_exchange_rate": Decimal('1.000000'),
+                "current_exchange_rate": Decimal('1.000000'),
+                "rate_difference": Decimal('0.000000'),
+                "current_balance_func_at_current_rate": Decimal('0.00'),
+                "unrealized_gain_loss": Decimal('0.00'),
+                "revaluation_required": False,
+                "error_message": None
+            }
+
+            if result.rate_missing[i]:
+                account_result["error_message"] = (
+                    f"No exchange rate found for {exposure.account_currencies[i]} to {self.functional_currency}"
+                )
+            elif not result.zero_balance[i]:
+                current_rate = _to_decimal(result.current_rates[i], RATE_QUANTIZER)
+                historical_rate = _to_decimal(result.historical_rates[i], RATE_QUANTIZER)
+                account_result.update({
+                    "opening_balance_func": _to_decimal(exposure.balance_func[i], AMOUNT_QUANTIZER),
+                    "historical_exchange_rate": historical_rate,
+                    "current_exchange_rate": current_rate,
+                    "rate_difference": current_rate - historical_rate,
+                    "current_balance_func_at_current_rate": _to_decimal(result.value_at_current_rate[i], AMOUNT_QUANTIZER),
+                    "unrealized_gain_loss": _to_decimal(result.unrealized_gain_loss[i], AMOUNT_QUANTIZER),
+                    "revaluation_required": bool(result.revaluation_required[i])
+                })
+
+            account_results.append(account_result)
+
+        return account_results
+
+    @staticmethod
+    def save_details(conn, run_id: int, company_code: str, ledger_id: str,
+                     account_results: List[Dict], result: RevaluationResult) -> int:
+        """Bulk insert fx_revaluation_details for the stored accounts; returns rows written"""
+        rows = [
+            {"run_id": run_id, "company_code": company_code, "ledger_id": ledger_id, **account_result}
+            for account_result, stored in zip(account_results, result.stored)
+            if stored
+        ]
+        if rows:
+            execute_multi_row_insert(conn, "fx_revaluation_details", DETAIL_COLUMNS, rows)
+        return len(rows)
+
+
+# Process-wide instance
+fx_revaluation_engine = FXRevaluationEngine()
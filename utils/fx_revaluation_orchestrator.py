@@ -0,0 +1,392 @@
+"""
+FX Revaluation Orchestrator
+Runs FX revaluation for many company codes and ledgers concurrently
+
+Every (company code, ledger) pair with active fx_revaluation_config rows is one
+unit of work. Units run in a thread pool (or a process pool with
+``use_processes=True``). Each unit uses its own pooled connection and transaction
+through FXRevaluationService._process_ledger_revaluation, so one failing ledger
+never rolls back another. A failed unit is retried up to ``max_retries`` times;
+its detail rows are written in a single transaction, so a retry never duplicates
+them.
+
+Rates are loaded once for the whole run: one RateCube for the revaluation date
+and one batch of historical rates covering every account currency.
+
+With ``incremental=True`` each unit re-extracts only the accounts whose balance
+changed since their last snapshot (see FXRevaluationEngine), which makes daily
+runs over many companies cheap without changing their results.
+
+Each company code gets one fx_revaluation_runs row. Progress is recorded on that
+row as units finish (totals and journal numbers are incremented in place), and
+the row is completed once all of the company's units are done.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from sqlalchemy import text
+from db_config import engine
+from utils.fx_revaluation_service import FXRevaluationService
+from utils.rate_cube import RateCube
+from utils.logger import get_logger
+
+logger = get_logger("fx_revaluation_orchestrator")
+
+# Keep within the engine's pool (pool_size + max_overflow)
+MAX_DEFAULT_WORKERS = 8
+
+
+@dataclass(frozen=True)
+class RevaluationUnit:
+    """One (company code, ledger) pair revalued as a unit"""
+    company_code: str
+    ledger_id: str
+
+
+@dataclass
+class UnitOutcome:
+    """Result of one unit after all attempts"""
+    unit: RevaluationUnit
+    status: str = "PENDING"
+    attempts: int = 0
+    elapsed_seconds: float = 0.0
+    ledger_result: Optional[Dict[str, Any]] = None
+    errors: List[str] = field(default_factory=list)
+
+
+_worker_state = threading.local()
+
+
+def _worker_service() -> FXRevaluationService:
+    """Service instance owned by the current worker thread or process"""
+    service = getattr(_worker_state, "service", None)
+    if service is None:
+        service = _worker_state.service = FXRevaluationService()
+    return service
+
+
+def _init_worker_process():
+    # Connections inherited from the parent process must not be shared
+    engine.dispose(close=False)
+
+
+def _revalue_unit(unit: RevaluationUnit, run_id: int, accounts: List[Dict],
+                  revaluation_date: date, fiscal_year: int, fiscal_period: int,
+                  create_journals: bool, cube: RateCube, historical_rates: Dict[str, Decimal],
+                  max_retries: int, retry_delay_seconds: float,
+                  incremental: bool = False) -> UnitOutcome:
+    """Revalue one unit with retries (runs inside a worker)"""
+    outcome = UnitOutcome(unit=unit)
+    started = time.perf_counter()
+    service = _worker_service()
+
+    while outcome.attempts <= max_retries:
+        outcome.attempts += 1
+        try:
+            outcome.ledger_result = service._process_ledger_revaluation(
+                run_id, unit.company_code, unit.ledger_id, accounts,
+                revaluation_date, fiscal_year, fiscal_period, create_journals,
+                cube, historical_rates, raise_errors=True, incremental=incremental
+            )
+            outcome.status = "COMPLETED"
+            break
+        except Exception as e:
+            outcome.errors.append(f"Attempt {outcome.attempts}: {e}")
+            if outcome.attempts <= max_retries:
+                time.sleep(retry_delay_seconds * outcome.attempts)
+
+    if outcome.status != "COMPLETED":
+        outcome.status = "FAILED"
+    outcome.elapsed_seconds = time.perf_counter() - started
+    return outcome
+
+
+class FXRevaluationOrchestrator:
+    """Concurrent FX revaluation across company codes and ledgers"""
+
+    def __init__(self, max_workers: Optional[int] = None, max_retries: int = 2,
+                 retry_delay_seconds: float = 1.0, use_processes: bool = False):
+        """
+        Args:
+            max_workers: Concurrent units (default: CPU count, capped by the connection pool)
+            max_retries: Retries per failed unit
+            retry_delay_seconds: Base delay between retries (multiplied by the attempt)
+            use_processes: Run units in worker processes instead of threads
+        """
+        self.max_workers = max_workers or min(os.cpu_count() or 4, MAX_DEFAULT_WORKERS)
+        self.max_retries = max_retries
+        self.retry_delay_seconds = retry_delay_seconds
+        self.use_processes = use_processes
+        self.service = FXRevaluationService()
+
+    def _get_units(self, company_codes: List[str],
+                   ledger_ids: Optional[List[str]]) -> Dict[RevaluationUnit, List[Dict]]:
+        """Active revaluation accounts of all requested companies, grouped into units"""
+        query = """
+            SELECT * FROM fx_revaluation_config
+            WHERE company_code = ANY(:company_codes)
+            AND is_active = true
+        """
+        params = {"company_codes": company_codes}
+        if ledger_ids:
+            query += " AND ledger_id = ANY(:ledger_ids)"
+            params["ledger_ids"] = ledger_ids
+        query += " ORDER BY company_code, ledger_id, gl_account"
+
+        with engine.connect() as conn:
+            rows = conn.execute(text(query), params).mappings().all()
+
+        units: Dict[RevaluationUnit, List[Dict]] = {}
+        for row in rows:
+            units.setdefault(RevaluationUnit(row["company_code"], row["ledger_id"]), []).append(dict(row))
+        return units
+
+    @staticmethod
+    def _record_unit_progress(run_id: int, outcome: UnitOutcome):
+        """Add a finished unit's totals to its company's run row"""
+        ledger_result = outcome.ledger_result or {}
+        error = None
+        if outcome.status == "FAILED":
+            error = f"Ledger {outcome.unit.ledger_id} failed after {outcome.attempts} attempts: {outcome.errors[-1]}"
+
+        with engine.begin() as conn:
+            conn.execute(text("""
+                UPDATE fx_revaluation_runs
+                SET total_accounts_processed = COALESCE(total_accounts_processed, 0) + :accounts_processed,
+                    total_revaluations = COALESCE(total_revaluations, 0) + :revaluations_created,
+                    total_unrealized_gain = COALESCE(total_unrealized_gain, 0) + :total_gain,
+                    total_unrealized_loss = COALESCE(total_unrealized_loss, 0) + :total_loss,
+                    journal_document_numbers = COALESCE(journal_document_numbers, '{}') || CAST(:journal_docs AS TEXT[]),
+                    error_details = CASE
+                        WHEN CAST(:error AS TEXT) IS NULL THEN error_details
+                        ELSE CONCAT_WS(E'\\n', error_details, CAST(:error AS TEXT))
+                    END
+                WHERE run_id = :run_id
+            """), {
+                "run_id": run_id,
+                "accounts_processed": ledger_result.get("accounts_processed", 0),
+                "revaluations_created": ledger_result.get("revaluations_created", 0),
+                "total_gain": ledger_result.get("total_unrealized_gain", Decimal('0.00')),
+                "total_loss": ledger_result.get("total_unrealized_loss", Decimal('0.00')),
+                "journal_docs": ledger_result.get("journal_documents", []),
+                "error": error
+            })
+
+    @staticmethod
+    def _new_company_result(company_code: str, run_id: Optional[int], revaluation_date: date,
+                            fiscal_year: int, fiscal_period: int, run_type: str) -> Dict[str, Any]:
+        """Per-company result in the shape returned by FXRevaluationService.run_fx_revaluation"""
+        return {
+            "run_id": run_id,
+            "company_code": company_code,
+            "revaluation_date": revaluation_date,
+            "fiscal_year": fiscal_year,
+            "fiscal_period": fiscal_period,
+            "run_type": run_type,
+            "started_at": datetime.now(),
+            "status": "RUNNING",
+            "accounts_processed": 0,
+            "accounts_reextracted": 0,
+            "revaluations_created": 0,
+            "total_unrealized_gain": Decimal('0.00'),
+            "total_unrealized_loss": Decimal('0.00'),
+            "journal_documents": [],
+            "errors": [],
+            "ledger_results": {}
+        }
+
+    def run(self, company_codes: Iterable[str], revaluation_date: date,
+            fiscal_year: int, fiscal_period: int, run_type: str = "PERIOD_END",
+            ledger_ids: Optional[List[str]] = None, create_journals: bool = True,
+            incremental: bool = False,
+            progress_callback: Optional[Callable[[int, int, UnitOutcome], None]] = None) -> Dict[str, Any]:
+        """
+        Revalue every (company, ledger) unit concurrently.
+
+        Args:
+            company_codes: Company codes to revalue
+            revaluation_date: Date for revaluation calculations
+            fiscal_year: Fiscal year
+            fiscal_period: Fiscal period
+            run_type: Type of revaluation run
+            ledger_ids: Specific ledgers to revalue (None = all configured)
+            create_journals: Whether to create journal entries
+            incremental: Re-extract only accounts whose balance changed since their
+                last snapshot
+            progress_callback: Called in the calling thread as ``(done, total, outcome)``
+                after each unit finishes
+
+        Returns:
+            Consolidated result with per-company results and per-unit outcomes
+        """
+        started = time.perf_counter()
+        company_codes = list(dict.fromkeys(company_codes))
+        result = {
+            "status": "PENDING",
+            "revaluation_date": revaluation_date,
+            "fiscal_year": fiscal_year,
+            "fiscal_period": fiscal_period,
+            "run_type": run_type,
+            "incremental": incremental,
+            "workers": self.max_workers,
+            "executor": "process" if self.use_processes else "thread",
+            "units_total": 0,
+            "units_completed": 0,
+            "units_failed": 0,
+            "accounts_processed": 0,
+            "accounts_reextracted": 0,
+            "revaluations_created": 0,
+            "total_unrealized_gain": Decimal('0.00'),
+            "total_unrealized_loss": Decimal('0.00'),
+            "journal_documents": [],
+            "company_results": {},
+            "unit_outcomes": [],
+            "errors": []
+        }
+
+        units = self._get_units(company_codes, ledger_ids)
+        result["units_total"] = len(units)
+        configured = {unit.company_code for unit in units}
+        for company_code in company_codes:
+            if company_code not in configured:
+                result["errors"].append(f"{company_code}: No accounts configured for FX revaluation")
+
+        if not units:
+            result["status"] = "COMPLETED"
+            return result
+
+        # One run row per company code
+        run_ids = {}
+        for company_code in sorted(configured):
+            try:
+                run_ids[company_code] = self.service._create_revaluation_run(
+                    company_code, revaluation_date, fiscal_year, fiscal_period,
+                    run_type, self.service.system_user
+                )
+                self.service._update_run_status(run_ids[company_code], "RUNNING")
+            except Exception as e:
+                result["errors"].append(f"{company_code}: Could not create revaluation run: {e}")
+
+            result["company_results"][company_code] = self._new_company_result(
+                company_code, run_ids.get(company_code), revaluation_date,
+                fiscal_year, fiscal_period, run_type
+            )
+
+        units = {unit: accounts for unit, accounts in units.items() if unit.company_code in run_ids}
+        cube, historical_rates = self.service._load_revaluation_rates(
+            revaluation_date,
+            {account["account_currency"] for accounts in units.values() for account in accounts}
+        )
+
+        logger.info(f"FX revaluation of {len(units)} units across {len(run_ids)} company codes "
+                    f"with {self.max_workers} {result['executor']} workers")
+
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        executor_kwargs = {"initializer": _init_worker_process} if self.use_processes else {}
+        done = 0
+
+        with executor_class(max_workers=min(self.max_workers, len(units)), **executor_kwargs) as executor:
+            futures = {
+                executor.submit(
+                    _revalue_unit, unit, run_ids[unit.company_code], accounts,
+                    revaluation_date, fiscal_year, fiscal_period, create_journals,
+                    cube, historical_rates, self.max_retries, self.retry_delay_seconds,
+                    incremental
+                ): unit
+                for unit, accounts in units.items()
+            }
+
+            for future in as_completed(futures):
+                unit = futures[future]
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    outcome = UnitOutcome(unit=unit, status="FAILED", errors=[str(e)])
+
+                self._consolidate(result, outcome)
+                try:
+                    self._record_unit_progress(run_ids[unit.company_code], outcome)
+                except Exception as e:
+                    logger.error(f"Error recording progress for {unit}: {e}")
+
+                done += 1
+                if progress_callback:
+                    progress_callback(done, len(units), outcome)
+
+        self._complete_company_runs(result, run_ids)
+
+        result["status"] = "COMPLETED" if result["units_failed"] == 0 else (
+            "FAILED" if result["units_completed"] == 0 else "PARTIAL"
+        )
+        result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(f"FX revaluation finished in {result['elapsed_seconds']}s: "
+                    f"{result['units_completed']}/{result['units_total']} units completed")
+        return result
+
+    @staticmethod
+    def _consolidate(result: Dict[str, Any], outcome: UnitOutcome):
+        """Fold one unit outcome into the company and overall totals"""
+        company_result = result["company_results"][outcome.unit.company_code]
+        result["unit_outcomes"].append({
+            "company_code": outcome.unit.company_code,
+            "ledger_id": outcome.unit.ledger_id,
+            "status": outcome.status,
+            "attempts": outcome.attempts,
+            "elapsed_seconds": round(outcome.elapsed_seconds, 3),
+            "errors": outcome.errors
+        })
+
+        if outcome.status != "COMPLETED":
+            result["units_failed"] += 1
+            message = f"Error processing ledger {outcome.unit.ledger_id}: {outcome.errors[-1] if outcome.errors else 'unknown error'}"
+            company_result["errors"].append(message)
+            result["errors"].append(f"{outcome.unit.company_code}: {message}")
+            return
+
+        result["units_completed"] += 1
+        ledger_result = outcome.ledger_result
+        company_result["ledger_results"][outcome.unit.ledger_id] = ledger_result
+
+        for totals in (company_result, result):
+            totals["accounts_processed"] += ledger_result["accounts_processed"]
+            totals["accounts_reextracted"] += ledger_result["accounts_reextracted"]
+            totals["revaluations_created"] += ledger_result["revaluations_created"]
+            totals["total_unrealized_gain"] += ledger_result["total_unrealized_gain"]
+            totals["total_unrealized_loss"] += ledger_result["total_unrealized_loss"]
+            totals["journal_documents"].extend(ledger_result["journal_documents"])
+
+    def _complete_company_runs(self, result: Dict[str, Any], run_ids: Dict[str, int]):
+        """Mark each company's run row COMPLETED, or FAILED when none of its units succeeded"""
+        for company_code, run_id in run_ids.items():
+            company_result = result["company_results"][company_code]
+            outcomes = [o for o in result["unit_outcomes"] if o["company_code"] == company_code]
+            failed = all(o["status"] != "COMPLETED" for o in outcomes)
+
+            company_result["status"] = "FAILED" if failed else "COMPLETED"
+            company_result["completed_at"] = datetime.now()
+            if failed:
+                self.service._update_run_status(run_id, "FAILED", "\n".join(company_result["errors"]))
+            else:
+                self.service._update_run_status(run_id, "COMPLETED")
+
+
+def run_fx_revaluation_for_companies(company_codes: Iterable[str], revaluation_date: date,
+                                     fiscal_year: int, fiscal_period: int,
+                                     run_type: str = "PERIOD_END",
+                                     ledger_ids: Optional[List[str]] = None,
+                                     create_journals: bool = True,
+                                     incremental: bool = False,
+                                     max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Run FX revaluation for several company codes and ledgers concurrently."""
+    orchestrator = FXRevaluationOrchestrator(max_workers=max_workers)
+    return orchestrator.run(
+        company_codes, revaluation_date, fiscal_year, fiscal_period,
+        run_type=run_type, ledger_ids=ledger_ids, create_journals=create_journals,
+        incremental=incremental
+    )
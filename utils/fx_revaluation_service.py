@@ -16,14 +16,19 @@ Date: August 6, 2025
 """
 
 import logging
+import numpy as np
 from datetime import datetime, date
 from decimal import Decimal, ROUND_HALF_UP
 from typing import List, Dict, Optional, Tuple, Any
 from sqlalchemy import text
 from db_config import engine
 from utils.currency_service import CurrencyTranslationService
+from utils.fx_revaluation_engine import FXRevaluationEngine, FUNCTIONAL_CURRENCY
+from utils.rate_cube import RateCube
+from utils.report_cache import bump_data_versions
 from utils.workflow_engine import WorkflowEngine
 from utils.logger import get_logger
+from utils.pipeline_instrumentation import pipeline_instrumentation as instrumentation
 
 logger = get_logger("fx_revaluation_service")
 
@@ -33,6 +38,7 @@ class FXRevaluationService:
     def __init__(self):
         """Initialize the FX revaluation service."""
         self.currency_service = CurrencyTranslationService()
+        self.revaluation_engine = FXRevaluationEngine()
         self.workflow_engine = WorkflowEngine()
         self.system_user = "FX_REVALUATION_SERVICE"
         
@@ -40,7 +46,8 @@ class FXRevaluationService:
                           fiscal_year: int, fiscal_period: int,
                           run_type: str = "PERIOD_END", 
                           ledger_ids: Optional[List[str]] = None,
-                          create_journals: bool = True) -> Dict[str, Any]:
+                          create_journals: bool = True,
+                          incremental: bool = False) -> Dict[str, Any]:
         """
         Execute comprehensive FX revaluation run.
         
@@ -52,6 +59,8 @@ class FXRevaluationService:
             run_type: Type of revaluation run
             ledger_ids: Specific ledgers to revalue (None = all configured)
             create_journals: Whether to create journal entries
+            incremental: Re-extract only accounts whose balance changed since their
+                last snapshot (results are identical to a full run)
             
         Returns:
             Dictionary with revaluation results
@@ -63,9 +72,11 @@ class FXRevaluationService:
             "fiscal_year": fiscal_year,
             "fiscal_period": fiscal_period,
             "run_type": run_type,
+            "incremental": incremental,
             "started_at": datetime.now(),
             "status": "PENDING",
             "accounts_processed": 0,
+            "accounts_reextracted": 0,
             "revaluations_created": 0,
             "total_unrealized_gain": Decimal('0.00'),
             "total_unrealized_loss": Decimal('0.00'),
@@ -74,81 +85,120 @@ class FXRevaluationService:
             "ledger_results": {}
         }
         
-        try:
-            # Create revaluation run record
-            run_id = self._create_revaluation_run(
-                company_code, revaluation_date, fiscal_year, fiscal_period,
-                run_type, self.system_user
-            )
-            run_results["run_id"] = run_id
-            
-            # Update run status to RUNNING
-            self._update_run_status(run_id, "RUNNING")
-            
-            logger.info(f"Starting FX revaluation run {run_id} for {company_code} on {revaluation_date}")
-            
-            # Get configured accounts for revaluation
-            if ledger_ids:
-                accounts_config = self._get_revaluation_accounts_for_ledgers(
-                    company_code, ledger_ids
-                )
-            else:
-                accounts_config = self._get_all_revaluation_accounts(company_code)
-            
-            if not accounts_config:
-                run_results["status"] = "COMPLETED"
-                run_results["errors"].append("No accounts configured for FX revaluation")
-                return run_results
-            
-            logger.info(f"Processing {len(accounts_config)} accounts for FX revaluation")
-            
-            # Process each ledger separately
-            ledger_groups = self._group_accounts_by_ledger(accounts_config)
-            
-            for ledger_id, ledger_accounts in ledger_groups.items():
-                try:
-                    ledger_result = self._process_ledger_revaluation(
-                        run_id, company_code, ledger_id, ledger_accounts,
-                        revaluation_date, fiscal_year, fiscal_period,
-                        create_journals
+        with instrumentation.document("fx_revaluation", f"{company_code}/{fiscal_year}-{fiscal_period:02d}"):
+            try:
+                # Create revaluation run record
+                with instrumentation.phase("fx_revaluation", "run_setup"):
+                    run_id = self._create_revaluation_run(
+                        company_code, revaluation_date, fiscal_year, fiscal_period,
+                        run_type, self.system_user
                     )
+                    run_results["run_id"] = run_id
                     
-                    run_results["ledger_results"][ledger_id] = ledger_result
-                    run_results["accounts_processed"] += ledger_result["accounts_processed"]
-                    run_results["revaluations_created"] += ledger_result["revaluations_created"]
-                    run_results["total_unrealized_gain"] += ledger_result["total_unrealized_gain"]
-                    run_results["total_unrealized_loss"] += ledger_result["total_unrealized_loss"]
-                    run_results["journal_documents"].extend(ledger_result["journal_documents"])
-                    
-                except Exception as e:
-                    error_msg = f"Error processing ledger {ledger_id}: {str(e)}"
-                    run_results["errors"].append(error_msg)
-                    logger.error(error_msg)
-            
-            # Update run with final results
-            self._finalize_revaluation_run(run_id, run_results)
-            
-            run_results["status"] = "COMPLETED"
-            run_results["completed_at"] = datetime.now()
-            
-            success_rate = (run_results["accounts_processed"] / len(accounts_config) * 100) if accounts_config else 0
-            logger.info(f"FX revaluation run {run_id} completed: {run_results['accounts_processed']}/{len(accounts_config)} accounts ({success_rate:.1f}%)")
-            
-        except Exception as e:
-            run_results["status"] = "FAILED"
-            run_results["errors"].append(f"Revaluation run failed: {str(e)}")
-            logger.error(f"FX revaluation run failed: {e}")
-            
-            if run_results["run_id"]:
-                self._update_run_status(run_results["run_id"], "FAILED", str(e))
+                    # Update run status to RUNNING
+                    self._update_run_status(run_id, "RUNNING")
+                
+                logger.info(f"Starting FX revaluation run {run_id} for {company_code} on {revaluation_date}")
+                
+                # Get configured accounts for revaluation
+                with instrumentation.phase("fx_revaluation", "accounts_config"):
+                    if ledger_ids:
+                        accounts_config = self._get_revaluation_accounts_for_ledgers(
+                            company_code, ledger_ids
+                        )
+                    else:
+                        accounts_config = self._get_all_revaluation_accounts(company_code)
+                
+                if not accounts_config:
+                    run_results["status"] = "COMPLETED"
+                    run_results["errors"].append("No accounts configured for FX revaluation")
+                    return run_results
+                
+                logger.info(f"Processing {len(accounts_config)} accounts for FX revaluation")
+                
+                # Closing and historical rates for every account currency, loaded once per run
+                with instrumentation.phase("fx_revaluation", "rates"):
+                    cube, historical_rates = self._load_revaluation_rates(
+                        revaluation_date, {account["account_currency"] for account in accounts_config}
+                    )
+                
+                # Process each ledger separately
+                ledger_groups = self._group_accounts_by_ledger(accounts_config)
+                
+                for ledger_id, ledger_accounts in ledger_groups.items():
+                    try:
+                        ledger_result = self._process_ledger_revaluation(
+                            run_id, company_code, ledger_id, ledger_accounts,
+                            revaluation_date, fiscal_year, fiscal_period,
+                            create_journals, cube, historical_rates,
+                            incremental=incremental
+                        )
+                        
+                        run_results["ledger_results"][ledger_id] = ledger_result
+                        run_results["accounts_processed"] += ledger_result["accounts_processed"]
+                        run_results["accounts_reextracted"] += ledger_result["accounts_reextracted"]
+                        run_results["revaluations_created"] += ledger_result["revaluations_created"]
+                        run_results["total_unrealized_gain"] += ledger_result["total_unrealized_gain"]
+                        run_results["total_unrealized_loss"] += ledger_result["total_unrealized_loss"]
+                        run_results["journal_documents"].extend(ledger_result["journal_documents"])
+                        
+                    except Exception as e:
+                        error_msg = f"Error processing ledger {ledger_id}: {str(e)}"
+                        run_results["errors"].append(error_msg)
+                        logger.error(error_msg)
+                
+                # Update run with final results
+                with instrumentation.phase("fx_revaluation", "finalize"):
+                    self._finalize_revaluation_run(run_id, run_results)
+                
+                run_results["status"] = "COMPLETED"
+                run_results["completed_at"] = datetime.now()
+                
+                success_rate = (run_results["accounts_processed"] / len(accounts_config) * 100) if accounts_config else 0
+                logger.info(f"FX revaluation run {run_id} completed: {run_results['accounts_processed']}/{len(accounts_config)} accounts ({success_rate:.1f}%)")
+                
+            except Exception as e:
+                run_results["status"] = "FAILED"
+                run_results["errors"].append(f"Revaluation run failed: {str(e)}")
+                logger.error(f"FX revaluation run failed: {e}")
+                
+                if run_results["run_id"]:
+                    self._update_run_status(run_results["run_id"], "FAILED", str(e))
         
         return run_results
     
+    def _load_revaluation_rates(self, revaluation_date: date,
+                                currencies: set) -> Tuple[RateCube, Dict[str, Decimal]]:
+        """Rate cube for the closing rates and historical rates per account currency."""
+        cube = self.revaluation_engine.load_cube(revaluation_date, currencies)
+        
+        # Historical rate: for simplicity the latest rate. In production, would use period
+        # opening rate or weighted average rate based on accounting policy
+        rate_keys = [(currency, FUNCTIONAL_CURRENCY, None) for currency in currencies]
+        historical = self.currency_service.get_exchange_rates(rate_keys)
+        historical_rates = {key[0]: historical.get(key) or Decimal('1.000000') for key in rate_keys}
+        
+        return cube, historical_rates
+    
     def _process_ledger_revaluation(self, run_id: int, company_code: str,
                                   ledger_id: str, accounts: List[Dict],
                                   revaluation_date: date, fiscal_year: int, 
-                                  fiscal_period: int, create_journals: bool) -> Dict[str, Any]:
-        """Process FX revaluation for a specific ledger."""
+                                  fiscal_period: int, create_journals: bool,
+                                  cube: Optional[RateCube] = None,
+                                  historical_rates: Optional[Dict[str, Decimal]] = None,
+                                  raise_errors: bool = False,
+                                  incremental: bool = False) -> Dict[str, Any]:
+        """
+        Process FX revaluation for a specific ledger.
+        
+        Balances of all accounts are extracted with one grouped query, revalued
+        vectorized against the rate cube and stored with one bulk insert.
+        With ``incremental`` only accounts whose balance may have changed since
+        their last snapshot are re-extracted; the others reuse the snapshot.
+        Every run refreshes the snapshots in fx_account_balances_history.
+        With ``raise_errors`` a failure propagates (after the detail insert has
+        rolled back) instead of returning a partial result, so callers can retry.
+        """
         ledger_result = {
             "ledger_id": ledger_id,
             "accounts_processed": 0,
@@ -156,225 +206,93 @@ class FXRevaluationService:
             "total_unrealized_gain": Decimal('0.00'),
             "total_unrealized_loss": Decimal('0.00'),
             "journal_documents": [],
-            "account_details": []
+            "account_details": [],
+            "accounts_reextracted": 0,
+            "accounts_balance_changed": 0,
+            "accounts_rate_changed": 0
         }
         
         try:
             logger.info(f"Processing {len(accounts)} accounts for ledger {ledger_id}")
             
-            for account_config in accounts:
-                try:
-                    account_result = self._process_account_revaluation(
-                        run_id, company_code, ledger_id, account_config,
-                        revaluation_date, fiscal_year, fiscal_period
+            if cube is None or historical_rates is None:
+                cube, historical_rates = self._load_revaluation_rates(
+                    revaluation_date, {account["account_currency"] for account in accounts}
+                )
+            
+            with engine.begin() as conn:
+                with instrumentation.phase("fx_revaluation", "extraction"):
+                    if incremental:
+                        exposure, reextracted, snapshots = self.revaluation_engine.extract_exposure_incremental(
+                            conn, company_code, ledger_id, accounts, revaluation_date
+                        )
+                    else:
+                        exposure = self.revaluation_engine.extract_exposure(
+                            conn, company_code, ledger_id, accounts, revaluation_date
+                        )
+                        snapshots = self.revaluation_engine.load_snapshots(
+                            conn, company_code, ledger_id, list(exposure.gl_accounts), revaluation_date
+                        )
+                        reextracted = np.ones(len(exposure), dtype=bool)
+                
+                with instrumentation.phase("fx_revaluation", "computation"):
+                    result = self.revaluation_engine.compute(
+                        exposure, cube, revaluation_date, historical_rates
                     )
+                    account_details = self.revaluation_engine.account_results(result)
+                
+                with instrumentation.phase("fx_revaluation", "details"):
+                    self.revaluation_engine.save_details(
+                        conn, run_id, company_code, ledger_id, account_details, result
+                    )
+                    self.revaluation_engine.save_snapshots(conn, result, account_details, snapshots)
+                
+                # Revaluation details change the period's report data. The version is bumped in
+                # the same transaction: a separate bump that failed would make the orchestrator
+                # retry a ledger whose details are already committed
+                bump_data_versions(conn, [(company_code, fiscal_year, fiscal_period)])
+            
+            ledger_result["accounts_reextracted"] = int(reextracted.sum())
+            ledger_result["accounts_balance_changed"] = int(
+                self.revaluation_engine.balance_changed(exposure, snapshots).sum()
+            )
+            ledger_result["accounts_rate_changed"] = int(
+                self.revaluation_engine.rate_changed(result, account_details, snapshots).sum()
+            )
+            
+            ledger_result["account_details"] = account_details
+            ledger_result["accounts_processed"] = len(account_details)
+            
+            for account_result in account_details:
+                if account_result["error_message"]:
+                    logger.error(f"Error processing account {account_result['gl_account']} revaluation: "
+                                 f"{account_result['error_message']}")
+                if account_result["revaluation_required"]:
+                    ledger_result["revaluations_created"] += 1
                     
-                    ledger_result["account_details"].append(account_result)
-                    ledger_result["accounts_processed"] += 1
-                    
-                    if account_result["revaluation_required"]:
-                        ledger_result["revaluations_created"] += 1
-                        
-                        if account_result["unrealized_gain_loss"] > 0:
-                            ledger_result["total_unrealized_gain"] += account_result["unrealized_gain_loss"]
-                        else:
-                            ledger_result["total_unrealized_loss"] += abs(account_result["unrealized_gain_loss"])
-                    
-                except Exception as e:
-                    logger.error(f"Error processing account {account_config['gl_account']}: {e}")
-                    continue
+                    if account_result["unrealized_gain_loss"] > 0:
+                        ledger_result["total_unrealized_gain"] += account_result["unrealized_gain_loss"]
+                    else:
+                        ledger_result["total_unrealized_loss"] += abs(account_result["unrealized_gain_loss"])
             
             # Create consolidated journal entry for the ledger if needed
             if create_journals and ledger_result["revaluations_created"] > 0:
-                journal_doc = self._create_fx_revaluation_journal(
-                    company_code, ledger_id, ledger_result["account_details"],
-                    revaluation_date, fiscal_year, fiscal_period
-                )
+                with instrumentation.phase("fx_revaluation", "journal"):
+                    journal_doc = self._create_fx_revaluation_journal(
+                        company_code, ledger_id, ledger_result["account_details"],
+                        revaluation_date, fiscal_year, fiscal_period
+                    )
                 
                 if journal_doc:
                     ledger_result["journal_documents"].append(journal_doc)
             
         except Exception as e:
             logger.error(f"Error processing ledger {ledger_id} revaluation: {e}")
+            if raise_errors:
+                raise
         
         return ledger_result
     
-    def _process_account_revaluation(self, run_id: int, company_code: str,
-                                   ledger_id: str, account_config: Dict,
-                                   revaluation_date: date, fiscal_year: int, 
-                                   fiscal_period: int) -> Dict[str, Any]:
-        """Process FX revaluation for a specific account."""
-        gl_account = account_config["gl_account"]
-        account_currency = account_config["account_currency"]
-        
-        account_result = {
-            "gl_account": gl_account,
-            "account_currency": account_currency,
-            "functional_currency": "USD",  # Default functional currency
-            "opening_balance_fc": Decimal('0.00'),
-            "current_balance_fc": Decimal('0.00'),
-            "opening_balance_func": Decimal('0.00'),
-            "historical_exchange_rate": Decimal('1.000000'),
-            "current_exchange_rate": Decimal('1.000000'),
-            "rate_difference": Decimal('0.000000'),
-            "current_balance_func_at_current_rate": Decimal('0.00'),
-            "unrealized_gain_loss": Decimal('0.00'),
-            "revaluation_required": False,
-            "error_message": None
-        }
-        
-        try:
-            # Get current account balance in foreign currency
-            current_balance_fc = self._get_account_balance(
-                company_code, ledger_id, gl_account, revaluation_date, account_currency
-            )
-            account_result["current_balance_fc"] = current_balance_fc
-            
-            if current_balance_fc == 0:
-                logger.debug(f"Account {gl_account} has zero balance, skipping revaluation")
-                return account_result
-            
-            # Get current exchange rate
-            current_rate = self.currency_service.get_exchange_rate(
-                account_currency, account_result["functional_currency"], revaluation_date
-            )
-            
-            if not current_rate:
-                account_result["error_message"] = f"No exchange rate found for {account_currency} to USD"
-                return account_result
-            
-            account_result["current_exchange_rate"] = current_rate
-            
-            # Get historical rate (using average rate for the period or opening rate)
-            historical_rate = self._get_historical_exchange_rate(
-                account_currency, account_result["functional_currency"], 
-                fiscal_year, fiscal_period
-            )
-            account_result["historical_exchange_rate"] = historical_rate
-            
-            # Calculate current balance in functional currency at current rate
-            current_balance_func_at_current_rate = current_balance_fc * current_rate
-            account_result["current_balance_func_at_current_rate"] = current_balance_func_at_current_rate
-            
-            # Get current balance in functional currency (historical rates)
-            current_balance_func_historical = self._get_account_balance_functional(
-                company_code, ledger_id, gl_account, revaluation_date
-            )
-            account_result["opening_balance_func"] = current_balance_func_historical
-            
-            # Calculate unrealized gain/loss
-            unrealized_gl = current_balance_func_at_current_rate - current_balance_func_historical
-            account_result["unrealized_gain_loss"] = unrealized_gl
-            account_result["rate_difference"] = current_rate - historical_rate
-            
-            # Determine if revaluation is required (threshold: $1.00 or 0.01%)
-            threshold_amount = Decimal('1.00')
-            threshold_percent = Decimal('0.0001')  # 0.01%
-            
-            if (abs(unrealized_gl) >= threshold_amount or 
-                abs(unrealized_gl / max(abs(current_balance_func_historical), Decimal('1.00'))) >= threshold_percent):
-                account_result["revaluation_required"] = True
-            
-            # Save revaluation detail to database
-            self._save_revaluation_detail(run_id, company_code, ledger_id, account_result)
-            
-        except Exception as e:
-            account_result["error_message"] = str(e)
-            logger.error(f"Error processing account {gl_account} revaluation: {e}")
-        
-        return account_result
-    
-    def _get_account_balance(self, company_code: str, ledger_id: str, 
-                           gl_account: str, balance_date: date, 
-                           currency_code: str) -> Decimal:
-        """Get account balance in foreign currency."""
-        try:
-            with engine.connect() as conn:
-                # Get balance from journal entry lines
-                query = text("""
-                    SELECT COALESCE(SUM(
-                        CASE 
-                            WHEN ga.accounttype IN ('ASSETS', 'EXPENSES') 
-                            THEN jel.debitamount - jel.creditamount
-                            ELSE jel.creditamount - jel.debitamount
-                        END
-                    ), 0) as balance
-                    FROM journalentryline jel
-                    JOIN journalentryheader jeh ON jel.documentnumber = jeh.documentnumber 
-                        AND jel.companycodeid = jeh.companycodeid
-                    JOIN glaccount ga ON jel.glaccountid = ga.glaccountid
-                    WHERE jel.companycodeid = :company_code
-                    AND jel.ledgerid = :ledger_id
-                    AND jel.glaccountid = :gl_account
-                    AND jel.currencycode = :currency_code
-                    AND jeh.postingdate <= :balance_date
-                    AND jeh.workflow_status = 'POSTED'
-                """)
-                
-                result = conn.execute(query, {
-                    "company_code": company_code,
-                    "ledger_id": ledger_id,
-                    "gl_account": gl_account,
-                    "currency_code": currency_code,
-                    "balance_date": balance_date
-                }).scalar()
-                
-                return Decimal(str(result)) if result else Decimal('0.00')
-                
-        except Exception as e:
-            logger.error(f"Error getting account balance: {e}")
-            return Decimal('0.00')
-    
-    def _get_account_balance_functional(self, company_code: str, ledger_id: str,
-                                      gl_account: str, balance_date: date) -> Decimal:
-        """Get account balance in functional currency (USD)."""
-        try:
-            with engine.connect() as conn:
-                # Get balance in USD (functional currency)
-                query = text("""
-                    SELECT COALESCE(SUM(
-                        CASE 
-                            WHEN ga.accounttype IN ('ASSETS', 'EXPENSES') 
-                            THEN jel.debitamount - jel.creditamount
-                            ELSE jel.creditamount - jel.debitamount
-                        END
-                    ), 0) as balance
-                    FROM journalentryline jel
-                    JOIN journalentryheader jeh ON jel.documentnumber = jeh.documentnumber 
-                        AND jel.companycodeid = jeh.companycodeid
-                    JOIN glaccount ga ON jel.glaccountid = ga.glaccountid
-                    WHERE jel.companycodeid = :company_code
-                    AND jel.ledgerid = :ledger_id
-                    AND jel.glaccountid = :gl_account
-                    AND jel.currencycode = 'USD'
-                    AND jeh.postingdate <= :balance_date
-                    AND jeh.workflow_status = 'POSTED'
-                """)
-                
-                result = conn.execute(query, {
-                    "company_code": company_code,
-                    "ledger_id": ledger_id,
-                    "gl_account": gl_account,
-                    "balance_date": balance_date
-                }).scalar()
-                
-                return Decimal(str(result)) if result else Decimal('0.00')
-                
-        except Exception as e:
-            logger.error(f"Error getting functional currency balance: {e}")
-            return Decimal('0.00')
-    
-    def _get_historical_exchange_rate(self, from_currency: str, to_currency: str,
-                                    fiscal_year: int, fiscal_period: int) -> Decimal:
-        """Get historical exchange rate for the period."""
-        try:
-            # For simplicity, use current rate. In production, would use period opening rate
-            # or weighted average rate based on accounting policy
-            return self.currency_service.get_exchange_rate(from_currency, to_currency) or Decimal('1.000000')
-        except Exception as e:
-            logger.error(f"Error getting historical exchange rate: {e}")
-            return Decimal('1.000000')
-    
     def _create_fx_revaluation_journal(self, company_code: str, ledger_id: str,
                                      account_details: List[Dict], revaluation_date: date,
                                      fiscal_year: int, fiscal_period: int) -> Optional[str]:
@@ -564,48 +482,6 @@ class FXRevaluationService:
         except Exception as e:
             logger.error(f"Error updating run status: {e}")
     
-    def _save_revaluation_detail(self, run_id: int, company_code: str, 
-                               ledger_id: str, account_result: Dict):
-        """Save revaluation detail to database."""
-        try:
-            with engine.connect() as conn:
-                query = text("""
-                    INSERT INTO fx_revaluation_details
-                    (run_id, company_code, ledger_id, gl_account, account_currency,
-                     functional_currency, opening_balance_fc, current_balance_fc,
-                     opening_balance_func, historical_exchange_rate, current_exchange_rate,
-                     rate_difference, current_balance_func_at_current_rate, 
-                     unrealized_gain_loss, revaluation_required, error_message)
-                    VALUES (:run_id, :company_code, :ledger_id, :gl_account, :account_currency,
-                            :functional_currency, :opening_balance_fc, :current_balance_fc,
-                            :opening_balance_func, :historical_exchange_rate, :current_exchange_rate,
-                            :rate_difference, :current_balance_func_at_current_rate,
-                            :unrealized_gain_loss, :revaluation_required, :error_message)
-                """)
-                
-                conn.execute(query, {
-                    "run_id": run_id,
-                    "company_code": company_code,
-                    "ledger_id": ledger_id,
-                    "gl_account": account_result["gl_account"],
-                    "account_currency": account_result["account_currency"],
-                    "functional_currency": account_result["functional_currency"],
-                    "opening_balance_fc": account_result["opening_balance_fc"],
-                    "current_balance_fc": account_result["current_balance_fc"],
-                    "opening_balance_func": account_result["opening_balance_func"],
-                    "historical_exchange_rate": account_result["historical_exchange_rate"],
-                    "current_exchange_rate": account_result["current_exchange_rate"],
-                    "rate_difference": account_result["rate_difference"],
-                    "current_balance_func_at_current_rate": account_result["current_balance_func_at_current_rate"],
-                    "unrealized_gain_loss": account_result["unrealized_gain_loss"],
-                    "revaluation_required": account_result["revaluation_required"],
-                    "error_message": account_result.get("error_message")
-                })
-                conn.commit()
-                
-        except Exception as e:
-            logger.error(f"Error saving revaluation detail: {e}")
-    
     def _finalize_revaluation_run(self, run_id: int, run_results: Dict):
         """Update revaluation run with final results."""
         try:
@@ -0,0 +1,273 @@
+"""
+FX Rate-Shock Scenario Engine
+Read-only what-if analysis of the unrealized gain/loss the next revaluation would produce
+
+The exposure of a company (every configured account of every ledger with its
+document-currency and functional balance) is loaded once into an
+``ExposureMatrix``. Scenarios are relative shocks to the closing rate of each
+account currency against the functional currency (0.05 = the currency gains 5%).
+All scenarios are evaluated together as matrix operations:
+
+    shocked rates      (scenarios x currencies) = base rates * (1 + shocks)
+    value at rate      (scenarios x accounts)   = balance_fc * shocked rate of the account currency
+    unrealized G/L     (scenarios x accounts)   = value at rate - functional balance
+    impact             (scenarios x accounts)   = unrealized G/L - unrealized G/L at base rates
+    ledger impact      (scenarios x ledgers)    = impact @ account-to-ledger indicator matrix
+
+Rates are rounded to six decimals and amounts go through
+FXRevaluationEngine.unrealized_at_rates, the rounding of compute, so the zero-shock scenario reproduces the run's
+unrealized gain/loss. Nothing is written to the database.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+from db_config import engine
+from utils.fx_revaluation_engine import FXRevaluationEngine, fx_revaluation_engine
+from utils.fx_revaluation_service import FXRevaluationService
+from utils.rate_cube import RateCube, round_half_up
+from utils.logger import get_logger
+
+logger = get_logger("fx_scenario_engine")
+
+DEFAULT_SHOCKS = (-0.10, -0.05, -0.02, -0.01, 0.01, 0.02, 0.05, 0.10)
+
+ALL_CURRENCIES = "*"
+
+
+@dataclass
+class RateScenario:
+    """Relative closing-rate shocks by account currency (``ALL_CURRENCIES`` applies to the other foreign currencies)"""
+    name: str
+    shocks: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class ExposureMatrix:
+    """Revaluation exposure of a company as parallel account arrays"""
+    company_code: str
+    revaluation_date: date
+    functional_currency: str
+    ledger_ids: List[str]
+    currencies: List[str]
+    account_ledgers: np.ndarray
+    gl_accounts: np.ndarray
+    account_currencies: np.ndarray
+    ledger_index: np.ndarray
+    currency_index: np.ndarray
+    balance_fc: np.ndarray
+    balance_func: np.ndarray
+    base_rates: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.gl_accounts)
+
+    @property
+    def revalued(self) -> np.ndarray:
+        """Accounts a revaluation would store: non-zero balance with a closing rate"""
+        return (self.balance_fc != 0) & ~np.isnan(self.base_rates[self.currency_index])
+
+
+@dataclass
+class ScenarioResult:
+    """Outcome of evaluating scenarios against one exposure matrix"""
+    exposure: ExposureMatrix
+    scenarios: List[RateScenario]
+    shocked_rates: np.ndarray
+    base_unrealized: np.ndarray
+    unrealized: np.ndarray
+    impact: np.ndarray
+    ledger_impact: np.ndarray
+    total_impact: np.ndarray
+
+    def scenario_summary(self) -> List[Dict]:
+        """One row per scenario with the total and per-ledger P&L impact"""
+        rows = []
+        for s, scenario in enumerate(self.scenarios):
+            row = {
+                "scenario": scenario.name,
+                "unrealized_gain_loss": round(float(self.unrealized[s].sum()), 2),
+                "impact": round(float(self.total_impact[s]), 2)
+            }
+            for l, ledger_id in enumerate(self.exposure.ledger_ids):
+                row[f"impact_{ledger_id}"] = round(float(self.ledger_impact[s, l]), 2)
+            rows.append(row)
+        return rows
+
+    def ledger_impacts(self) -> List[Dict]:
+        """One row per scenario and ledger"""
+        return [
+            {
+                "scenario": scenario.name,
+                "ledger_id": ledger_id,
+                "impact": round(float(self.ledger_impact[s, l]), 2)
+            }
+            for s, scenario in enumerate(self.scenarios)
+            for l, ledger_id in enumerate(self.exposure.ledger_ids)
+        ]
+
+    def account_impacts(self, scenario_index: int, include_unaffected: bool = False) -> List[Dict]:
+        """Per-account detail of one scenario"""
+        exposure = self.exposure
+        rows = []
+        for i in range(len(exposure)):
+            impact = float(self.impact[scenario_index, i])
+            if not include_unaffected and impact == 0:
+                continue
+            rows.append({
+                "ledger_id": exposure.account_ledgers[i],
+                "gl_account": exposure.gl_accounts[i],
+                "account_currency": exposure.account_currencies[i],
+                "balance_fc": float(exposure.balance_fc[i]),
+                "balance_func": float(exposure.balance_func[i]),
+                "base_rate": float(exposure.base_rates[exposure.currency_index[i]]),
+                "shocked_rate": float(self.shocked_rates[scenario_index, exposure.currency_index[i]]),
+                "base_unrealized": float(self.base_unrealized[i]),
+                "unrealized": float(self.unrealized[scenario_index, i]),
+                "impact": impact
+            })
+        return rows
+
+
+class FXScenarioEngine:
+    """Evaluates rate-shock scenarios against a company's revaluation exposure"""
+
+    def __init__(self, revaluation_engine: Optional[FXRevaluationEngine] = None,
+                 service: Optional[FXRevaluationService] = None):
+        self.revaluation_engine = revaluation_engine or fx_revaluation_engine
+        self.service = service or FXRevaluationService()
+
+    def load_exposure(self, company_code: str, revaluation_date: date,
+                      ledger_ids: Optional[List[str]] = None,
+                      cube: Optional[RateCube] = None) -> ExposureMatrix:
+        """
+        Load balances and closing rates of every configured account
+
+        Args:
+            company_code: Company code
+            revaluation_date: Balance and closing rate date
+            ledger_ids: Specific ledgers (None = all configured)
+            cube: Rate cube containing ``revaluation_date`` (loaded when omitted)
+
+        Returns:
+            ExposureMatrix (empty when no accounts are configured)
+        """
+        if ledger_ids:
+            accounts = self.service._get_revaluation_accounts_for_ledgers(company_code, ledger_ids)
+        else:
+            accounts = self.service._get_all_revaluation_accounts(company_code)
+
+        ledger_groups = self.service._group_accounts_by_ledger(accounts)
+        exposures = []
+        with engine.connect() as conn:
+            for ledger_id, ledger_accounts in ledger_groups.items():
+                exposures.append(self.revaluation_engine.extract_exposure(
+                    conn, company_code, ledger_id, ledger_accounts, revaluation_date
+                ))
+
+        functional = self.revaluation_engine.functional_currency
+        currencies = sorted({account["account_currency"] for account in accounts})
+        if cube is None and currencies:
+            cube = self.revaluation_engine.load_cube(revaluation_date, currencies)
+
+        base_rates = np.empty(0, dtype=np.float64)
+        if currencies:
+            rates, _ = cube.lookup(np.array(currencies, dtype=object), functional,
+                                   np.array([revaluation_date] * len(currencies), dtype=object))
+            base_rates = round_half_up(rates, 6)
+
+        ledgers = list(ledger_groups.keys())
+        positions = {currency: k for k, currency in enumerate(currencies)}
+
+        def concat(arrays, dtype):
+            return np.concatenate(arrays).astype(dtype) if arrays else np.empty(0, dtype=dtype)
+
+        account_currencies = concat([e.account_currencies for e in exposures], object)
+        return ExposureMatrix(
+            company_code=company_code,
+            revaluation_date=revaluation_date,
+            functional_currency=functional,
+            ledger_ids=ledgers,
+            currencies=currencies,
+            account_ledgers=concat([np.full(len(e), e.ledger_id, dtype=object) for e in exposures], object),
+            gl_accounts=concat([e.gl_accounts for e in exposures], object),
+            account_currencies=account_currencies,
+            ledger_index=concat([np.full(len(e), l) for l, e in enumerate(exposures)], np.int64),
+            currency_index=np.array([positions[c] for c in account_currencies], dtype=np.int64),
+            balance_fc=concat([e.balance_fc for e in exposures], np.float64),
+            balance_func=concat([e.balance_func for e in exposures], np.float64),
+            base_rates=base_rates
+        )
+
+    @staticmethod
+    def shock_matrix(exposure: ExposureMatrix, scenarios: Sequence[RateScenario]) -> np.ndarray:
+        """
+        Relative shocks as a (scenarios x currencies) matrix
+
+        ``ALL_CURRENCIES`` shocks every foreign currency; accounts kept in the
+        functional currency have a fixed rate of 1 and are never shocked by it.
+        """
+        shocks = np.zeros((len(scenarios), len(exposure.currencies)), dtype=np.float64)
+        foreign = np.array([currency != exposure.functional_currency for currency in exposure.currencies],
+                           dtype=bool)
+        for s, scenario in enumerate(scenarios):
+            if ALL_CURRENCIES in scenario.shocks:
+                shocks[s, foreign] = scenario.shocks[ALL_CURRENCIES]
+            for k, currency in enumerate(exposure.currencies):
+                if currency in scenario.shocks:
+                    shocks[s, k] = scenario.shocks[currency]
+        return shocks
+
+    def _unrealized(self, exposure: ExposureMatrix, rates: np.ndarray) -> np.ndarray:
+        """Unrealized G/L for rate rows shaped (..., currencies); zero where nothing is revalued"""
+        _, unrealized = FXRevaluationEngine.unrealized_at_rates(
+            exposure.balance_fc, exposure.balance_func, rates[..., exposure.currency_index])
+        return np.where(exposure.revalued, unrealized, 0.0)
+
+    def evaluate(self, exposure: ExposureMatrix, scenarios: Sequence[RateScenario]) -> ScenarioResult:
+        """Evaluate every scenario against the exposure in one pass"""
+        scenarios = list(scenarios)
+        shocked_rates = round_half_up(exposure.base_rates[np.newaxis, :] *
+                                      (1.0 + self.shock_matrix(exposure, scenarios)), 6)
+
+        base_unrealized = self._unrealized(exposure, exposure.base_rates)
+        unrealized = self._unrealized(exposure, shocked_rates)
+        impact = unrealized - base_unrealized
+
+        indicator = np.zeros((len(exposure), len(exposure.ledger_ids)), dtype=np.float64)
+        indicator[np.arange(len(exposure)), exposure.ledger_index] = 1.0
+        ledger_impact = impact @ indicator
+
+        return ScenarioResult(
+            exposure=exposure,
+            scenarios=scenarios,
+            shocked_rates=shocked_rates,
+            base_unrealized=base_unrealized,
+            unrealized=unrealized,
+            impact=impact,
+            ledger_impact=ledger_impact,
+            total_impact=impact.sum(axis=1)
+        )
+
+    def run(self, company_code: str, revaluation_date: date, scenarios: Sequence[RateScenario],
+            ledger_ids: Optional[List[str]] = None) -> ScenarioResult:
+        """Load the exposure and evaluate the scenarios"""
+        exposure = self.load_exposure(company_code, revaluation_date, ledger_ids)
+        logger.info(f"Evaluating {len(scenarios)} FX scenarios over {len(exposure)} accounts "
+                    f"for {company_code} on {revaluation_date}")
+        return self.evaluate(exposure, scenarios)
+
+
+def currency_shock_grid(currencies: Iterable[str],
+                        shocks: Sequence[float] = DEFAULT_SHOCKS,
+                        include_all: bool = True) -> List[RateScenario]:
+    """Single-currency scenarios for every currency and shock, plus uniform shocks of all currencies"""
+    scenarios = [RateScenario("Base", {})]
+    for currency in currencies:
+        for shock in shocks:
+            scenarios.append(RateScenario(f"{currency} {shock * 100:+g}%", {currency: shock}))
+    if include_all:
+        for shock in shocks:
+            scenarios.append(RateScenario(f"All {shock * 100:+g}%", {ALL_CURRENCIES: shock}))
+    return scenarios
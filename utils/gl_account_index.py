@@ -0,0 +1,190 @@
+"""
+GL Account Master Index
+Process-wide, versioned in-memory index of glaccount and account_groups
+
+The index is loaded once and answers existence, account type, field status group,
+deletion flag and reconciliation type lookups without touching the database.
+Writers to the chart of accounts call ``invalidate_gl_account_index()`` which bumps
+the version counter; the next lookup reloads the index.
+
+Edits made by other processes are picked up by a periodic refresh (``max_age_seconds``)
+and by a rate-limited reload when a lookup misses an account.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import text
+from db_config import engine
+from utils.logger import get_logger
+
+logger = get_logger("gl_account_index")
+
+
+@dataclass(frozen=True)
+class GLAccountInfo:
+    """Posting-relevant attributes of one GL account"""
+    gl_account: str
+    account_name: Optional[str]
+    account_type: Optional[str]
+    account_class: Optional[str]
+    account_group_code: Optional[str]
+    field_status_group: Optional[str]
+    reconciliation_type: Optional[str]
+    marked_for_deletion: bool
+    blocked_for_posting: bool
+
+    @property
+    def is_active(self) -> bool:
+        return not self.marked_for_deletion
+
+
+@dataclass(frozen=True)
+class AccountGroupInfo:
+    """Number range and defaults of one account group"""
+    group_code: str
+    group_name: Optional[str]
+    account_class: Optional[str]
+    number_range_from: Optional[str]
+    number_range_to: Optional[str]
+    default_field_status_group: Optional[str]
+    is_active: bool
+
+
+class GLAccountIndex:
+    """Versioned in-memory GL account master index"""
+
+    def __init__(self, max_age_seconds: int = 600, miss_refresh_interval: int = 30):
+        self.max_age_seconds = max_age_seconds
+        self.miss_refresh_interval = miss_refresh_interval
+        self._lock = threading.RLock()
+        self._accounts: Dict[str, GLAccountInfo] = {}
+        self._groups: Dict[str, AccountGroupInfo] = {}
+        self._version = 0
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._last_miss_refresh = 0.0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump_version(self) -> int:
+        """Mark the index stale; the next lookup reloads it"""
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def refresh(self):
+        """Reload accounts and account groups from the database"""
+        with self._lock:
+            version = self._version
+            with engine.connect() as conn:
+                account_rows = conn.execute(text("""
+                    SELECT ga.glaccountid, ga.accountname, ga.accounttype, ga.account_class,
+                           ga.account_group_code,
+                           COALESCE(ga.field_status_group, ag.default_field_status_group),
+                           ga.reconciliation_account_type,
+                           COALESCE(ga.marked_for_deletion, FALSE),
+                           COALESCE(ga.blocked_for_posting, FALSE)
+                    FROM glaccount ga
+                    LEFT JOIN account_groups ag ON ag.group_code = ga.account_group_code
+                """)).fetchall()
+
+                group_rows = conn.execute(text("""
+                    SELECT group_code, group_name, account_class, number_range_from,
+                           number_range_to, default_field_status_group, COALESCE(is_active, FALSE)
+                    FROM account_groups
+                """)).fetchall()
+
+            self._accounts = {
+                str(row[0]): GLAccountInfo(str(row[0]), *row[1:7], bool(row[7]), bool(row[8]))
+                for row in account_rows
+            }
+            self._groups = {
+                row[0]: AccountGroupInfo(row[0], *row[1:6], bool(row[6]))
+                for row in group_rows
+            }
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+
+            logger.info(f"GL account index loaded: {len(self._accounts)} accounts, "
+                        f"{len(self._groups)} groups (version {version})")
+
+    def _ensure_loaded(self):
+        if (self._loaded_version != self._version or
+                time.monotonic() - self._loaded_at > self.max_age_seconds):
+            with self._lock:
+                if (self._loaded_version != self._version or
+                        time.monotonic() - self._loaded_at > self.max_age_seconds):
+                    self.refresh()
+
+    def get(self, gl_account: str) -> Optional[GLAccountInfo]:
+        """Look up one account"""
+        self._ensure_loaded()
+        return self._accounts.get(str(gl_account))
+
+    def get_many(self, gl_accounts: Iterable[str]) -> Dict[str, GLAccountInfo]:
+        """Look up many accounts; unknown accounts are left out of the result"""
+        self._ensure_loaded()
+        accounts = self._accounts
+        return {str(acc): accounts[str(acc)] for acc in gl_accounts if str(acc) in accounts}
+
+    def exists(self, gl_account: str) -> bool:
+        return self.get(gl_account) is not None
+
+    def find_missing(self, gl_accounts: Iterable[str]) -> List[str]:
+        """
+        Return the accounts that do not exist, in input order
+
+        A miss may mean the account was created by another process, so the index
+        is reloaded once (at most every ``miss_refresh_interval`` seconds) before
+        an account is reported missing.
+        """
+        self._ensure_loaded()
+        candidates = [str(acc) for acc in gl_accounts]
+        missing = [acc for acc in candidates if acc not in self._accounts]
+
+        if missing and time.monotonic() - self._last_miss_refresh > self.miss_refresh_interval:
+            with self._lock:
+                self._last_miss_refresh = time.monotonic()
+                self.refresh()
+            missing = [acc for acc in missing if acc not in self._accounts]
+
+        return missing
+
+    def get_group(self, group_code: str) -> Optional[AccountGroupInfo]:
+        """Look up one account group"""
+        self._ensure_loaded()
+        return self._groups.get(group_code)
+
+    def accounts_in_group(self, group_code: str, active_only: bool = True) -> List[GLAccountInfo]:
+        """All accounts assigned to an account group"""
+        self._ensure_loaded()
+        return [
+            info for info in self._accounts.values()
+            if info.account_group_code == group_code and (info.is_active or not active_only)
+        ]
+
+    def get_statistics(self) -> Dict[str, int]:
+        return {
+            "version": self._version,
+            "loaded_version": self._loaded_version,
+            "accounts": len(self._accounts),
+            "account_groups": len(self._groups)
+        }
+
+
+# Process-wide instance
+gl_account_index = GLAccountIndex()
+
+
+def get_gl_account_index() -> GLAccountIndex:
+    """Get the process-wide GL account index"""
+    return gl_account_index
+
+
+def invalidate_gl_account_index() -> int:
+    """Bump the index version after any change to glaccount or account_groups"""
+    return gl_account_index.bump_version()
@@ -6,16 +6,30 @@ This module handles the posting of approved journal entries to the General Ledge
 creating actual GL transactions and maintaining account balances.
 """
 
+import uuid
 from datetime import datetime, date
 from typing import List, Dict, Optional, Tuple, Any
 from decimal import Decimal
+import numpy as np
+import pandas as pd
 from sqlalchemy import text
 from db_config import engine
 from utils.logger import get_logger
 from utils.workflow_engine import WorkflowEngine
+from utils.sql_helpers import execute_multi_row_insert
+from utils.gl_account_index import gl_account_index
+from utils.period_summary import PeriodSummaryService
+from utils.report_cache import bump_data_versions
+from utils.pipeline_instrumentation import pipeline_instrumentation as instrumentation
 
 logger = get_logger("gl_posting_engine")
 
+# Documents posted per transaction in bulk mode
+BULK_POSTING_BATCH_SIZE = 500
+
+# Key of one gl_account_balances row
+BALANCE_KEY_COLUMNS = ["company_code", "gl_account", "ledger_id", "fiscal_year", "posting_period"]
+
 class GLPostingEngine:
     """
     Enterprise General Ledger Posting Engine
@@ -43,40 +57,46 @@ class GLPostingEngine:
             
             logger.info(f"Starting GL posting for document {journal_doc_number}")
             
-            with engine.begin() as conn:
+            with instrumentation.document("gl_posting", journal_doc_number), engine.begin() as conn:
                 # 1. VALIDATION PHASE
-                validation_result = GLPostingEngine._validate_posting_eligibility(
-                    conn, journal_doc_number, company_code, posting_date, posted_by
-                )
+                with instrumentation.phase("gl_posting", "validation"):
+                    validation_result = GLPostingEngine._validate_posting_eligibility(
+                        conn, journal_doc_number, company_code, posting_date, posted_by
+                    )
                 if not validation_result[0]:
                     return False, validation_result[1]
                 
                 journal_data = validation_result[2]
                 
                 # 2. CREATE POSTING DOCUMENT HEADER
-                doc_id = GLPostingEngine._create_posting_document(
-                    conn, journal_data, posted_by, posting_date
-                )
+                with instrumentation.phase("gl_posting", "header"):
+                    doc_id = GLPostingEngine._create_posting_document(
+                        conn, journal_data, posted_by, posting_date
+                    )
                 
                 # 3. CREATE GL TRANSACTIONS
-                GLPostingEngine._create_gl_transactions(
-                    conn, doc_id, journal_data, posted_by, posting_date
-                )
+                with instrumentation.phase("gl_posting", "transactions"):
+                    GLPostingEngine._create_gl_transactions(
+                        conn, doc_id, journal_data, posted_by, posting_date
+                    )
                 
                 # 4. UPDATE ACCOUNT BALANCES
-                GLPostingEngine._update_account_balances(
-                    conn, journal_data, posting_date
-                )
+                with instrumentation.phase("gl_posting", "balances"):
+                    GLPostingEngine._update_account_balances(
+                        conn, journal_data, posting_date
+                    )
                 
                 # 5. UPDATE SOURCE DOCUMENT STATUS
-                GLPostingEngine._update_journal_entry_status(
-                    conn, journal_doc_number, company_code, posted_by, posting_date
-                )
+                with instrumentation.phase("gl_posting", "status"):
+                    GLPostingEngine._update_journal_entry_status(
+                        conn, journal_doc_number, company_code, posted_by, posting_date
+                    )
                 
                 # 6. CREATE AUDIT TRAIL
-                GLPostingEngine._create_posting_audit_trail(
-                    conn, doc_id, journal_data, posted_by, posting_date
-                )
+                with instrumentation.phase("gl_posting", "audit"):
+                    GLPostingEngine._create_posting_audit_trail(
+                        conn, doc_id, journal_data, posted_by, posting_date
+                    )
                 
                 logger.info(f"Document {journal_doc_number} posted successfully")
                 return True, f"Document {journal_doc_number} posted successfully to GL"
@@ -87,7 +107,9 @@ class GLPostingEngine:
     
     @staticmethod
     def post_multiple_journal_entries(journal_doc_numbers: List[str], company_code: str,
-                                    posted_by: str, posting_date: date = None) -> Dict[str, Any]:
+                                    posted_by: str, posting_date: date = None,
+                                    bulk_mode: bool = False,
+                                    batch_size: int = BULK_POSTING_BATCH_SIZE) -> Dict[str, Any]:
         """
         Batch posting of multiple journal entries
         
@@ -96,6 +118,9 @@ class GLPostingEngine:
             company_code: Company code
             posted_by: User performing the posting
             posting_date: Optional posting date
+            bulk_mode: Validate and write each batch with set-based statements
+                instead of posting document by document
+            batch_size: Documents per transaction in bulk mode
             
         Returns:
             Dictionary with batch posting results
@@ -108,22 +133,28 @@ class GLPostingEngine:
             "batch_start_time": datetime.now()
         }
         
-        for doc_number in journal_doc_numbers:
-            success, message = GLPostingEngine.post_journal_entry(
-                doc_number, company_code, posted_by, posting_date
+        # A repeated document number is posted once; the repeats are reported as failures
+        journal_doc_numbers, duplicates = GLPostingEngine._split_duplicate_documents(journal_doc_numbers)
+        for doc_number in duplicates:
+            GLPostingEngine._record_batch_result(
+                results, doc_number, False, f"Duplicate document number {doc_number} in batch"
             )
+        
+        if bulk_mode:
+            if posting_date is None:
+                posting_date = date.today()
             
-            if success:
-                results["posted_successfully"] += 1
-                results["success_documents"].append({
-                    "document": doc_number,
-                    "message": message
-                })
-            else:
-                results["failed_documents"].append({
-                    "document": doc_number,
-                    "error": message
-                })
+            for start in range(0, len(journal_doc_numbers), batch_size):
+                GLPostingEngine._post_batch_bulk(
+                    journal_doc_numbers[start:start + batch_size], company_code,
+                    posted_by, posting_date, results
+                )
+        else:
+            for doc_number in journal_doc_numbers:
+                success, message = GLPostingEngine.post_journal_entry(
+                    doc_number, company_code, posted_by, posting_date
+                )
+                GLPostingEngine._record_batch_result(results, doc_number, success, message)
         
         results["batch_end_time"] = datetime.now()
         results["batch_duration"] = (results["batch_end_time"] - results["batch_start_time"]).total_seconds()
@@ -131,6 +162,344 @@ class GLPostingEngine:
         logger.info(f"Batch posting completed: {results['posted_successfully']}/{results['total_documents']} successful")
         return results
     
+    @staticmethod
+    def simulate_posting(journal_doc_numbers: List[str], company_code: str, posted_by: str,
+                         posting_date: date = None) -> Dict[str, Any]:
+        """
+        Simulate posting a set of documents without writing anything
+        
+        Runs the same validation as bulk posting, aggregates the balance deltas of
+        all valid documents in one vectorized pass and projects them onto the current
+        gl_account_balances rows. Runs on a read-only transaction.
+        
+        Args:
+            journal_doc_numbers: Documents to simulate
+            company_code: Company code
+            posted_by: User who would perform the posting (for segregation of duties)
+            posting_date: Optional posting date
+            
+        Returns:
+            Dictionary with per-document validation results, projected balances per
+            account/ledger/period and the trial balance impact per ledger/period
+        """
+        if posting_date is None:
+            posting_date = date.today()
+        
+        simulation = {
+            "total_documents": len(journal_doc_numbers),
+            "valid_documents": [],
+            "failed_documents": [],
+            "projected_balances": [],
+            "trial_balance_impact": [],
+            "simulated_at": datetime.now()
+        }
+        
+        journal_doc_numbers, duplicates = GLPostingEngine._split_duplicate_documents(journal_doc_numbers)
+        simulation["failed_documents"] = [
+            {"document": doc_number, "error": f"Duplicate document number {doc_number} in batch"}
+            for doc_number in duplicates
+        ]
+        
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SET TRANSACTION READ ONLY"))
+                
+                valid_documents, failures = GLPostingEngine._validate_batch_posting_eligibility(
+                    conn, journal_doc_numbers, company_code, posting_date, posted_by, lock_rows=False
+                )
+                simulation["valid_documents"] = [doc["header"]["document_number"] for doc in valid_documents]
+                simulation["failed_documents"] += [
+                    {"document": doc_number, "error": error} for doc_number, error in failures.items()
+                ]
+                
+                if not valid_documents:
+                    return simulation
+                
+                deltas = GLPostingEngine._aggregate_balance_deltas_frame(valid_documents)
+                
+                current = pd.DataFrame(conn.execute(text("""
+                    SELECT company_code, gl_account, ledger_id, fiscal_year, posting_period,
+                           COALESCE(period_debits, 0), COALESCE(period_credits, 0),
+                           COALESCE(ending_balance, 0), COALESCE(ytd_balance, 0),
+                           COALESCE(transaction_count, 0)
+                    FROM gl_account_balances
+                    WHERE company_code = :cc AND fiscal_year = ANY(:years)
+                    AND gl_account = ANY(:accounts)
+                """), {
+                    "cc": company_code,
+                    "years": sorted(int(y) for y in deltas["fiscal_year"].unique()),
+                    "accounts": sorted(deltas["gl_account"].unique())
+                }).fetchall(), columns=BALANCE_KEY_COLUMNS + [
+                    "current_period_debits", "current_period_credits", "current_ending_balance",
+                    "current_ytd_balance", "current_transaction_count"
+                ])
+        except Exception as e:
+            logger.error(f"Error simulating posting: {e}")
+            simulation["error"] = str(e)
+            return simulation
+        
+        projected = deltas.merge(current, on=BALANCE_KEY_COLUMNS, how="left")
+        for column in ["current_period_debits", "current_period_credits",
+                       "current_ending_balance", "current_ytd_balance"]:
+            projected[column] = (projected[column].fillna(0).astype(float) * 100).round().astype("int64")
+        projected["current_transaction_count"] = projected["current_transaction_count"].fillna(0).astype("int64")
+        
+        projected["projected_period_debits"] = projected["current_period_debits"] + projected["debit_cents"]
+        projected["projected_period_credits"] = projected["current_period_credits"] + projected["credit_cents"]
+        projected["net_change"] = projected["debit_cents"] - projected["credit_cents"]
+        projected["projected_ending_balance"] = projected["current_ending_balance"] + projected["net_change"]
+        projected["projected_ytd_balance"] = projected["current_ytd_balance"] + projected["net_change"]
+        projected["projected_transaction_count"] = (
+            projected["current_transaction_count"] + projected["transaction_count"]
+        )
+        
+        output = projected.rename(columns={"debit_cents": "delta_debits", "credit_cents": "delta_credits"})
+        money_columns = [
+            "delta_debits", "delta_credits", "net_change",
+            "current_period_debits", "current_period_credits", "current_ending_balance", "current_ytd_balance",
+            "projected_period_debits", "projected_period_credits", "projected_ending_balance",
+            "projected_ytd_balance"
+        ]
+        output[money_columns] = output[money_columns] / 100.0
+        simulation["projected_balances"] = output.to_dict("records")
+        
+        impact = projected.groupby(["ledger_id", "fiscal_year", "posting_period"], as_index=False).agg(
+            total_debits=("debit_cents", "sum"),
+            total_credits=("credit_cents", "sum"),
+            accounts_affected=("gl_account", "nunique")
+        )
+        impact["balanced"] = impact["total_debits"] == impact["total_credits"]
+        impact["total_debits"] = impact["total_debits"] / 100.0
+        impact["total_credits"] = impact["total_credits"] / 100.0
+        simulation["trial_balance_impact"] = impact.to_dict("records")
+        
+        return simulation
+    
+    @staticmethod
+    def _split_duplicate_documents(doc_numbers: List[str]) -> Tuple[List[str], List[str]]:
+        """Split document numbers into (first occurrences in order, repeated occurrences)"""
+        
+        unique, duplicates, seen = [], [], set()
+        for doc_number in doc_numbers:
+            if doc_number in seen:
+                duplicates.append(doc_number)
+            else:
+                seen.add(doc_number)
+                unique.append(doc_number)
+        return unique, duplicates
+    
+    @staticmethod
+    def _record_batch_result(results: Dict[str, Any], doc_number: str, success: bool, message: str):
+        """Record the outcome of one document in a batch results dictionary"""
+        
+        if success:
+            results["posted_successfully"] += 1
+            results["success_documents"].append({
+                "document": doc_number,
+                "message": message
+            })
+        else:
+            results["failed_documents"].append({
+                "document": doc_number,
+                "error": message
+            })
+    
+    @staticmethod
+    def _new_batch_id(prefix: str) -> str:
+        """
+        Audit trail batch id: prefix, timestamp and a random suffix
+        
+        Several batches start within the same second, so the timestamp alone
+        does not tell them apart.
+        """
+        return f"{prefix}{datetime.now().strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:8].upper()}"
+    
+    @staticmethod
+    def _post_batch_bulk(doc_numbers: List[str], company_code: str, posted_by: str,
+                         posting_date: date, results: Dict[str, Any]):
+        """
+        Post one batch of documents in a single transaction using set-based statements
+        
+        Documents that fail validation are reported individually and skipped. If the
+        bulk write itself fails, the batch is rolled back and retried one document at a
+        time so that a single bad document cannot fail the others.
+        """
+        batch_id = GLPostingEngine._new_batch_id("BULK")
+        
+        try:
+            with engine.begin() as conn:
+                posted, failures = GLPostingEngine._post_documents_bulk(
+                    conn, doc_numbers, company_code, posted_by, posting_date, batch_id
+                )
+        except Exception as e:
+            logger.warning(f"Bulk posting of batch {batch_id} failed, retrying documents individually: {e}")
+            for doc_number in doc_numbers:
+                success, message = GLPostingEngine.post_journal_entry(
+                    doc_number, company_code, posted_by, posting_date
+                )
+                GLPostingEngine._record_batch_result(results, doc_number, success, message)
+            return
+        
+        for doc_number in doc_numbers:
+            if doc_number in posted:
+                GLPostingEngine._record_batch_result(
+                    results, doc_number, True, f"Document {doc_number} posted successfully to GL"
+                )
+            else:
+                GLPostingEngine._record_batch_result(results, doc_number, False, failures[doc_number])
+        
+        logger.info(f"Bulk batch {batch_id}: {len(posted)}/{len(doc_numbers)} documents posted")
+    
+    @staticmethod
+    def _post_documents_bulk(conn, doc_numbers: List[str], company_code: str, posted_by: str,
+                             posting_date: date, batch_id: str) -> Tuple[set, Dict[str, str]]:
+        """
+        Validate and write a batch of documents on an open transaction
+        
+        Returns:
+            Tuple of (set of posted document numbers, {document: error} for failures)
+        """
+        with instrumentation.document("gl_posting_bulk", batch_id):
+            with instrumentation.phase("gl_posting_bulk", "validation"):
+                valid_documents, failures = GLPostingEngine._validate_batch_posting_eligibility(
+                    conn, doc_numbers, company_code, posting_date, posted_by
+                )
+            
+            if valid_documents:
+                with instrumentation.phase("gl_posting_bulk", "header"):
+                    doc_ids = GLPostingEngine._create_posting_documents_bulk(
+                        conn, valid_documents, posted_by, posting_date
+                    )
+                with instrumentation.phase("gl_posting_bulk", "transactions"):
+                    GLPostingEngine._create_gl_transactions_bulk(
+                        conn, doc_ids, valid_documents, posted_by, posting_date
+                    )
+                with instrumentation.phase("gl_posting_bulk", "balances"):
+                    GLPostingEngine._update_account_balances_bulk(
+                        conn, valid_documents, posting_date
+                    )
+                with instrumentation.phase("gl_posting_bulk", "status"):
+                    GLPostingEngine._update_journal_entry_status_bulk(
+                        conn, [doc["header"]["document_number"] for doc in valid_documents],
+                        company_code, posted_by, posting_date
+                    )
+                with instrumentation.phase("gl_posting_bulk", "audit"):
+                    GLPostingEngine._create_posting_audit_trail_bulk(
+                        conn, doc_ids, valid_documents, posted_by, posting_date, batch_id
+                    )
+        
+        return {doc["header"]["document_number"] for doc in valid_documents}, failures
+    
+    @staticmethod
+    def _validate_batch_posting_eligibility(conn, doc_numbers: List[str], company_code: str,
+                                            posting_date: date, posted_by: str,
+                                            lock_rows: bool = True) -> Tuple[List[Dict], Dict[str, str]]:
+        """
+        Set-based version of _validate_posting_eligibility for a batch of documents
+        
+        Applies the same checks, in the same order and with the same messages, using
+        one query each for headers, period controls and lines; GL accounts are
+        checked against the in-memory account index. Header rows are locked unless
+        ``lock_rows`` is False (read-only simulation).
+        
+        Returns:
+            Tuple of (journal_data list for valid documents, {document: error} for failures)
+        """
+        lock_clause = "FOR UPDATE" if lock_rows else ""
+        headers = {
+            row[0]: row for row in conn.execute(text(f"""
+                SELECT jeh.documentnumber, jeh.companycodeid, jeh.workflow_status,
+                       jeh.postingdate, jeh.fiscalyear, jeh.period, jeh.currencycode,
+                       jeh.createdby, jeh.posted_at, jeh.posted_by, jeh.document_type
+                FROM journalentryheader jeh
+                WHERE jeh.companycodeid = :cc AND jeh.documentnumber = ANY(:docs)
+                ORDER BY jeh.documentnumber
+                {lock_clause}
+            """), {"cc": company_code, "docs": list(doc_numbers)})
+        }
+        
+        fiscal_years = sorted({row[4] for row in headers.values() if row[4] is not None})
+        periods = {
+            (row[0], row[1]): row for row in conn.execute(text("""
+                SELECT fiscal_year, posting_period, period_status, allow_posting
+                FROM fiscal_period_controls
+                WHERE company_code = :cc AND fiscal_year = ANY(:years)
+            """), {"cc": company_code, "years": fiscal_years})
+        } if fiscal_years else {}
+        
+        lines_by_doc = {}
+        for line in conn.execute(text("""
+            SELECT jel.documentnumber, jel.linenumber, jel.glaccountid, jel.debitamount,
+                   jel.creditamount, jel.description, jel.business_unit_code, jel.ledgerid,
+                   jel.currencycode, jel.business_area_id
+            FROM journalentryline jel
+            WHERE jel.companycodeid = :cc AND jel.documentnumber = ANY(:docs)
+            ORDER BY jel.documentnumber, jel.linenumber
+        """), {"cc": company_code, "docs": list(headers.keys())}):
+            lines_by_doc.setdefault(line[0], []).append(tuple(line[1:]))
+        
+        accounts = sorted({line[1] for lines in lines_by_doc.values() for line in lines})
+        missing_accounts = set(gl_account_index.find_missing(accounts))
+        
+        valid_documents = []
+        failures = {}
+        
+        # Each document is validated once, so its balance deltas can never be applied twice
+        for doc_number in dict.fromkeys(doc_numbers):
+            journal_row = headers.get(doc_number)
+            if not journal_row:
+                failures[doc_number] = "Journal entry not found"
+                continue
+            
+            if journal_row[2] != 'APPROVED':
+                failures[doc_number] = f"Document not approved (status: {journal_row[2]})"
+                continue
+            
+            if journal_row[8] is not None:
+                failures[doc_number] = f"Document already posted on {journal_row[8]} by {journal_row[9]}"
+                continue
+            
+            fiscal_year, period = journal_row[4], journal_row[5]
+            period_row = periods.get((fiscal_year, period))
+            if not period_row:
+                failures[doc_number] = f"Period {period}/{fiscal_year} not configured"
+                continue
+            
+            if period_row[2] != 'OPEN' or not period_row[3]:
+                failures[doc_number] = f"Period {period}/{fiscal_year} is closed for posting"
+                continue
+            
+            if posted_by == journal_row[7]:
+                failures[doc_number] = "Cannot post your own journal entry (Segregation of Duties)"
+                continue
+            
+            lines = lines_by_doc.get(doc_number)
+            if not lines:
+                failures[doc_number] = "No journal entry lines found"
+                continue
+            
+            total_debit = sum(Decimal(line[2] or 0) for line in lines)
+            total_credit = sum(Decimal(line[3] or 0) for line in lines)
+            
+            if total_debit != total_credit:
+                failures[doc_number] = f"Document not balanced: Debits {total_debit} != Credits {total_credit}"
+                continue
+            
+            if total_debit == 0:
+                failures[doc_number] = "Document has zero amount"
+                continue
+            
+            missing_account = next((line[1] for line in lines if line[1] in missing_accounts), None)
+            if missing_account is not None:
+                failures[doc_number] = f"GL Account {missing_account} does not exist"
+                continue
+            
+            valid_documents.append(
+                GLPostingEngine._build_journal_data(journal_row, lines, total_debit, total_credit)
+            )
+        
+        return valid_documents, failures
+    
     @staticmethod
     def _validate_posting_eligibility(conn, journal_doc_number: str, company_code: str,
                                     posting_date: date, posted_by: str) -> Tuple[bool, str, Optional[Dict]]:
@@ -140,11 +509,13 @@ class GLPostingEngine:
         journal_result = conn.execute(text("""
             SELECT jeh.documentnumber, jeh.companycodeid, jeh.workflow_status,
                    jeh.postingdate, jeh.fiscalyear, jeh.period, jeh.currencycode,
-                   jeh.createdby, jeh.posted_at, jeh.posted_by
+                   jeh.createdby, jeh.posted_at, jeh.posted_by, jeh.document_type
             FROM journalentryheader jeh
             WHERE jeh.documentnumber = :doc AND jeh.companycodeid = :cc
+            FOR UPDATE
         """), {"doc": journal_doc_number, "cc": company_code})
         
+        # The row lock makes the posted_at check below safe against concurrent posters
         journal_row = journal_result.fetchone()
         if not journal_row:
             return False, "Journal entry not found", None
@@ -181,7 +552,8 @@ class GLPostingEngine:
         # Get journal lines for balance validation
         lines_result = conn.execute(text("""
             SELECT jel.linenumber, jel.glaccountid, jel.debitamount, jel.creditamount,
-                   jel.description, jel.business_unit_code, jel.ledgerid, jel.currencycode
+                   jel.description, jel.business_unit_code, jel.ledgerid, jel.currencycode,
+                   jel.business_area_id
             FROM journalentryline jel
             WHERE jel.documentnumber = :doc AND jel.companycodeid = :cc
             ORDER BY jel.linenumber
@@ -201,20 +573,21 @@ class GLPostingEngine:
         if total_debit == 0:
             return False, "Document has zero amount", None
         
-        # Validate GL accounts exist and are posting-enabled
-        for line in lines:
-            gl_account = line[1]
-            account_result = conn.execute(text("""
-                SELECT glaccountid, accountname, accounttype
-                FROM glaccount
-                WHERE glaccountid = :account
-            """), {"account": gl_account})
-            
-            if not account_result.fetchone():
-                return False, f"GL Account {gl_account} does not exist", None
+        # Validate GL accounts exist (answered from the in-memory account index)
+        missing_accounts = gl_account_index.find_missing(line[1] for line in lines)
+        if missing_accounts:
+            return False, f"GL Account {missing_accounts[0]} does not exist", None
         
         # Package journal data for posting
-        journal_data = {
+        journal_data = GLPostingEngine._build_journal_data(journal_row, lines, total_debit, total_credit)
+        
+        return True, "Validation successful", journal_data
+    
+    @staticmethod
+    def _build_journal_data(journal_row, lines, total_debit: Decimal, total_credit: Decimal) -> Dict:
+        """Package a validated header row and its lines for posting"""
+        
+        return {
             "header": {
                 "document_number": journal_row[0],
                 "company_code": journal_row[1],
@@ -223,6 +596,7 @@ class GLPostingEngine:
                 "period": journal_row[5],
                 "currency_code": journal_row[6],
                 "created_by": journal_row[7],
+                "document_type": journal_row[10],
                 "total_debit": total_debit,
                 "total_credit": total_credit
             },
@@ -235,13 +609,12 @@ class GLPostingEngine:
                     "description": line[4],
                     "business_unit": line[5],
                     "ledger_id": line[6] or '0L',  # Default ledger
-                    "currency_code": line[7]
+                    "currency_code": line[7],
+                    "business_area": line[8]
                 }
                 for line in lines
             ]
         }
-        
-        return True, "Validation successful", journal_data
     
     @staticmethod
     def _create_posting_document(conn, journal_data: Dict, posted_by: str, posting_date: date) -> int:
@@ -322,45 +695,130 @@ class GLPostingEngine:
     
     @staticmethod
     def _update_account_balances(conn, journal_data: Dict, posting_date: date):
-        """Update GL account balances"""
+        """Update GL account balances and the dimensional period summary"""
         
-        header = journal_data["header"]
+        GLPostingEngine._apply_balance_deltas(
+            conn, GLPostingEngine._aggregate_balance_deltas([journal_data]), posting_date
+        )
+        PeriodSummaryService.apply_deltas(
+            conn, PeriodSummaryService.aggregate_deltas([journal_data])
+        )
+    
+    @staticmethod
+    def _aggregate_balance_deltas(documents: List[Dict]) -> List[Dict]:
+        """
+        Collapse journal lines into one balance delta per
+        (company, account, ledger, fiscal year, period)
         
-        for line in journal_data["lines"]:
-            # Insert or update account balance
-            conn.execute(text("""
-                INSERT INTO gl_account_balances (
-                    company_code, gl_account, ledger_id, fiscal_year, posting_period,
-                    beginning_balance, period_debits, period_credits, ending_balance,
-                    ytd_debits, ytd_credits, ytd_balance, last_updated, last_posting_date,
-                    transaction_count
-                ) VALUES (
-                    :company_code, :gl_account, :ledger_id, :fiscal_year, :period,
-                    0, :debit_amount, :credit_amount, :debit_amount - :credit_amount,
-                    :debit_amount, :credit_amount, :debit_amount - :credit_amount,
-                    CURRENT_TIMESTAMP, :posting_date, 1
-                )
+        ``transaction_count`` carries the number of lines folded into each delta so
+        the running count on gl_account_balances stays identical to line-by-line
+        posting. Deltas are returned in key order so that concurrent postings always
+        lock balance rows in the same sequence.
+        """
+        deltas = {}
+        
+        for doc in documents:
+            header = doc["header"]
+            for line in doc["lines"]:
+                key = (header["company_code"], line["gl_account"], line["ledger_id"],
+                       header["fiscal_year"], header["period"])
+                delta = deltas.get(key)
+                if delta is None:
+                    delta = deltas[key] = {
+                        "company_code": key[0],
+                        "gl_account": key[1],
+                        "ledger_id": key[2],
+                        "fiscal_year": key[3],
+                        "posting_period": key[4],
+                        "debit_amount": Decimal(0),
+                        "credit_amount": Decimal(0),
+                        "transaction_count": 0
+                    }
+                delta["debit_amount"] += line["debit_amount"]
+                delta["credit_amount"] += line["credit_amount"]
+                delta["transaction_count"] += 1
+        
+        return [deltas[key] for key in sorted(deltas)]
+    
+    @staticmethod
+    def _aggregate_balance_deltas_frame(documents: List[Dict]) -> pd.DataFrame:
+        """
+        Vectorized counterpart of _aggregate_balance_deltas
+        
+        Amounts are aggregated as integer cents so the sums are exact.
+        """
+        header_keys = []
+        accounts, ledgers, debits, credits = [], [], [], []
+        
+        for doc in documents:
+            header = doc["header"]
+            key = (header["company_code"], header["fiscal_year"], header["period"])
+            for line in doc["lines"]:
+                header_keys.append(key)
+                accounts.append(line["gl_account"])
+                ledgers.append(line["ledger_id"])
+                debits.append(int(line["debit_amount"] * 100))
+                credits.append(int(line["credit_amount"] * 100))
+        
+        lines = pd.DataFrame(header_keys, columns=["company_code", "fiscal_year", "posting_period"])
+        lines["gl_account"] = accounts
+        lines["ledger_id"] = ledgers
+        lines["debit_cents"] = np.asarray(debits, dtype=np.int64)
+        lines["credit_cents"] = np.asarray(credits, dtype=np.int64)
+        
+        return lines.groupby(BALANCE_KEY_COLUMNS, as_index=False, sort=True).agg(
+            debit_cents=("debit_cents", "sum"),
+            credit_cents=("credit_cents", "sum"),
+            transaction_count=("gl_account", "size")
+        )
+    
+    @staticmethod
+    def _apply_balance_deltas(conn, deltas: List[Dict], posting_date: date):
+        """Upsert pre-aggregated balance deltas, one row per balance key, and bump report data versions"""
+        
+        if not deltas:
+            return
+        
+        bump_data_versions(
+            conn, {(delta["company_code"], delta["fiscal_year"], delta["posting_period"]) for delta in deltas}
+        )
+        
+        rows = [
+            {
+                "company_code": delta["company_code"],
+                "gl_account": delta["gl_account"],
+                "ledger_id": delta["ledger_id"],
+                "fiscal_year": delta["fiscal_year"],
+                "posting_period": delta["posting_period"],
+                "beginning_balance": 0,
+                "period_debits": delta["debit_amount"],
+                "period_credits": delta["credit_amount"],
+                "ending_balance": delta["debit_amount"] - delta["credit_amount"],
+                "ytd_debits": delta["debit_amount"],
+                "ytd_credits": delta["credit_amount"],
+                "ytd_balance": delta["debit_amount"] - delta["credit_amount"],
+                "last_posting_date": posting_date,
+                "transaction_count": delta["transaction_count"]
+            }
+            for delta in deltas
+        ]
+        
+        execute_multi_row_insert(
+            conn, "gl_account_balances", list(rows[0].keys()), rows,
+            on_conflict="""
                 ON CONFLICT (company_code, gl_account, ledger_id, fiscal_year, posting_period)
                 DO UPDATE SET
-                    period_debits = gl_account_balances.period_debits + :debit_amount,
-                    period_credits = gl_account_balances.period_credits + :credit_amount,
-                    ending_balance = gl_account_balances.ending_balance + :debit_amount - :credit_amount,
-                    ytd_debits = gl_account_balances.ytd_debits + :debit_amount,
-                    ytd_credits = gl_account_balances.ytd_credits + :credit_amount,
-                    ytd_balance = gl_account_balances.ytd_balance + :debit_amount - :credit_amount,
+                    period_debits = gl_account_balances.period_debits + EXCLUDED.period_debits,
+                    period_credits = gl_account_balances.period_credits + EXCLUDED.period_credits,
+                    ending_balance = gl_account_balances.ending_balance + EXCLUDED.ending_balance,
+                    ytd_debits = gl_account_balances.ytd_debits + EXCLUDED.ytd_debits,
+                    ytd_credits = gl_account_balances.ytd_credits + EXCLUDED.ytd_credits,
+                    ytd_balance = gl_account_balances.ytd_balance + EXCLUDED.ytd_balance,
                     last_updated = CURRENT_TIMESTAMP,
-                    last_posting_date = :posting_date,
-                    transaction_count = gl_account_balances.transaction_count + 1
-            """), {
-                "company_code": header["company_code"],
-                "gl_account": line["gl_account"],
-                "ledger_id": line["ledger_id"],
-                "fiscal_year": header["fiscal_year"],
-                "period": header["period"],
-                "debit_amount": line["debit_amount"],
-                "credit_amount": line["credit_amount"],
-                "posting_date": posting_date
-            })
+                    last_posting_date = EXCLUDED.last_posting_date,
+                    transaction_count = gl_account_balances.transaction_count + EXCLUDED.transaction_count
+            """
+        )
     
     @staticmethod
     def _update_journal_entry_status(conn, journal_doc_number: str, company_code: str, posted_by: str, posting_date: date = None):
@@ -411,6 +869,124 @@ class GLPostingEngine:
             "total_amount": header["total_debit"]
         })
     
+    @staticmethod
+    def _create_posting_documents_bulk(conn, documents: List[Dict], posted_by: str,
+                                       posting_date: date) -> Dict[str, int]:
+        """Create posting document headers for a batch; returns {document_number: document_id}"""
+        
+        rows = [
+            {
+                "company_code": doc["header"]["company_code"],
+                "document_number": doc["header"]["document_number"],
+                "fiscal_year": doc["header"]["fiscal_year"],
+                "document_type": 'SA',
+                "source_system": 'GL',
+                "posting_date": posting_date,
+                "document_date": posting_date,
+                "document_currency": doc["header"]["currency_code"],
+                "total_debit": doc["header"]["total_debit"],
+                "total_credit": doc["header"]["total_credit"],
+                "source_document": doc["header"]["document_number"],
+                "source_document_type": 'JE',
+                "posted_by": posted_by
+            }
+            for doc in documents
+        ]
+        
+        returned = execute_multi_row_insert(
+            conn, "posting_documents", list(rows[0].keys()), rows,
+            returning="document_number, document_id"
+        )
+        return {row[0]: row[1] for row in returned}
+    
+    @staticmethod
+    def _create_gl_transactions_bulk(conn, doc_ids: Dict[str, int], documents: List[Dict],
+                                     posted_by: str, posting_date: date):
+        """Create GL transaction records for a batch with multi-row inserts"""
+        
+        rows = []
+        for doc in documents:
+            header = doc["header"]
+            for line in doc["lines"]:
+                rows.append({
+                    "document_id": doc_ids[header["document_number"]],
+                    "company_code": header["company_code"],
+                    "fiscal_year": header["fiscal_year"],
+                    "document_number": header["document_number"],
+                    "line_item": line["line_number"],
+                    "source_doc_number": header["document_number"],
+                    "source_doc_type": 'JE',
+                    "source_line_number": line["line_number"],
+                    "gl_account": line["gl_account"],
+                    "ledger_id": line["ledger_id"],
+                    "business_unit_id": line["business_unit"],
+                    "debit_amount": line["debit_amount"] if line["debit_amount"] > 0 else None,
+                    "credit_amount": line["credit_amount"] if line["credit_amount"] > 0 else None,
+                    "local_currency_amount": line["debit_amount"] - line["credit_amount"],
+                    "document_currency": line["currency_code"] or header["currency_code"] or 'USD',
+                    "posting_date": posting_date,
+                    "document_date": posting_date,
+                    "line_text": line["description"],
+                    "posting_period": header["period"],
+                    "posted_by": posted_by
+                })
+        
+        execute_multi_row_insert(conn, "gl_transactions", list(rows[0].keys()), rows)
+    
+    @staticmethod
+    def _update_account_balances_bulk(conn, documents: List[Dict], posting_date: date):
+        """Apply the balance and period summary deltas of a whole batch, aggregated across documents"""
+        
+        GLPostingEngine._apply_balance_deltas(
+            conn, GLPostingEngine._aggregate_balance_deltas(documents), posting_date
+        )
+        PeriodSummaryService.apply_deltas(
+            conn, PeriodSummaryService.aggregate_deltas(documents)
+        )
+    
+    @staticmethod
+    def _update_journal_entry_status_bulk(conn, doc_numbers: List[str], company_code: str,
+                                          posted_by: str, posting_date: date):
+        """Update a batch of journal entries to POSTED"""
+        
+        conn.execute(text("""
+            UPDATE journalentryheader 
+            SET workflow_status = 'POSTED',
+                postingdate = :posting_date,
+                posted_at = CURRENT_TIMESTAMP,
+                posted_by = :posted_by
+            WHERE companycodeid = :cc AND documentnumber = ANY(:docs)
+        """), {
+            "docs": doc_numbers,
+            "cc": company_code,
+            "posted_by": posted_by,
+            "posting_date": posting_date
+        })
+    
+    @staticmethod
+    def _create_posting_audit_trail_bulk(conn, doc_ids: Dict[str, int], documents: List[Dict],
+                                         posted_by: str, posting_date: date, batch_id: str):
+        """Create audit trail entries for a batch with multi-row inserts"""
+        
+        rows = [
+            {
+                "document_id": doc_ids[doc["header"]["document_number"]],
+                "source_document": doc["header"]["document_number"],
+                "company_code": doc["header"]["company_code"],
+                "action_type": 'POST',
+                "action_by": posted_by,
+                "fiscal_year": doc["header"]["fiscal_year"],
+                "posting_period": doc["header"]["period"],
+                "posting_date": posting_date,
+                "total_amount": doc["header"]["total_debit"],
+                "action_status": 'SUCCESS',
+                "batch_id": batch_id
+            }
+            for doc in documents
+        ]
+        
+        execute_multi_row_insert(conn, "posting_audit_trail", list(rows[0].keys()), rows)
+    
     @staticmethod
     def get_posting_eligible_documents(company_code: str = None) -> List[Dict]:
         """Get list of documents eligible for posting"""
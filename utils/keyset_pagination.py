@@ -0,0 +1,321 @@
+"""
+Keyset Pagination
+Fixed-size pages over journal listings with stable cursors
+
+A page is fetched with a row comparison against the sort key of the last
+(or first) row of the previous page instead of an OFFSET, so the database
+never reads the rows of earlier pages and page 500 costs the same as page 1.
+Cursors encode that sort key, so they stay valid while new documents are
+posted: a page never repeats or skips rows that existed when it was read.
+
+``KeysetPaginator`` is generic over a select list, a FROM clause and the
+sort keys. The sort keys must identify a row uniquely and be non-null, so
+nullable columns are sorted through COALESCE (document dates through
+``NULL_SORT_DATE``, which puts undated documents before every dated one in
+ascending order). The paginator selects the key expressions itself, so
+cursors always hold the values the seek condition compares. Two listings
+are provided:
+
+- ``GLLineListing``: journal lines ordered by (account, date, company,
+  document, line), with jump-to-account navigation and totals read from the
+  balance tables through the reporting engine. The lines carry their
+  header's document date, so the whole sort key is read from one index and
+  a page costs its own rows, regardless of its page number.
+- ``JOURNAL_HEADER_SORT_KEYS``: journal documents, newest first.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import pandas as pd
+from sqlalchemy import text
+from db_config import engine
+from utils.logger import get_logger
+from utils.reporting_engine import ReportFilter, reporting_engine
+
+logger = get_logger("keyset_pagination")
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 10000
+
+# Sort value of a missing document date (the keyset indexes use the same expression)
+NULL_SORT_DATE = "DATE '0001-01-01'"
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """One column of a listing's sort order"""
+    expression: str
+    name: str
+    descending: bool = False
+
+
+@dataclass
+class Page:
+    """One page of a listing"""
+    rows: pd.DataFrame
+    first_cursor: Optional[str]
+    last_cursor: Optional[str]
+    has_next: bool
+    has_previous: bool
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "n" in value:
+            return Decimal(value["n"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque, URL-safe cursor of a row's sort key values"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Sort key values of a cursor"""
+    try:
+        return [_decode_value(value) for value in json.loads(base64.urlsafe_b64decode(cursor.encode()))]
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {e}")
+
+
+class KeysetPaginator:
+    """Pages through a query in sort key order without OFFSET"""
+
+    def __init__(self, select: str, source: str, sort_keys: Sequence[SortKey],
+                 page_size: int = DEFAULT_PAGE_SIZE):
+        self.select = select
+        self.source = source
+        self.sort_keys = tuple(sort_keys)
+        self.page_size = page_size
+
+    def _seek_condition(self, values: Sequence[Any], backward: bool,
+                        params: Dict[str, Any]) -> str:
+        """Rows strictly after (or before) the given sort key values"""
+        if len(values) != len(self.sort_keys):
+            raise ValueError("Page cursor does not match the listing's sort order")
+
+        branches = []
+        for position, key in enumerate(self.sort_keys):
+            params[f"seek_{position}"] = values[position]
+            after = key.descending == backward
+            branch = [f"{k.expression} = :seek_{i}" for i, k in enumerate(self.sort_keys[:position])]
+            branch.append(f"{key.expression} {'>' if after else '<'} :seek_{position}")
+            branches.append(" AND ".join(branch))
+
+        # The bound on the leading key lets the planner start an index scan at the cursor
+        leading = self.sort_keys[0]
+        leading_after = leading.descending == backward
+        return (f"{leading.expression} {'>=' if leading_after else '<='} :seek_0 "
+                f"AND (({') OR ('.join(branches)}))")
+
+    def _order_by(self, backward: bool) -> str:
+        return ", ".join(
+            f"{key.expression} {'DESC' if key.descending != backward else 'ASC'}"
+            for key in self.sort_keys
+        )
+
+    def fetch_page(self, conditions: Optional[List[str]] = None, params: Optional[Dict[str, Any]] = None,
+                   after: Optional[str] = None, before: Optional[str] = None,
+                   start: Any = None, page_size: Optional[int] = None) -> Page:
+        """
+        Fetch one page
+
+        Args:
+            conditions: SQL conditions restricting the listing
+            params: Parameters of the conditions
+            after: Cursor of the row after which the page starts (next page)
+            before: Cursor of the row before which the page ends (previous page)
+            start: Start at the first row whose leading sort key is at or after this value
+            page_size: Rows per page (defaults to the paginator's page size)
+
+        Returns:
+            Page with its rows and the cursors of its first and last row
+        """
+        page_size = min(int(page_size or self.page_size), MAX_PAGE_SIZE)
+        params = dict(params or {})
+        where = list(conditions or [])
+        backward = before is not None
+
+        if after is not None and before is not None:
+            raise ValueError("Pass either after or before, not both")
+        probe_query = None
+        if after is not None or before is not None:
+            where.append(self._seek_condition(decode_cursor(after or before), backward, params))
+        elif start is not None:
+            leading = self.sort_keys[0]
+            params["seek_start"] = start
+            # One row before the start decides whether there is a previous page
+            before_start = f"{leading.expression} {'>' if leading.descending else '<'} :seek_start"
+            probe_query = f"""
+                SELECT 1
+                FROM {self.source}
+                WHERE {" AND ".join(where + [before_start])}
+                LIMIT 1
+            """
+            where.append(f"{leading.expression} {'<=' if leading.descending else '>='} :seek_start")
+
+        key_columns = [f"_sort_key_{position}" for position in range(len(self.sort_keys))]
+        key_select = ", ".join(
+            f"{key.expression} AS {column}" for key, column in zip(self.sort_keys, key_columns)
+        )
+        query = f"""
+            SELECT {self.select}, {key_select}
+            FROM {self.source}
+            WHERE {" AND ".join(where) if where else "TRUE"}
+            ORDER BY {self._order_by(backward)}
+            LIMIT :page_limit
+        """
+        params["page_limit"] = page_size + 1
+
+        with engine.connect() as conn:
+            df = pd.read_sql(text(query), conn, params=params)
+            rows_before_start = (probe_query is not None and
+                                 conn.execute(text(probe_query), params).first() is not None)
+
+        more = len(df) > page_size
+        df = df.head(page_size)
+        if backward:
+            df = df.iloc[::-1]
+        df = df.reset_index(drop=True)
+
+        if df.empty:
+            first_cursor = last_cursor = None
+        else:
+            first_cursor = encode_cursor(df.iloc[0][key_columns].tolist())
+            last_cursor = encode_cursor(df.iloc[-1][key_columns].tolist())
+        df = df.drop(columns=key_columns)
+
+        if backward:
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = after is not None or rows_before_start, more
+
+        return Page(rows=df, first_cursor=first_cursor, last_cursor=last_cursor,
+                    has_next=has_next, has_previous=has_previous)
+
+
+# Journal lines in general ledger order
+GL_LINE_SORT_KEYS = (
+    SortKey("jel.glaccountid", "glaccountid"),
+    SortKey(f"COALESCE(jel.documentdate, {NULL_SORT_DATE})", "documentdate"),
+    SortKey("jel.companycodeid", "companycodeid"),
+    SortKey("jel.documentnumber", "documentnumber"),
+    SortKey("jel.linenumber", "linenumber")
+)
+
+GL_LINE_SELECT = """
+    jel.glaccountid,
+    jel.documentdate,
+    jel.companycodeid,
+    jel.documentnumber,
+    jel.linenumber,
+    coa.accountname AS gl_description,
+    coa.accounttype,
+    jeh.fiscalyear,
+    jeh.period,
+    jel.debitamount,
+    jel.creditamount,
+    jel.description AS memo,
+    jel.business_unit_id,
+    jeh.reference,
+    jeh.createdby,
+    jeh.createdat
+"""
+
+GL_LINE_SOURCE = """
+    journalentryline jel
+    JOIN journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
+        AND jeh.companycodeid = jel.companycodeid
+    JOIN glaccount coa ON coa.glaccountid = jel.glaccountid
+"""
+
+# Journal documents, newest first
+JOURNAL_HEADER_SORT_KEYS = (
+    SortKey(f"COALESCE(documentdate, {NULL_SORT_DATE})", "documentdate", descending=True),
+    SortKey("documentnumber", "documentnumber"),
+    SortKey("companycodeid", "companycodeid")
+)
+
+
+class GLLineListing:
+    """Journal lines by (account, date, company, document, line) for ReportFilter selections"""
+
+    def __init__(self, page_size: int = DEFAULT_PAGE_SIZE):
+        self.paginator = KeysetPaginator(GL_LINE_SELECT, GL_LINE_SOURCE, GL_LINE_SORT_KEYS, page_size)
+
+    def _conditions(self, report_filter: ReportFilter) -> Tuple[List[str], Dict[str, Any]]:
+        params: Dict[str, Any] = {}
+        conditions = reporting_engine.header_conditions(report_filter, params)
+        conditions += reporting_engine.account_conditions(report_filter, params)
+        if not report_filter.include_unposted:
+            conditions.append("jeh.posted_at IS NOT NULL")
+        return conditions, params
+
+    def fetch_page(self, report_filter: ReportFilter, after: Optional[str] = None,
+                   before: Optional[str] = None, account: Optional[str] = None,
+                   page_size: Optional[int] = None) -> Page:
+        """
+        One page of journal lines
+
+        Args:
+            report_filter: Listing filter (the same filter drives ``totals``)
+            after: Cursor for the next page
+            before: Cursor for the previous page
+            account: Jump to the first line of this GL account (or the next account after it)
+            page_size: Rows per page
+        """
+        conditions, params = self._conditions(report_filter)
+        return self.paginator.fetch_page(conditions, params, after=after, before=before,
+                                         start=account, page_size=page_size)
+
+    def export_query(self, report_filter: ReportFilter) -> Tuple[str, Dict[str, Any]]:
+        """
+        Every line of the listing in page order, for streamed exports
+
+        Uses the same conditions as ``fetch_page`` and ``totals``, so an export
+        holds exactly the rows the pages and their totals describe.
+        """
+        conditions, params = self._conditions(report_filter)
+        return f"""
+            SELECT {GL_LINE_SELECT}
+            FROM {GL_LINE_SOURCE}
+            WHERE {" AND ".join(conditions) if conditions else "TRUE"}
+            ORDER BY {", ".join(key.expression for key in GL_LINE_SORT_KEYS)}
+        """, params
+
+    def totals(self, report_filter: ReportFilter) -> pd.DataFrame:
+        """
+        Per-account totals of the listing
+
+        Read from gl_account_balances (plus unposted lines) through the reporting
+        engine and its shared cache rather than by counting the listed lines.
+        """
+        return reporting_engine.account_totals(report_filter)
+
+
+# Process-wide listing used by the report pages
+gl_line_listing = GLLineListing()
@@ -100,7 +100,14 @@ class ParallelLedgerReportingService:
                 grand_total_debits = Decimal('0')
                 grand_total_credits = Decimal('0')
                 
-                for row in result:
+                # Translate every balance in one vectorized call
+                translations = None
+                if include_currency_translation and result:
+                    translations = self.currency_service.translate_amounts(
+                        [float(row[7]) for row in result], [row[8] for row in result], ledger_info[3]
+                    )
+                
+                for i, row in enumerate(result):
                     account_data = {
                         "account_id": row[0],
                         "account_name": row[1],
@@ -116,10 +123,10 @@ class ParallelLedgerReportingService:
                     
                     # Add currency translations if requested
                     if include_currency_translation and ledger_info[3] != row[8]:
-                        translated_balance = self.currency_service.translate_amount(
-                            Decimal(str(row[7])), row[8], ledger_info[3]
+                        account_data["translated_balance"] = (
+                            None if translations["rate_missing"][i]
+                            else float(translations["translated_amount"][i])
                         )
-                        account_data["translated_balance"] = float(translated_balance) if translated_balance else None
                         account_data["ledger_currency"] = ledger_info[3]
                     
                     accounts.append(account_data)
@@ -354,9 +361,14 @@ class ParallelLedgerReportingService:
                     ORDER BY gab.gl_account, l.isleadingledger DESC, gab.ledger_id
                 """), params).fetchall()
                 
+                # Translate non-USD ledger balances in one vectorized call
+                translations = self.currency_service.translate_amounts(
+                    [float(row[10]) for row in result], [row[6] for row in result], 'USD'
+                ) if result else None
+                
                 # Organize results by account
                 accounts_data = {}
-                for row in result:
+                for i, row in enumerate(result):
                     account_id = row[0]
                     if account_id not in accounts_data:
                         accounts_data[account_id] = {
@@ -369,11 +381,8 @@ class ParallelLedgerReportingService:
                     # Add currency translation if different currencies
                     ytd_balance = float(row[10])
                     translated_balance = None
-                    if row[6] != 'USD':  # Assuming USD as base currency
-                        translated_amount = self.currency_service.translate_amount(
-                            Decimal(str(ytd_balance)), row[6], 'USD'
-                        )
-                        translated_balance = float(translated_amount) if translated_amount else None
+                    if row[6] != 'USD' and not translations["rate_missing"][i]:  # Assuming USD as base currency
+                        translated_balance = float(translations["translated_amount"][i])
                     
                     accounts_data[account_id]["ledger_balances"].append({
                         "ledger_id": row[3],
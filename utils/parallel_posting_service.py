@@ -16,10 +16,17 @@ from sqlalchemy import text
 from db_config import engine
 from utils.currency_service import CurrencyTranslationService
 from utils.gl_posting_engine import GLPostingEngine
+from utils.period_summary import PeriodSummaryService
+from utils.sql_helpers import execute_multi_row_insert
+from utils.derivation_rule_matcher import derivation_rule_matcher
 from utils.logger import get_logger
+from utils.pipeline_instrumentation import pipeline_instrumentation as instrumentation
 
 logger = get_logger("parallel_posting_service")
 
+# Rounding applied to translated amounts (same as CurrencyTranslationService.translate_amount)
+TRANSLATION_QUANTIZER = Decimal('0.01')
+
 class ParallelPostingService:
     """Service for automated parallel ledger posting with currency translation."""
     
@@ -27,6 +34,7 @@ class ParallelPostingService:
         """Initialize the parallel posting service."""
         self.currency_service = CurrencyTranslationService()
         self.posting_engine = GLPostingEngine()
+        self.rule_matcher = derivation_rule_matcher
         self.system_user = "PARALLEL_POSTER"
         
     def process_approved_document_to_all_ledgers(self, document_number: str, 
@@ -53,74 +61,76 @@ class ParallelPostingService:
             "errors": []
         }
         
-        try:
-            # Get source ledger (leading ledger)
-            source_ledger = self._get_leading_ledger()
-            if not source_ledger:
-                results["errors"].append("No leading ledger configured")
-                return results
-                
-            results["source_ledger"] = source_ledger
-            
-            # Get all target ledgers for parallel posting
-            target_ledgers = self._get_parallel_ledgers(exclude_leading=True)
-            results["total_ledgers"] = len(target_ledgers)
-            
-            if not target_ledgers:
-                logger.info("No parallel ledgers configured - posting to source ledger only")
-                # Post to source ledger only
-                success, message = self._post_to_single_ledger(
-                    document_number, company_code, source_ledger
-                )
-                results["ledger_results"][source_ledger] = {
-                    "success": success,
-                    "message": message,
-                    "posted_lines": 0
-                }
-                results["successful_ledgers"] = 1 if success else 0
-                results["failed_ledgers"] = 0 if success else 1
-                return results
-            
-            logger.info(f"Processing document {document_number} for parallel posting to {len(target_ledgers)} ledgers")
-            
-            # Post to each target ledger using derivation rules
-            for target_ledger in target_ledgers:
-                try:
-                    ledger_result = self._process_parallel_posting_to_ledger(
-                        document_number, company_code, source_ledger, target_ledger
-                    )
-                    
-                    results["ledger_results"][target_ledger["ledgerid"]] = ledger_result
+        with instrumentation.document("parallel_posting", document_number):
+            try:
+                # Get source ledger (leading ledger) and target ledgers for parallel posting
+                with instrumentation.phase("parallel_posting", "ledger_config"):
+                    source_ledger = self._get_leading_ledger()
+                    target_ledgers = self._get_parallel_ledgers(exclude_leading=True)
+                if not source_ledger:
+                    results["errors"].append("No leading ledger configured")
+                    return results
                     
-                    if ledger_result["success"]:
-                        results["successful_ledgers"] += 1
-                        logger.info(f"Successfully posted to {target_ledger['ledgerid']}: {ledger_result['message']}")
-                    else:
-                        results["failed_ledgers"] += 1
-                        logger.error(f"Failed posting to {target_ledger['ledgerid']}: {ledger_result['message']}")
-                        
-                except Exception as e:
-                    error_msg = f"Error processing ledger {target_ledger['ledgerid']}: {str(e)}"
-                    results["ledger_results"][target_ledger["ledgerid"]] = {
-                        "success": False,
-                        "message": error_msg,
+                results["source_ledger"] = source_ledger
+                
+                results["total_ledgers"] = len(target_ledgers)
+                
+                if not target_ledgers:
+                    logger.info("No parallel ledgers configured - posting to source ledger only")
+                    # Post to source ledger only
+                    success, message = self._post_to_single_ledger(
+                        document_number, company_code, source_ledger
+                    )
+                    results["ledger_results"][source_ledger] = {
+                        "success": success,
+                        "message": message,
                         "posted_lines": 0
                     }
-                    results["failed_ledgers"] += 1
-                    logger.error(error_msg)
-            
-            # Update document status
-            if results["successful_ledgers"] > 0:
-                self._update_parallel_posting_status(document_number, company_code, results)
-            
-            # Log summary
-            success_rate = (results["successful_ledgers"] / results["total_ledgers"] * 100) if results["total_ledgers"] > 0 else 0
-            logger.info(f"Parallel posting complete: {results['successful_ledgers']}/{results['total_ledgers']} successful ({success_rate:.1f}%)")
-            
-        except Exception as e:
-            error_msg = f"Parallel posting error for {document_number}: {str(e)}"
-            results["errors"].append(error_msg)
-            logger.error(error_msg)
+                    results["successful_ledgers"] = 1 if success else 0
+                    results["failed_ledgers"] = 0 if success else 1
+                    return results
+                
+                logger.info(f"Processing document {document_number} for parallel posting to {len(target_ledgers)} ledgers")
+                
+                # Post to each target ledger using derivation rules
+                for target_ledger in target_ledgers:
+                    try:
+                        ledger_result = self._process_parallel_posting_to_ledger(
+                            document_number, company_code, source_ledger, target_ledger
+                        )
+                        
+                        results["ledger_results"][target_ledger["ledgerid"]] = ledger_result
+                        
+                        if ledger_result["success"]:
+                            results["successful_ledgers"] += 1
+                            logger.info(f"Successfully posted to {target_ledger['ledgerid']}: {ledger_result['message']}")
+                        else:
+                            results["failed_ledgers"] += 1
+                            logger.error(f"Failed posting to {target_ledger['ledgerid']}: {ledger_result['message']}")
+                            
+                    except Exception as e:
+                        error_msg = f"Error processing ledger {target_ledger['ledgerid']}: {str(e)}"
+                        results["ledger_results"][target_ledger["ledgerid"]] = {
+                            "success": False,
+                            "message": error_msg,
+                            "posted_lines": 0
+                        }
+                        results["failed_ledgers"] += 1
+                        logger.error(error_msg)
+                
+                # Update document status
+                if results["successful_ledgers"] > 0:
+                    with instrumentation.phase("parallel_posting", "status"):
+                        self._update_parallel_posting_status(document_number, company_code, results)
+                
+                # Log summary
+                success_rate = (results["successful_ledgers"] / results["total_ledgers"] * 100) if results["total_ledgers"] > 0 else 0
+                logger.info(f"Parallel posting complete: {results['successful_ledgers']}/{results['total_ledgers']} successful ({success_rate:.1f}%)")
+                
+            except Exception as e:
+                error_msg = f"Parallel posting error for {document_number}: {str(e)}"
+                results["errors"].append(error_msg)
+                logger.error(error_msg)
         
         return results
     
@@ -148,7 +158,8 @@ class ParallelPostingService:
         
         try:
             # Get source journal entry lines
-            source_lines = self._get_journal_entry_lines(document_number, company_code, source_ledger)
+            with instrumentation.phase("parallel_posting", "source_lines"):
+                source_lines = self._get_journal_entry_lines(document_number, company_code, source_ledger)
             if not source_lines:
                 result["message"] = "No source journal entry lines found"
                 return result
@@ -158,24 +169,31 @@ class ParallelPostingService:
             currency_translations = 0
             derivation_adjustments = 0
             
-            for source_line in source_lines:
-                parallel_line = self._apply_derivation_rules(
-                    source_line, source_ledger, target_ledger["ledgerid"]
+            with instrumentation.phase("parallel_posting", "derivation"):
+                derived_lines = self._apply_derivation_rules_batch(
+                    source_lines, source_ledger, target_ledger["ledgerid"]
                 )
+            
+            kept_lines = [
+                (source_line, parallel_line)
+                for source_line, parallel_line in zip(source_lines, derived_lines)
+                if parallel_line
+            ]
+            
+            # Apply currency translation if needed (one rate query per document)
+            with instrumentation.phase("parallel_posting", "translation"):
+                translated_lines = self._apply_currency_translation_batch(
+                    [parallel_line for _, parallel_line in kept_lines], target_ledger
+                )
+            
+            for (source_line, parallel_line), translated_line in zip(kept_lines, translated_lines):
+                if translated_line != parallel_line:
+                    currency_translations += 1
                 
-                if parallel_line:
-                    # Apply currency translation if needed
-                    translated_line = self._apply_currency_translation(
-                        parallel_line, target_ledger, source_line["posting_date"]
-                    )
-                    
-                    if translated_line != parallel_line:
-                        currency_translations += 1
-                    
-                    if translated_line["gl_account"] != source_line["gl_account"]:
-                        derivation_adjustments += 1
-                    
-                    parallel_lines.append(translated_line)
+                if translated_line["gl_account"] != source_line["gl_account"]:
+                    derivation_adjustments += 1
+                
+                parallel_lines.append(translated_line)
             
             if not parallel_lines:
                 result["message"] = "No lines generated after applying derivation rules"
@@ -187,9 +205,10 @@ class ParallelPostingService:
                 return result
             
             # Create parallel ledger journal entry
-            success, message = self._create_parallel_journal_entry(
-                document_number, company_code, target_ledger["ledgerid"], parallel_lines
-            )
+            with instrumentation.phase("parallel_posting", "write"):
+                success, message = self._create_parallel_journal_entry(
+                    document_number, company_code, target_ledger["ledgerid"], parallel_lines
+                )
             
             result["success"] = success
             result["message"] = message
@@ -203,6 +222,145 @@ class ParallelPostingService:
         
         return result
     
+    def process_approved_documents_bulk(self, document_numbers: List[str], company_code: str,
+                                        atomic: bool = True) -> Dict[str, Any]:
+        """
+        Fan a set of approved documents out to all parallel ledgers with set-based writes.
+        
+        Source headers and lines are read once for the whole set, derived and
+        translated in memory for every target ledger, and written with multi-row
+        inserts. Balance deltas are aggregated per account and period before the
+        upsert, as in GLPostingEngine.
+        
+        Args:
+            document_numbers: Journal entry document numbers
+            company_code: Company code
+            atomic: Write every ledger in one transaction (all or nothing). When
+                False each target ledger is written in its own transaction so a
+                failing ledger does not roll back the others.
+            
+        Returns:
+            Dictionary with per-document, per-ledger results and totals
+        """
+        results = {
+            "company_code": company_code,
+            "processed_at": datetime.now(),
+            "mode": "ATOMIC" if atomic else "PER_LEDGER",
+            "source_ledger": None,
+            "total_documents": len(document_numbers),
+            "total_ledgers": 0,
+            "documents": {},
+            "ledger_summary": {},
+            "errors": []
+        }
+        
+        with instrumentation.document("parallel_posting_bulk", f"{company_code}:{len(document_numbers)} docs"):
+            try:
+                with instrumentation.phase("parallel_posting_bulk", "ledger_config"):
+                    source_ledger = self._get_leading_ledger()
+                    target_ledgers = self._get_parallel_ledgers(exclude_leading=True)
+                if not source_ledger:
+                    results["errors"].append("No leading ledger configured")
+                    return results
+                
+                results["source_ledger"] = source_ledger
+                results["total_ledgers"] = len(target_ledgers)
+                
+                if not target_ledgers:
+                    results["errors"].append("No parallel ledgers configured")
+                    return results
+                
+                # Read all source documents and existing parallel entries once
+                with instrumentation.phase("parallel_posting_bulk", "source_lines"):
+                    with engine.connect() as conn:
+                        headers, source_lines = self._get_source_documents_bulk(
+                            conn, document_numbers, company_code, source_ledger
+                        )
+                        existing = self._get_existing_parallel_documents(
+                            conn, list(headers), company_code, [ledger["ledgerid"] for ledger in target_ledgers]
+                        )
+                
+                for doc_number in document_numbers:
+                    results["documents"][doc_number] = {
+                        "ledger_results": {},
+                        "total_ledgers": len(target_ledgers),
+                        "successful_ledgers": 0,
+                        "failed_ledgers": 0,
+                        "errors": [] if doc_number in headers else ["Original journal entry header not found"]
+                    }
+                
+                with instrumentation.phase("parallel_posting_bulk", "derivation"):
+                    derived = self.rule_matcher.derive_documents(
+                        source_lines, source_ledger, [ledger["ledgerid"] for ledger in target_ledgers]
+                    )
+                
+                # One rate query for every ledger, currency and posting date in the set
+                with instrumentation.phase("parallel_posting_bulk", "translation"):
+                    rates = self.currency_service.get_exchange_rates((
+                        (line["currency_code"], ledger["currencycode"], line["posting_date"])
+                        for ledger in target_ledgers
+                        for lines in derived[ledger["ledgerid"]].values()
+                        for line in lines if line and line["currency_code"] != ledger["currencycode"]
+                    ), allow_cross_rates=True)
+                    ledger_batches = {
+                        ledger["ledgerid"]: self._build_parallel_ledger_batch(
+                            ledger, headers, source_lines, derived[ledger["ledgerid"]],
+                            existing, company_code, rates, results
+                        )
+                        for ledger in target_ledgers
+                    }
+                
+                with instrumentation.phase("parallel_posting_bulk", "write"):
+                    if atomic:
+                        try:
+                            with engine.begin() as conn:
+                                for ledger_id, batch in ledger_batches.items():
+                                    self._write_parallel_ledger_batch(conn, company_code, ledger_id, batch)
+                        except Exception as e:
+                            error_msg = f"Bulk parallel posting failed, nothing was written: {str(e)}"
+                            logger.error(error_msg)
+                            results["errors"].append(error_msg)
+                            for ledger_id, batch in ledger_batches.items():
+                                self._fail_parallel_ledger_batch(results, ledger_id, batch, error_msg)
+                    else:
+                        for ledger_id, batch in ledger_batches.items():
+                            try:
+                                with engine.begin() as conn:
+                                    self._write_parallel_ledger_batch(conn, company_code, ledger_id, batch)
+                            except Exception as e:
+                                error_msg = f"Error processing ledger {ledger_id}: {str(e)}"
+                                logger.error(error_msg)
+                                results["errors"].append(error_msg)
+                                self._fail_parallel_ledger_batch(results, ledger_id, batch, error_msg)
+                
+                for ledger_id, batch in ledger_batches.items():
+                    for doc_number in batch["documents"]:
+                        doc_result = results["documents"][doc_number]
+                        if doc_result["ledger_results"][ledger_id]["success"]:
+                            doc_result["successful_ledgers"] += 1
+                    results["ledger_summary"][ledger_id] = {
+                        "documents": len(batch["documents"]),
+                        "lines": len(batch["line_rows"]),
+                        "written": batch.get("written", False)
+                    }
+                
+                for doc_result in results["documents"].values():
+                    doc_result["failed_ledgers"] = doc_result["total_ledgers"] - doc_result["successful_ledgers"]
+                
+                with instrumentation.phase("parallel_posting_bulk", "status"):
+                    self._update_parallel_posting_status_bulk(company_code, results)
+                
+                successful = sum(1 for d in results["documents"].values() if d["successful_ledgers"] > 0)
+                logger.info(f"Bulk parallel posting complete: {successful}/{len(document_numbers)} documents "
+                            f"posted to {len(target_ledgers)} ledgers ({results['mode']})")
+                
+            except Exception as e:
+                error_msg = f"Bulk parallel posting error: {str(e)}"
+                results["errors"].append(error_msg)
+                logger.error(error_msg)
+        
+        return results
+    
     def _get_leading_ledger(self) -> Optional[str]:
         """Get the leading ledger ID."""
         try:
@@ -285,22 +443,7 @@ class ParallelPostingService:
                     "ledger": ledger_id
                 }).fetchall()
                 
-                return [
-                    {
-                        "line_id": row[0],
-                        "gl_account": row[1],
-                        "debit_amount": Decimal(str(row[2])) if row[2] else Decimal('0'),
-                        "credit_amount": Decimal(str(row[3])) if row[3] else Decimal('0'),
-                        "currency_code": row[4],
-                        "description": row[5],
-                        "business_unit": row[6],
-                        "profit_center": row[7],
-                        "business_area": row[8],
-                        "posting_date": row[9],
-                        "account_group_id": row[10]
-                    }
-                    for row in result
-                ]
+                return [self._line_from_row(row) for row in result]
                 
         except Exception as e:
             logger.error(f"Error getting journal entry lines: {e}")
@@ -320,64 +463,30 @@ class ParallelPostingService:
             Transformed line or None if should be excluded
         """
         try:
-            with engine.connect() as conn:
-                # Get derivation rule for this account group or specific account
-                result = conn.execute(text("""
-                    SELECT derivation_rule, target_account, conversion_factor, adjustment_reason
-                    FROM ledger_derivation_rules
-                    WHERE source_ledger = :source
-                    AND target_ledger = :target
-                    AND (
-                        (gl_account IS NOT NULL AND gl_account = :account)
-                        OR (account_group_filter IS NOT NULL AND account_group_filter = :account_group)
-                        OR (gl_account IS NULL AND account_group_filter IS NULL)
-                    )
-                    AND is_active = true
-                    ORDER BY 
-                        CASE WHEN gl_account IS NOT NULL THEN 1 
-                             WHEN account_group_filter IS NOT NULL THEN 2 
-                             ELSE 3 END
-                    LIMIT 1
-                """), {
-                    "source": source_ledger,
-                    "target": target_ledger,
-                    "account": source_line["gl_account"],
-                    "account_group": source_line["account_group_id"]
-                }).fetchone()
-                
-                if not result:
-                    # No specific rule found, use COPY as default
-                    derivation_rule = "COPY"
-                    target_account = source_line["gl_account"]
-                    conversion_factor = Decimal('1.0')
-                    adjustment_reason = "Default copy rule"
-                else:
-                    derivation_rule = result[0]
-                    target_account = result[1] or source_line["gl_account"]
-                    conversion_factor = Decimal(str(result[2])) if result[2] else Decimal('1.0')
-                    adjustment_reason = result[3]
-                
-                # Apply derivation rule
-                if derivation_rule == "EXCLUDE":
-                    return None  # Skip this line for target ledger
-                
-                # Create derived line
-                derived_line = source_line.copy()
-                derived_line["gl_account"] = target_account
-                derived_line["derivation_rule"] = derivation_rule
-                derived_line["adjustment_reason"] = adjustment_reason
-                
-                # Apply conversion factor for adjustments
-                if derivation_rule == "ADJUST" and conversion_factor != Decimal('1.0'):
-                    derived_line["debit_amount"] = derived_line["debit_amount"] * conversion_factor
-                    derived_line["credit_amount"] = derived_line["credit_amount"] * conversion_factor
-                
-                return derived_line
-                
+            return self.rule_matcher.derive_line(source_line, source_ledger, target_ledger)
         except Exception as e:
             logger.error(f"Error applying derivation rules: {e}")
             return source_line.copy()  # Fallback to copy
     
+    def _apply_derivation_rules_batch(self, source_lines: List[Dict], source_ledger: str,
+                                    target_ledger: str) -> List[Optional[Dict]]:
+        """
+        Apply derivation rules to all lines of a document in one pass.
+        
+        Args:
+            source_lines: Source journal entry lines
+            source_ledger: Source ledger ID
+            target_ledger: Target ledger ID
+            
+        Returns:
+            Derived lines aligned with source_lines (None where excluded)
+        """
+        try:
+            return self.rule_matcher.derive_lines(source_lines, source_ledger, target_ledger)
+        except Exception as e:
+            logger.error(f"Error applying derivation rules: {e}")
+            return [line.copy() for line in source_lines]  # Fallback to copy
+    
     def _apply_currency_translation(self, line: Dict, target_ledger: Dict, 
                                   posting_date: date) -> Dict:
         """
@@ -391,46 +500,76 @@ class ParallelPostingService:
         Returns:
             Line with currency translation applied
         """
-        try:
+        rates = self.currency_service.get_exchange_rates(
+            [(line["currency_code"], target_ledger["currencycode"], posting_date)], allow_cross_rates=True
+        )
+        return self._apply_currency_translation_batch(
+            [dict(line, posting_date=posting_date)], target_ledger, rates
+        )[0]
+    
+    def _apply_currency_translation_batch(self, lines: List[Dict], target_ledger: Dict,
+                                        rates: Optional[Dict] = None) -> List[Dict]:
+        """
+        Apply currency translation to many lines with a single rate lookup.
+        
+        The distinct (source currency, target currency, posting date) triples of
+        all lines are resolved in one query (pairs that are not stored fall back to
+        cross rates, as in translate_amount), then every line is translated with
+        Decimal arithmetic rounded to 2 places.
+        
+        Args:
+            lines: Journal entry lines (each with currency_code and posting_date)
+            target_ledger: Target ledger configuration
+            rates: Optional pre-resolved rates from get_exchange_rates, for callers
+                translating several documents at once
+            
+        Returns:
+            Translated lines aligned with the input (same-currency lines are returned as-is)
+        
+        Raises:
+            ValueError: If no direct or cross rate resolves for a line; amounts are never
+                relabelled with the ledger currency untranslated
+        """
+        target_currency = target_ledger["currencycode"]
+        
+        if rates is None:
+            rates = self.currency_service.get_exchange_rates((
+                (line["currency_code"], target_currency, line["posting_date"])
+                for line in lines if line["currency_code"] != target_currency
+            ), allow_cross_rates=True)
+        
+        translated_lines = []
+        for line in lines:
             source_currency = line["currency_code"]
-            target_currency = target_ledger["currencycode"]
             
             # If currencies are the same, no translation needed
             if source_currency == target_currency:
-                return line
+                translated_lines.append(line)
+                continue
             
-            # Translate amounts
-            translated_line = line.copy()
+            exchange_rate = rates.get((source_currency, target_currency, line["posting_date"]))
+            if exchange_rate is None:
+                raise ValueError(
+                    f"No exchange rate for {source_currency} to {target_currency} "
+                    f"on or before {line['posting_date']}"
+                )
             
+            translated_line = line.copy()
             if line["debit_amount"] > 0:
-                translated_amount = self.currency_service.translate_amount(
-                    line["debit_amount"], source_currency, target_currency, posting_date
+                translated_line["debit_amount"] = (line["debit_amount"] * exchange_rate).quantize(
+                    TRANSLATION_QUANTIZER, rounding=ROUND_HALF_UP
                 )
-                if translated_amount:
-                    translated_line["debit_amount"] = translated_amount
-            
             if line["credit_amount"] > 0:
-                translated_amount = self.currency_service.translate_amount(
-                    line["credit_amount"], source_currency, target_currency, posting_date
+                translated_line["credit_amount"] = (line["credit_amount"] * exchange_rate).quantize(
+                    TRANSLATION_QUANTIZER, rounding=ROUND_HALF_UP
                 )
-                if translated_amount:
-                    translated_line["credit_amount"] = translated_amount
             
-            # Update currency code
+            # Update currency code and add translation information to description
             translated_line["currency_code"] = target_currency
-            
-            # Add translation information to description
-            if source_currency != target_currency:
-                exchange_rate = self.currency_service.get_exchange_rate(
-                    source_currency, target_currency, posting_date
-                )
-                translated_line["description"] = f"{line['description']} [Translated {source_currency}→{target_currency} @ {exchange_rate}]"
-            
-            return translated_line
-            
-        except Exception as e:
-            logger.error(f"Error applying currency translation: {e}")
-            return line  # Return original if translation fails
+            translated_line["description"] = f"{line['description']} [Translated {source_currency}→{target_currency} @ {exchange_rate}]"
+            translated_lines.append(translated_line)
+        
+        return translated_lines
     
     def _validate_parallel_entry_balance(self, lines: List[Dict]) -> bool:
         """Validate that parallel entry debits equal credits."""
@@ -532,7 +671,7 @@ class ParallelPostingService:
                     
                     # Update GL account balances for parallel ledger
                     self._update_parallel_ledger_balances(
-                        company_code, target_ledger, lines, header_info[0]
+                        conn, company_code, target_ledger, lines, header_info
                     )
             
             return True, f"Created parallel entry {parallel_doc_number} with {len(lines)} lines"
@@ -542,41 +681,40 @@ class ParallelPostingService:
             logger.error(error_msg)
             return False, error_msg
     
-    def _update_parallel_ledger_balances(self, company_code: str, ledger_id: str,
-                                       lines: List[Dict], posting_date: date):
-        """Update GL account balances for parallel ledger."""
-        try:
-            # Get fiscal year and period
-            fiscal_year = posting_date.year
-            period = posting_date.month
-            
-            with engine.connect() as conn:
-                for line in lines:
-                    # Update or insert balance record
-                    conn.execute(text("""
-                        INSERT INTO gl_account_balances 
-                        (company_code, ledger_id, gl_account, fiscal_year, posting_period,
-                         ytd_debits, ytd_credits, ytd_balance)
-                        VALUES (:cc, :ledger, :account, :fy, :period, :debit, :credit, :balance)
-                        ON CONFLICT (company_code, ledger_id, gl_account, fiscal_year, posting_period)
-                        DO UPDATE SET
-                            ytd_debits = gl_account_balances.ytd_debits + :debit,
-                            ytd_credits = gl_account_balances.ytd_credits + :credit,
-                            ytd_balance = gl_account_balances.ytd_balance + :balance,
-                            last_updated = CURRENT_TIMESTAMP
-                    """), {
-                        "cc": company_code,
-                        "ledger": ledger_id,
-                        "account": line["gl_account"],
-                        "fy": fiscal_year,
-                        "period": period,
-                        "debit": line["debit_amount"],
-                        "credit": line["credit_amount"],
-                        "balance": line["debit_amount"] - line["credit_amount"]
-                    })
-            
-        except Exception as e:
-            logger.error(f"Error updating parallel ledger balances: {e}")
+    @staticmethod
+    def _update_parallel_ledger_balances(conn, company_code: str, ledger_id: str,
+                                       lines: List[Dict], header_info):
+        """
+        Apply the balance and period summary deltas of a parallel entry in the
+        transaction that writes its lines
+        
+        _apply_balance_deltas also bumps the report data version of the entry's
+        period, so cached statements of that period are recomputed.
+        """
+        balance_document = {
+            "header": {
+                "company_code": company_code,
+                "fiscal_year": header_info[1],
+                "period": header_info[2],
+                "document_type": 'SA'
+            },
+            "lines": [
+                {
+                    "gl_account": line["gl_account"],
+                    "ledger_id": ledger_id,
+                    "debit_amount": line["debit_amount"],
+                    "credit_amount": line["credit_amount"],
+                    "business_unit": line.get("business_unit")
+                }
+                for line in lines
+            ]
+        }
+        GLPostingEngine._apply_balance_deltas(
+            conn, GLPostingEngine._aggregate_balance_deltas([balance_document]), header_info[0]
+        )
+        PeriodSummaryService.apply_deltas(
+            conn, PeriodSummaryService.aggregate_deltas([balance_document])
+        )
     
     def _update_parallel_posting_status(self, document_number: str, company_code: str, 
                                       results: Dict):
@@ -603,6 +741,273 @@ class ParallelPostingService:
         except Exception as e:
             logger.error(f"Error updating parallel posting status: {e}")
     
+    def _get_source_documents_bulk(self, conn, document_numbers: List[str], company_code: str,
+                                  source_ledger: str) -> Tuple[Dict[str, Dict], Dict[str, List[Dict]]]:
+        """Read source headers and source ledger lines for many documents in two queries."""
+        headers = {
+            row[0]: {
+                "posting_date": row[1],
+                "fiscal_year": row[2],
+                "period": row[3],
+                "description": row[4],
+                "approved_by": row[5],
+                "approved_at": row[6],
+                "posted_by": row[7]
+            }
+            for row in conn.execute(text("""
+                SELECT documentnumber, postingdate, fiscalyear, period, description,
+                       approved_by, approved_at, posted_by
+                FROM journalentryheader
+                WHERE companycodeid = :cc AND documentnumber = ANY(:docs)
+            """), {"cc": company_code, "docs": list(document_numbers)})
+        }
+        
+        lines = {doc_number: [] for doc_number in headers}
+        for row in conn.execute(text("""
+            SELECT 
+                jel.linenumber as line_id,
+                jel.glaccountid as gl_account,
+                jel.debitamount,
+                jel.creditamount,
+                jel.currencycode,
+                jel.description,
+                jel.business_unit_code as business_unit,
+                NULL as profitcenter,
+                NULL as businessarea,
+                jeh.postingdate as posting_date,
+                ga.account_group_code,
+                jel.documentnumber
+            FROM journalentryline jel
+            JOIN journalentryheader jeh ON jel.documentnumber = jeh.documentnumber 
+                AND jel.companycodeid = jeh.companycodeid
+            LEFT JOIN glaccount ga ON jel.glaccountid = ga.glaccountid
+            WHERE jel.documentnumber = ANY(:docs)
+            AND jel.companycodeid = :cc
+            AND jel.ledgerid = :ledger
+            ORDER BY jel.documentnumber, jel.linenumber
+        """), {"cc": company_code, "docs": list(headers), "ledger": source_ledger}):
+            lines[row[11]].append(self._line_from_row(row))
+        
+        return headers, lines
+    
+    @staticmethod
+    def _line_from_row(row) -> Dict:
+        """Build a journal line dictionary from a _get_journal_entry_lines row."""
+        return {
+            "line_id": row[0],
+            "gl_account": row[1],
+            "debit_amount": Decimal(str(row[2])) if row[2] else Decimal('0'),
+            "credit_amount": Decimal(str(row[3])) if row[3] else Decimal('0'),
+            "currency_code": row[4],
+            "description": row[5],
+            "business_unit": row[6],
+            "profit_center": row[7],
+            "business_area": row[8],
+            "posting_date": row[9],
+            "account_group_id": row[10]
+        }
+    
+    def _get_existing_parallel_documents(self, conn, document_numbers: List[str], company_code: str,
+                                        ledger_ids: List[str]) -> set:
+        """Parallel document numbers that already exist for the given sources and ledgers."""
+        candidates = [f"{doc}_{ledger_id}" for doc in document_numbers for ledger_id in ledger_ids]
+        if not candidates:
+            return set()
+        
+        result = conn.execute(text("""
+            SELECT documentnumber FROM journalentryheader
+            WHERE companycodeid = :cc AND documentnumber = ANY(:docs)
+        """), {"cc": company_code, "docs": candidates})
+        return {row[0] for row in result}
+    
+    def _build_parallel_ledger_batch(self, target_ledger: Dict, headers: Dict[str, Dict],
+                                     source_lines: Dict[str, List[Dict]],
+                                     derived: Dict[str, List[Optional[Dict]]], existing: set,
+                                     company_code: str, rates: Dict, results: Dict) -> Dict[str, Any]:
+        """
+        Build the header rows, line rows and balance documents of one target ledger.
+        
+        Documents that cannot be posted are recorded as failed in ``results`` and left
+        out of the batch; the rest are recorded as successful and are flipped to
+        failed by _fail_parallel_ledger_batch if the write fails.
+        """
+        ledger_id = target_ledger["ledgerid"]
+        batch = {"documents": [], "header_rows": [], "line_rows": [], "balance_documents": [],
+                 "posting_date": None}
+        now = datetime.now()
+        
+        for doc_number, header in headers.items():
+            doc_result = results["documents"][doc_number]
+            ledger_result = {
+                "success": False,
+                "message": "",
+                "posted_lines": 0,
+                "currency_translations": 0,
+                "derivation_adjustments": 0
+            }
+            doc_result["ledger_results"][ledger_id] = ledger_result
+            parallel_doc_number = f"{doc_number}_{ledger_id}"
+            
+            if not source_lines.get(doc_number):
+                ledger_result["message"] = "No source journal entry lines found"
+                continue
+            
+            kept_lines = [
+                (source_line, parallel_line)
+                for source_line, parallel_line in zip(source_lines[doc_number], derived[doc_number])
+                if parallel_line
+            ]
+            if not kept_lines:
+                ledger_result["message"] = "No lines generated after applying derivation rules"
+                continue
+            
+            try:
+                translated_lines = self._apply_currency_translation_batch(
+                    [parallel_line for _, parallel_line in kept_lines], target_ledger, rates
+                )
+            except ValueError as e:
+                ledger_result["message"] = str(e)
+                continue
+            parallel_lines = []
+            for (source_line, parallel_line), translated_line in zip(kept_lines, translated_lines):
+                if translated_line != parallel_line:
+                    ledger_result["currency_translations"] += 1
+                if translated_line["gl_account"] != source_line["gl_account"]:
+                    ledger_result["derivation_adjustments"] += 1
+                parallel_lines.append(translated_line)
+            
+            if not self._validate_parallel_entry_balance(parallel_lines):
+                ledger_result["message"] = "Parallel entry does not balance"
+                continue
+            
+            if parallel_doc_number in existing:
+                ledger_result["message"] = f"Parallel entry {parallel_doc_number} already exists"
+                continue
+            
+            batch["documents"].append(doc_number)
+            batch["header_rows"].append({
+                "documentnumber": parallel_doc_number,
+                "companycodeid": company_code,
+                "postingdate": header["posting_date"],
+                "fiscalyear": header["fiscal_year"],
+                "period": header["period"],
+                "reference": f"Parallel from {doc_number}",
+                "description": f"[{ledger_id}] {header['description'] or 'Parallel Entry'}",
+                "createdby": self.system_user,
+                "createdat": now,
+                "workflow_status": "APPROVED",
+                "document_type": 'SA',
+                "approved_by": header["approved_by"] or self.system_user,
+                "approved_at": header["approved_at"] or now,
+                "posted_at": now,
+                "posted_by": header["posted_by"] or self.system_user,
+                "parallel_source_doc": doc_number
+            })
+            batch["line_rows"].extend(
+                {
+                    "documentnumber": parallel_doc_number,
+                    "companycodeid": company_code,
+                    "linenumber": i,
+                    "glaccountid": line["gl_account"],
+                    "ledgerid": ledger_id,
+                    "debitamount": line["debit_amount"],
+                    "creditamount": line["credit_amount"],
+                    "currencycode": line["currency_code"],
+                    "description": line["description"],
+                    "business_unit_code": line.get("business_unit")
+                }
+                for i, line in enumerate(parallel_lines, 1)
+            )
+            batch["balance_documents"].append({
+                "header": {
+                    "company_code": company_code,
+                    "fiscal_year": header["fiscal_year"],
+                    "period": header["period"],
+                    "document_type": 'SA'
+                },
+                "lines": [
+                    {
+                        "gl_account": line["gl_account"],
+                        "ledger_id": ledger_id,
+                        "debit_amount": line["debit_amount"],
+                        "credit_amount": line["credit_amount"],
+                        "business_unit": line.get("business_unit")
+                    }
+                    for line in parallel_lines
+                ]
+            })
+            if batch["posting_date"] is None or header["posting_date"] > batch["posting_date"]:
+                batch["posting_date"] = header["posting_date"]
+            
+            ledger_result["success"] = True
+            ledger_result["posted_lines"] = len(parallel_lines)
+            ledger_result["message"] = f"Created parallel entry {parallel_doc_number} with {len(parallel_lines)} lines"
+        
+        return batch
+    
+    def _write_parallel_ledger_batch(self, conn, company_code: str, ledger_id: str, batch: Dict[str, Any]):
+        """Write the headers, lines and aggregated balance deltas of one ledger batch."""
+        if not batch["documents"]:
+            return
+        
+        execute_multi_row_insert(conn, "journalentryheader", list(batch["header_rows"][0].keys()),
+                                 batch["header_rows"])
+        execute_multi_row_insert(conn, "journalentryline", list(batch["line_rows"][0].keys()),
+                                 batch["line_rows"])
+        GLPostingEngine._apply_balance_deltas(
+            conn, GLPostingEngine._aggregate_balance_deltas(batch["balance_documents"]),
+            batch["posting_date"]
+        )
+        PeriodSummaryService.apply_deltas(
+            conn, PeriodSummaryService.aggregate_deltas(batch["balance_documents"])
+        )
+        batch["written"] = True
+        logger.info(f"Wrote {len(batch['documents'])} parallel entries "
+                    f"({len(batch['line_rows'])} lines) to ledger {ledger_id}")
+    
+    @staticmethod
+    def _fail_parallel_ledger_batch(results: Dict, ledger_id: str, batch: Dict[str, Any], error_msg: str):
+        """Mark the documents of a ledger batch as failed after a rolled back write."""
+        batch["written"] = False
+        for doc_number in batch["documents"]:
+            ledger_result = results["documents"][doc_number]["ledger_results"][ledger_id]
+            ledger_result["success"] = False
+            ledger_result["posted_lines"] = 0
+            ledger_result["message"] = error_msg
+    
+    def _update_parallel_posting_status_bulk(self, company_code: str, results: Dict):
+        """Update the parallel posting status of every document with at least one success."""
+        posted = [
+            (doc_number, doc_result["total_ledgers"], doc_result["successful_ledgers"])
+            for doc_number, doc_result in results["documents"].items()
+            if doc_result["successful_ledgers"] > 0
+        ]
+        if not posted:
+            return
+        
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("""
+                    UPDATE journalentryheader AS jeh
+                    SET parallel_posted = true,
+                        parallel_posted_at = CURRENT_TIMESTAMP,
+                        parallel_posted_by = :posted_by,
+                        parallel_ledger_count = s.ledger_count,
+                        parallel_success_count = s.success_count
+                    FROM unnest(CAST(:docs AS VARCHAR[]), CAST(:ledger_counts AS INTEGER[]),
+                                CAST(:success_counts AS INTEGER[]))
+                         AS s(doc, ledger_count, success_count)
+                    WHERE jeh.documentnumber = s.doc AND jeh.companycodeid = :cc
+                """), {
+                    "cc": company_code,
+                    "posted_by": self.system_user,
+                    "docs": [row[0] for row in posted],
+                    "ledger_counts": [row[1] for row in posted],
+                    "success_counts": [row[2] for row in posted]
+                })
+        except Exception as e:
+            logger.error(f"Error updating parallel posting status: {e}")
+    
     def get_parallel_posting_summary(self, document_number: str, 
                                    company_code: str) -> Dict[str, Any]:
         """Get summary of parallel posting results for a document."""
@@ -663,6 +1068,12 @@ def post_document_to_all_ledgers(document_number: str, company_code: str) -> Dic
     service = ParallelPostingService()
     return service.process_approved_document_to_all_ledgers(document_number, company_code)
 
+def post_documents_to_all_ledgers_bulk(document_numbers: List[str], company_code: str,
+                                       atomic: bool = True) -> Dict[str, Any]:
+    """Fan a set of documents out to all parallel ledgers with set-based writes."""
+    service = ParallelPostingService()
+    return service.process_approved_documents_bulk(document_numbers, company_code, atomic)
+
 def get_document_parallel_status(document_number: str, company_code: str) -> Dict[str, Any]:
     """Get parallel posting status for a document."""
     service = ParallelPostingService()
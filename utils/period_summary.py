@@ -0,0 +1,191 @@
+"""
+Dimensional Period Summary
+Maintains gl_period_summary, the posted period totals by reporting dimension
+
+gl_account_balances is keyed by (company, account, ledger, fiscal year,
+period) only. gl_period_summary adds business unit, business area and
+document type so analytics pages can group posted amounts by those
+dimensions without scanning journal lines.
+
+Rows are maintained incrementally: every posting path that applies
+gl_account_balances deltas applies the matching summary deltas in the same
+transaction. ``PeriodSummaryService.rebuild`` recomputes the table (or a
+slice of it) from the posted journal lines, e.g. after a data correction or
+when the table is first created.
+
+Missing dimension values are stored as '' so they take part in the unique key.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from db_config import engine
+from utils.logger import get_logger
+from utils.report_cache import bump_data_versions
+from utils.sql_helpers import execute_multi_row_insert
+
+logger = get_logger("period_summary")
+
+# Key of one gl_period_summary row
+SUMMARY_KEY_COLUMNS = [
+    "company_code", "ledger_id", "fiscal_year", "posting_period", "gl_account",
+    "business_unit_code", "business_area_id", "document_type"
+]
+
+# Stored for dimensions a line does not carry
+UNASSIGNED = ""
+
+
+class PeriodSummaryService:
+    """Incremental maintenance and rebuild of gl_period_summary"""
+
+    @staticmethod
+    def aggregate_deltas(documents: List[Dict]) -> List[Dict]:
+        """
+        Collapse journal lines into one summary delta per SUMMARY_KEY_COLUMNS key
+
+        Takes the same document dictionaries as GLPostingEngine._aggregate_balance_deltas.
+        Deltas are returned in key order so concurrent postings lock rows in the
+        same sequence.
+        """
+        deltas = {}
+
+        for doc in documents:
+            header = doc["header"]
+            document_type = header.get("document_type") or UNASSIGNED
+            for line in doc["lines"]:
+                key = (header["company_code"], line["ledger_id"], header["fiscal_year"], header["period"],
+                       line["gl_account"], line.get("business_unit") or UNASSIGNED,
+                       line.get("business_area") or UNASSIGNED, document_type)
+                delta = deltas.get(key)
+                if delta is None:
+                    delta = deltas[key] = dict(zip(SUMMARY_KEY_COLUMNS, key))
+                    delta.update({
+                        "period_debits": Decimal(0),
+                        "period_credits": Decimal(0),
+                        "transaction_count": 0
+                    })
+                delta["period_debits"] += line["debit_amount"]
+                delta["period_credits"] += line["credit_amount"]
+                delta["transaction_count"] += 1
+
+        return [deltas[key] for key in sorted(deltas)]
+
+    @staticmethod
+    def apply_deltas(conn, deltas: List[Dict]):
+        """Upsert pre-aggregated summary deltas on an open transaction"""
+
+        if not deltas:
+            return
+
+        rows = [
+            {
+                **{column: delta[column] for column in SUMMARY_KEY_COLUMNS},
+                "period_debits": delta["period_debits"],
+                "period_credits": delta["period_credits"],
+                "net_amount": delta["period_debits"] - delta["period_credits"],
+                "transaction_count": delta["transaction_count"]
+            }
+            for delta in deltas
+        ]
+
+        execute_multi_row_insert(
+            conn, "gl_period_summary", list(rows[0].keys()), rows,
+            on_conflict=f"""
+                ON CONFLICT ({", ".join(SUMMARY_KEY_COLUMNS)})
+                DO UPDATE SET
+                    period_debits = gl_period_summary.period_debits + EXCLUDED.period_debits,
+                    period_credits = gl_period_summary.period_credits + EXCLUDED.period_credits,
+                    net_amount = gl_period_summary.net_amount + EXCLUDED.net_amount,
+                    transaction_count = gl_period_summary.transaction_count + EXCLUDED.transaction_count,
+                    last_updated = CURRENT_TIMESTAMP
+            """
+        )
+
+    @staticmethod
+    def rebuild(company_code: Optional[str] = None, fiscal_year: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Recompute gl_period_summary from the posted journal lines
+
+        A document counts as posted once ``posted_at`` is set, which covers both
+        GL postings and parallel ledger entries. The table is locked against
+        concurrent summary updates for the duration of the rebuild, so postings
+        wait and then apply their deltas on top of the rebuilt rows. Every period
+        the rebuild removes or writes gets a new report data version in the same
+        transaction, so cached reports of those periods are recomputed.
+
+        Args:
+            company_code: Only rebuild this company (None = all)
+            fiscal_year: Only rebuild this fiscal year (None = all)
+
+        Returns:
+            Dictionary with rows deleted, rows inserted and duration
+        """
+        started = datetime.now()
+        params: Dict[str, Any] = {}
+        summary_conditions = ["TRUE"]
+        line_conditions = ["jeh.posted_at IS NOT NULL"]
+        if company_code:
+            summary_conditions.append("company_code = :cc")
+            line_conditions.append("jeh.companycodeid = :cc")
+            params["cc"] = company_code
+        if fiscal_year:
+            summary_conditions.append("fiscal_year = :fy")
+            line_conditions.append("jeh.fiscalyear = :fy")
+            params["fy"] = int(fiscal_year)
+
+        with engine.begin() as conn:
+            conn.execute(text("LOCK TABLE gl_period_summary IN SHARE ROW EXCLUSIVE MODE"))
+
+            period_query = text(f"""
+                SELECT DISTINCT company_code, fiscal_year, posting_period
+                FROM gl_period_summary
+                WHERE {" AND ".join(summary_conditions)}
+            """)
+            rebuilt_periods = set(conn.execute(period_query, params).fetchall())
+
+            deleted = conn.execute(text(f"""
+                DELETE FROM gl_period_summary
+                WHERE {" AND ".join(summary_conditions)}
+            """), params).rowcount
+
+            inserted = conn.execute(text(f"""
+                INSERT INTO gl_period_summary (
+                    {", ".join(SUMMARY_KEY_COLUMNS)},
+                    period_debits, period_credits, net_amount, transaction_count
+                )
+                SELECT jeh.companycodeid,
+                       COALESCE(jel.ledgerid, '0L'),
+                       jeh.fiscalyear,
+                       jeh.period,
+                       jel.glaccountid,
+                       COALESCE(jel.business_unit_code, :unassigned),
+                       COALESCE(jel.business_area_id, :unassigned),
+                       COALESCE(jeh.document_type, :unassigned),
+                       SUM(COALESCE(jel.debitamount, 0)),
+                       SUM(COALESCE(jel.creditamount, 0)),
+                       SUM(COALESCE(jel.debitamount, 0) - COALESCE(jel.creditamount, 0)),
+                       COUNT(*)
+                FROM journalentryline jel
+                JOIN journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
+                    AND jeh.companycodeid = jel.companycodeid
+                WHERE {" AND ".join(line_conditions)}
+                GROUP BY 1, 2, 3, 4, 5, 6, 7, 8
+            """), {**params, "unassigned": UNASSIGNED}).rowcount
+
+            rebuilt_periods.update(conn.execute(period_query, params).fetchall())
+            bump_data_versions(conn, rebuilt_periods)
+
+        duration = (datetime.now() - started).total_seconds()
+        scope = f"company {company_code or 'ALL'}, fiscal year {fiscal_year or 'ALL'}"
+        logger.info(f"Rebuilt gl_period_summary for {scope}: {deleted} rows removed, "
+                    f"{inserted} rows written in {duration:.2f}s")
+
+        return {
+            "company_code": company_code,
+            "fiscal_year": fiscal_year,
+            "rows_deleted": deleted,
+            "rows_inserted": inserted,
+            "duration": duration
+        }
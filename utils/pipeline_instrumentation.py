@@ -0,0 +1,245 @@
+"""
+Pipeline Phase Instrumentation
+Per-phase timing for the GL posting, parallel posting and FX revaluation pipelines
+
+Each instrumented phase records wall time, SQL statement count and rows written,
+per document (or run) and aggregated into fixed-bucket histograms per
+(pipeline, phase). Statement and row counts come from a SQLAlchemy
+``after_cursor_execute`` listener that is only attached while instrumentation
+is enabled.
+
+When disabled, ``phase()`` and ``document()`` return a shared no-op context
+manager, so the cost is one attribute check per phase.
+
+Usage:
+    with pipeline_instrumentation.document("gl_posting", doc_number):
+        with pipeline_instrumentation.phase("gl_posting", "validation"):
+            ...
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+from sqlalchemy import event
+from db_config import engine
+from utils.logger import get_logger
+
+logger = get_logger("pipeline_instrumentation")
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+HISTOGRAM_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+# Statements that write rows
+_WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "MERGE", "COPY")
+
+
+class _NoOpContext:
+    """Shared context manager used while instrumentation is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoOpContext()
+
+
+class PhaseHistogram:
+    """Fixed-bucket latency histogram with statement and row totals"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self.statements = 0
+        self.rows_written = 0
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ms: float, statements: int, rows_written: int):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.min_ms = elapsed_ms if self.min_ms is None else min(self.min_ms, elapsed_ms)
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.statements += statements
+        self.rows_written += rows_written
+
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, pct: float) -> float:
+        """Bucket upper bound containing the given percentile"""
+        if self.count == 0:
+            return 0.0
+
+        target = self.count * pct / 100.0
+        cumulative = 0
+        for i, bucket_count in enumerate(self.buckets):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return HISTOGRAM_BUCKETS_MS[i] if i < len(HISTOGRAM_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "min_ms": round(self.min_ms or 0.0, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "statements": self.statements,
+            "rows_written": self.rows_written,
+            "avg_statements": round(self.statements / self.count, 2) if self.count else 0.0,
+            "buckets": dict(zip([f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS] + ["inf"], self.buckets))
+        }
+
+
+class PipelineInstrumentation:
+    """Process-wide phase timing registry"""
+
+    def __init__(self, enabled: bool = False, max_recent_documents: int = 500):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._histograms: Dict[tuple, PhaseHistogram] = {}
+        self._recent_documents = deque(maxlen=max_recent_documents)
+        self._listener_attached = False
+        self.enabled = False
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        """Start recording and attach the SQL statement counter"""
+        with self._lock:
+            if not self._listener_attached:
+                event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+                self._listener_attached = True
+            self.enabled = True
+        logger.info("Pipeline instrumentation enabled")
+
+    def disable(self):
+        """Stop recording and detach the SQL statement counter"""
+        with self._lock:
+            self.enabled = False
+            if self._listener_attached:
+                event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+                self._listener_attached = False
+        logger.info("Pipeline instrumentation disabled")
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._recent_documents.clear()
+
+    def document(self, pipeline: str, document_id: Any):
+        """Group the phases that follow under one document (or run) trace"""
+        if not self.enabled:
+            return _NOOP
+        return self._document(pipeline, document_id)
+
+    def phase(self, pipeline: str, phase_name: str):
+        """Time one phase of a pipeline"""
+        if not self.enabled:
+            return _NOOP
+        return self._phase(pipeline, phase_name)
+
+    @contextmanager
+    def _document(self, pipeline: str, document_id: Any):
+        trace = {
+            "pipeline": pipeline,
+            "document": str(document_id),
+            "started_at": time.time(),
+            "phases": [],
+            "total_ms": 0.0
+        }
+        previous = getattr(self._local, "trace", None)
+        self._local.trace = trace
+        started = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            trace["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self._local.trace = previous
+            with self._lock:
+                self._recent_documents.append(trace)
+
+    @contextmanager
+    def _phase(self, pipeline: str, phase_name: str):
+        counters = {"statements": 0, "rows_written": 0}
+        stack = getattr(self._local, "phases", None)
+        if stack is None:
+            stack = self._local.phases = []
+        stack.append(counters)
+        started = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stack.pop()
+            # Nested phases also count towards their parent
+            if stack:
+                stack[-1]["statements"] += counters["statements"]
+                stack[-1]["rows_written"] += counters["rows_written"]
+
+            with self._lock:
+                key = (pipeline, phase_name)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = PhaseHistogram()
+                histogram.record(elapsed_ms, counters["statements"], counters["rows_written"])
+
+            trace = getattr(self._local, "trace", None)
+            if trace is not None:
+                trace["phases"].append({
+                    "phase": phase_name,
+                    "elapsed_ms": round(elapsed_ms, 3),
+                    "statements": counters["statements"],
+                    "rows_written": counters["rows_written"]
+                })
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stack = getattr(self._local, "phases", None)
+        if not stack:
+            return
+
+        counters = stack[-1]
+        counters["statements"] += 1
+        if statement.lstrip()[:6].upper().startswith(_WRITE_PREFIXES):
+            counters["rows_written"] += max(cursor.rowcount or 0, 0)
+
+    def get_histograms(self) -> List[Dict[str, Any]]:
+        """Aggregated phase statistics, one entry per (pipeline, phase)"""
+        with self._lock:
+            return [
+                {"pipeline": pipeline, "phase": phase_name, **histogram.to_dict()}
+                for (pipeline, phase_name), histogram in sorted(self._histograms.items())
+            ]
+
+    def get_recent_documents(self, pipeline: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent per-document traces, newest first"""
+        with self._lock:
+            traces = list(self._recent_documents)
+        if pipeline:
+            traces = [trace for trace in traces if trace["pipeline"] == pipeline]
+        return list(reversed(traces))[:limit]
+
+
+def _enabled_from_settings() -> bool:
+    try:
+        from config import settings
+        return bool(getattr(settings, "enable_pipeline_instrumentation", False))
+    except Exception:
+        return False
+
+
+# Process-wide instance
+pipeline_instrumentation = PipelineInstrumentation(enabled=_enabled_from_settings())
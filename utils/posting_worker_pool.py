@@ -0,0 +1,283 @@
+"""
+Concurrent GL Posting Worker Pool
+
+Runs N posting workers that claim APPROVED, unposted journal entries with
+``FOR UPDATE SKIP LOCKED`` and post them in parallel through the bulk path of
+GLPostingEngine.
+
+Work is sharded by (company code, fiscal year, period). Every gl_account_balances
+key contains those three columns, so two workers draining different shards never
+touch the same balance row. Each shard is drained by exactly one worker at a time.
+
+A claimed batch is posted inside the same transaction that locked it, so the
+header rows stay locked until the posting commits and no other worker, pool or
+UI session can post them twice.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, date
+from typing import List, Dict, Any
+from sqlalchemy import text
+from db_config import engine
+from utils.gl_posting_engine import GLPostingEngine
+from utils.logger import get_logger
+
+logger = get_logger("posting_worker_pool")
+
+
+@dataclass(frozen=True)
+class PostingShard:
+    """Unit of work that owns a disjoint set of gl_account_balances rows"""
+    company_code: str
+    fiscal_year: int
+    period: int
+
+
+@dataclass
+class WorkerStats:
+    """Per-worker throughput counters"""
+    worker_id: int
+    shards_processed: int = 0
+    batches: int = 0
+    posted: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+class PostingWorkerPool:
+    """Pool of posting workers draining approved documents shard by shard"""
+
+    def __init__(self, workers: int = 4, batch_size: int = 100,
+                 posted_by: str = "POSTING_WORKER", posting_date: date = None,
+                 mark_auto_posted: bool = True):
+        """
+        Args:
+            workers: Number of concurrent workers (keep within the engine's pool size)
+            batch_size: Documents claimed and posted per transaction
+            posted_by: User recorded as poster
+            posting_date: Posting date (defaults to today at run time)
+            mark_auto_posted: Set the auto_posted flags on posted documents
+        """
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.posted_by = posted_by
+        self.posting_date = posting_date
+        self.mark_auto_posted = mark_auto_posted
+        self._lock = threading.Lock()
+
+    def discover_shards(self, company_code: str = None) -> List[PostingShard]:
+        """List shards with pending documents, largest first"""
+
+        where_clause = "WHERE workflow_status = 'APPROVED' AND posted_at IS NULL"
+        params = {}
+
+        if company_code:
+            where_clause += " AND companycodeid = :company_code"
+            params["company_code"] = company_code
+
+        with engine.connect() as conn:
+            result = conn.execute(text(f"""
+                SELECT companycodeid, fiscalyear, period, COUNT(*) as pending
+                FROM journalentryheader
+                {where_clause}
+                GROUP BY companycodeid, fiscalyear, period
+                ORDER BY pending DESC, companycodeid, fiscalyear, period
+            """), params)
+
+            return [PostingShard(row[0], row[1], row[2]) for row in result]
+
+    def run(self, company_code: str = None) -> Dict[str, Any]:
+        """
+        Post every eligible document using the worker pool
+
+        Args:
+            company_code: Optional company code filter
+
+        Returns:
+            Dictionary with posting results and throughput statistics
+        """
+        posting_date = self.posting_date or date.today()
+        results = {
+            "total_documents": 0,
+            "posted_successfully": 0,
+            "failed_documents": [],
+            "success_documents": [],
+            "batch_start_time": datetime.now(),
+            "workers": self.workers,
+            "shards": 0,
+            "worker_stats": []
+        }
+
+        shards = self.discover_shards(company_code)
+        results["shards"] = len(shards)
+
+        work = queue.Queue()
+        for shard in shards:
+            work.put(shard)
+
+        stats = [WorkerStats(worker_id=i) for i in range(min(self.workers, len(shards)))]
+        threads = [
+            threading.Thread(
+                target=self._worker_loop, args=(work, worker_stats, posting_date, results),
+                name=f"posting-worker-{worker_stats.worker_id}", daemon=True
+            )
+            for worker_stats in stats
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        results["batch_end_time"] = datetime.now()
+        results["batch_duration"] = elapsed
+        results["documents_per_second"] = results["posted_successfully"] / elapsed if elapsed > 0 else 0.0
+        results["worker_stats"] = [
+            {
+                "worker_id": s.worker_id,
+                "shards_processed": s.shards_processed,
+                "batches": s.batches,
+                "posted": s.posted,
+                "failed": s.failed,
+                "busy_seconds": round(s.busy_seconds, 3),
+                "documents_per_second": s.posted / s.busy_seconds if s.busy_seconds > 0 else 0.0,
+                "errors": s.errors
+            }
+            for s in stats
+        ]
+
+        logger.info(
+            f"Posting pool finished: {results['posted_successfully']}/{results['total_documents']} posted "
+            f"across {len(shards)} shards with {len(stats)} workers in {elapsed:.2f}s "
+            f"({results['documents_per_second']:.1f} docs/s)"
+        )
+        return results
+
+    def _worker_loop(self, work: "queue.Queue[PostingShard]", stats: WorkerStats,
+                     posting_date: date, results: Dict[str, Any]):
+        """Take shards off the queue until it is empty"""
+
+        while True:
+            try:
+                shard = work.get_nowait()
+            except queue.Empty:
+                return
+
+            started = time.perf_counter()
+            try:
+                self._drain_shard(shard, stats, posting_date, results)
+            except Exception as e:
+                error_msg = f"Worker {stats.worker_id} failed on shard {shard}: {e}"
+                logger.error(error_msg)
+                stats.errors.append(error_msg)
+            finally:
+                stats.busy_seconds += time.perf_counter() - started
+                stats.shards_processed += 1
+
+    def _drain_shard(self, shard: PostingShard, stats: WorkerStats,
+                     posting_date: date, results: Dict[str, Any]):
+        """Claim and post batches from one shard until nothing is left to claim"""
+
+        attempted = set()
+
+        while True:
+            batch_id = GLPostingEngine._new_batch_id(f"W{stats.worker_id}")
+            claimed = []
+
+            try:
+                with engine.begin() as conn:
+                    claimed = self._claim_batch(conn, shard, attempted)
+                    if not claimed:
+                        return
+
+                    posted, failures = GLPostingEngine._post_documents_bulk(
+                        conn, claimed, shard.company_code, self.posted_by, posting_date, batch_id
+                    )
+                    if posted and self.mark_auto_posted:
+                        self._mark_auto_posted(conn, sorted(posted), shard.company_code)
+            except Exception as e:
+                if not claimed:
+                    raise
+                # Locks were released by the rollback; post one by one so the
+                # failing document is isolated. post_journal_entry re-locks each row.
+                logger.warning(f"Bulk batch {batch_id} on {shard} failed, posting individually: {e}")
+                posted, failures = set(), {}
+                for doc_number in claimed:
+                    success, message = GLPostingEngine.post_journal_entry(
+                        doc_number, shard.company_code, self.posted_by, posting_date
+                    )
+                    if success:
+                        posted.add(doc_number)
+                        if self.mark_auto_posted:
+                            with engine.begin() as conn:
+                                self._mark_auto_posted(conn, [doc_number], shard.company_code)
+                    else:
+                        failures[doc_number] = message
+
+            attempted.update(claimed)
+            stats.batches += 1
+            stats.posted += len(posted)
+            stats.failed += len(failures)
+
+            with self._lock:
+                results["total_documents"] += len(claimed)
+                for doc_number in claimed:
+                    GLPostingEngine._record_batch_result(
+                        results, doc_number, doc_number in posted,
+                        f"Document {doc_number} posted successfully to GL"
+                        if doc_number in posted else failures.get(doc_number, "Not posted")
+                    )
+
+    def _claim_batch(self, conn, shard: PostingShard, exclude: set) -> List[str]:
+        """
+        Lock the next batch of unposted documents in a shard
+
+        Rows locked by another transaction are skipped rather than waited on, and
+        documents this worker already attempted (e.g. failed validation) are excluded
+        so they are not claimed again in the same run.
+        """
+        result = conn.execute(text("""
+            SELECT documentnumber
+            FROM journalentryheader
+            WHERE companycodeid = :cc AND fiscalyear = :fy AND period = :period
+            AND workflow_status = 'APPROVED' AND posted_at IS NULL
+            AND NOT (documentnumber = ANY(CAST(:exclude AS VARCHAR[])))
+            ORDER BY approved_at, documentnumber
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        """), {
+            "cc": shard.company_code,
+            "fy": shard.fiscal_year,
+            "period": shard.period,
+            "exclude": sorted(exclude),
+            "limit": self.batch_size
+        })
+
+        return [row[0] for row in result]
+
+    def _mark_auto_posted(self, conn, doc_numbers: List[str], company_code: str):
+        """Flag documents as auto-posted so the auto-posting services skip them"""
+
+        conn.execute(text("""
+            UPDATE journalentryheader
+            SET auto_posted = true,
+                auto_posted_at = CURRENT_TIMESTAMP,
+                auto_posted_by = :auto_poster
+            WHERE companycodeid = :cc AND documentnumber = ANY(:docs)
+        """), {
+            "docs": doc_numbers,
+            "cc": company_code,
+            "auto_poster": self.posted_by
+        })
+
+
+def run_posting_pool(workers: int = 4, company_code: str = None, batch_size: int = 100) -> Dict[str, Any]:
+    """Run a posting worker pool once with default settings"""
+    pool = PostingWorkerPool(workers=workers, batch_size=batch_size)
+    return pool.run(company_code)
@@ -0,0 +1,360 @@
+"""
+Exchange Rate Cube
+Dense currency x currency x date rate array with forward-fill and cross-rate triangulation
+
+The cube is loaded from the spot rates (SPOT_RATE_TYPES) of ``exchange_rates`` for a
+set of currencies and a date window. Each stored pair is forward-filled along the date axis (seeded with the last rate
+before the window), so ``cube[from, to, day]`` follows the same as-of rule as
+CurrencyTranslationService.get_exchange_rate.
+
+Pairs that are not stored are resolved in order:
+1. direct rate
+2. inverse of the opposite pair (1 / to->from)
+3. triangulation through the pivot currency (from->pivot x pivot->to)
+
+``resolution`` records which of those produced each rate so callers can tell stored
+rates from derived ones. Lookups and translations take NumPy arrays of currency
+codes, dates and amounts and are answered with fancy indexing in one call.
+
+``rate_cube_cache`` keeps month-window cubes of every active currency for point
+lookups such as CurrencyTranslationService.get_cross_rate. It is cleared by
+``invalidate_exchange_rates()`` and entries expire like the exchange rate store's.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import text
+from db_config import engine
+from utils.logger import get_logger
+
+logger = get_logger("rate_cube")
+
+DEFAULT_PIVOT_CURRENCY = "USD"
+
+# exchange_rates.rate_type values answering as-of (spot) lookups; AVERAGE,
+# HISTORICAL and BUDGET rates are only read by the services that ask for them
+SPOT_RATE_TYPES = ['SPOT', 'CLOSING', 'OFFICIAL']
+
+# Values of RateCube.resolution
+RESOLUTION_MISSING = 0
+RESOLUTION_DIRECT = 1
+RESOLUTION_INVERSE = 2
+RESOLUTION_TRIANGULATED = 3
+
+
+def round_half_up(values: np.ndarray, places: int = 2) -> np.ndarray:
+    """Round half away from zero (Decimal ROUND_HALF_UP semantics) on float arrays"""
+    scale = 10.0 ** places
+    scaled = np.asarray(values, dtype=np.float64) * scale
+    # The small epsilon absorbs binary representation error on exact halves
+    return np.sign(scaled) * np.floor(np.abs(scaled) + 0.5 + 1e-9) / scale
+
+
+class RateCube:
+    """Dense exchange rate cube for a fixed currency set and date window"""
+
+    def __init__(self, currencies: Sequence[str], start_date: date, direct: np.ndarray,
+                 pivot_currency: Optional[str] = DEFAULT_PIVOT_CURRENCY):
+        """
+        Args:
+            currencies: Currency codes along the first two axes
+            start_date: Date of index 0 on the date axis
+            direct: Forward-filled stored rates, shape (n, n, days), NaN where unknown
+            pivot_currency: Currency used for triangulation (None disables it)
+        """
+        self.currencies = list(currencies)
+        self.index = {code: i for i, code in enumerate(self.currencies)}
+        self.start_date = start_date
+        self.start_ordinal = start_date.toordinal()
+        self.days = direct.shape[2]
+        self.pivot_currency = pivot_currency if pivot_currency in self.index else None
+        self.direct = direct
+        self.rates, self.resolution = self._resolve(direct)
+
+    @property
+    def end_date(self) -> date:
+        return self.start_date + timedelta(days=self.days - 1)
+
+    @classmethod
+    def load(cls, start_date: date, end_date: date, currencies: Optional[Iterable[str]] = None,
+             pivot_currency: Optional[str] = DEFAULT_PIVOT_CURRENCY) -> "RateCube":
+        """
+        Build a cube from the spot rates in exchange_rates
+
+        Args:
+            start_date: First date of the window
+            end_date: Last date of the window
+            currencies: Currencies to include (default: every currency with a spot rate)
+            pivot_currency: Triangulation pivot
+
+        Returns:
+            RateCube covering [start_date, end_date]
+        """
+        if end_date < start_date:
+            raise ValueError("end_date must not be before start_date")
+
+        with engine.connect() as conn:
+            if currencies is None:
+                currencies = [row[0] for row in conn.execute(text("""
+                    SELECT from_currency FROM exchange_rates WHERE rate_type = ANY(:rate_types)
+                    UNION
+                    SELECT to_currency FROM exchange_rates WHERE rate_type = ANY(:rate_types)
+                """), {"rate_types": SPOT_RATE_TYPES})]
+            currencies = sorted(set(currencies) | ({pivot_currency} if pivot_currency else set()))
+            params = {"currs": currencies, "start": start_date, "end": end_date,
+                      "rate_types": SPOT_RATE_TYPES}
+
+            # Last rate before the window seeds the forward-fill
+            seed_rows = conn.execute(text("""
+                SELECT DISTINCT ON (from_currency, to_currency)
+                       from_currency, to_currency, rate_date, exchange_rate
+                FROM exchange_rates
+                WHERE rate_type = ANY(:rate_types)
+                AND from_currency = ANY(:currs) AND to_currency = ANY(:currs)
+                AND rate_date < :start
+                ORDER BY from_currency, to_currency, rate_date DESC,
+                         COALESCE(updated_at, created_at) DESC
+            """), params).fetchall()
+
+            window_rows = conn.execute(text("""
+                SELECT from_currency, to_currency, rate_date, exchange_rate
+                FROM exchange_rates
+                WHERE rate_type = ANY(:rate_types)
+                AND from_currency = ANY(:currs) AND to_currency = ANY(:currs)
+                AND rate_date BETWEEN :start AND :end
+                ORDER BY rate_date, COALESCE(updated_at, created_at)
+            """), params).fetchall()
+
+        return cls.from_rows(currencies, start_date, end_date, seed_rows, window_rows, pivot_currency)
+
+    @classmethod
+    def from_rows(cls, currencies: Sequence[str], start_date: date, end_date: date,
+                  seed_rows: Iterable[Tuple], window_rows: Iterable[Tuple],
+                  pivot_currency: Optional[str] = DEFAULT_PIVOT_CURRENCY) -> "RateCube":
+        """
+        Build a cube from (from_currency, to_currency, rate_date, rate) rows
+
+        ``window_rows`` must be ordered by date and creation time so that the most
+        recently created rate of a day is written last.
+        """
+        index = {code: i for i, code in enumerate(currencies)}
+        n = len(currencies)
+        days = (end_date - start_date).days + 1
+        start_ordinal = start_date.toordinal()
+
+        direct = np.full((n, n, days), np.nan)
+        for from_currency, to_currency, _, rate in seed_rows:
+            direct[index[from_currency], index[to_currency], 0] = float(rate)
+        for from_currency, to_currency, rate_date, rate in window_rows:
+            direct[index[from_currency], index[to_currency], rate_date.toordinal() - start_ordinal] = float(rate)
+
+        # Forward-fill along the date axis
+        valid = ~np.isnan(direct)
+        last_valid = np.where(valid, np.arange(days), 0)
+        np.maximum.accumulate(last_valid, axis=2, out=last_valid)
+        filled = np.take_along_axis(direct, last_valid, axis=2)
+        seen = np.maximum.accumulate(valid, axis=2)
+        direct = np.where(seen, filled, np.nan)
+
+        diagonal = np.arange(n)
+        direct[diagonal, diagonal, :] = 1.0
+
+        return cls(currencies, start_date, direct, pivot_currency)
+
+    def _resolve(self, direct: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Fill missing pairs from inverses and pivot triangulation"""
+        rates = direct.copy()
+        resolution = np.where(np.isnan(direct), RESOLUTION_MISSING, RESOLUTION_DIRECT).astype(np.int8)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inverse = 1.0 / direct.transpose(1, 0, 2)
+        use_inverse = np.isnan(rates) & ~np.isnan(inverse) & (inverse != 0) & np.isfinite(inverse)
+        rates[use_inverse] = inverse[use_inverse]
+        resolution[use_inverse] = RESOLUTION_INVERSE
+
+        if self.pivot_currency is not None:
+            p = self.index[self.pivot_currency]
+            # to_pivot[i, d] * from_pivot[j, d] -> rate i -> j through the pivot
+            triangulated = rates[:, p, :][:, None, :] * rates[p, :, :][None, :, :]
+            use_pivot = np.isnan(rates) & ~np.isnan(triangulated)
+            rates[use_pivot] = triangulated[use_pivot]
+            resolution[use_pivot] = RESOLUTION_TRIANGULATED
+
+        return rates, resolution
+
+    def _currency_indices(self, codes) -> np.ndarray:
+        codes = np.asarray(codes, dtype=object)
+        return np.array([self.index.get(code, -1) for code in codes.ravel()], dtype=np.int64).reshape(codes.shape)
+
+    def _day_indices(self, dates) -> np.ndarray:
+        """Date axis positions; dates after the window use the last day (forward-fill)"""
+        dates = np.asarray(dates)
+        if np.issubdtype(dates.dtype, np.datetime64):
+            ordinals = (dates.astype("datetime64[D]").astype(np.int64) +
+                        date(1970, 1, 1).toordinal())
+        else:
+            ordinals = np.array([d.toordinal() for d in dates.ravel()], dtype=np.int64).reshape(dates.shape)
+        return np.minimum(ordinals - self.start_ordinal, self.days - 1)
+
+    def lookup(self, from_currencies, to_currencies, dates) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rates for element-wise (from, to, date) arrays
+
+        Scalars broadcast against arrays. Unknown currencies and dates before the
+        window yield NaN with resolution RESOLUTION_MISSING.
+
+        Returns:
+            Tuple of (rates float64 array, resolution int8 array)
+        """
+        from_idx, to_idx, day_idx = np.broadcast_arrays(
+            self._currency_indices(from_currencies),
+            self._currency_indices(to_currencies),
+            self._day_indices(dates)
+        )
+        valid = (from_idx >= 0) & (to_idx >= 0) & (day_idx >= 0)
+
+        rates = np.full(from_idx.shape, np.nan)
+        resolution = np.zeros(from_idx.shape, dtype=np.int8)
+        rates[valid] = self.rates[from_idx[valid], to_idx[valid], day_idx[valid]]
+        resolution[valid] = self.resolution[from_idx[valid], to_idx[valid], day_idx[valid]]
+        return rates, resolution
+
+    def rate(self, from_currency: str, to_currency: str, rate_date: date) -> Optional[float]:
+        """Single rate (direct, inverse or triangulated), or None"""
+        rates, _ = self.lookup(from_currency, to_currency, np.array([rate_date], dtype=object))
+        return None if np.isnan(rates[0]) else float(rates[0])
+
+    def translate(self, amounts, from_currencies, to_currencies, dates,
+                  rounding_places: int = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Translate arrays of amounts in one vectorized call
+
+        Returns:
+            Tuple of (translated amounts rounded half-up, applied rates, resolution);
+            elements without a rate are NaN
+        """
+        rates, resolution = self.lookup(from_currencies, to_currencies, dates)
+        translated = round_half_up(np.asarray(amounts, dtype=np.float64) * rates, rounding_places)
+        return translated, rates, resolution
+
+    def cross_rate_matrix(self, rate_date: date) -> np.ndarray:
+        """Resolved n x n rate matrix for one date"""
+        return self.rates[:, :, min(rate_date.toordinal() - self.start_ordinal, self.days - 1)]
+
+    def missing_direct_pairs(self, rate_date: date) -> List[Tuple[str, str, float, int]]:
+        """Pairs without a stored rate that can be derived, as (from, to, rate, resolution)"""
+        day = min(rate_date.toordinal() - self.start_ordinal, self.days - 1)
+        derived = np.argwhere(self.resolution[:, :, day] > RESOLUTION_DIRECT)
+        return [
+            (self.currencies[i], self.currencies[j], float(self.rates[i, j, day]),
+             int(self.resolution[i, j, day]))
+            for i, j in derived
+        ]
+
+    def triangular_deviations(self, rate_date: date, tolerance: float = 0.01) -> List[Dict]:
+        """
+        Triangular arbitrage check on stored rates for one date
+
+        Compares every stored base->target rate with base->via x via->target for all
+        via currencies at once.
+        """
+        day = min(rate_date.toordinal() - self.start_ordinal, self.days - 1)
+        if day < 0:
+            return []
+
+        stored = self.direct[:, :, day].copy()
+        n = len(self.currencies)
+        stored[np.arange(n), np.arange(n)] = np.nan
+
+        # calculated[b, v, t] = stored[b, v] * stored[v, t]; direct[b, t] broadcast over v
+        calculated = stored[:, :, None] * stored[None, :, :]
+        direct = stored[:, None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            deviation = np.abs(direct - calculated) / direct
+        flagged = np.argwhere(deviation > tolerance)
+
+        return [
+            {
+                'path': f"{self.currencies[b]} → {self.currencies[t]} (direct) vs "
+                        f"{self.currencies[b]} → {self.currencies[v]} → {self.currencies[t]}",
+                'direct_rate': float(stored[b, t]),
+                'calculated_rate': float(calculated[b, v, t]),
+                'deviation_percent': float(deviation[b, v, t]) * 100
+            }
+            for b, v, t in flagged
+            if b != v and v != t and b != t
+        ]
+
+    def get_statistics(self) -> Dict[str, int]:
+        return {
+            "currencies": len(self.currencies),
+            "days": self.days,
+            "direct_rates": int((self.resolution == RESOLUTION_DIRECT).sum()),
+            "inverse_rates": int((self.resolution == RESOLUTION_INVERSE).sum()),
+            "triangulated_rates": int((self.resolution == RESOLUTION_TRIANGULATED).sum()),
+            "missing_rates": int((self.resolution == RESOLUTION_MISSING).sum()),
+            "bytes": int(self.rates.nbytes + self.direct.nbytes + self.resolution.nbytes)
+        }
+
+
+def load_rate_cube(start_date: date, end_date: Optional[date] = None,
+                   currencies: Optional[Iterable[str]] = None,
+                   pivot_currency: Optional[str] = DEFAULT_PIVOT_CURRENCY) -> RateCube:
+    """Load a rate cube for a date window (a single day when end_date is omitted)"""
+    return RateCube.load(start_date, end_date or start_date, currencies, pivot_currency)
+
+
+class RateCubeCache:
+    """Bounded cache of calendar-month cubes of every active currency"""
+
+    def __init__(self, max_cubes: int = 24, max_age_seconds: int = 300):
+        self.max_cubes = max_cubes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.RLock()
+        self._cubes: "OrderedDict[Tuple[int, int, Optional[str]], Tuple[RateCube, float]]" = OrderedDict()
+        self._hits = 0
+        self._loads = 0
+
+    def invalidate(self) -> int:
+        """Drop every cached cube after rates were written; returns the number dropped"""
+        with self._lock:
+            dropped = len(self._cubes)
+            self._cubes.clear()
+            return dropped
+
+    def get(self, rate_date: date, pivot_currency: Optional[str] = DEFAULT_PIVOT_CURRENCY) -> RateCube:
+        """Cube of the calendar month containing ``rate_date``"""
+        key = (rate_date.year, rate_date.month, pivot_currency)
+        with self._lock:
+            cached = self._cubes.get(key)
+            if cached is not None and time.monotonic() - cached[1] <= self.max_age_seconds:
+                self._cubes.move_to_end(key)
+                self._hits += 1
+                return cached[0]
+
+            start_date = rate_date.replace(day=1)
+            end_date = (start_date + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            cube = RateCube.load(start_date, end_date, pivot_currency=pivot_currency)
+            self._loads += 1
+            self._cubes[key] = (cube, time.monotonic())
+            self._cubes.move_to_end(key)
+            while len(self._cubes) > self.max_cubes:
+                self._cubes.popitem(last=False)
+            return cube
+
+    def get_statistics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "cubes_cached": len(self._cubes),
+                "max_cubes": self.max_cubes,
+                "hits": self._hits,
+                "loads": self._loads
+            }
+
+
+# Process-wide cube cache for point lookups
+rate_cube_cache = RateCubeCache()
@@ -0,0 +1,235 @@
+"""
+Rate Source Providers
+Pluggable transport used by CentralBankRatesService to fetch central bank documents
+
+Every document a rate source needs (the ECB daily XML, one FRED series, one BOE
+series) is described by a ``RateResource``: a provider-neutral ``key`` such as
+``ecb/eurofxref-daily.xml`` plus the real endpoint URL and query parameters.
+
+Providers:
+- ``HttpRateProvider`` fetches the real endpoints, or any HTTP stand-in serving
+  the resource keys under ``base_url``, through a ``ResponseCache`` on disk.
+  Cached documents younger than ``fresh_seconds`` are served without a request;
+  older ones are revalidated with If-None-Match / If-Modified-Since, and served
+  stale if the endpoint cannot be reached.
+- ``LocalFileRateProvider`` reads ``<root_dir>/<key>`` from disk, for tests and
+  air-gapped runs.
+
+``get_default_rate_provider()`` picks one from the central_bank_rates_* settings.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from utils.logger import get_logger
+
+logger = get_logger("rate_source_providers")
+
+# Query parameters never written into cache keys
+SECRET_PARAMS = frozenset({"api_key"})
+
+
+@dataclass(frozen=True)
+class RateResource:
+    """One document to fetch from a rate source"""
+    source: str
+    key: str
+    url: str
+    params: Tuple[Tuple[str, str], ...] = ()
+
+    @property
+    def cache_key(self) -> str:
+        public_params = [(name, value) for name, value in self.params if name not in SECRET_PARAMS]
+        raw = self.key + "?" + "&".join(f"{name}={value}" for name, value in sorted(public_params))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class RateResponse:
+    """Result of fetching one RateResource"""
+    resource: RateResource
+    status_code: int
+    content: bytes = b""
+    from_cache: bool = False
+    revalidated: bool = False
+    stale: bool = False
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200 and self.error is None
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+
+class RateSourceProvider:
+    """Interface for fetching rate source documents"""
+
+    name = "base"
+    # Whether the real endpoints behind this provider need API credentials
+    requires_credentials = True
+
+    def fetch(self, resource: RateResource) -> RateResponse:
+        raise NotImplementedError
+
+
+class ResponseCache:
+    """On-disk cache of fetched documents with their validators"""
+
+    def __init__(self, cache_dir: str, fresh_seconds: int = 300):
+        self.cache_dir = cache_dir
+        self.fresh_seconds = fresh_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, resource: RateResource) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, resource.cache_key)
+        return base + ".body", base + ".json"
+
+    def get(self, resource: RateResource) -> Optional[Tuple[bytes, Dict]]:
+        """Cached body and metadata, or None"""
+        body_path, meta_path = self._paths(resource)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                return f.read(), meta
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, meta: Dict) -> bool:
+        return time.time() - meta.get("fetched_at", 0) <= self.fresh_seconds
+
+    def put(self, resource: RateResource, content: bytes, headers: Dict[str, str]):
+        body_path, _ = self._paths(resource)
+        self._write_atomic(body_path, content)
+        self._write_meta(resource, {
+            "key": resource.key,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time()
+        })
+
+    def touch(self, resource: RateResource, meta: Dict):
+        """Record a successful revalidation"""
+        self._write_meta(resource, {**meta, "fetched_at": time.time()})
+
+    def _write_meta(self, resource: RateResource, meta: Dict):
+        _, meta_path = self._paths(resource)
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class HttpRateProvider(RateSourceProvider):
+    """Fetches resources over HTTP with conditional revalidation against a disk cache"""
+
+    name = "http"
+
+    def __init__(self, cache: Optional[ResponseCache] = None, timeout: int = 30,
+                 base_url: Optional[str] = None, pool_size: int = 10):
+        """
+        Args:
+            cache: Response cache (None disables caching)
+            timeout: Per-request timeout in seconds
+            base_url: Serve every resource from ``<base_url>/<key>`` instead of the
+                real endpoint, e.g. a local HTTP stand-in
+            pool_size: Connections kept per host, at least the fetch parallelism
+        """
+        self.cache = cache
+        self.timeout = timeout
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.requires_credentials = base_url is None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _url(self, resource: RateResource) -> str:
+        return f"{self.base_url}/{resource.key}" if self.base_url else resource.url
+
+    def fetch(self, resource: RateResource) -> RateResponse:
+        started = time.perf_counter()
+        cached = self.cache.get(resource) if self.cache else None
+
+        if cached and self.cache.is_fresh(cached[1]):
+            return RateResponse(resource, 200, cached[0], from_cache=True)
+
+        headers = {}
+        if cached:
+            if cached[1].get("etag"):
+                headers["If-None-Match"] = cached[1]["etag"]
+            if cached[1].get("last_modified"):
+                headers["If-Modified-Since"] = cached[1]["last_modified"]
+
+        try:
+            response = self.session.get(self._url(resource), params=dict(resource.params),
+                                        headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if cached:
+                logger.warning(f"{resource.key}: {e}; serving cached copy")
+                return RateResponse(resource, 200, cached[0], from_cache=True, stale=True,
+                                    elapsed_ms=elapsed_ms)
+            return RateResponse(resource, 0, elapsed_ms=elapsed_ms, error=str(e))
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if response.status_code == 304 and cached:
+            self.cache.touch(resource, cached[1])
+            return RateResponse(resource, 200, cached[0], from_cache=True, revalidated=True,
+                                elapsed_ms=elapsed_ms)
+
+        if response.status_code == 200:
+            if self.cache:
+                self.cache.put(resource, response.content, response.headers)
+            return RateResponse(resource, 200, response.content, elapsed_ms=elapsed_ms)
+
+        return RateResponse(resource, response.status_code, response.content, elapsed_ms=elapsed_ms,
+                            error=f"HTTP {response.status_code}")
+
+
+class LocalFileRateProvider(RateSourceProvider):
+    """Serves resources from files laid out by resource key under ``root_dir``"""
+
+    name = "local"
+    requires_credentials = False
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def fetch(self, resource: RateResource) -> RateResponse:
+        path = os.path.join(self.root_dir, *resource.key.split("/"))
+        try:
+            with open(path, "rb") as f:
+                return RateResponse(resource, 200, f.read())
+        except OSError as e:
+            return RateResponse(resource, 404, error=f"{path}: {e.strerror}")
+
+
+def get_default_rate_provider() -> RateSourceProvider:
+    """Provider configured by the central_bank_rates_* settings"""
+    from config import settings
+
+    if settings.central_bank_rates_fixture_dir:
+        return LocalFileRateProvider(settings.central_bank_rates_fixture_dir)
+
+    cache = None
+    if settings.central_bank_rates_cache_dir:
+        cache = ResponseCache(settings.central_bank_rates_cache_dir,
+                              settings.central_bank_rates_cache_fresh_seconds)
+    return HttpRateProvider(cache=cache, base_url=settings.central_bank_rates_base_url,
+                            pool_size=max(settings.central_bank_rates_max_workers, 1))
@@ -0,0 +1,343 @@
+"""
+Shared Report Result Cache
+Process-wide cache of report results, invalidated by data versions
+
+Entries are keyed by report type plus the normalized filter parameters, so
+every user requesting the same report shares one result. Each entry is
+tagged with the data version of its scope (companies, fiscal years,
+periods). Versions live in report_data_versions, one counter per (company,
+fiscal year, period); the posting, reversal and revaluation paths bump them
+in the same transaction as their writes, so other processes see the change
+as soon as it commits. GL postings and parallel ledger entries (bulk and
+per document) bump them through GLPostingEngine._apply_balance_deltas.
+
+A lookup reads the sum of the scope's counters. Counters only grow, so the
+sum changes exactly when a posting touched the scope, and the entry is then
+recomputed. Concurrent requests for the same missing entry wait for the
+first computation instead of running the report again.
+
+Journal entry drafts are not versioned. Reports that include unposted
+documents therefore also pass ``max_age`` to bound how stale they can get.
+
+Memory is bounded by ``max_bytes`` with least-recently-used eviction.
+"""
+
+import copy
+import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+from sqlalchemy import text
+from db_config import engine
+from utils.logger import get_logger
+
+logger = get_logger("report_cache")
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Age limit for reports that read data without a version (e.g. drafts)
+UNVERSIONED_MAX_AGE_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class CacheScope:
+    """Data a report depends on (None = every company / year / period)"""
+    company_codes: Optional[Tuple[str, ...]] = None
+    fiscal_years: Optional[Tuple[int, ...]] = None
+    periods: Optional[Tuple[int, ...]] = None
+
+    @classmethod
+    def of(cls, company_codes: Optional[Iterable[str]] = None,
+           fiscal_years: Optional[Iterable[int]] = None,
+           periods: Optional[Iterable[int]] = None) -> "CacheScope":
+        """Scope from filter lists; empty lists and "All" mean unrestricted"""
+        def normalize(values, cast):
+            if not values or "All" in values:
+                return None
+            return tuple(sorted({cast(value) for value in values}))
+        return cls(normalize(company_codes, str), normalize(fiscal_years, int), normalize(periods, int))
+
+
+@dataclass
+class CacheEntry:
+    """One cached report result"""
+    key: str
+    report_type: str
+    value: Any
+    size_bytes: int
+    data_version: int
+    created_at: float
+    max_age: Optional[float] = None
+    hits: int = 0
+    compute_seconds: float = 0.0
+
+    def expired(self, now: float) -> bool:
+        return self.max_age is not None and now - self.created_at > self.max_age
+
+
+@dataclass
+class _Flight:
+    """Computation in progress for one key"""
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+def _normalize(value: Any) -> Any:
+    """JSON-serializable, order-independent form of filter parameters"""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        # Filter lists are selections: their order does not change the report
+        return sorted((_normalize(v) for v in value), key=lambda item: json.dumps(item, sort_keys=True, default=str))
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    return value
+
+
+def make_cache_key(report_type: str, params: Dict[str, Any]) -> str:
+    """Cache key of a report type and its filter parameters"""
+    return f"{report_type}:{json.dumps(_normalize(params), sort_keys=True, default=str)}"
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+def _copy_value(value: Any) -> Any:
+    """Copy handed to callers so page-side edits never change the cached result"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=True)
+    return copy.deepcopy(value)
+
+
+def bump_data_versions(conn, keys: Iterable[Tuple[str, int, int]]):
+    """
+    Bump the data version of (company, fiscal year, period) keys on an open transaction
+
+    Keys are bumped in sorted order so concurrent postings lock version rows in
+    the same sequence.
+    """
+    keys = sorted({(str(cc), int(fy), int(period)) for cc, fy, period in keys
+                   if cc is not None and fy is not None and period is not None})
+    if not keys:
+        return
+
+    conn.execute(text("""
+        INSERT INTO report_data_versions (company_code, fiscal_year, posting_period, version, updated_at)
+        SELECT k.company_code, k.fiscal_year, k.posting_period, 1, CURRENT_TIMESTAMP
+        FROM unnest(CAST(:companies AS VARCHAR[]), CAST(:years AS INTEGER[]), CAST(:periods AS INTEGER[]))
+            AS k(company_code, fiscal_year, posting_period)
+        ON CONFLICT (company_code, fiscal_year, posting_period)
+        DO UPDATE SET version = report_data_versions.version + 1,
+                      updated_at = CURRENT_TIMESTAMP
+    """), {
+        "companies": [key[0] for key in keys],
+        "years": [key[1] for key in keys],
+        "periods": [key[2] for key in keys]
+    })
+
+
+class ReportCache:
+    """Data-version-aware LRU cache of report results, bounded by bytes"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "expired": 0, "coalesced": 0,
+                       "evictions": 0, "oversized": 0, "errors": 0}
+        self._by_type: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, report_type: str, outcome: str):
+        self._stats[outcome] += 1
+        counters = self._by_type.setdefault(report_type, {"hits": 0, "misses": 0})
+        if outcome in counters:
+            counters[outcome] += 1
+
+    def data_version(self, scope: CacheScope) -> int:
+        """Current data version of a scope (sum of its per-period counters)"""
+        conditions = ["TRUE"]
+        params: Dict[str, Any] = {}
+        if scope.company_codes is not None:
+            conditions.append("company_code = ANY(:companies)")
+            params["companies"] = list(scope.company_codes)
+        if scope.fiscal_years is not None:
+            conditions.append("fiscal_year = ANY(:years)")
+            params["years"] = list(scope.fiscal_years)
+        if scope.periods is not None:
+            conditions.append("posting_period = ANY(:periods)")
+            params["periods"] = list(scope.periods)
+
+        with engine.connect() as conn:
+            return int(conn.execute(text(f"""
+                SELECT COALESCE(SUM(version), 0)
+                FROM report_data_versions
+                WHERE {" AND ".join(conditions)}
+            """), params).scalar())
+
+    def get_or_compute(self, report_type: str, params: Dict[str, Any], compute: Callable[[], Any],
+                       scope: Optional[CacheScope] = None, max_age: Optional[float] = None) -> Any:
+        """
+        Cached result of ``compute`` for a report type and its filter parameters
+
+        Args:
+            report_type: Report identifier (part of the key)
+            params: Filter parameters (normalized into the key)
+            compute: Produces the result on a miss
+            scope: Data the report reads (defaults to everything)
+            max_age: Optional age limit in seconds for data that is not versioned
+
+        Returns:
+            A copy of the cached or freshly computed result
+        """
+        key = make_cache_key(report_type, params)
+        scope = scope or CacheScope()
+
+        try:
+            version = self.data_version(scope)
+        except Exception as e:
+            # Without versions the cache cannot be trusted; serve uncached
+            logger.warning(f"Report cache bypassed for {report_type}: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return compute()
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if entry.data_version == version and not entry.expired(time.time()):
+                        entry.hits += 1
+                        self._entries.move_to_end(key)
+                        self._count(report_type, "hits")
+                        return _copy_value(entry.value)
+                    self._remove(key)
+                    self._stats["stale" if entry.data_version != version else "expired"] += 1
+
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = _Flight()
+                    break
+                self._stats["coalesced"] += 1
+
+            # Another request is computing this key; wait for it and look again
+            flight.done.wait()
+
+        try:
+            started = time.perf_counter()
+            value = compute()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._count(report_type, "misses")
+                self._store(CacheEntry(
+                    key=key,
+                    report_type=report_type,
+                    value=_copy_value(value),
+                    size_bytes=estimate_size(value),
+                    data_version=version,
+                    created_at=time.time(),
+                    max_age=max_age,
+                    compute_seconds=elapsed
+                ))
+            return value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _store(self, entry: CacheEntry):
+        """Insert an entry and evict least recently used entries beyond max_bytes"""
+        if entry.size_bytes > self.max_bytes:
+            self._stats["oversized"] += 1
+            return
+        self._remove(entry.key)
+        self._entries[entry.key] = entry
+        self._bytes += entry.size_bytes
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size_bytes
+
+    def invalidate(self, report_type: Optional[str] = None) -> int:
+        """Drop all entries, or those of one report type; returns the number dropped"""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items()
+                    if report_type is None or entry.report_type == report_type]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        """Drop all entries and reset the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for name in self._stats:
+                self._stats[name] = 0
+            self._by_type.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory use"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "by_report_type": [
+                    {"report_type": report_type, **counters}
+                    for report_type, counters in sorted(self._by_type.items())
+                ]
+            }
+
+    def get_entries(self) -> List[Dict[str, Any]]:
+        """Cached entries from least to most recently used"""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "report_type": entry.report_type,
+                    "key": entry.key,
+                    "size_bytes": entry.size_bytes,
+                    "data_version": entry.data_version,
+                    "age_seconds": round(now - entry.created_at, 1),
+                    "max_age": entry.max_age,
+                    "hits": entry.hits,
+                    "compute_ms": round(entry.compute_seconds * 1000, 1)
+                }
+                for entry in self._entries.values()
+            ]
+
+
+# Process-wide cache shared by all sessions
+report_cache = ReportCache()
+
+
+def cached_report(report_type: str, params: Dict[str, Any], compute: Callable[[], Any],
+                  scope: Optional[CacheScope] = None, max_age: Optional[float] = None) -> Any:
+    """Convenience wrapper around the process-wide report cache"""
+    return report_cache.get_or_compute(report_type, params, compute, scope, max_age)
@@ -0,0 +1,388 @@
+"""
+Balance Reporting Engine
+Answers trial balance, balance sheet, income statement and cash flow requests from gl_account_balances
+
+Posted amounts come from the period totals the posting engine maintains in
+gl_account_balances (one row per company, account, ledger, fiscal year and
+period), so a report reads one row per account and period instead of every
+journal line. Journal lines are read only for:
+
+- documents that have not been posted (drafts, parked and pending documents,
+  which have no balance rows yet), and
+- posted documents of periods that a date range only partly covers
+  (periods are taken whole when fiscal_period_controls places them entirely
+  inside ``date_from``..``date_to``; periods without a calendar row fall back
+  to their lines), and
+- posted documents of those whole periods whose document date lies outside
+  the range, which are subtracted again: the date range filters on
+  ``documentdate`` exactly as the journal-line queries do, even for documents
+  dated outside the period they were posted to.
+
+A ``created_by`` filter cannot be answered from period totals, so it switches
+the whole request to the journal lines.
+
+A document counts as posted once ``posted_at`` is set: GL postings set it
+together with workflow_status 'POSTED', while parallel ledger entries are
+written as 'APPROVED' with ``posted_at`` and their balance deltas applied.
+"""
+
+from dataclasses import asdict, dataclass, replace
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from db_config import engine
+from utils.logger import get_logger
+from utils.report_cache import UNVERSIONED_MAX_AGE_SECONDS, CacheScope, report_cache
+
+logger = get_logger("reporting_engine")
+
+# Header condition of documents whose amounts are in gl_account_balances
+POSTED_CONDITION = "jeh.posted_at IS NOT NULL"
+
+BALANCE_SHEET_TYPES = ["Asset", "Liability", "Equity"]
+INCOME_STATEMENT_TYPES = ["Revenue", "Expense"]
+
+ACCOUNT_TOTAL_COLUMNS = [
+    "glaccountid", "accountname", "accounttype", "total_debit", "total_credit",
+    "net_balance", "transaction_count"
+]
+
+
+@dataclass
+class ReportFilter:
+    """Filters shared by the financial statement pages (None or empty = no restriction)"""
+    company_codes: Optional[List[str]] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    fiscal_years: Optional[List[int]] = None
+    periods: Optional[List[int]] = None
+    account_types: Optional[List[str]] = None
+    account_id_search: str = ""
+    account_name_search: str = ""
+    created_by: Optional[List[str]] = None
+    include_unposted: bool = True
+
+
+class BalanceReportingEngine:
+    """Shared reporting API over gl_account_balances with a journal-line fallback"""
+
+    def __init__(self):
+        self.last_sources: Dict[str, Any] = {}
+
+    def header_conditions(self, report_filter: ReportFilter, params: Dict[str, Any]) -> List[str]:
+        """Journal header conditions of the filter"""
+        conditions = []
+        if report_filter.date_from:
+            conditions.append("jeh.documentdate >= :date_from")
+            params["date_from"] = report_filter.date_from
+        if report_filter.date_to:
+            conditions.append("jeh.documentdate <= :date_to")
+            params["date_to"] = report_filter.date_to
+        if report_filter.company_codes:
+            conditions.append("jeh.companycodeid = ANY(:company_codes)")
+            params["company_codes"] = list(report_filter.company_codes)
+        if report_filter.fiscal_years:
+            conditions.append("jeh.fiscalyear = ANY(:fiscal_years)")
+            params["fiscal_years"] = [int(y) for y in report_filter.fiscal_years]
+        if report_filter.periods:
+            conditions.append("jeh.period = ANY(:periods)")
+            params["periods"] = [int(p) for p in report_filter.periods]
+        if report_filter.created_by:
+            conditions.append("jeh.createdby = ANY(:created_by)")
+            params["created_by"] = list(report_filter.created_by)
+        return conditions
+
+    def _period_conditions(self, report_filter: ReportFilter, alias: str,
+                           company_column: str, period_column: str) -> List[str]:
+        """Company, year and period conditions on a period-keyed table"""
+        conditions = []
+        if report_filter.company_codes:
+            conditions.append(f"{alias}.{company_column} = ANY(:company_codes)")
+        if report_filter.fiscal_years:
+            conditions.append(f"{alias}.fiscal_year = ANY(:fiscal_years)")
+        if report_filter.periods:
+            conditions.append(f"{alias}.{period_column} = ANY(:periods)")
+        return conditions
+
+    def account_conditions(self, report_filter: ReportFilter, params: Dict[str, Any]) -> List[str]:
+        """glaccount conditions of the filter"""
+        conditions = []
+        if report_filter.account_types:
+            conditions.append("coa.accounttype = ANY(:account_types)")
+            params["account_types"] = list(report_filter.account_types)
+        if report_filter.account_id_search:
+            conditions.append("UPPER(coa.glaccountid) LIKE UPPER(:account_id_search)")
+            params["account_id_search"] = f"%{report_filter.account_id_search}%"
+        if report_filter.account_name_search:
+            conditions.append("UPPER(coa.accountname) LIKE UPPER(:account_name_search)")
+            params["account_name_search"] = f"%{report_filter.account_name_search}%"
+        return conditions
+
+    def _build_query(self, report_filter: ReportFilter) -> Tuple[str, Dict[str, Any], str]:
+        """Account totals query and its parameters; returns (sql, params, mode)"""
+        params: Dict[str, Any] = {}
+        header_conditions = self.header_conditions(report_filter, params)
+        account_conditions = self.account_conditions(report_filter, params)
+        account_where = " AND ".join(account_conditions) if account_conditions else "TRUE"
+
+        if report_filter.created_by:
+            # Creator is a document attribute: every amount comes from the lines
+            line_where = " AND ".join(header_conditions) if header_conditions else "TRUE"
+            if not report_filter.include_unposted:
+                line_where += f" AND {POSTED_CONDITION}"
+            return f"""
+                WITH line_totals AS (
+                    SELECT jel.glaccountid AS gl_account,
+                           SUM(COALESCE(jel.debitamount, 0)) AS debit,
+                           SUM(COALESCE(jel.creditamount, 0)) AS credit,
+                           COUNT(*) AS transaction_count
+                    FROM journalentryline jel
+                    JOIN journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
+                        AND jeh.companycodeid = jel.companycodeid
+                    WHERE {line_where}
+                    GROUP BY jel.glaccountid
+                )
+                SELECT coa.glaccountid, coa.accountname, coa.accounttype,
+                       t.debit AS total_debit, t.credit AS total_credit,
+                       t.debit - t.credit AS net_balance,
+                       t.transaction_count
+                FROM line_totals t
+                JOIN glaccount coa ON coa.glaccountid = t.gl_account
+                WHERE {account_where}
+            """, params, "lines"
+
+        date_range = report_filter.date_from is not None or report_filter.date_to is not None
+        if date_range:
+            # Periods lying entirely inside the date range are read whole from the balances
+            calendar_conditions = self._period_conditions(
+                report_filter, "fpc", "company_code", "posting_period"
+            )
+            if report_filter.date_from:
+                calendar_conditions.append("fpc.period_start_date >= :date_from")
+            if report_filter.date_to:
+                calendar_conditions.append("fpc.period_end_date <= :date_to")
+            balance_periods_cte = f"""
+                balance_periods AS (
+                    SELECT fpc.company_code, fpc.fiscal_year, fpc.posting_period
+                    FROM fiscal_period_controls fpc
+                    WHERE {" AND ".join(calendar_conditions)}
+                ),"""
+            balance_join = """
+                    JOIN balance_periods bp ON bp.company_code = b.company_code
+                        AND bp.fiscal_year = b.fiscal_year
+                        AND bp.posting_period = b.posting_period"""
+            balance_where = "TRUE"
+            posted_fallback = f"""({POSTED_CONDITION} AND NOT EXISTS (
+                        SELECT 1 FROM balance_periods bp
+                        WHERE bp.company_code = jeh.companycodeid
+                        AND bp.fiscal_year = jeh.fiscalyear
+                        AND bp.posting_period = jeh.period
+                    ))"""
+
+            # Documents in those periods but dated outside the range are in the balances; take them out
+            outside_conditions = self.header_conditions(
+                replace(report_filter, date_from=None, date_to=None), params
+            )
+            outside_dates = []
+            if report_filter.date_from:
+                outside_dates.append("jeh.documentdate < :date_from")
+            if report_filter.date_to:
+                outside_dates.append("jeh.documentdate > :date_to")
+            outside_conditions += [
+                POSTED_CONDITION,
+                f"({' OR '.join(outside_dates)})",
+                """EXISTS (
+                        SELECT 1 FROM balance_periods bp
+                        WHERE bp.company_code = jeh.companycodeid
+                        AND bp.fiscal_year = jeh.fiscalyear
+                        AND bp.posting_period = jeh.period
+                    )"""
+            ]
+            outside_cte = f"""
+            outside_totals AS (
+                SELECT jel.glaccountid AS gl_account,
+                       -SUM(COALESCE(jel.debitamount, 0)) AS debit,
+                       -SUM(COALESCE(jel.creditamount, 0)) AS credit,
+                       -COUNT(*) AS transaction_count
+                FROM journalentryline jel
+                JOIN journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
+                    AND jeh.companycodeid = jel.companycodeid
+                WHERE {" AND ".join(outside_conditions)}
+                GROUP BY jel.glaccountid
+            ),"""
+            outside_union = """
+                    UNION ALL
+                    SELECT * FROM outside_totals"""
+        else:
+            balance_periods_cte = ""
+            balance_join = ""
+            balance_conditions = self._period_conditions(report_filter, "b", "company_code", "posting_period")
+            balance_where = " AND ".join(balance_conditions) if balance_conditions else "TRUE"
+            posted_fallback = None
+            outside_cte = ""
+            outside_union = ""
+
+        fallback_conditions = []
+        if report_filter.include_unposted:
+            fallback_conditions.append(f"NOT ({POSTED_CONDITION})")
+        if posted_fallback:
+            fallback_conditions.append(posted_fallback)
+        line_where = " AND ".join(header_conditions + (
+            [f"({' OR '.join(fallback_conditions)})"] if fallback_conditions else ["FALSE"]
+        ))
+
+        return f"""
+            WITH {balance_periods_cte}
+            balance_totals AS (
+                SELECT b.gl_account,
+                       SUM(COALESCE(b.period_debits, 0)) AS debit,
+                       SUM(COALESCE(b.period_credits, 0)) AS credit,
+                       SUM(COALESCE(b.transaction_count, 0)) AS transaction_count
+                FROM gl_account_balances b{balance_join}
+                WHERE {balance_where}
+                GROUP BY b.gl_account
+            ),
+            line_totals AS (
+                SELECT jel.glaccountid AS gl_account,
+                       SUM(COALESCE(jel.debitamount, 0)) AS debit,
+                       SUM(COALESCE(jel.creditamount, 0)) AS credit,
+                       COUNT(*) AS transaction_count
+                FROM journalentryline jel
+                JOIN journalentryheader jeh ON jeh.documentnumber = jel.documentnumber
+                    AND jeh.companycodeid = jel.companycodeid
+                WHERE {line_where}
+                GROUP BY jel.glaccountid
+            ),{outside_cte}
+            totals AS (
+                SELECT gl_account, SUM(debit) AS debit, SUM(credit) AS credit,
+                       SUM(transaction_count) AS transaction_count
+                FROM (
+                    SELECT * FROM balance_totals
+                    UNION ALL
+                    SELECT * FROM line_totals{outside_union}
+                ) combined
+                GROUP BY gl_account
+            )
+            SELECT coa.glaccountid, coa.accountname, coa.accounttype,
+                   t.debit AS total_debit, t.credit AS total_credit,
+                   t.debit - t.credit AS net_balance,
+                   t.transaction_count
+            FROM totals t
+            JOIN glaccount coa ON coa.glaccountid = t.gl_account
+            WHERE {account_where}
+        """, params, "balances"
+
+    def account_totals(self, report_filter: ReportFilter) -> pd.DataFrame:
+        """
+        Debit, credit and net totals per account for the filter
+
+        Results are shared through the report cache and recomputed when a posting
+        changes one of the filter's periods. Unposted documents carry no data
+        version, so results including them also expire after
+        UNVERSIONED_MAX_AGE_SECONDS.
+
+        Returns:
+            DataFrame with ACCOUNT_TOTAL_COLUMNS ordered by account type and account
+        """
+        return report_cache.get_or_compute(
+            "account_totals", asdict(report_filter),
+            lambda: self._query_account_totals(report_filter),
+            scope=CacheScope.of(report_filter.company_codes, report_filter.fiscal_years, report_filter.periods),
+            max_age=UNVERSIONED_MAX_AGE_SECONDS if report_filter.include_unposted else None
+        )
+
+    def _query_account_totals(self, report_filter: ReportFilter) -> pd.DataFrame:
+        """Uncached account_totals"""
+        query, params, mode = self._build_query(report_filter)
+        with engine.connect() as conn:
+            df = pd.read_sql(text(query), conn, params=params)
+
+        for column in ["total_debit", "total_credit", "net_balance"]:
+            df[column] = df[column].astype(float)
+        df["transaction_count"] = df["transaction_count"].astype("int64")
+
+        self.last_sources = {"mode": mode, "accounts": len(df)}
+        logger.info(f"Account totals for {len(df)} accounts answered from {mode}")
+        return df.sort_values(["accounttype", "glaccountid"]).reset_index(drop=True)[ACCOUNT_TOTAL_COLUMNS]
+
+    def trial_balance(self, report_filter: ReportFilter, threshold: Optional[float] = None) -> pd.DataFrame:
+        """Accounts with debit or credit totals of at least ``threshold`` (None = all)"""
+        df = self.account_totals(report_filter)
+        if threshold is not None:
+            df = df[(df["total_debit"].abs() >= threshold) | (df["total_credit"].abs() >= threshold)]
+        return df.reset_index(drop=True)
+
+    def balance_sheet(self, report_filter: ReportFilter, threshold: Optional[float] = None) -> pd.DataFrame:
+        """Balance sheet accounts with ``balance`` = debits - credits"""
+        if not report_filter.account_types:
+            report_filter = replace(report_filter, account_types=BALANCE_SHEET_TYPES)
+        df = self.account_totals(report_filter)
+        df["balance"] = df["net_balance"]
+        if threshold is not None:
+            df = df[df["balance"].abs() >= threshold]
+        return df[["glaccountid", "accountname", "accounttype", "balance"]].reset_index(drop=True)
+
+    def income_statement(self, report_filter: ReportFilter, threshold: Optional[float] = None) -> pd.DataFrame:
+        """Income statement accounts with ``net_amount`` = credits - debits"""
+        if not report_filter.account_types:
+            report_filter = replace(report_filter, account_types=INCOME_STATEMENT_TYPES)
+        df = self.account_totals(report_filter)
+        df["net_amount"] = -df["net_balance"]
+        if threshold is not None:
+            df = df[df["net_amount"].abs() >= threshold]
+        df = df.sort_values(["accounttype", "glaccountid"], ascending=[False, True])
+        return df[["glaccountid", "accountname", "accounttype", "net_amount"]].reset_index(drop=True)
+
+    def cash_flow(self, report_filter: ReportFilter, method: str = "Direct Method",
+                  threshold: Optional[float] = None) -> pd.DataFrame:
+        """Net change per account with its cash flow category for the direct or indirect method"""
+        df = self.account_totals(report_filter)
+        df["net_change"] = df["net_balance"]
+        if threshold is not None:
+            df = df[df["net_change"].abs() >= threshold].copy()
+
+        df["cash_flow_category"] = cash_flow_categories(df["accounttype"], df["accountname"], method)
+        df = df.sort_values(["cash_flow_category", "accounttype", "glaccountid"])
+        return df[["glaccountid", "accountname", "accounttype", "net_change",
+                   "cash_flow_category", "transaction_count"]].reset_index(drop=True)
+
+
+def cash_flow_categories(account_types: pd.Series, account_names: pd.Series, method: str) -> np.ndarray:
+    """Cash flow category per account from its type and name"""
+    names = account_names.fillna("")
+
+    def named(word: str) -> pd.Series:
+        return names.str.contains(word, case=False, regex=False)
+
+    cash = (account_types == "Asset") & (named("cash") | named("bank"))
+    if method == "Direct Method":
+        conditions = [
+            cash,
+            account_types == "Revenue",
+            (account_types == "Expense") & ~named("depreciation"),
+            (account_types == "Asset") & (named("equipment") | named("property") | named("investment")),
+            (account_types == "Liability") & (named("loan") | named("debt")),
+            account_types == "Equity"
+        ]
+        choices = ["Cash and Cash Equivalents", "Operating Activities", "Operating Activities",
+                   "Investing Activities", "Financing Activities", "Financing Activities"]
+    else:
+        conditions = [
+            cash,
+            account_types.isin(INCOME_STATEMENT_TYPES),
+            (account_types == "Asset") & ~named("cash") & ~named("bank"),
+            (account_types == "Liability") & ~named("loan") & ~named("debt"),
+            (account_types == "Asset") & (named("equipment") | named("property")),
+            (account_types == "Liability") & (named("loan") | named("debt")),
+            account_types == "Equity"
+        ]
+        choices = ["Cash and Cash Equivalents", "Net Income Adjustment", "Operating Activities",
+                   "Operating Activities", "Investing Activities", "Financing Activities",
+                   "Financing Activities"]
+    return np.select(conditions, choices, default="Operating Activities")
+
+
+# Process-wide instance used by the report pages
+reporting_engine = BalanceReportingEngine()
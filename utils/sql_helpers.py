@@ -5,7 +5,7 @@ Common utilities to handle PostgreSQL-specific syntax properly
 
 from sqlalchemy import text
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Sequence
 
 def build_date_filter(column: str, days_back: int, operator: str = ">=") -> tuple:
     """
@@ -131,6 +131,69 @@ def safe_sql_query(query: str, params: Dict[str, Any], connection) -> Any:
         print(f"Params: {params}")
         return None
 
+def build_values_clause(columns: Sequence[str], rows: Sequence[Dict[str, Any]],
+                        prefix: str = "v") -> tuple:
+    """
+    Build a multi-row VALUES list with uniquely named bind parameters
+    
+    Args:
+        columns: Column names, in the order they appear in each tuple
+        rows: Row dictionaries keyed by column name
+        prefix: Bind parameter prefix (must be unique within one statement)
+    
+    Returns:
+        Tuple of (values_sql, params_dict)
+    """
+    params = {}
+    tuples = []
+    
+    for i, row in enumerate(rows):
+        placeholders = []
+        for j, column in enumerate(columns):
+            key = f"{prefix}{i}_{j}"
+            params[key] = row[column]
+            placeholders.append(f":{key}")
+        tuples.append(f"({', '.join(placeholders)})")
+    
+    return ", ".join(tuples), params
+
+def execute_multi_row_insert(connection, table: str, columns: Sequence[str],
+                             rows: Sequence[Dict[str, Any]], returning: Optional[str] = None,
+                             on_conflict: Optional[str] = None, chunk_size: int = 500) -> List[Any]:
+    """
+    Insert many rows using multi-row INSERT ... VALUES statements
+    
+    Rows are written in chunks of ``chunk_size`` so that one statement never
+    carries an unbounded number of bind parameters.
+    
+    Args:
+        connection: Database connection
+        table: Target table name
+        columns: Column names to insert
+        rows: Row dictionaries keyed by column name
+        returning: Optional RETURNING column list
+        on_conflict: Optional ON CONFLICT clause
+        chunk_size: Maximum rows per statement
+    
+    Returns:
+        List of RETURNING rows (empty when ``returning`` is not given)
+    """
+    returned = []
+    
+    for start in range(0, len(rows), chunk_size):
+        values_sql, params = build_values_clause(columns, rows[start:start + chunk_size])
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values_sql}"
+        if on_conflict:
+            query += f" {on_conflict}"
+        if returning:
+            query += f" RETURNING {returning}"
+        
+        result = connection.execute(text(query), params)
+        if returning:
+            returned.extend(result.fetchall())
+    
+    return returned
+
 # Common query patterns
 class CommonQueries:
     """Common SQL query patterns for the ERP system"""
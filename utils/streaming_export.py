@@ -0,0 +1,431 @@
+"""
+Streaming Report Export
+Writes query results to CSV, XLSX or Parquet files in fixed-size chunks
+
+Rows are read through a server-side cursor (``stream_results``) and handed to
+the writer one chunk at a time, so peak memory depends on ``chunk_size``, not
+on the number of rows:
+
+- CSV is appended chunk by chunk.
+- XLSX uses xlsxwriter's ``constant_memory`` mode, which flushes every row
+  to disk as it is written. Sheets roll over at Excel's row limit.
+- Parquet writes one row group per chunk (requires pyarrow). The file
+  schema is fixed up front from the query's column types, so chunks whose
+  values alone would infer a different type (NULL-only columns, numerics of
+  another precision) still match it.
+
+Files are written to ``EXPORT_DIR`` and removed by the next export once they
+are older than an hour. An optional ``transform`` is applied to
+every chunk before it is written (e.g. running balances that carry state
+across chunks), and ``progress`` is called after every chunk.
+"""
+
+import csv
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from sqlalchemy import text
+from db_config import engine
+from utils.logger import get_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = get_logger("streaming_export")
+
+EXPORT_CHUNK_SIZE = 10000
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "gl_exports"))
+
+# Data rows per worksheet (Excel limit minus the header row)
+XLSX_MAX_ROWS_PER_SHEET = 1048575
+
+EXPORT_FORMATS = {
+    "CSV": {"extension": "csv", "mime": "text/csv"},
+    "XLSX": {"extension": "xlsx",
+             "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "Parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet"}
+}
+
+
+# PostgreSQL type OIDs of query columns written to Parquet with a specific type
+PG_BOOL, PG_INT8, PG_INT2, PG_INT4 = 16, 20, 21, 23
+PG_FLOAT4, PG_FLOAT8, PG_NUMERIC = 700, 701, 1700
+PG_DATE, PG_TIMESTAMP, PG_TIMESTAMPTZ = 1082, 1114, 1184
+
+
+def available_formats() -> List[str]:
+    """Export formats usable in this environment"""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "Parquet" or PYARROW_AVAILABLE]
+
+
+@dataclass
+class ExportResult:
+    """Outcome of one export"""
+    path: str
+    file_name: str
+    export_format: str
+    mime: str
+    rows: int = 0
+    chunks: int = 0
+    size_bytes: int = 0
+    duration: float = 0.0
+    totals: Dict[str, float] = field(default_factory=dict)
+
+
+class RunningBalance:
+    """Chunk transform adding a running debit - credit balance per account across chunks"""
+
+    def __init__(self, account_column: str = "glaccountid", debit_column: str = "debitamount",
+                 credit_column: str = "creditamount", output_column: str = "running_balance"):
+        self.account_column = account_column
+        self.debit_column = debit_column
+        self.credit_column = credit_column
+        self.output_column = output_column
+        self._carry: Dict[Any, float] = {}
+
+    def __call__(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        net = (pd.to_numeric(chunk[self.debit_column], errors="coerce").fillna(0.0)
+               - pd.to_numeric(chunk[self.credit_column], errors="coerce").fillna(0.0))
+        accounts = chunk[self.account_column]
+        running = net.groupby(accounts, sort=False).cumsum()
+        running = running + accounts.map(self._carry).fillna(0.0)
+        chunk[self.output_column] = running.round(2)
+        last = chunk.groupby(self.account_column, sort=False)[self.output_column].last()
+        self._carry.update(last.to_dict())
+        return chunk
+
+
+def _cell_value(value: Any) -> Any:
+    """Plain Python value xlsxwriter can write"""
+    if value is None:
+        return None
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+class _CSVWriter:
+    def __init__(self, path: str, columns: List[str]):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, chunk: pd.DataFrame):
+        chunk.to_csv(self._file, header=False, index=False)
+
+    def close(self, totals: Dict[str, float]):
+        self._file.close()
+
+    def abort(self):
+        self._file.close()
+
+
+class _XLSXWriter:
+    def __init__(self, path: str, columns: List[str], sheet_name: str,
+                 column_formats: Optional[Dict[str, str]] = None):
+        self._workbook = xlsxwriter.Workbook(path, {"constant_memory": True,
+                                                    "default_date_format": "yyyy-mm-dd"})
+        self._columns = columns
+        self._sheet_name = sheet_name
+        self._bold = self._workbook.add_format({"bold": True})
+        self._formats = {
+            "currency": self._workbook.add_format({"num_format": "#,##0.00", "align": "right"}),
+            "date": self._workbook.add_format({"num_format": "yyyy-mm-dd"}),
+            "datetime": self._workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        }
+        self._column_formats = {
+            index: self._formats.get((column_formats or {}).get(column))
+            for index, column in enumerate(columns)
+        }
+        self._sheets = 0
+        self._sheet = None
+        self._row = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self._sheets += 1
+        name = self._sheet_name if self._sheets == 1 else f"{self._sheet_name}_{self._sheets}"
+        self._sheet = self._workbook.add_worksheet(name[:31])
+        for index, column in enumerate(self._columns):
+            self._sheet.set_column(index, index, 30 if "description" in column or column == "memo" else 15,
+                                   self._column_formats[index])
+        self._sheet.write_row(0, 0, self._columns, self._bold)
+        self._row = 1
+
+    def write(self, chunk: pd.DataFrame):
+        for record in chunk.itertuples(index=False, name=None):
+            if self._row > XLSX_MAX_ROWS_PER_SHEET:
+                self._new_sheet()
+            for index, value in enumerate(record):
+                value = _cell_value(value)
+                if value is None:
+                    continue
+                cell_format = self._column_formats[index]
+                if isinstance(value, datetime):
+                    self._sheet.write_datetime(self._row, index, value, cell_format or self._formats["datetime"])
+                elif isinstance(value, date):
+                    self._sheet.write_datetime(self._row, index, datetime(value.year, value.month, value.day),
+                                               cell_format or self._formats["date"])
+                else:
+                    self._sheet.write(self._row, index, value, cell_format)
+            self._row += 1
+
+    def close(self, totals: Dict[str, float]):
+        if totals:
+            row = self._row + 1
+            self._sheet.write(row, 0, "TOTALS:", self._bold)
+            for column, total in totals.items():
+                self._sheet.write_number(row, self._columns.index(column), total, self._formats["currency"])
+        self._workbook.close()
+
+    def abort(self):
+        # xlsxwriter has no discard; closing releases the file and its temp files
+        if self._workbook.fileclosed:
+            return
+        self._workbook.close()
+
+
+def _arrow_type(type_code: Any, precision: Optional[int], scale: Optional[int]):
+    """Parquet column type of a query column (text for types without a mapping)"""
+    if type_code == PG_BOOL:
+        return pa.bool_()
+    if type_code in (PG_INT2, PG_INT4, PG_INT8):
+        return pa.int64()
+    if type_code in (PG_FLOAT4, PG_FLOAT8):
+        return pa.float64()
+    if type_code == PG_NUMERIC:
+        # Unconstrained NUMERIC (e.g. sums) has no fixed scale to store as a decimal
+        if precision and scale is not None and precision <= 38:
+            return pa.decimal128(precision, scale)
+        return pa.float64()
+    if type_code == PG_DATE:
+        return pa.date32()
+    if type_code == PG_TIMESTAMP:
+        return pa.timestamp("us")
+    if type_code == PG_TIMESTAMPTZ:
+        return pa.timestamp("us", tz="UTC")
+    return pa.string()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str, columns: List[str], column_types: Dict[str, tuple]):
+        self._path = path
+        self._columns = columns
+        self._column_types = column_types
+        self._schema = None
+        self._writer = None
+
+    def _build_schema(self, chunk: Optional[pd.DataFrame]):
+        fields = []
+        for column in self._columns:
+            if column in self._column_types:
+                arrow_type = _arrow_type(*self._column_types[column])
+            elif chunk is not None and not pd.api.types.is_string_dtype(chunk[column].dtype):
+                # Columns added by a transform carry a numpy dtype; text columns may be
+                # object or pandas string dtype
+                arrow_type = pa.from_numpy_dtype(chunk[column].dtype)
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(column, arrow_type))
+        return pa.schema(fields)
+
+    def write(self, chunk: pd.DataFrame):
+        if self._schema is None:
+            self._schema = self._build_schema(chunk)
+            self._writer = pq.ParquetWriter(self._path, self._schema)
+        chunk = chunk.copy(deep=False)
+        for schema_field in self._schema:
+            values = chunk[schema_field.name]
+            if pa.types.is_floating(schema_field.type) and values.dtype == object:
+                chunk[schema_field.name] = pd.to_numeric(values, errors="coerce")
+            elif pa.types.is_string(schema_field.type):
+                chunk[schema_field.name] = values.map(lambda v: None if pd.isna(v) else str(v))
+        self._writer.write_table(pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False))
+
+    def close(self, totals: Dict[str, float]):
+        if self._writer is None:
+            # Empty result: a file with the schema and no rows
+            self._schema = self._build_schema(None)
+            pq.write_table(self._schema.empty_table(), self._path)
+        else:
+            self._writer.close()
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class StreamingExporter:
+    """Exports a query in chunks through a server-side cursor"""
+
+    def __init__(self, chunk_size: int = EXPORT_CHUNK_SIZE, export_dir: str = EXPORT_DIR):
+        self.chunk_size = chunk_size
+        self.export_dir = export_dir
+
+    def count_rows(self, query: str, params: Optional[Dict[str, Any]] = None) -> int:
+        """Number of rows the query returns (for progress reporting)"""
+        with engine.connect() as conn:
+            return int(conn.execute(text(f"SELECT COUNT(*) FROM ({query}) AS export_rows"),
+                                    params or {}).scalar())
+
+    def iter_chunks(self, query: str, params: Optional[Dict[str, Any]] = None,
+                    column_types: Optional[Dict[str, tuple]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Query result as DataFrames of at most ``chunk_size`` rows
+
+        ``column_types`` is filled with {column: (type_code, precision, scale)} from the
+        cursor description once the first chunk has been fetched (also for empty results).
+        """
+        with engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, max_row_buffer=self.chunk_size
+            ).execute(text(query), params or {})
+            columns = list(result.keys())
+            # A server-side cursor describes its columns after the first fetch
+            cursor = result.cursor
+            while True:
+                rows = result.fetchmany(self.chunk_size)
+                if column_types is not None and not column_types and cursor.description:
+                    column_types.update({
+                        column.name: (column.type_code, column.precision, column.scale)
+                        for column in cursor.description
+                    })
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def export(self, query: str, params: Optional[Dict[str, Any]], export_format: str, file_stem: str,
+               columns: Optional[List[str]] = None,
+               transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+               column_formats: Optional[Dict[str, str]] = None,
+               total_columns: Optional[List[str]] = None,
+               progress: Optional[Callable[[int, Optional[int]], None]] = None,
+               total_rows: Optional[int] = None,
+               sheet_name: str = "Export") -> ExportResult:
+        """
+        Stream a query into an export file
+
+        Args:
+            query: SELECT statement
+            params: Query parameters
+            export_format: One of EXPORT_FORMATS
+            file_stem: File name without extension
+            columns: Columns to write, in order (None = all query columns)
+            transform: Applied to every chunk before it is written
+            column_formats: XLSX formats by column ("currency", "date", "datetime")
+            total_columns: Numeric columns summed into the result (and the XLSX totals row)
+            progress: Called as progress(rows_written, total_rows) after every chunk
+            total_rows: Expected row count passed to ``progress``
+            sheet_name: XLSX worksheet name
+
+        Returns:
+            ExportResult describing the written file
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        if export_format == "Parquet" and not PYARROW_AVAILABLE:
+            raise ValueError("Parquet export requires pyarrow")
+
+        started = time.perf_counter()
+        spec = EXPORT_FORMATS[export_format]
+        os.makedirs(self.export_dir, exist_ok=True)
+        cleanup_exports(export_dir=self.export_dir)
+        file_name = f"{file_stem}.{spec['extension']}"
+        path = os.path.join(self.export_dir, f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{file_name}")
+
+        result = ExportResult(path=path, file_name=file_name, export_format=export_format, mime=spec["mime"],
+                              totals={column: 0.0 for column in total_columns or []})
+        writer = None
+        column_types: Dict[str, tuple] = {}
+        try:
+            for chunk in self.iter_chunks(query, params, column_types):
+                if transform is not None:
+                    chunk = transform(chunk)
+                if columns is not None:
+                    chunk = chunk[columns]
+                for column in result.totals:
+                    result.totals[column] += float(pd.to_numeric(chunk[column], errors="coerce").fillna(0).sum())
+
+                if writer is None:
+                    writer = self._open_writer(export_format, path, list(chunk.columns), sheet_name,
+                                               column_formats, column_types)
+                writer.write(chunk)
+
+                result.rows += len(chunk)
+                result.chunks += 1
+                if progress is not None:
+                    progress(result.rows, total_rows)
+
+            if writer is None:
+                # Empty result: still produce a file with the header
+                writer = self._open_writer(export_format, path, columns or list(column_types),
+                                           sheet_name, column_formats, column_types)
+            writer.close({column: round(total, 2) for column, total in result.totals.items()})
+        except Exception:
+            # Release the file handle before removing the partial file; cleanup errors
+            # are logged so they never replace the original one
+            if writer is not None:
+                try:
+                    writer.abort()
+                except Exception as cleanup_error:
+                    logger.warning(f"Could not close partial export {path}: {cleanup_error}")
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as cleanup_error:
+                logger.warning(f"Could not remove partial export {path}: {cleanup_error}")
+            raise
+
+        result.size_bytes = os.path.getsize(path)
+        result.duration = time.perf_counter() - started
+        logger.info(f"Exported {result.rows} rows in {result.chunks} chunks to {path} "
+                    f"({result.size_bytes} bytes, {result.duration:.2f}s)")
+        return result
+
+    @staticmethod
+    def _open_writer(export_format: str, path: str, columns: List[str], sheet_name: str,
+                     column_formats: Optional[Dict[str, str]], column_types: Dict[str, tuple]):
+        if export_format == "CSV":
+            return _CSVWriter(path, columns)
+        if export_format == "XLSX":
+            return _XLSXWriter(path, columns, sheet_name, column_formats)
+        return _ParquetWriter(path, columns, column_types)
+
+
+def cleanup_exports(max_age_seconds: int = 3600, export_dir: str = EXPORT_DIR) -> int:
+    """Delete export files older than ``max_age_seconds``; returns the number removed"""
+    if not os.path.isdir(export_dir):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(export_dir):
+        path = os.path.join(export_dir, name)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Could not remove export {path}: {e}")
+    return removed
+
+
+# Process-wide exporter used by the report pages
+streaming_exporter = StreamingExporter()
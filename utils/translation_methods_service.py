@@ -9,14 +9,19 @@ Author: Claude Code Assistant
 Date: August 6, 2025
 """
 
+import calendar
 import logging
+from bisect import bisect_right
+from dataclasses import dataclass, field
 from datetime import datetime, date, timedelta
 from decimal import Decimal, ROUND_HALF_UP
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Iterable, Optional, Tuple, Any
 from enum import Enum
+import numpy as np
 from sqlalchemy import text
 from db_config import engine
 from utils.currency_service import CurrencyTranslationService
+from utils.sql_helpers import execute_multi_row_insert
 from utils.logger import get_logger
 
 logger = get_logger("translation_methods_service")
@@ -42,6 +47,28 @@ class FinancialStatementItem(Enum):
     EXPENSES = "EXPENSES"
     GAINS_LOSSES = "GAINS_LOSSES"
 
+TRANSLATION_DETAIL_COLUMNS = [
+    "history_id", "gl_account", "account_name", "account_type", "monetary_classification",
+    "rate_type", "balance_fc", "rate_applied", "balance_translated"
+]
+
+@dataclass
+class TranslationRates:
+    """Closing, period-average and historical rates of one currency pair, resolved together."""
+    from_currency: str
+    to_currency: str
+    closing: Dict[date, Decimal] = field(default_factory=dict)
+    average: Dict[Tuple[int, int], Decimal] = field(default_factory=dict)
+    historical: Dict[date, Optional[Decimal]] = field(default_factory=dict)
+    
+    def historical_array(self, dates: np.ndarray, fallback: Decimal) -> np.ndarray:
+        """Historical rate per date as floats, ``fallback`` where no rate exists."""
+        unique_dates, inverse = np.unique(dates, return_inverse=True)
+        values = np.array([
+            float(self.historical.get(d) or fallback) for d in unique_dates
+        ], dtype=np.float64)
+        return values[inverse]
+
 class TranslationMethodsService:
     """Service implementing current rate and temporal translation methods."""
     
@@ -89,8 +116,12 @@ class TranslationMethodsService:
         
         try:
             # Get exchange rates
-            current_rate = self._get_closing_rate(functional_currency, presentation_currency, translation_date)
-            average_rate = self._get_average_rate(functional_currency, presentation_currency, fiscal_year, fiscal_period)
+            rates = self._resolve_rates(
+                functional_currency, presentation_currency,
+                closing_dates=[translation_date], average_periods=[(fiscal_year, fiscal_period)]
+            )
+            current_rate = rates.closing[translation_date]
+            average_rate = rates.average[(fiscal_year, fiscal_period)]
             
             translation_result["exchange_rates_used"] = {
                 "current_rate": float(current_rate),
@@ -142,6 +173,8 @@ class TranslationMethodsService:
                     
                     account_key = f"{account['glaccountid']}_{account['accountname']}"
                     translation_result["translated_balances"][account_key] = {
+                        "gl_account": account['glaccountid'],
+                        "account_name": account['accountname'],
                         "account_type": account['accounttype'],
                         "balance_fc": float(balance_fc),
                         "rate_applied": float(current_rate),
@@ -186,6 +219,8 @@ class TranslationMethodsService:
                     
                     account_key = f"{account['glaccountid']}_{account['accountname']}"
                     translation_result["translated_balances"][account_key] = {
+                        "gl_account": account['glaccountid'],
+                        "account_name": account['accountname'],
                         "account_type": "EQUITY",
                         "balance_fc": float(balance_fc),
                         "rate_applied": float(historical_rate),
@@ -234,6 +269,8 @@ class TranslationMethodsService:
                     
                     account_key = f"{account['glaccountid']}_{account['accountname']}"
                     translation_result["translated_balances"][account_key] = {
+                        "gl_account": account['glaccountid'],
+                        "account_name": account['accountname'],
                         "account_type": account['accounttype'],
                         "balance_fc": float(balance_fc),
                         "rate_applied": float(average_rate),
@@ -305,18 +342,8 @@ class TranslationMethodsService:
         }
         
         try:
-            # Get exchange rates
-            current_rate = self._get_closing_rate(functional_currency, reporting_currency, translation_date)
-            average_rate = self._get_average_rate(functional_currency, reporting_currency, fiscal_year, fiscal_period)
-            
-            translation_result["exchange_rates_used"] = {
-                "current_rate": float(current_rate),
-                "average_rate": float(average_rate),
-                "rate_date": str(translation_date)
-            }
-            
             with engine.connect() as conn:
-                # Translate monetary items at current rate
+                # Monetary items: one balance per account
                 monetary_query = text("""
                     SELECT 
                         ga.glaccountid,
@@ -331,6 +358,7 @@ class TranslationMethodsService:
                     FROM journalentryline jel
                     JOIN glaccount ga ON jel.glaccountid = ga.glaccountid
                     JOIN journalentryheader jeh ON jel.documentnumber = jeh.documentnumber
+                        AND jel.companycodeid = jeh.companycodeid
                     WHERE jel.companycodeid = :entity_id
                     AND ga.monetary_classification = 'MONETARY'
                     AND jeh.postingdate <= :translation_date
@@ -341,114 +369,129 @@ class TranslationMethodsService:
                 monetary_items = conn.execute(monetary_query, {
                     "entity_id": entity_id,
                     "translation_date": translation_date
-                }).fetchall()
-                
-                total_monetary_translated = Decimal('0.00')
-                
-                for account in monetary_items:
-                    balance_fc = Decimal(str(account['balance_fc']))
-                    # Temporal method: Monetary at current rate
-                    balance_translated = balance_fc * current_rate
-                    
-                    account_key = f"{account['glaccountid']}_{account['accountname']}"
-                    translation_result["translated_balances"][account_key] = {
-                        "account_type": account['accounttype'],
-                        "monetary_classification": account['monetary_classification'],
-                        "balance_fc": float(balance_fc),
-                        "rate_applied": float(current_rate),
-                        "balance_translated": float(balance_translated),
-                        "rate_type": AccountTranslationRate.CURRENT.value
-                    }
-                    
-                    total_monetary_translated += balance_translated
+                }).mappings().fetchall()
                 
-                # Translate non-monetary items at historical rates
+                # Non-monetary items: one row per line with its acquisition date
                 non_monetary_query = text("""
                     SELECT 
                         ga.glaccountid,
                         ga.accountname,
                         ga.accounttype,
-                        ga.monetary_classification,
                         jel.debitamount - jel.creditamount as balance_fc,
                         jel.exchange_rate as historical_rate,
                         jeh.postingdate as acquisition_date
                     FROM journalentryline jel
                     JOIN glaccount ga ON jel.glaccountid = ga.glaccountid
                     JOIN journalentryheader jeh ON jel.documentnumber = jeh.documentnumber
+                        AND jel.companycodeid = jeh.companycodeid
                     WHERE jel.companycodeid = :entity_id
                     AND ga.monetary_classification = 'NON_MONETARY'
                     AND jeh.postingdate <= :translation_date
                     AND jeh.workflow_status = 'POSTED'
-                    ORDER BY jeh.postingdate
                 """)
                 
                 non_monetary_items = conn.execute(non_monetary_query, {
                     "entity_id": entity_id,
                     "translation_date": translation_date
                 }).fetchall()
+            
+            # Resolve every rate the translation needs in one pass
+            acquisition_dates = np.array([item[5] for item in non_monetary_items], dtype=object)
+            rates = self._resolve_rates(
+                functional_currency, reporting_currency,
+                closing_dates=[translation_date],
+                average_periods=[(fiscal_year, fiscal_period)],
+                historical_dates=acquisition_dates
+            )
+            current_rate = rates.closing[translation_date]
+            average_rate = rates.average[(fiscal_year, fiscal_period)]
+            
+            translation_result["exchange_rates_used"] = {
+                "current_rate": float(current_rate),
+                "average_rate": float(average_rate),
+                "rate_date": str(translation_date),
+                "historical_dates": len(rates.historical)
+            }
+            
+            total_monetary_translated = Decimal('0.00')
+            
+            for account in monetary_items:
+                balance_fc = Decimal(str(account['balance_fc'])) if account['balance_fc'] else Decimal('0.00')
+                # Temporal method: Monetary at current rate
+                balance_translated = balance_fc * current_rate
+                
+                account_key = f"{account['glaccountid']}_{account['accountname']}"
+                translation_result["translated_balances"][account_key] = {
+                    "gl_account": account['glaccountid'],
+                    "account_name": account['accountname'],
+                    "account_type": account['accounttype'],
+                    "monetary_classification": account['monetary_classification'],
+                    "balance_fc": float(balance_fc),
+                    "rate_applied": float(current_rate),
+                    "balance_translated": float(balance_translated),
+                    "rate_type": AccountTranslationRate.CURRENT.value
+                }
+                
+                total_monetary_translated += balance_translated
+            
+            # Translate non-monetary items at historical rates: the line's own rate,
+            # else the rate at the acquisition date, else the closing rate
+            total_non_monetary_translated = Decimal('0.00')
+            
+            if non_monetary_items:
+                account_ids = np.array([item[0] for item in non_monetary_items], dtype=object)
+                item_balances = np.array([float(item[3] or 0) for item in non_monetary_items], dtype=np.float64)
+                line_rates = np.array([
+                    float(item[4]) if item[4] else np.nan for item in non_monetary_items
+                ], dtype=np.float64)
+                item_rates = np.where(
+                    np.isnan(line_rates),
+                    rates.historical_array(acquisition_dates, current_rate),
+                    line_rates
+                )
+                item_translated = item_balances * item_rates
+                
+                accounts, first_item, inverse = np.unique(account_ids, return_index=True, return_inverse=True)
+                balance_by_account = np.bincount(inverse, weights=item_balances, minlength=len(accounts))
+                translated_by_account = np.bincount(inverse, weights=item_translated, minlength=len(accounts))
+                weighted_rates = np.divide(
+                    translated_by_account, balance_by_account,
+                    out=np.zeros(len(accounts), dtype=np.float64), where=balance_by_account != 0
+                )
                 
-                non_monetary_by_account = {}
-                
-                for item in non_monetary_items:
-                    account_id = item['glaccountid']
-                    if account_id not in non_monetary_by_account:
-                        non_monetary_by_account[account_id] = {
-                            "accountname": item['accountname'],
-                            "accounttype": item['accounttype'],
-                            "items": []
-                        }
-                    
-                    non_monetary_by_account[account_id]["items"].append({
-                        "balance_fc": Decimal(str(item['balance_fc'])),
-                        "historical_rate": Decimal(str(item['historical_rate'])) if item['historical_rate'] else current_rate,
-                        "acquisition_date": item['acquisition_date']
-                    })
-                
-                total_non_monetary_translated = Decimal('0.00')
-                
-                for account_id, account_data in non_monetary_by_account.items():
-                    total_balance_fc = Decimal('0.00')
-                    total_balance_translated = Decimal('0.00')
-                    weighted_rate = Decimal('0.00')
-                    
-                    for item in account_data["items"]:
-                        balance_fc = item["balance_fc"]
-                        historical_rate = item["historical_rate"]
-                        total_balance_fc += balance_fc
-                        total_balance_translated += balance_fc * historical_rate
-                    
-                    if total_balance_fc != 0:
-                        weighted_rate = total_balance_translated / total_balance_fc
-                    
-                    account_key = f"{account_id}_{account_data['accountname']}"
+                for a, account_id in enumerate(accounts):
+                    item = non_monetary_items[first_item[a]]
+                    account_key = f"{account_id}_{item[1]}"
                     translation_result["translated_balances"][account_key] = {
-                        "account_type": account_data['accounttype'],
+                        "gl_account": account_id,
+                        "account_name": item[1],
+                        "account_type": item[2],
                         "monetary_classification": "NON_MONETARY",
-                        "balance_fc": float(total_balance_fc),
-                        "rate_applied": float(weighted_rate),
-                        "balance_translated": float(total_balance_translated),
+                        "balance_fc": float(balance_by_account[a]),
+                        "rate_applied": float(weighted_rates[a]),
+                        "balance_translated": float(translated_by_account[a]),
                         "rate_type": AccountTranslationRate.HISTORICAL.value
                     }
-                    
-                    total_non_monetary_translated += total_balance_translated
-                
-                # Calculate remeasurement gain/loss (goes to P&L)
-                total_translated = total_monetary_translated + total_non_monetary_translated
-                
-                # Get historical translated balance for comparison
-                historical_balance = self._get_historical_translated_balance(
-                    entity_id, fiscal_year, fiscal_period - 1
-                )
-                
-                remeasurement_gain_loss = total_translated - historical_balance
-                translation_result["remeasurement_gain_loss"] = remeasurement_gain_loss
-                translation_result["pnl_impact"] = remeasurement_gain_loss
-                
-                # Save translation results
-                self._save_translation_results(translation_result)
-                
-                logger.info(f"Temporal method translation completed for {entity_id}")
                 
+                total_non_monetary_translated = Decimal(repr(float(translated_by_account.sum())))
+            
+            # Calculate remeasurement gain/loss (goes to P&L)
+            total_translated = total_monetary_translated + total_non_monetary_translated
+            
+            # Get historical translated balance for comparison
+            historical_balance = self._get_historical_translated_balance(
+                entity_id, fiscal_year, fiscal_period - 1
+            )
+            
+            remeasurement_gain_loss = total_translated - historical_balance
+            translation_result["remeasurement_gain_loss"] = remeasurement_gain_loss
+            translation_result["pnl_impact"] = remeasurement_gain_loss
+            
+            # Save translation results
+            self._save_translation_results(translation_result)
+            
+            logger.info(f"Temporal method translation completed for {entity_id}")
+            
         except Exception as e:
             logger.error(f"Error applying temporal method: {e}")
             translation_result["error"] = str(e)
@@ -461,6 +504,9 @@ class TranslationMethodsService:
         """
         Compare results between current rate and temporal methods.
         
+        Both methods are applied in memory to a single extraction of the entity's
+        balances (see utils.translation_pipeline); the comparison is not saved.
+        
         Args:
             entity_id: Entity identifier
             functional_currency: Functional currency
@@ -485,53 +531,12 @@ class TranslationMethodsService:
         }
         
         try:
-            # Apply current rate method
-            current_rate_result = self.apply_current_rate_method(
-                entity_id, functional_currency, presentation_currency,
-                translation_date, fiscal_year, fiscal_period
-            )
-            
-            # Apply temporal method
-            temporal_result = self.apply_temporal_method(
-                entity_id, functional_currency, presentation_currency,
-                translation_date, fiscal_year, fiscal_period
-            )
+            # Both methods run on one extraction of the entity's balances
+            from utils.translation_pipeline import TranslationPipeline, TranslationScope
             
-            comparison_result["current_rate_method"] = {
-                "total_assets": self._sum_by_type(current_rate_result["translated_balances"], "ASSETS"),
-                "total_liabilities": self._sum_by_type(current_rate_result["translated_balances"], "LIABILITIES"),
-                "total_equity": self._sum_by_type(current_rate_result["translated_balances"], "EQUITY"),
-                "translation_adjustment": float(current_rate_result["translation_adjustment"]),
-                "oci_impact": float(current_rate_result["oci_impact"]),
-                "pnl_impact": 0
-            }
-            
-            comparison_result["temporal_method"] = {
-                "total_monetary": self._sum_by_classification(temporal_result["translated_balances"], "MONETARY"),
-                "total_non_monetary": self._sum_by_classification(temporal_result["translated_balances"], "NON_MONETARY"),
-                "remeasurement_gain_loss": float(temporal_result["remeasurement_gain_loss"]),
-                "oci_impact": 0,
-                "pnl_impact": float(temporal_result["pnl_impact"])
-            }
-            
-            # Calculate differences
-            comparison_result["differences"] = {
-                "oci_vs_pnl": abs(current_rate_result["oci_impact"] - temporal_result["pnl_impact"]),
-                "volatility_in_pnl": "Higher" if abs(temporal_result["pnl_impact"]) > 0 else "Lower",
-                "volatility_in_oci": "Higher" if abs(current_rate_result["oci_impact"]) > 0 else "Lower"
-            }
-            
-            # Recommendation based on accounting standards
-            if functional_currency != presentation_currency:
-                comparison_result["recommendation"] = (
-                    "Use Current Rate Method - Entity's functional currency differs from presentation currency. "
-                    "IAS 21.39 and ASC 830-30 require current rate method for translation."
-                )
-            else:
-                comparison_result["recommendation"] = (
-                    "Use Temporal Method - Entity's functional currency equals presentation currency. "
-                    "ASC 830-20 requires temporal method for remeasurement."
-                )
+            scope = TranslationScope(entity_id, functional_currency, translation_date,
+                                     fiscal_year, fiscal_period)
+            comparison_result = TranslationPipeline(self).compare([scope], presentation_currency)[0]
             
         except Exception as e:
             logger.error(f"Error comparing translation methods: {e}")
@@ -539,53 +544,113 @@ class TranslationMethodsService:
         
         return comparison_result
     
+    def _resolve_rates(self, from_currency: str, to_currency: str,
+                       closing_dates: Iterable[date] = (),
+                       average_periods: Iterable[Tuple[int, int]] = (),
+                       historical_dates: Iterable[date] = ()) -> TranslationRates:
+        """
+        Resolve every closing, period-average and historical rate of a currency pair in one query.
+        
+        - Closing: the CLOSING rate on the date, else 1.00
+        - Average: mean of the CLOSING and SPOT rates in the period's month, else the
+          closing rate on day 28 of the period
+        - Historical: the latest CLOSING (preferred) or SPOT rate on or before the date,
+          else None
+        
+        Args:
+            from_currency: Source currency
+            to_currency: Target currency
+            closing_dates: Dates needing a closing rate
+            average_periods: (fiscal_year, fiscal_period) pairs needing an average rate
+            historical_dates: Dates needing a historical rate
+            
+        Returns:
+            TranslationRates keyed by the requested dates and periods
+        """
+        closing_dates = set(closing_dates)
+        average_periods = set(average_periods)
+        historical_dates = {d for d in historical_dates if d is not None}
+        
+        rates = TranslationRates(from_currency, to_currency)
+        
+        # Day-28 closing fallbacks and the month bounds of every average period
+        month_bounds = {}
+        for fiscal_year, fiscal_period in average_periods:
+            if 1 <= fiscal_period <= 12:
+                month_bounds[(fiscal_year, fiscal_period)] = (
+                    date(fiscal_year, fiscal_period, 1),
+                    date(fiscal_year, fiscal_period, calendar.monthrange(fiscal_year, fiscal_period)[1])
+                )
+                closing_dates.add(date(fiscal_year, fiscal_period, 28))
+        
+        needed = closing_dates | historical_dates | {d for bounds in month_bounds.values() for d in bounds}
+        rows = []
+        if needed:
+            try:
+                with engine.connect() as conn:
+                    rows = conn.execute(text("""
+                        SELECT rate_date, rate_type, exchange_rate FROM exchange_rates
+                        WHERE from_currency = :from_curr
+                        AND to_currency = :to_curr
+                        AND rate_type IN ('CLOSING', 'SPOT')
+                        AND rate_date BETWEEN :start_date AND :end_date
+                        UNION ALL
+                        (SELECT rate_date, rate_type, exchange_rate FROM exchange_rates
+                         WHERE from_currency = :from_curr
+                         AND to_currency = :to_curr
+                         AND rate_type IN ('CLOSING', 'SPOT')
+                         AND rate_date < :start_date
+                         ORDER BY rate_date DESC, rate_type
+                         LIMIT 1)
+                    """), {
+                        "from_curr": from_currency,
+                        "to_curr": to_currency,
+                        "start_date": min(needed),
+                        "end_date": max(needed)
+                    }).fetchall()
+            except Exception as e:
+                logger.error(f"Error resolving {from_currency}/{to_currency} rates: {e}")
+        
+        closing_by_date = {}
+        spot_by_date = {}
+        for rate_date, rate_type, exchange_rate in rows:
+            target = closing_by_date if rate_type == 'CLOSING' else spot_by_date
+            target.setdefault(rate_date, Decimal(str(exchange_rate)))
+        
+        for closing_date in closing_dates:
+            rates.closing[closing_date] = closing_by_date.get(closing_date, Decimal('1.00'))
+        
+        for period in average_periods:
+            bounds = month_bounds.get(period)
+            period_rates = [
+                Decimal(str(exchange_rate)) for rate_date, _, exchange_rate in rows
+                if bounds and bounds[0] <= rate_date <= bounds[1]
+            ]
+            if period_rates:
+                rates.average[period] = sum(period_rates) / len(period_rates)
+            elif bounds:
+                rates.average[period] = rates.closing[date(period[0], period[1], 28)]
+            else:
+                rates.average[period] = Decimal('1.00')
+        
+        if historical_dates:
+            by_date = {**spot_by_date, **closing_by_date}
+            known_dates = sorted(by_date)
+            for historical_date in historical_dates:
+                position = bisect_right(known_dates, historical_date)
+                rates.historical[historical_date] = by_date[known_dates[position - 1]] if position else None
+        
+        return rates
+    
     def _get_closing_rate(self, from_currency: str, to_currency: str, rate_date: date) -> Decimal:
         """Get closing exchange rate."""
-        try:
-            with engine.connect() as conn:
-                result = conn.execute(text("""
-                    SELECT exchange_rate FROM exchange_rates
-                    WHERE from_currency = :from_curr
-                    AND to_currency = :to_curr
-                    AND rate_date = :rate_date
-                    AND rate_type = 'CLOSING'
-                    ORDER BY rate_date DESC
-                    LIMIT 1
-                """), {
-                    "from_curr": from_currency,
-                    "to_curr": to_currency,
-                    "rate_date": rate_date
-                }).scalar()
-                
-                return Decimal(str(result)) if result else Decimal('1.00')
-        except:
-            return Decimal('1.00')
+        return self._resolve_rates(from_currency, to_currency, closing_dates=[rate_date]).closing[rate_date]
     
     def _get_average_rate(self, from_currency: str, to_currency: str,
                          fiscal_year: int, fiscal_period: int) -> Decimal:
         """Get average exchange rate for period."""
-        try:
-            with engine.connect() as conn:
-                result = conn.execute(text("""
-                    SELECT AVG(exchange_rate) as avg_rate
-                    FROM exchange_rates
-                    WHERE from_currency = :from_curr
-                    AND to_currency = :to_curr
-                    AND EXTRACT(YEAR FROM rate_date) = :fiscal_year
-                    AND EXTRACT(MONTH FROM rate_date) = :fiscal_period
-                    AND rate_type IN ('CLOSING', 'SPOT')
-                """), {
-                    "from_curr": from_currency,
-                    "to_curr": to_currency,
-                    "fiscal_year": fiscal_year,
-                    "fiscal_period": fiscal_period
-                }).scalar()
-                
-                return Decimal(str(result)) if result else self._get_closing_rate(
-                    from_currency, to_currency, date(fiscal_year, fiscal_period, 28)
-                )
-        except:
-            return Decimal('1.00')
+        period = (fiscal_year, fiscal_period)
+        return self._resolve_rates(from_currency, to_currency, average_periods=[period]).average[period]
     
     def _get_historical_translated_balance(self, entity_id: str, fiscal_year: int,
                                           fiscal_period: int) -> Decimal:
@@ -611,11 +676,11 @@ class TranslationMethodsService:
             return Decimal('0.00')
     
     def _save_translation_results(self, translation_result: Dict[str, Any]):
-        """Save translation results to database."""
+        """Save translation results and their account lines in one transaction."""
         try:
             with engine.begin() as conn:
-                # Save to translation history
-                conn.execute(text("""
+                # Save to translation history (a rerun replaces the previous result)
+                history_id = conn.execute(text("""
                     INSERT INTO translation_history (
                         entity_id, translation_method, functional_currency,
                         presentation_currency, translation_date, fiscal_year,
@@ -626,11 +691,21 @@ class TranslationMethodsService:
                         :fiscal_year, :fiscal_period, :total_balance, :trans_adj,
                         :oci_impact, :pnl_impact, CURRENT_TIMESTAMP, 'TRANSLATION_SERVICE'
                     )
+                    ON CONFLICT ON CONSTRAINT uk_translation_history DO UPDATE SET
+                        functional_currency = EXCLUDED.functional_currency,
+                        presentation_currency = EXCLUDED.presentation_currency,
+                        total_translated_balance = EXCLUDED.total_translated_balance,
+                        translation_adjustment = EXCLUDED.translation_adjustment,
+                        oci_impact = EXCLUDED.oci_impact,
+                        pnl_impact = EXCLUDED.pnl_impact,
+                        created_at = EXCLUDED.created_at
+                    RETURNING history_id
                 """), {
                     "entity_id": translation_result["entity_id"],
                     "method": translation_result["method"],
                     "func_curr": translation_result["functional_currency"],
-                    "pres_curr": translation_result["presentation_currency"],
+                    "pres_curr": (translation_result.get("presentation_currency")
+                                  or translation_result.get("reporting_currency")),
                     "trans_date": translation_result["translation_date"],
                     "fiscal_year": translation_result["fiscal_year"],
                     "fiscal_period": translation_result["fiscal_period"],
@@ -641,26 +716,28 @@ class TranslationMethodsService:
                     "trans_adj": translation_result.get("translation_adjustment", 0),
                     "oci_impact": translation_result.get("oci_impact", 0),
                     "pnl_impact": translation_result.get("pnl_impact", 0)
-                })
+                }).scalar()
+                
+                # Account lines in one bulk write
+                conn.execute(text("DELETE FROM translation_history_details WHERE history_id = :history_id"),
+                             {"history_id": history_id})
+                execute_multi_row_insert(conn, "translation_history_details", TRANSLATION_DETAIL_COLUMNS, [
+                    {
+                        "history_id": history_id,
+                        "gl_account": item.get("gl_account"),
+                        "account_name": item.get("account_name"),
+                        "account_type": item.get("account_type"),
+                        "monetary_classification": item.get("monetary_classification"),
+                        "rate_type": item.get("rate_type"),
+                        "balance_fc": round(item["balance_fc"], 2),
+                        "rate_applied": round(item["rate_applied"], 6),
+                        "balance_translated": round(item["balance_translated"], 2)
+                    }
+                    for item in translation_result["translated_balances"].values()
+                ])
                 
         except Exception as e:
             logger.error(f"Error saving translation results: {e}")
-    
-    def _sum_by_type(self, balances: Dict[str, Any], account_type: str) -> float:
-        """Sum translated balances by account type."""
-        total = Decimal('0.00')
-        for account_data in balances.values():
-            if account_data.get("account_type") == account_type:
-                total += Decimal(str(account_data["balance_translated"]))
-        return float(total)
-    
-    def _sum_by_classification(self, balances: Dict[str, Any], classification: str) -> float:
-        """Sum translated balances by monetary classification."""
-        total = Decimal('0.00')
-        for account_data in balances.values():
-            if account_data.get("monetary_classification") == classification:
-                total += Decimal(str(account_data["balance_translated"]))
-        return float(total)
 
 # Create translation history table if not exists
 def create_translation_history_table():
@@ -690,6 +767,24 @@ def create_translation_history_table():
                     )
                 )
             """))
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS translation_history_details (
+                    detail_id SERIAL PRIMARY KEY,
+                    history_id INTEGER NOT NULL REFERENCES translation_history(history_id) ON DELETE CASCADE,
+                    gl_account VARCHAR(20),
+                    account_name VARCHAR(100),
+                    account_type VARCHAR(20),
+                    monetary_classification VARCHAR(20),
+                    rate_type VARCHAR(20),
+                    balance_fc DECIMAL(18,2),
+                    rate_applied DECIMAL(15,6),
+                    balance_translated DECIMAL(18,2)
+                )
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_translation_history_details_history
+                ON translation_history_details(history_id)
+            """))
             logger.info("Translation history table created successfully")
     except Exception as e:
         logger.error(f"Error creating translation history table: {e}")
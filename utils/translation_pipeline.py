@@ -0,0 +1,447 @@
+"""
+Translation Pipeline
+Extracts an entity's balances once and applies any number of translation methods in memory
+
+``TranslationPipeline.extract`` reads, for every requested scope (entity,
+translation date, fiscal period), one columnar ``TranslationBalances`` table:
+
+- per account: net debit up to the translation date, net debit of the fiscal
+  period and the average line rate (one grouped query for all entities of a date)
+- non-monetary items: net amounts grouped by account, acquisition date and line rate
+- the previous period's translated balance from translation_history
+
+Rates of every currency pair are resolved once through
+TranslationMethodsService._resolve_rates. The methods registered in
+``TRANSLATION_METHODS`` (current rate, temporal) then run as NumPy array
+arithmetic with the same account selection, signs and rate fallbacks as
+TranslationMethodsService.apply_current_rate_method and apply_temporal_method.
+Comparison reports are built without further database access and nothing is
+saved.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import text
+from db_config import engine
+from utils.translation_methods_service import (
+    AccountTranslationRate, TranslationMethodType, TranslationMethodsService, TranslationRates
+)
+from utils.logger import get_logger
+
+logger = get_logger("translation_pipeline")
+
+
+@dataclass(frozen=True)
+class TranslationScope:
+    """One entity and period to translate"""
+    entity_id: str
+    functional_currency: str
+    translation_date: date
+    fiscal_year: int
+    fiscal_period: int
+
+
+@dataclass
+class TranslationBalances:
+    """Columnar balances of one scope"""
+    scope: TranslationScope
+    gl_accounts: np.ndarray
+    account_names: np.ndarray
+    account_types: np.ndarray
+    classifications: np.ndarray
+    net_debit_to_date: np.ndarray
+    net_debit_period: np.ndarray
+    average_line_rate: np.ndarray
+    posted_to_date: np.ndarray
+    posted_in_period: np.ndarray
+    item_account_index: np.ndarray
+    item_amounts: np.ndarray
+    item_line_rates: np.ndarray
+    item_dates: np.ndarray
+    previous_translated_balance: Decimal
+
+    def __len__(self) -> int:
+        return len(self.gl_accounts)
+
+
+def _to_decimal(value: float) -> Decimal:
+    return Decimal(repr(float(value)))
+
+
+def _account_entries(balances: TranslationBalances, mask: np.ndarray, balance_fc: np.ndarray,
+                     rates: np.ndarray, translated: np.ndarray, rate_type: str,
+                     classification: bool = False) -> Dict[str, Dict]:
+    """translated_balances entries in the shape of TranslationMethodsService results"""
+    entries = {}
+    for i in np.flatnonzero(mask):
+        entry = {
+            "gl_account": balances.gl_accounts[i],
+            "account_name": balances.account_names[i],
+            "account_type": balances.account_types[i],
+            "balance_fc": float(balance_fc[i]),
+            "rate_applied": float(rates[i]),
+            "balance_translated": float(translated[i]),
+            "rate_type": rate_type
+        }
+        if classification:
+            entry["monetary_classification"] = balances.classifications[i]
+        entries[f"{balances.gl_accounts[i]}_{balances.account_names[i]}"] = entry
+    return entries
+
+
+def current_rate_method(balances: TranslationBalances, rates: TranslationRates) -> Dict[str, Any]:
+    """Current rate method: A&L at closing, equity at historical, P&L at average rate"""
+    scope = balances.scope
+    current_rate = float(rates.closing[scope.translation_date])
+    average_rate = float(rates.average[(scope.fiscal_year, scope.fiscal_period)])
+    types = balances.account_types
+
+    assets_liabilities_fc = np.where(types == "ASSETS", balances.net_debit_to_date, -balances.net_debit_to_date)
+    assets_liabilities = (balances.posted_to_date & np.isin(types, ["ASSETS", "LIABILITIES"]) &
+                          (assets_liabilities_fc != 0))
+    assets_liabilities_translated = assets_liabilities_fc * current_rate
+
+    equity = balances.posted_to_date & (types == "EQUITY")
+    equity_fc = -balances.net_debit_to_date
+    equity_rates = np.where(np.isnan(balances.average_line_rate) | (balances.average_line_rate == 0),
+                            current_rate, balances.average_line_rate)
+    equity_translated = equity_fc * equity_rates
+
+    income_expense = balances.posted_in_period & np.isin(types, ["REVENUE", "EXPENSES"])
+    income_expense_fc = np.where(types == "REVENUE", -balances.net_debit_period, balances.net_debit_period)
+    income_expense_translated = income_expense_fc * average_rate
+
+    translated_balances = {}
+    translated_balances.update(_account_entries(
+        balances, assets_liabilities, assets_liabilities_fc, np.full(len(balances), current_rate),
+        assets_liabilities_translated, AccountTranslationRate.CURRENT.value
+    ))
+    translated_balances.update(_account_entries(
+        balances, equity, equity_fc, equity_rates, equity_translated, AccountTranslationRate.HISTORICAL.value
+    ))
+    translated_balances.update(_account_entries(
+        balances, income_expense, income_expense_fc, np.full(len(balances), average_rate),
+        income_expense_translated, AccountTranslationRate.AVERAGE.value
+    ))
+
+    total_assets = assets_liabilities_translated[assets_liabilities & (types == "ASSETS")].sum()
+    total_liabilities = assets_liabilities_translated[assets_liabilities & (types == "LIABILITIES")].sum()
+    total_equity = equity_translated[equity].sum()
+    total_income = income_expense_translated[income_expense & (types == "REVENUE")].sum()
+    total_expense = income_expense_translated[income_expense & (types == "EXPENSES")].sum()
+
+    translation_adjustment = _to_decimal(
+        (total_assets - total_liabilities) - (total_income - total_expense) - total_equity
+    )
+    return {
+        "method": TranslationMethodType.CURRENT_RATE_METHOD.value,
+        "exchange_rates_used": {"current_rate": current_rate, "average_rate": average_rate,
+                                "rate_date": str(scope.translation_date)},
+        "translated_balances": translated_balances,
+        "total_assets": float(total_assets),
+        "total_liabilities": float(total_liabilities),
+        "total_equity": float(total_equity),
+        "translation_adjustment": translation_adjustment,
+        "oci_impact": translation_adjustment,
+        "pnl_impact": Decimal('0.00')
+    }
+
+
+def temporal_method(balances: TranslationBalances, rates: TranslationRates) -> Dict[str, Any]:
+    """Temporal method: monetary items at closing, non-monetary items at historical rates"""
+    scope = balances.scope
+    current_rate = float(rates.closing[scope.translation_date])
+    average_rate = float(rates.average[(scope.fiscal_year, scope.fiscal_period)])
+    types = balances.account_types
+
+    monetary = balances.posted_to_date & (balances.classifications == "MONETARY")
+    monetary_fc = np.where(np.isin(types, ["ASSETS", "EXPENSES"]),
+                           balances.net_debit_to_date, -balances.net_debit_to_date)
+    monetary_translated = monetary_fc * current_rate
+
+    # Line rate, else the rate at acquisition, else the closing rate
+    item_rates = np.where(
+        np.isnan(balances.item_line_rates) | (balances.item_line_rates == 0),
+        rates.historical_array(balances.item_dates, rates.closing[scope.translation_date])
+        if len(balances.item_dates) else np.empty(0),
+        balances.item_line_rates
+    )
+    non_monetary_fc = np.bincount(balances.item_account_index, weights=balances.item_amounts,
+                                  minlength=len(balances))
+    non_monetary_translated = np.bincount(balances.item_account_index,
+                                          weights=balances.item_amounts * item_rates,
+                                          minlength=len(balances))
+    non_monetary = np.bincount(balances.item_account_index, minlength=len(balances)) > 0
+    weighted_rates = np.divide(non_monetary_translated, non_monetary_fc,
+                               out=np.zeros(len(balances), dtype=np.float64), where=non_monetary_fc != 0)
+
+    translated_balances = {}
+    translated_balances.update(_account_entries(
+        balances, monetary, monetary_fc, np.full(len(balances), current_rate), monetary_translated,
+        AccountTranslationRate.CURRENT.value, classification=True
+    ))
+    translated_balances.update(_account_entries(
+        balances, non_monetary, non_monetary_fc, weighted_rates, non_monetary_translated,
+        AccountTranslationRate.HISTORICAL.value, classification=True
+    ))
+
+    total_monetary = monetary_translated[monetary].sum()
+    total_non_monetary = non_monetary_translated[non_monetary].sum()
+    remeasurement = _to_decimal(total_monetary + total_non_monetary) - balances.previous_translated_balance
+    return {
+        "method": TranslationMethodType.TEMPORAL_METHOD.value,
+        "exchange_rates_used": {"current_rate": current_rate, "average_rate": average_rate,
+                                "rate_date": str(scope.translation_date)},
+        "translated_balances": translated_balances,
+        "total_monetary": float(total_monetary),
+        "total_non_monetary": float(total_non_monetary),
+        "remeasurement_gain_loss": remeasurement,
+        "oci_impact": Decimal('0.00'),
+        "pnl_impact": remeasurement
+    }
+
+
+# Translation methods by TranslationMethodType value; further methods can be registered here
+TRANSLATION_METHODS: Dict[str, Callable[[TranslationBalances, TranslationRates], Dict[str, Any]]] = {
+    TranslationMethodType.CURRENT_RATE_METHOD.value: current_rate_method,
+    TranslationMethodType.TEMPORAL_METHOD.value: temporal_method
+}
+
+
+class TranslationPipeline:
+    """Single-extraction translation of one or more entities and periods"""
+
+    def __init__(self, service: Optional[TranslationMethodsService] = None):
+        self.service = service or TranslationMethodsService()
+
+    def extract(self, scopes: Sequence[TranslationScope]) -> Dict[TranslationScope, TranslationBalances]:
+        """Balances of every scope; scopes sharing a date and period are read together"""
+        groups: Dict[Tuple[date, int, int], List[TranslationScope]] = {}
+        for scope in scopes:
+            groups.setdefault((scope.translation_date, scope.fiscal_year, scope.fiscal_period), []).append(scope)
+
+        extracted = {}
+        with engine.connect() as conn:
+            previous = self._previous_translated_balances(conn, scopes)
+            for (translation_date, fiscal_year, fiscal_period), group in groups.items():
+                entity_ids = sorted({scope.entity_id for scope in group})
+                params = {
+                    "entity_ids": entity_ids,
+                    "translation_date": translation_date,
+                    "fiscal_year": fiscal_year,
+                    "fiscal_period": fiscal_period
+                }
+
+                account_rows = conn.execute(text("""
+                    SELECT
+                        jel.companycodeid,
+                        ga.glaccountid,
+                        ga.accountname,
+                        ga.accounttype,
+                        ga.monetary_classification,
+                        SUM(CASE WHEN jeh.postingdate <= :translation_date
+                                 THEN jel.debitamount - jel.creditamount ELSE 0 END) as net_debit_to_date,
+                        SUM(CASE WHEN jeh.fiscalyear = :fiscal_year AND jeh.period = :fiscal_period
+                                 THEN jel.debitamount - jel.creditamount ELSE 0 END) as net_debit_period,
+                        AVG(CASE WHEN jeh.postingdate <= :translation_date
+                                 THEN COALESCE(jel.exchange_rate, 1.000000) END) as average_line_rate,
+                        BOOL_OR(jeh.postingdate <= :translation_date) as posted_to_date,
+                        BOOL_OR(jeh.fiscalyear = :fiscal_year AND jeh.period = :fiscal_period) as posted_in_period
+                    FROM journalentryline jel
+                    JOIN glaccount ga ON jel.glaccountid = ga.glaccountid
+                    JOIN journalentryheader jeh ON jel.documentnumber = jeh.documentnumber
+                        AND jel.companycodeid = jeh.companycodeid
+                    WHERE jel.companycodeid = ANY(:entity_ids)
+                    AND jeh.workflow_status = 'POSTED'
+                    AND (jeh.postingdate <= :translation_date
+                         OR (jeh.fiscalyear = :fiscal_year AND jeh.period = :fiscal_period))
+                    GROUP BY jel.companycodeid, ga.glaccountid, ga.accountname,
+                             ga.accounttype, ga.monetary_classification
+                    ORDER BY jel.companycodeid, ga.glaccountid
+                """), params).fetchall()
+
+                item_rows = conn.execute(text("""
+                    SELECT
+                        jel.companycodeid,
+                        jel.glaccountid,
+                        jeh.postingdate as acquisition_date,
+                        NULLIF(jel.exchange_rate, 0) as line_rate,
+                        SUM(jel.debitamount - jel.creditamount) as amount
+                    FROM journalentryline jel
+                    JOIN glaccount ga ON jel.glaccountid = ga.glaccountid
+                    JOIN journalentryheader jeh ON jel.documentnumber = jeh.documentnumber
+                        AND jel.companycodeid = jeh.companycodeid
+                    WHERE jel.companycodeid = ANY(:entity_ids)
+                    AND ga.monetary_classification = 'NON_MONETARY'
+                    AND jeh.postingdate <= :translation_date
+                    AND jeh.workflow_status = 'POSTED'
+                    GROUP BY jel.companycodeid, jel.glaccountid, jeh.postingdate, NULLIF(jel.exchange_rate, 0)
+                """), params).fetchall()
+
+                for scope in group:
+                    extracted[scope] = self._build_balances(
+                        scope,
+                        [row for row in account_rows if row[0] == scope.entity_id],
+                        [row for row in item_rows if row[0] == scope.entity_id],
+                        previous.get((scope.entity_id, scope.fiscal_year, scope.fiscal_period - 1),
+                                     Decimal('0.00'))
+                    )
+        return extracted
+
+    @staticmethod
+    def _previous_translated_balances(conn, scopes: Sequence[TranslationScope]
+                                      ) -> Dict[Tuple[str, int, int], Decimal]:
+        """Latest translation_history balance of each scope's previous period"""
+        if not scopes:
+            return {}
+        try:
+            rows = conn.execute(text("""
+                SELECT DISTINCT ON (th.entity_id, th.fiscal_year, th.fiscal_period)
+                    th.entity_id, th.fiscal_year, th.fiscal_period, th.total_translated_balance
+                FROM translation_history th
+                JOIN unnest(CAST(:entity_ids AS VARCHAR[]), CAST(:fiscal_years AS INTEGER[]),
+                            CAST(:fiscal_periods AS INTEGER[])) AS p(entity_id, fiscal_year, fiscal_period)
+                    ON th.entity_id = p.entity_id
+                    AND th.fiscal_year = p.fiscal_year
+                    AND th.fiscal_period = p.fiscal_period
+                ORDER BY th.entity_id, th.fiscal_year, th.fiscal_period, th.translation_date DESC
+            """), {
+                "entity_ids": [scope.entity_id for scope in scopes],
+                "fiscal_years": [scope.fiscal_year for scope in scopes],
+                "fiscal_periods": [scope.fiscal_period - 1 for scope in scopes]
+            }).fetchall()
+        except Exception as e:
+            logger.error(f"Error reading previous translated balances: {e}")
+            return {}
+        return {(row[0], row[1], row[2]): Decimal(str(row[3] or 0)) for row in rows}
+
+    @staticmethod
+    def _build_balances(scope: TranslationScope, account_rows: List, item_rows: List,
+                        previous_translated_balance: Decimal) -> TranslationBalances:
+        gl_accounts = np.array([row[1] for row in account_rows], dtype=object)
+        positions = {gl_account: i for i, gl_account in enumerate(gl_accounts)}
+
+        return TranslationBalances(
+            scope=scope,
+            gl_accounts=gl_accounts,
+            account_names=np.array([row[2] for row in account_rows], dtype=object),
+            account_types=np.array([row[3] for row in account_rows], dtype=object),
+            classifications=np.array([row[4] for row in account_rows], dtype=object),
+            net_debit_to_date=np.array([float(row[5] or 0) for row in account_rows], dtype=np.float64),
+            net_debit_period=np.array([float(row[6] or 0) for row in account_rows], dtype=np.float64),
+            average_line_rate=np.array([np.nan if row[7] is None else float(row[7]) for row in account_rows],
+                                       dtype=np.float64),
+            posted_to_date=np.array([bool(row[8]) for row in account_rows], dtype=bool),
+            posted_in_period=np.array([bool(row[9]) for row in account_rows], dtype=bool),
+            item_account_index=np.array([positions[row[1]] for row in item_rows], dtype=np.int64),
+            item_amounts=np.array([float(row[4] or 0) for row in item_rows], dtype=np.float64),
+            item_line_rates=np.array([np.nan if row[3] is None else float(row[3]) for row in item_rows],
+                                     dtype=np.float64),
+            item_dates=np.array([row[2] for row in item_rows], dtype=object),
+            previous_translated_balance=previous_translated_balance
+        )
+
+    def resolve_rates(self, balances: Iterable[TranslationBalances],
+                      presentation_currency: str) -> Dict[str, TranslationRates]:
+        """Rates per functional currency covering every date and period of the balances"""
+        requirements: Dict[str, Dict[str, set]] = {}
+        for table in balances:
+            scope = table.scope
+            needs = requirements.setdefault(scope.functional_currency,
+                                            {"closing": set(), "average": set(), "historical": set()})
+            needs["closing"].add(scope.translation_date)
+            needs["average"].add((scope.fiscal_year, scope.fiscal_period))
+            needs["historical"].update(table.item_dates)
+
+        return {
+            functional_currency: self.service._resolve_rates(
+                functional_currency, presentation_currency,
+                closing_dates=needs["closing"], average_periods=needs["average"],
+                historical_dates=needs["historical"]
+            )
+            for functional_currency, needs in requirements.items()
+        }
+
+    def translate(self, scopes: Sequence[TranslationScope], presentation_currency: str,
+                  methods: Sequence[str] = tuple(TRANSLATION_METHODS)
+                  ) -> Dict[TranslationScope, Dict[str, Dict[str, Any]]]:
+        """
+        Apply each method to each scope from one extraction
+
+        Returns:
+            {scope: {method: method result}}
+        """
+        extracted = self.extract(scopes)
+        rates = self.resolve_rates(extracted.values(), presentation_currency)
+        return {
+            scope: {
+                method: TRANSLATION_METHODS[method](balances, rates[scope.functional_currency])
+                for method in methods
+            }
+            for scope, balances in extracted.items()
+        }
+
+    def compare(self, scopes: Sequence[TranslationScope], presentation_currency: str) -> List[Dict[str, Any]]:
+        """Comparison reports (the shape of compare_translation_methods) for every scope"""
+        translated = self.translate(scopes, presentation_currency)
+        return [
+            comparison_report(scope, presentation_currency, results)
+            for scope, results in translated.items()
+        ]
+
+
+def comparison_report(scope: TranslationScope, presentation_currency: str,
+                      results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Current rate versus temporal comparison of one scope"""
+    current = results[TranslationMethodType.CURRENT_RATE_METHOD.value]
+    temporal = results[TranslationMethodType.TEMPORAL_METHOD.value]
+
+    if scope.functional_currency != presentation_currency:
+        recommendation = (
+            "Use Current Rate Method - Entity's functional currency differs from presentation currency. "
+            "IAS 21.39 and ASC 830-30 require current rate method for translation."
+        )
+    else:
+        recommendation = (
+            "Use Temporal Method - Entity's functional currency equals presentation currency. "
+            "ASC 830-20 requires temporal method for remeasurement."
+        )
+
+    return {
+        "entity_id": scope.entity_id,
+        "translation_date": scope.translation_date,
+        "fiscal_year": scope.fiscal_year,
+        "fiscal_period": scope.fiscal_period,
+        "functional_currency": scope.functional_currency,
+        "presentation_currency": presentation_currency,
+        "current_rate_method": {
+            "total_assets": current["total_assets"],
+            "total_liabilities": current["total_liabilities"],
+            "total_equity": current["total_equity"],
+            "translation_adjustment": float(current["translation_adjustment"]),
+            "oci_impact": float(current["oci_impact"]),
+            "pnl_impact": 0
+        },
+        "temporal_method": {
+            "total_monetary": temporal["total_monetary"],
+            "total_non_monetary": temporal["total_non_monetary"],
+            "remeasurement_gain_loss": float(temporal["remeasurement_gain_loss"]),
+            "oci_impact": 0,
+            "pnl_impact": float(temporal["pnl_impact"])
+        },
+        "differences": {
+            "oci_vs_pnl": abs(current["oci_impact"] - temporal["pnl_impact"]),
+            "volatility_in_pnl": "Higher" if abs(temporal["pnl_impact"]) > 0 else "Lower",
+            "volatility_in_oci": "Higher" if abs(current["oci_impact"]) > 0 else "Lower"
+        },
+        "recommendation": recommendation
+    }
+
+
+def compare_translation_methods_bulk(scopes: Sequence[TranslationScope],
+                                     presentation_currency: str) -> List[Dict[str, Any]]:
+    """Compare translation methods for several entities or periods in one call."""
+    return TranslationPipeline().compare(scopes, presentation_currency)